@@ -19,6 +19,23 @@ import pyswarm.agents.agentState as ags
 
 
 
+#####################################
+def AgentsForParticleIds(particleIds, attributeGroupsController, startingBehaviour, agentStore=None):
+    """
+    Bulk equivalent of [Agent(particleId, ...) for particleId in particleIds] - returns list of new agents, ordered as
+    per particleIds.  Data blobs are created for the whole batch at once (one pass per attribute group), which is 
+    much quicker when large numbers of particles appear at once (e.g. from emitters).
+    """
+    agentsList = [Agent(particleId, attributeGroupsController, None, agentStore, False) for particleId in particleIds]
+    ags.AssignDataBlobsToAgentStates([agent.state for agent in agentsList], attributeGroupsController)
+    startingBehaviour.assignAgents(agentsList)
+    
+    return agentsList
+
+#####################################
+
+
+
 #####################################
 class Agent(PyswarmObject):
     """Represents single agent instance.   
@@ -57,8 +74,10 @@ class Agent(PyswarmObject):
         
     """
 
-    def __init__(self, particleId, attributeGroupsController, startingBehaviour):
-        self.state = ags.AgentState(particleId, attributeGroupsController)
+    def __init__(self, particleId, attributeGroupsController, startingBehaviour, agentStore=None, assignDataBlobs=True):
+        """If assignDataBlobs is False, the caller is responsible for assigning the data blobs and starting behaviour 
+        instead (see AgentsForParticleIds)."""
+        self.state = ags.AgentState(particleId, attributeGroupsController, agentStore, assignDataBlobs)
         
         self.currentBehaviour = None
         
@@ -72,7 +91,8 @@ class Agent(PyswarmObject):
         
         self.debugColour = col.DefaultColour
         
-        startingBehaviour.assignAgent(self)
+        if(assignDataBlobs):
+            startingBehaviour.assignAgent(self)
 
 ##################### 
     def __str__(self):
@@ -143,10 +163,25 @@ class Agent(PyswarmObject):
         return self.state.behaviourAttributes
     behaviourAttributes = property(_getBehaviourAttributes)
     
+    def _getNeedsBehaviourCalculation(self):
+        return self._needsBehaviourCalculation
+    needsBehaviourCalculation = property(_getNeedsBehaviourCalculation)
+    
 ##################### 
     def updateCurrentVectors(self, position, isFirstFrame=False):
         """Updates internal state from corresponding vectors."""
         self.state.updateCurrentVectors(position, isFirstFrame)
+        self._onVectorsUpdated()
+        
+########
+    def onVectorsUpdatedInStore(self):
+        """As updateCurrentVectors, but for when the agent's row in the AgentArrayStore has 
+        already been updated in bulk (i.e. by the AgentsController)."""
+        self.state.onVectorsUpdatedInStore()
+        self._onVectorsUpdated()
+        
+########
+    def _onVectorsUpdated(self):
         self._needsBehaviourCalculation = True         
         self._needsBehaviourCommit = False
         
@@ -162,6 +197,15 @@ class Agent(PyswarmObject):
             
             self._needsBehaviourCalculation = False
             self._needsBehaviourCommit = True
+            
+########
+    def setDesiredAccelerationFromBatch(self, x, y, z):
+        """Alternative to calculateDesiredBehaviour, for when the desired acceleration has been calculated
+        for many agents at once (see BehaviourBaseObject.getDesiredAccelerationsForAgents)."""
+        self._desiredAcceleration = v3.Vector3(x, y, z)
+        
+        self._needsBehaviourCalculation = False
+        self._needsBehaviourCommit = True
 
 ##############################
     def _jump(self):
@@ -178,24 +222,58 @@ class Agent(PyswarmObject):
         self._desiredAcceleration.invert()
         self._needsBehaviourCommit = True
 
+######################  
+    def _getCommittedVelocity(self):
+        desiredVelocity = v3.Vector3(self.currentVelocity)
+        desiredVelocity.add(self._desiredAcceleration)
+        return desiredVelocity
+    
+########
+    def _commitStickinessIfNecessary(self, particleShapeName):
+        if(self._stickinessChanged):
+            sceneInterface.SetSingleParticleStickinessScale(particleShapeName, self.agentId, self.stickinessScale)
+            self._stickinessChanged = False
+
 ######################  
     def commitNewBehaviour(self, particleShapeName):      
-        """Updates agent's corresponding Maya nParticle with current internal state."""
+        """Updates agent's corresponding Maya nParticle with current internal state.
+        Makes a separate Maya call for this agent - intended for one-off updates (e.g. makeJump), 
+        use commitNewBehaviourToBuffer when updating the whole swarm.
+        """
         if(self._needsBehaviourCommit):
-            desiredVelocity = v3.Vector3(self.currentVelocity)
-            desiredVelocity.add(self._desiredAcceleration)
-            
-            sceneInterface.SetSingleParticleVelocity(particleShapeName, self.agentId, desiredVelocity)
-            
-            if(self._stickinessChanged):
-                sceneInterface.SetSingleParticleStickinessScale(particleShapeName, self.agentId, self.stickinessScale)
-                self._stickinessChanged = False
+            sceneInterface.SetSingleParticleVelocity(particleShapeName, self.agentId, self._getCommittedVelocity())
+            self._commitStickinessIfNecessary(particleShapeName)
             
             self._needsBehaviourCommit = False
      
         #pm.particle(particleShapeName, e=True, at="velocityU", id=self._particleId, fv=self._velocity.u)
         #pm.particle(particleShapeName, e=True, at="velocityV", id=self._particleId, fv=self._velocity.v)
 
+########
+    def commitNewBehaviourToBuffer(self, particleShapeName, velocityBuffer, particleIndex):
+        """As commitNewBehaviour, but writes the new velocity into a flat [x0, y0, z0, x1...] velocity buffer 
+        (at the given particle index) rather than making a separate Maya call - the owner of the buffer is then 
+        responsible for pushing the whole thing to Maya in one go.
+        
+        :param particleShapeName: particleShapeNode name (still needed for stickiness, which is set individually).
+        :param velocityBuffer: flat list of floats, 3 per particle.
+        :param particleIndex: index of this agent's particle in the buffer, i.e. NOT the particle ID.
+        :returns: True if the buffer was written to, False otherwise (i.e. no new behaviour to commit).
+        """
+        if(self._needsBehaviourCommit):
+            desiredVelocity = self._getCommittedVelocity()
+            j = particleIndex * 3
+            velocityBuffer[j] = desiredVelocity.x
+            velocityBuffer[j + 1] = desiredVelocity.y
+            velocityBuffer[j + 2] = desiredVelocity.z
+            
+            self._commitStickinessIfNecessary(particleShapeName)
+            
+            self._needsBehaviourCommit = False
+            return True
+        else:
+            return False
+
 
 # END OF CLASS - Agent
 ################################################################################
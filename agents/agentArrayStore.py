@@ -0,0 +1,431 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+# 
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - without it the store falls back to the (slower) stdlib array module.
+
+from pyswarm.pyswarmObject import PyswarmObject
+import pyswarm.vectors.vector3 as v3
+
+
+
+_DEFAULT_INITIAL_CAPACITY_ = 64
+
+_VECTOR_COLUMN_NAMES_ = ("positions", "velocities", "accelerations",
+                         "avPositions", "avVelocities", "avCrowdedPositions", "avCollisionDirections")
+
+
+
+#####################################
+def NumpyAvailable():
+    """True if the store is backed by NumPy arrays (and so the vectorised paths are available), False otherwise."""
+    return (np is not None)
+
+#####################################
+def _NewFloatColumn(length):
+    if(np is not None):
+        return np.zeros(length, dtype=np.float64)
+    else:
+        return array.array('d', [0.0]) * length
+
+def _NewIntColumn(length):
+    if(np is not None):
+        return np.zeros(length, dtype=np.int64)
+    else:
+        return array.array('l', [0]) * length
+
+def _NewBoolColumn(length):
+    if(np is not None):
+        return np.zeros(length, dtype=np.bool_)
+    else:
+        return array.array('b', [0]) * length
+
+#####
+def _GrownColumn(column, newLength):
+    if(np is not None):
+        newColumn = np.zeros(newLength, dtype=column.dtype)
+        newColumn[:len(column)] = column
+        return newColumn
+    else:
+        column.extend(array.array(column.typecode, [0]) * (newLength - len(column)))
+        return column
+
+#####
+def _ColumnFromValues(values, typecode):
+    """Used when unpickling - the saved columns may not match the current backing type (i.e. NumPy (un)available)."""
+    if(np is not None):
+        dtype = { 'd' : np.float64, 'l' : np.int64, 'b' : np.bool_ }[typecode]
+        return np.array(values, dtype=dtype)
+    else:
+        return array.array(typecode, [(bool(value) if(typecode == 'b') else value) for value in values])
+
+#####################################
+def VectorRowsForAgentStates(agentStates, columnName):
+    """
+    Gathers the given vector column for a list of agent states into an (n x 3) NumPy array (a copy, ordered as
+    per agentStates).  Intended for the batch behaviour calculations - requires NumPy.
+    
+    :param agentStates: list of AgentState instances (normally, but not necessarily, all in the same store).
+    :param columnName: one of "positions", "velocities", "accelerations", "avPositions", "avVelocities",
+                       "avCrowdedPositions" or "avCollisionDirections".
+    """
+    numRows = len(agentStates)
+    if(numRows == 0):
+        return np.zeros((0, 3), dtype=np.float64)
+    
+    store = agentStates[0].store
+    if(all(agentState.store is store for agentState in agentStates)):
+        rows = np.fromiter((agentState.storeIndex for agentState in agentStates), dtype=np.intp, count=numRows)
+        return store.vectorColumnView(getattr(store, columnName))[rows]
+    else:
+        return np.array([agentState.store.rowValues(getattr(agentState.store, columnName), agentState.storeIndex) 
+                         for agentState in agentStates], dtype=np.float64)
+
+#####################################
+
+
+
+#####################################
+class AgentArrayStore(PyswarmObject):
+    """
+    Structure-of-arrays container holding the per-frame kinematic state of a group of agents - i.e. position, velocity,
+    acceleration, the neighbourhood averages, freefall flag and agent ID - in contiguous columns, rather than
+    as individual Vector3 instances hanging off each agent.
+
+    Each agent is allocated a dense row index when added; removing an agent moves the last row into the vacated
+    slot, so the active rows are always 0...count-1.  Vector columns are flat, 3 floats per row: [x0, y0, z0, x1...].
+
+    AgentState instances are thin views over a row (the store notifies them, via _onStoreRowChanged, if their
+    row index changes), so per-agent code can carry on reading Vector3s as before while batch code works
+    directly on the columns.
+
+    If NumPy is available the columns are NumPy arrays and the per-frame vector update is vectorised, otherwise
+    they are stdlib array.array instances and the update is done row-by-row.
+
+    IMPORTANT - the column objects are replaced whenever the store grows, so don't hang on to them (or
+    to the views returned by vectorColumnView) across agent additions.
+    """
+
+    def __init__(self, initialCapacity=_DEFAULT_INITIAL_CAPACITY_):
+        self._count = 0
+        self._capacity = 0
+        self._idToIndexLookup = {}
+        self._rowOwners = []
+
+        self.agentIds = _NewIntColumn(0)
+        self.isInFreefall = _NewBoolColumn(0)
+        for columnName in _VECTOR_COLUMN_NAMES_:
+            setattr(self, columnName, _NewFloatColumn(0))
+
+        self._layoutVersion = 0         # incremented every time rows are added, moved or removed.
+        self._cachedOrdering = None     #
+        self._cachedOrderingVersion = -1  #
+        self._cachedOrderingRows = None # particle ordering -> row indices, for the vectorised update.
+
+        self._grow(max(1, initialCapacity))
+
+#####################
+    def __str__(self):
+        return ("<%s, count=%d, capacity=%d, numpy=%s>" %
+                (type(self).__name__, self._count, self._capacity, "Y" if(np is not None) else "N"))
+
+########
+    def _getDebugStr(self):
+        rowStrings = [("\n\tid=%d, p=%s, v=%s, inFF=%s" %
+                       (self.agentIds[index], self.vector3At(self.positions, index),
+                        self.vector3At(self.velocities, index), "Y" if(self.isInFreefall[index]) else "N"))
+                      for index in xrange(self._count)]
+        return ("%s%s" % (self, ''.join(rowStrings)))
+
+#####################
+    def __getstate__(self):
+        state = super(AgentArrayStore, self).__getstate__()
+
+        state["agentIds"] = self.agentIds.tolist()      # pickle as plain lists, so saved files don't depend on
+        state["isInFreefall"] = self.isInFreefall.tolist()  # whether or not NumPy was available at the time.
+        for columnName in _VECTOR_COLUMN_NAMES_:
+            state[columnName] = getattr(self, columnName).tolist()
+        state["_cachedOrdering"] = None
+        state["_cachedOrderingRows"] = None
+
+        return state
+
+########
+    def __setstate__(self, state):
+        super(AgentArrayStore, self).__setstate__(state)
+
+        self.agentIds = _ColumnFromValues(self.agentIds, 'l')
+        self.isInFreefall = _ColumnFromValues(self.isInFreefall, 'b')
+        for columnName in _VECTOR_COLUMN_NAMES_:
+            setattr(self, columnName, _ColumnFromValues(getattr(self, columnName), 'd'))
+        self._cachedOrderingVersion = -1
+
+#####################
+    def _getCount(self):
+        return self._count
+    count = property(_getCount)
+
+    def _getCapacity(self):
+        return self._capacity
+    capacity = property(_getCapacity)
+
+    def _getLayoutVersion(self):
+        """Changes whenever rows are added, moved or removed - i.e. any cached row indices are out of date."""
+        return self._layoutVersion
+    layoutVersion = property(_getLayoutVersion)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, agentId):
+        return (agentId in self._idToIndexLookup)
+
+#####################
+    def indexForAgentId(self, agentId):
+        """Returns the row index for the given agent ID - raises KeyError if not in the store."""
+        return self._idToIndexLookup[agentId]
+
+########
+    def ownerAtIndex(self, index):
+        return self._rowOwners[index]
+
+#####################
+    def _grow(self, minimumCapacity):
+        newCapacity = max(self._capacity, 1)
+        while(newCapacity < minimumCapacity):
+            newCapacity *= 2
+
+        if(newCapacity != self._capacity):
+            self.agentIds = _GrownColumn(self.agentIds, newCapacity)
+            self.isInFreefall = _GrownColumn(self.isInFreefall, newCapacity)
+            for columnName in _VECTOR_COLUMN_NAMES_:
+                setattr(self, columnName, _GrownColumn(getattr(self, columnName), newCapacity * 3))
+
+            self._capacity = newCapacity
+
+########
+    def _copyRow(self, fromIndex, toIndex):
+        self.agentIds[toIndex] = self.agentIds[fromIndex]
+        self.isInFreefall[toIndex] = self.isInFreefall[fromIndex]
+
+        i, j = fromIndex * 3, toIndex * 3
+        for columnName in _VECTOR_COLUMN_NAMES_:
+            column = getattr(self, columnName)
+            column[j : j + 3] = column[i : i + 3]
+
+########
+    def _clearRow(self, index):
+        self.agentIds[index] = 0
+        self.isInFreefall[index] = True
+
+        j = index * 3
+        for columnName in _VECTOR_COLUMN_NAMES_:
+            column = getattr(self, columnName)
+            column[j] = column[j + 1] = column[j + 2] = 0.0
+
+#####################
+    def addAgent(self, agentId, owner):
+        """
+        Allocates a new row for the given agent.
+
+        :param agentId: particle ID of the agent.
+        :param owner: object viewing the row (normally the AgentState) - must implement _onStoreRowChanged(store, index).
+        :returns: the new row index.
+        """
+        if(agentId in self._idToIndexLookup):
+            raise ValueError("Agent %d already present in %s" % (agentId, self))
+
+        index = self._count
+        if(index >= self._capacity):
+            self._grow(index + 1)
+
+        self._clearRow(index)
+        self.agentIds[index] = agentId
+        self._idToIndexLookup[agentId] = index
+        self._rowOwners.append(owner)
+        self._count += 1
+        self._layoutVersion += 1
+
+        owner._onStoreRowChanged(self, index)
+
+        return index
+
+########
+    def removeAgent(self, agentId):
+        """
+        Frees the row for the given agent, moving the last row into its place.  The removed agent's owner is
+        handed a detached single-row copy of its data, so any lingering references to it stay valid.
+        """
+        index = self._idToIndexLookup.pop(agentId)
+        owner = self._rowOwners[index]
+        self._detachOwner(owner, index)
+
+        lastIndex = self._count - 1
+        if(index != lastIndex):
+            self._copyRow(lastIndex, index)
+            movedOwner = self._rowOwners[lastIndex]
+            self._rowOwners[index] = movedOwner
+            self._idToIndexLookup[movedOwner.agentId] = index
+            movedOwner._onStoreRowChanged(self, index)
+
+        self._rowOwners.pop()
+        self._count -= 1
+        self._layoutVersion += 1
+
+########
+    def clear(self):
+        for index, owner in enumerate(self._rowOwners):
+            self._detachOwner(owner, index)
+
+        self._idToIndexLookup.clear()
+        del self._rowOwners[:]
+        self._count = 0
+        self._layoutVersion += 1
+
+########
+    def _detachOwner(self, owner, index):
+        detachedStore = AgentArrayStore(1)
+        detachedStore.addAgent(int(self.agentIds[index]), owner)
+        detachedStore.isInFreefall[0] = self.isInFreefall[index]
+
+        j = index * 3
+        for columnName in _VECTOR_COLUMN_NAMES_:
+            getattr(detachedStore, columnName)[0 : 3] = getattr(self, columnName)[j : j + 3]
+
+#####################
+    if(np is not None):
+        @staticmethod
+        def rowValues(column, index):
+            j = index * 3
+            return column[j : j + 3].tolist()
+    else:
+        @staticmethod
+        def rowValues(column, index):
+            j = index * 3
+            return (column[j], column[j + 1], column[j + 2])
+
+########
+    def vector3At(self, column, index):
+        """Returns a *new* Vector3 from the given vector column & row - changing it does not affect the store."""
+        x, y, z = self.rowValues(column, index)
+        return v3.Vector3(x, y, z)
+
+########
+    def setVector3At(self, column, index, vector):
+        j = index * 3
+        column[j] = vector.x
+        column[j + 1] = vector.y
+        column[j + 2] = vector.z
+
+########
+    def setXYZAt(self, column, index, x, y, z):
+        j = index * 3
+        column[j] = x
+        column[j + 1] = y
+        column[j + 2] = z
+
+########
+    def addXYZAt(self, column, index, x, y, z):
+        j = index * 3
+        column[j] += x
+        column[j + 1] += y
+        column[j + 2] += z
+
+########
+    def vectorColumnView(self, column):
+        """
+        Returns an (count x 3) NumPy view of the active rows of the given vector column (writes go straight
+        through to the store).  Only available with NumPy - raises RuntimeError otherwise.
+        """
+        if(np is None):
+            raise RuntimeError("NumPy not available - cannot create column view.")
+
+        return column[: self._count * 3].reshape(self._count, 3)
+
+#####################
+    def updateRowFromPosition(self, index, x, y, z, isFirstFrame, accelerationDueToGravity):
+        """
+        Updates position for a single row, deriving velocity, acceleration & freefall status from the previous values.
+        (We measure velocity ourselves by deriving from position because Maya's built-in velocity
+        query, like many things in Maya, is buggy & unreliable - thanks Autodesk.)
+        """
+        j = index * 3
+        positions, velocities, accelerations = self.positions, self.velocities, self.accelerations
+
+        if(not isFirstFrame and (positions[j] != 0 or positions[j + 1] != 0 or positions[j + 2] != 0)):
+            vx, vy, vz = x - positions[j], y - positions[j + 1], z - positions[j + 2]
+            accelerations[j] = vx - velocities[j]
+            accelerations[j + 1] = vy - velocities[j + 1]
+            accelerations[j + 2] = vz - velocities[j + 2]
+            velocities[j], velocities[j + 1], velocities[j + 2] = vx, vy, vz
+        else:
+            velocities[j] = velocities[j + 1] = velocities[j + 2] = 0.0
+            accelerations[j] = accelerations[j + 1] = accelerations[j + 2] = 0.0
+        positions[j], positions[j + 1], positions[j + 2] = x, y, z
+
+        self.isInFreefall[index] = (accelerations[j + 1] < accelerationDueToGravity)
+
+########
+    def updateFromPositionsList(self, particleIdsOrdering, positionsList, isFirstFrame, accelerationDueToGravity):
+        """
+        Bulk equivalent of updateRowFromPosition for all agents at once.
+
+        :param particleIdsOrdering: list of particle IDs, in the same order as positionsList.
+        :param positionsList: flat list of floats [x0, y0, z0, x1...] as returned by sceneInterface.
+        """
+        if(np is not None):
+            rows = self._rowsForOrdering(particleIdsOrdering)
+            numRows = len(rows)
+            newPositions = np.asarray(positionsList, dtype=np.float64)[: numRows * 3].reshape(numRows, 3)
+
+            allPositions = self.positions.reshape(-1, 3)
+            allVelocities = self.velocities.reshape(-1, 3)
+            allAccelerations = self.accelerations.reshape(-1, 3)
+
+            oldPositions = allPositions[rows]
+            if(isFirstFrame):
+                hasHistory = np.zeros((numRows, 1), dtype=np.bool_)
+            else:
+                hasHistory = np.any(oldPositions != 0.0, axis=1).reshape(numRows, 1)
+
+            newVelocities = np.where(hasHistory, newPositions - oldPositions, 0.0)
+            newAccelerations = np.where(hasHistory, newVelocities - allVelocities[rows], 0.0)
+
+            allPositions[rows] = newPositions
+            allVelocities[rows] = newVelocities
+            allAccelerations[rows] = newAccelerations
+            self.isInFreefall[rows] = (newAccelerations[:, 1] < accelerationDueToGravity)
+        else:
+            lookup = self._idToIndexLookup
+            for i, particleId in enumerate(particleIdsOrdering):
+                j = i * 3
+                self.updateRowFromPosition(lookup[particleId], positionsList[j], positionsList[j + 1], positionsList[j + 2],
+                                           isFirstFrame, accelerationDueToGravity)
+
+########
+    def _rowsForOrdering(self, particleIdsOrdering):
+        if(self._cachedOrdering is not particleIdsOrdering or self._cachedOrderingVersion != self._layoutVersion):
+            lookup = self._idToIndexLookup
+            self._cachedOrderingRows = np.fromiter((lookup[particleId] for particleId in particleIdsOrdering),
+                                                   dtype=np.intp, count=len(particleIdsOrdering))
+            self._cachedOrdering = particleIdsOrdering
+            self._cachedOrderingVersion = self._layoutVersion
+
+        return self._cachedOrderingRows
+
+
+# END OF CLASS - AgentArrayStore
+#####################################
@@ -10,11 +10,33 @@
 # ------------------------------------------------------------
 
 
+import math as mth
+
 from pyswarm.pyswarmObject import PyswarmObject
 import pyswarm.vectors.vector3 as v3
 import pyswarm.utils.general as util
+import pyswarm.utils.operationCounters as oc
+import pyswarm.utils.behaviourProfiler as bp
+import pyswarm.utils.frameTimings as ft
+
+import pyswarm.agents.agentArrayStore as aas
+from pyswarm.attributes.agentPerceptionAttributeGroup import AgentPerceptionAttributeGroup
+
 
 
+#############################################
+def AssignDataBlobsToAgentStates(agentStatesList, attributeGroupsController):
+    """Bulk equivalent of the movement & perception data blob assignment done in AgentState.__init__ - for
+    agent states created with assignDataBlobs=False.  Much quicker for large numbers of new agents."""
+    movementBlobsList = attributeGroupsController.agentMovementAttributeGroup.getDataBlobsForAgents(agentStatesList)
+    perceptionBlobsList = attributeGroupsController.agentPerceptionAttributeGroup.getDataBlobsForAgents(agentStatesList)
+    
+    for agentState, movementBlob, perceptionBlob in zip(agentStatesList, movementBlobsList, perceptionBlobsList):
+        agentState._movementAttributes = movementBlob
+        agentState._perceptionAttributes = perceptionBlob
+
+#############################################
+
 
 #############################################
 class AgentState(PyswarmObject):
@@ -29,92 +51,116 @@ class AgentState(PyswarmObject):
     "nearby" (simply within perceivable range), "crowded" (within close proximity) 
     or "collided" (so close as to be considered to have collided with this agent).
     
+    The vector data (position, velocity, acceleration, averages) and the freefall flag are not held here, but in a 
+    row of an AgentArrayStore shared by the whole swarm - i.e. this is a "view" onto that row.  Note that
+    the vector properties therefore return *copies*; changing them will not change the agent's state.
+    
     Potentially confusing member variables:
         - "inFreefall" = True if agent is jumping/falling, ie not under normal locomotion, False otherwise.
     """
     
-    def __init__(self, particleId, attributeGroupsController):
+    def __init__(self, particleId, attributeGroupsController, agentStore=None, assignDataBlobs=True):
         self._agentId = int(particleId)
-        self._position = v3.Vector3()
-        self._velocity = v3.Vector3()
-        self._acceleration = v3.Vector3()
-        
-        self._isInFreefall = True
+        self._store = None       # both set by the store itself 
+        self._storeIndex = -1    # (see _onStoreRowChanged)
+        if(agentStore is None):
+            agentStore = aas.AgentArrayStore(1) # stand-alone agent, i.e. not part of a swarm - gets its own single-row store.
+        agentStore.addAgent(self._agentId, self)
         
         self._nearbyList = []        # 
         self._crowdedList = []       #
         self._collisionList = []     # lists of agent instances
-        self._avPosition = v3.Vector3()
-        self._avVelocity = v3.Vector3()
-        self._avCrowdedPos = v3.Vector3()
-        self._avCollisionDirection = v3.Vector3()    
         self._reciprocalNearbyChecks = set() 
         self._nearbyWeightedTotal = 0.0
         self._crowdingWeightedTotal = 0.0
         self._otherAgentWeightingLookup = {}
         
-        self._framesUntilNextRebuild = 0
         self._needsFullListsRebuild = True 
-        self._needsAveragesRecalc = False
+        self._frameInputs = None                # (position, velocity, isInFreefall) as of the last frame update,
+        self._frameInputsChanged = True         # and whether they'd changed since the one before.
+        self._listsInputVersions = None         # 
+        self._previousListsAndAverages = None   # see restoreListsAndAveragesIfUnchanged
+        self._ignoresReciprocalChecks = False   # i.e. lists & averages are already final for this frame
         
-        self._movementAttributes = attributeGroupsController.agentMovementAttributeGroup.getDataBlobForAgent(self)
-        self._perceptionAttributes = attributeGroupsController.agentPerceptionAttributeGroup.getDataBlobForAgent(self)
+        if(assignDataBlobs):
+            self._movementAttributes = attributeGroupsController.agentMovementAttributeGroup.getDataBlobForAgent(self)
+            self._perceptionAttributes = attributeGroupsController.agentPerceptionAttributeGroup.getDataBlobForAgent(self)
+        else:
+            self._movementAttributes = None     # caller must use AssignDataBlobsToAgentStates
+            self._perceptionAttributes = None   #
         self._perceptionAttributeGroup = attributeGroupsController.agentPerceptionAttributeGroup
         self.behaviourAttributes = None  # data 'blob' for client behaviours to store instance-level data - not used internally
         self._globalAttributeGroup = attributeGroupsController.globalAttributeGroup
         
 ###################        
     def __str__(self):
+        velocity = self.velocity
+        acceleration = self.acceleration
         return ("id=%d, pos=%s, vel:(hdgH=%d, hdgV=%d, spd=%.2f), acln:(hdgH=%d, hdgV=%d, spd=%.2f), inFF=%s" % 
-                (self._agentId, self._position, 
-                 self._velocity.degreeHeading(), self._velocity.degreeHeadingVertical(), self._velocity.magnitude(),
-                 self._acceleration.degreeHeading(), self._acceleration.degreeHeadingVertical(), self._acceleration.magnitude(),
-                 "Y" if(self._isInFreefall) else "N"))
+                (self._agentId, self.position, 
+                 velocity.degreeHeading(), velocity.degreeHeadingVertical(), velocity.magnitude(),
+                 acceleration.degreeHeading(), acceleration.degreeHeadingVertical(), acceleration.magnitude(),
+                 "Y" if(self.isInFreefall) else "N"))
     
 ################### 
     def _getDebugStr(self):
         nearStringsList = [("%d," % nearbyAgent.agentId) for nearbyAgent in self.nearbyList]
         crowdStringsList = [("%d," % crowdingAgent.agentId) for crowdingAgent in self.crowdedList]
         collisionStringsList = [("%d," % collidingAgent.agentId) for collidingAgent in self.collisionList]
+        avVelocity = self.avVelocity
         
-        return ("id=%d, avP=%s, avV=:(hdgH=%d, hdgV=%d, spd=%.2f), avCP=%s, nextRbld=%d\n\t\tbhvrAtrbts=%s, nr=%s, cr=%s, col=%s" % 
-                (self._agentId, self._avPosition, 
-                 self._avVelocity.degreeHeading(), self._avVelocity.degreeHeadingVertical(), self._avVelocity.magnitude(), 
-                 self._avCrowdedPos, self._framesUntilNextRebuild, self.behaviourAttributes,
+        return ("id=%d, avP=%s, avV=:(hdgH=%d, hdgV=%d, spd=%.2f), avCP=%s\n\t\tbhvrAtrbts=%s, nr=%s, cr=%s, col=%s" % 
+                (self._agentId, self.avPosition, 
+                 avVelocity.degreeHeading(), avVelocity.degreeHeadingVertical(), avVelocity.magnitude(), 
+                 self.avCrowdedPosition, self.behaviourAttributes,
                  ''.join(nearStringsList), ''.join(crowdStringsList), ''.join(collisionStringsList)))       
     
+#####################
+    def _onStoreRowChanged(self, agentStore, index):
+        """Called by the AgentArrayStore whenever this agent's row is allocated or moved."""
+        self._store = agentStore
+        self._storeIndex = index
+        
 #####################
     def _getAgentId(self):
         return self._agentId
     agentId = property(_getAgentId)
+    
+    def _getStore(self):
+        return self._store
+    store = property(_getStore)
+    
+    def _getStoreIndex(self):
+        return self._storeIndex
+    storeIndex = property(_getStoreIndex)
 
     def _getPosition(self):
-        return self._position
+        return self._store.vector3At(self._store.positions, self._storeIndex)
     position = property(_getPosition)
 
     def _getVelocity(self):
-        return self._velocity
+        return self._store.vector3At(self._store.velocities, self._storeIndex)
     velocity = property(_getVelocity)
 
     def _getAcceleration(self):
-        return self._acceleration
+        return self._store.vector3At(self._store.accelerations, self._storeIndex)
     acceleration = property(_getAcceleration)
     
     def _getIsInFreefall(self):
         """True if agent is jumping/falling & not under own locomotion, False otherwise."""
-        return self._isInFreefall
+        return bool(self._store.isInFreefall[self._storeIndex])
     isInFreefall = property(_getIsInFreefall)   
     
     def _getAvPosition(self):
-        return self._avPosition
+        return self._store.vector3At(self._store.avPositions, self._storeIndex)
     avPosition = property(_getAvPosition)
     
     def _getAvVelocity(self):
-        return self._avVelocity
+        return self._store.vector3At(self._store.avVelocities, self._storeIndex)
     avVelocity = property(_getAvVelocity)
     
     def _getAvCrowdedPosition(self):
-        return self._avCrowdedPos
+        return self._store.vector3At(self._store.avCrowdedPositions, self._storeIndex)
     avCrowdedPosition = property(_getAvCrowdedPosition)
     
     def _getHasNeighbours(self):
@@ -133,7 +179,7 @@ class AgentState(PyswarmObject):
     isCollided = property(_getIsCollided)
     
     def _getAvCollisionDirection(self):
-        return self._avCollisionDirection
+        return self._store.vector3At(self._store.avCollisionDirections, self._storeIndex)
     avCollisionDirection = property(_getAvCollisionDirection)   
     
     def _getNearbyList(self):
@@ -159,42 +205,31 @@ class AgentState(PyswarmObject):
 #####################           
     def updateCurrentVectors(self, position, isFirstFrame=False):
         """Updates internal state from corresponding vectors."""
-        # we measure velocity ourselves by deriving from position because Maya's built-in velocity
-        # query, like many things in Maya, is buggy & unreliable - thanks Autodesk.
-        if(not isFirstFrame and not self._position.isNull()):
-            velocity = position - self._position
-            self._acceleration = velocity - self._velocity
-            self._velocity.resetToVector(velocity)
-            self._position.resetToVector(position)
-        else:
-            self._position.resetToVector(position)
-            self._velocity.reset()
-            self._acceleration.reset()
-        
-#         if(self._globalAttributeGroup.movementIsThreeDimensional):
-#             self._isInFreefall = False
-#         el
-        if(self._acceleration.y >= self._globalAttributeGroup.accelerationDueToGravity):
-            self._isInFreefall = False
-        else:
-            self._isInFreefall = True
+        self._store.updateRowFromPosition(self._storeIndex, position.x, position.y, position.z, isFirstFrame,
+                                          self._globalAttributeGroup.accelerationDueToGravity)
+        self._onFrameUpdated()
         
+########
+    def onVectorsUpdatedInStore(self):
+        """Alternative to updateCurrentVectors, for when the store has already been updated in bulk 
+        (see AgentArrayStore.updateFromPositionsList)."""
         self._onFrameUpdated()
 
 #################################
     def withinCrudeRadiusOfPoint(self, otherPosition, radius):
-        if(abs(self._position.x - otherPosition.x) > radius):   # Crude check intended to cut down 
-            return False                                        # on the number of calls to vector3.distanceFrom
-        elif(abs(self._position.z - otherPosition.z) > radius): # in the 'Precise' check
-            return False                                        # (which involves a relatively
-        elif(abs(self._position.y - otherPosition.y) > radius): # expensive squareRoot operation).
-            return False                                        # i.e. Essentially used as a kind 
-        else:                                                   # of "Prune & Sweep".                                              
+        x, y, z = self._store.rowValues(self._store.positions, self._storeIndex)
+        if(abs(x - otherPosition.x) > radius):      # Crude check intended to cut down 
+            return False                            # on the number of calls to vector3.distanceFrom
+        elif(abs(z - otherPosition.z) > radius):    # in the 'Precise' check
+            return False                            # (which involves a relatively
+        elif(abs(y - otherPosition.y) > radius):    # expensive squareRoot operation).
+            return False                            # i.e. Essentially used as a kind 
+        else:                                       # of "Prune & Sweep".                                              
             return True
 
 #################################       
     def withinPreciseRadiusOfPoint(self, otherPosition, radius):
-        if(self._position.distanceSquaredFrom(otherPosition) > radius **2):
+        if(self.position.distanceSquaredFrom(otherPosition) > radius **2):
             return False
         else:
             return True
@@ -207,13 +242,13 @@ class AgentState(PyswarmObject):
 ################################# 
     def angleToLocation(self, location):
         """Angle, in degrees, of given location with respect to current heading."""
-        directionVec = location - self._position
-        return self._velocity.angleTo(directionVec)
+        directionVec = location - self.position
+        return self.velocity.angleTo(directionVec)
        
 ##############################
     def notifyJump(self):
         """Should be called if agent is to be made to jump."""
-        self._isInFreefall = True
+        self._store.isInFreefall[self._storeIndex] = True
 
 ##############################    
     def _resetListsAndAverages(self):
@@ -225,16 +260,17 @@ class AgentState(PyswarmObject):
         self._resetAverages()
         
         self._needsFullListsRebuild = True
+        self._listsInputVersions = None
+        self._ignoresReciprocalChecks = False
     
     def _resetAverages(self):
-        self._avVelocity.reset()
-        self._avPosition.reset()
-        self._avCrowdedPos.reset()
-        self._avCollisionDirection.reset()  
+        store, index = self._store, self._storeIndex
+        store.setXYZAt(store.avVelocities, index, 0.0, 0.0, 0.0)
+        store.setXYZAt(store.avPositions, index, 0.0, 0.0, 0.0)
+        store.setXYZAt(store.avCrowdedPositions, index, 0.0, 0.0, 0.0)
+        store.setXYZAt(store.avCollisionDirections, index, 0.0, 0.0, 0.0)
         self._nearbyWeightedTotal = 0.0
         self._crowdingWeightedTotal = 0.0
-    
-        self._needsAveragesRecalc = True
 
 ############################## 
     @staticmethod    
@@ -252,205 +288,321 @@ class AgentState(PyswarmObject):
 
 ########
     @staticmethod    
-    def _getWeightingAngular(angle, forwardAngle, blindAngle):
-        if(angle < forwardAngle):
+    def _getWeightingAngular(cosine, forwardCosine, visibleCosine):
+        """Full weighting within the forward area, falling off linearly (in cosine, not angle) to zero 
+        at the edge of the visible area."""
+        if(cosine > forwardCosine):
             return 1
         else:
-            variableRange = blindAngle - forwardAngle
-            return (float(variableRange - (angle - forwardAngle)) / variableRange)
+            return ((cosine - visibleCosine) / (forwardCosine - visibleCosine))
     
 ########
-    def _calculateWeighting(self, distanceVector, regionSize, angle, forwardAngle, blindAngle):
-        percetionAttributeGroup = self._perceptionAttributeGroup
-        if(percetionAttributeGroup.useInverseSquareWeighting):
+    @staticmethod
+    def _getHorizontalCosine(x1, z1, x2, z2):
+        """Cosine of the horizontal angle between (x1, z1) & (x2, z2) - i.e. cos(abs(angleTo(..., True))) without 
+        the acos, including returning 1 (i.e. 0 degrees) if either vector is null."""
+        magnitudesSquared = ((x1 **2) + (z1 **2)) * ((x2 **2) + (z2 **2))
+        if(magnitudesSquared > 0):
+            return ((x1 * x2) + (z1 * z2)) / mth.sqrt(magnitudesSquared)
+        else:
+            return 1.0
+    
+########
+    @staticmethod
+    def _calculateWeighting(weightingMode, distanceVector, regionSize, cosine, forwardCosine, visibleCosine):
+        """weightingMode is the PerceptionTable's weightingMode."""
+        if(weightingMode == AgentPerceptionAttributeGroup._WeightingInverseSquare_):
             proximityWeighting = AgentState._getWeightingInverseSquareDistance(distanceVector)
-        elif(percetionAttributeGroup.useLinearWeighting):
+        elif(weightingMode == AgentPerceptionAttributeGroup._WeightingLinear_):
             proximityWeighting = AgentState._getWeightingLinearDistance(distanceVector, regionSize)
-        elif(percetionAttributeGroup.useNoWeighting):
+        elif(weightingMode == AgentPerceptionAttributeGroup._WeightingNone_):
             proximityWeighting = 0
         else:
             raise RuntimeError("Unrecognised proximity weighting option.")
         
         return (proximityWeighting +
-                AgentState._getWeightingAngular(angle, forwardAngle, blindAngle)) 
+                AgentState._getWeightingAngular(cosine, forwardCosine, visibleCosine)) 
              
 ##############################        
     def _onFrameUpdated(self):
-        """Resets stats of nearby, crowded and collided agents."""
-        if(self._framesUntilNextRebuild <= 0 or not self.nearbyList):
-            self._resetListsAndAverages()
+        """Resets stats of nearby, crowded and collided agents - these are rebuilt from scratch every frame (the 
+        candidates come from the ZoneGraph's neighbour lists, so there are relatively few of them to check), unless
+        nothing they depend on has changed - so if this agent hasn't moved, the previous frame's are set aside
+        first (see restoreListsAndAveragesIfUnchanged)."""
+        store, index = self._store, self._storeIndex
+        frameInputs = (store.rowValues(store.positions, index), store.rowValues(store.velocities, index), 
+                       bool(store.isInFreefall[index]))
+        self._frameInputsChanged = (frameInputs != self._frameInputs)
+        self._frameInputs = frameInputs
+        
+        if(self._frameInputsChanged or self._needsFullListsRebuild or self._listsInputVersions is None):
+            self._previousListsAndAverages = None
         else:
-            self._framesUntilNextRebuild -= 1
-            self._resetAverages()
+            self._previousListsAndAverages = (self._listsInputVersions, 
+                                              self._nearbyList, self._crowdedList, self._collisionList, 
+                                              self._otherAgentWeightingLookup, 
+                                              self._nearbyWeightedTotal, self._crowdingWeightedTotal,
+                                              store.rowValues(store.avVelocities, index),
+                                              store.rowValues(store.avPositions, index),
+                                              store.rowValues(store.avCrowdedPositions, index),
+                                              store.rowValues(store.avCollisionDirections, index))
+            self._nearbyList, self._crowdedList, self._collisionList = [], [], []
+            self._otherAgentWeightingLookup = {}
+            
+        self._resetListsAndAverages()
+        
+##############################
+    def restoreListsAndAveragesIfUnchanged(self, otherAgents, neighbourListVersion, perceptionTableVersion):
+        """For the AgentsController - to be called once every agent has had its frame update and the neighbour 
+        lists are up to date, but before any regional stats are calculated.  If this agent, its neighbour list 
+        (otherAgents), the PerceptionTable and every agent on that list are all exactly as they were on the 
+        previous frame, then so are the lists and averages - so the previous frame's are put back rather than
+        being recalculated, and other agents leave them alone from here on (see _makeReciprocalCheck).
+        Returns True if so, False if they're to be calculated as normal (by updateRegionalStatsIfNecessary).
+        """
+        inputVersions = (neighbourListVersion, perceptionTableVersion)
+        previousListsAndAverages = self._previousListsAndAverages
+        self._previousListsAndAverages = None
+        self._listsInputVersions = inputVersions if(neighbourListVersion is not None) else None
+        
+        if(previousListsAndAverages is None or previousListsAndAverages[0] != inputVersions):
+            return False
+        for otherAgent in otherAgents:
+            if(otherAgent.state._frameInputsChanged):
+                return False
+        
+        (_, self._nearbyList, self._crowdedList, self._collisionList, self._otherAgentWeightingLookup,
+         self._nearbyWeightedTotal, self._crowdingWeightedTotal, 
+         avVelocity, avPosition, avCrowdedPosition, avCollisionDirection) = previousListsAndAverages
+        
+        store, index = self._store, self._storeIndex
+        store.setXYZAt(store.avVelocities, index, *avVelocity)
+        store.setXYZAt(store.avPositions, index, *avPosition)
+        store.setXYZAt(store.avCrowdedPositions, index, *avCrowdedPosition)
+        store.setXYZAt(store.avCollisionDirections, index, *avCollisionDirection)
+        
+        self._needsFullListsRebuild = False
+        self._ignoresReciprocalChecks = True
+        
+        return True
+        
+##############################
+    def listsStateForBatch(self):
+        """For the ParallelCalculator - returns tuple (nearbyWeightedTotal, crowdingWeightedTotal, number of nearby,
+        crowded & collided agents, needsFullListsRebuild, ignoresReciprocalChecks, reciprocalNearbyChecks) as they
+        stand before its batches are calculated.  Note the lists may already be partly filled in by the reciprocal 
+        checks of agents calculated earlier in the frame."""
+        return (self._nearbyWeightedTotal, self._crowdingWeightedTotal,
+                len(self._nearbyList), len(self._crowdedList), len(self._collisionList),
+                self._needsFullListsRebuild, self._ignoresReciprocalChecks, self._reciprocalNearbyChecks)
+        
+########
+    def addToListsFromBatch(self, nearbyAgents, crowdedAgents, collidedAgents):
+        """For the ParallelCalculator, which does the equivalent of _recalculateListsAndAverages (& the resulting
+        _makeReciprocalCheck calls) in its worker processes & writes the averages straight into the store - the
+        agents are added to the lists in the same order as they would have been here."""
+        self._nearbyList.extend(nearbyAgents)
+        self._crowdedList.extend(crowdedAgents)
+        if(collidedAgents):
+            self._isCollided = True
+            self._collisionList.extend(collidedAgents)
+        
+########
+    def setWeightedTotalsFromBatch(self, nearbyWeightedTotal, crowdingWeightedTotal, wasRecalculated):
+        """For the ParallelCalculator (see addToListsFromBatch) - wasRecalculated is True if it did the equivalent
+        of _recalculateListsAndAverages for this agent, rather than just its reciprocal checks."""
+        self._nearbyWeightedTotal = nearbyWeightedTotal
+        self._crowdingWeightedTotal = crowdingWeightedTotal
+        if(wasRecalculated):
+            self._needsFullListsRebuild = False
         
 ##############################
     def updateRegionalStatsIfNecessary(self, parentAgent, otherAgents, forceUpdate=False):
         """Builds up nearby, crowded and collided lists (if needed), recalculates averages for each.
+        Region sizes etc. are those in the perception attribute group's PerceptionTable.
         @param otherAgents List: list of other agents, all of which will be checked for proximity.
-        @param neighbourhoodSize Float: distance below which other agents considered to be "nearby".
-        @param crowdedRegionSize Float: ditto with "crowded".
-        @param collisionRegionSize Float: ditto with "collided".
         """
         
         
         
         if(forceUpdate):
-            self._framesUntilNextRebuild = 0
             self._onFrameUpdated()
         
         if(self._needsFullListsRebuild):
-            self._recalculateListsAndAverages(parentAgent, otherAgents, 
-                                              self.perceptionAttributes.neighbourhoodSize,
-                                              self.perceptionAttributes.nearRegionSize, 
-                                              self.perceptionAttributes.collisionRegionSize, 
-                                              self.perceptionAttributes.blindRegionAngle, 
-                                              self.perceptionAttributes.forwardVisionAngle)
+            profiler = bp.ActiveProfiler
+            if(profiler is None):
+                self._recalculateListsAndAverages(parentAgent, otherAgents, self._perceptionAttributeGroup.perceptionTable)
+            else:
+                startTime = ft.WallTime()
+                self._recalculateListsAndAverages(parentAgent, otherAgents, self._perceptionAttributeGroup.perceptionTable)
+                profiler.addRegionalStatsTime(ft.WallTime() - startTime)
             self._needsFullListsRebuild = False
-            self._needsAveragesRecalc = False
-            
-            self._framesUntilNextRebuild = self._globalAttributeGroup.listRebuildFrequency if not self.isCrowded else 0
-            
-        elif(self._needsAveragesRecalc):
-            self._recalculateAverages()
-            self._needsAveragesRecalc = False
     
 ##############################
-    def _recalculateListsAndAverages(self, parentAgent, otherAgents, neighbourhoodSize, 
-                                       crowdedRegionSize, collisionRegionSize, blindRegionAngle, forwardRegionAngle):
-        """Rebuilds from scratch using the corresponding list of candidate agents and region radii sizes.
+    def _recalculateListsAndAverages(self, parentAgent, otherAgents, perceptionTable):
+        """Rebuilds from scratch using the corresponding list of candidate agents and this agent's row of the
+        PerceptionTable.  Field of vision is given there as cosines - other agents are classified by comparing 
+        those against the cosine of the angle to them, so no actual angles are ever calculated.
+        How each candidate was dealt with is tallied in locals, only passed on if operations are being counted
+        (see operationCounters).
         ***ASSUMES BOTH LISTS AND AVERAGES HAVE PREVIOUSLY BEEN RESET***
         """
-        visibleAreaAngle = 180 - (blindRegionAngle * 0.5)
-        forwardAreaAngle = forwardRegionAngle * 0.5
-        neighbourhoodRegionSquared = neighbourhoodSize **2
-        crowdedRegionSquared = crowdedRegionSize **2
-        collisionRegionSquared = collisionRegionSize **2
+        row = self._perceptionAttributes.tableIndex
+        neighbourhoodSize = perceptionTable.neighbourhoodSizes[row]
+        neighbourhoodRegionSquared = perceptionTable.neighbourhoodSizesSquared[row]
+        crowdedRegionSquared = perceptionTable.nearRegionSizesSquared[row]
+        collisionRegionSquared = perceptionTable.collisionRegionSizesSquared[row]
+        visibleAreaCosine = perceptionTable.visibleAreaCosines[row]
+        forwardAreaCosine = perceptionTable.forwardAreaCosines[row]
+        weightingMode = perceptionTable.weightingMode
+        
+        store, index = self._store, self._storeIndex
+        px, py, pz = store.rowValues(store.positions, index)
+        vx, vy, vz = store.rowValues(store.velocities, index)
         
+        # averages are accumulated in locals & written back to the store at the end (note that they may 
+        # already be non-zero here, courtesy of other agents' reciprocal checks).
+        avVx, avVy, avVz = store.rowValues(store.avVelocities, index)
+        avPx, avPy, avPz = store.rowValues(store.avPositions, index)
+        avCPx, avCPy, avCPz = store.rowValues(store.avCrowdedPositions, index)
+        avCDx, avCDy, avCDz = store.rowValues(store.avCollisionDirections, index)
+        
+        numSkipped = numReciprocalChecks = numCrudeRejections = numPreciseChecks = 0
+        directionToOtherAgent = v3.Vector3()   # re-used for every candidate (nothing downstream hangs on to it)
         for otherAgent in otherAgents:
             otherAgentParticleId = otherAgent.agentId
             otherAgentState = otherAgent.state
-            otherAgentPosition = otherAgentState.position
             
-            if(otherAgentParticleId != self._agentId and
-               not otherAgentState.isInFreefall and
-               otherAgentParticleId not in self._reciprocalNearbyChecks and
-               self.withinCrudeRadiusOfPoint(otherAgentPosition, neighbourhoodSize)):
+            if(otherAgentParticleId == self._agentId or otherAgentState.isInFreefall):
+                numSkipped += 1
+                continue
+            
+            otherStore, otherIndex = otherAgentState._store, otherAgentState._storeIndex
+            ox, oy, oz = otherStore.rowValues(otherStore.positions, otherIndex)
+            
+            if(otherAgentParticleId in self._reciprocalNearbyChecks):
+                numReciprocalChecks += 1
+                otherAgentState._makeReciprocalCheck(parentAgent)
+            elif(abs(px - ox) <= neighbourhoodSize and     # crude check first - cuts down on the 
+                 abs(pz - oz) <= neighbourhoodSize and     # number of more expensive precise checks
+                 abs(py - oy) <= neighbourhoodSize):       # (as per withinCrudeRadiusOfPoint).
                 
-                directionToOtherAgent = otherAgentPosition - self._position # slightly more efficient than using self.withinPreciseRadius,
-                distanceToOtherAgentSquared = directionToOtherAgent.magnitudeSquared(True) # as this way we can reuse locally created Vectors
+                numPreciseChecks += 1
+                directionToOtherAgent.reset(ox - px, oy - py, oz - pz)
+                distanceToOtherAgentSquared = directionToOtherAgent.magnitudeSquared(True)
                 if(distanceToOtherAgentSquared < neighbourhoodRegionSquared):
-                    angleToOtherAgent = abs(self._velocity.angleTo(directionToOtherAgent, True))
+                    cosineToOtherAgent = AgentState._getHorizontalCosine(vx, vz, ox - px, oz - pz)
                     
-                    if(angleToOtherAgent < visibleAreaAngle):
+                    if(cosineToOtherAgent > visibleAreaCosine):
                         # otherAgent is "nearby" if we're here
                         self.nearbyList.append(otherAgent)
-                        weighting = self._calculateWeighting(directionToOtherAgent, neighbourhoodSize, 
-                                                             angleToOtherAgent, forwardAreaAngle, visibleAreaAngle)
+                        weighting = AgentState._calculateWeighting(weightingMode, directionToOtherAgent, neighbourhoodSize, 
+                                                                   cosineToOtherAgent, forwardAreaCosine, visibleAreaCosine)
                         self._otherAgentWeightingLookup[otherAgentParticleId] = weighting
                         
-                        self._avVelocity.add(otherAgentState.velocity * weighting)
-                        self._avPosition.add(otherAgentPosition * weighting)
+                        ovx, ovy, ovz = otherStore.rowValues(otherStore.velocities, otherIndex)
+                        avVx += ovx * weighting
+                        avVy += ovy * weighting
+                        avVz += ovz * weighting
+                        avPx += ox * weighting
+                        avPy += oy * weighting
+                        avPz += oz * weighting
                         self._nearbyWeightedTotal += weighting
                         
                         if(distanceToOtherAgentSquared < crowdedRegionSquared):
                             # "crowded" if we're here
                             self.crowdedList.append(otherAgent)
-                            self._avCrowdedPos.add(otherAgentPosition * weighting)
+                            avCPx += ox * weighting
+                            avCPy += oy * weighting
+                            avCPz += oz * weighting
                             self._crowdingWeightedTotal += weighting
                             
-                            if(distanceToOtherAgentSquared < collisionRegionSquared and angleToOtherAgent < 90):
+                            if(distanceToOtherAgentSquared < collisionRegionSquared and cosineToOtherAgent > 0): # i.e. < 90 degrees
                                 # "collided" if we're here
                                 self._isCollided = True
                                 self.collisionList.append(otherAgent)
-                                self._avCollisionDirection.add(otherAgentPosition)
+                                avCDx += ox
+                                avCDy += oy
+                                avCDz += oz
                     
                     directionToOtherAgent.invert()
-                    otherAgentState._makeReciprocalCheck(parentAgent, distanceToOtherAgentSquared, directionToOtherAgent)
+                    otherAgentState._makeReciprocalCheck(parentAgent, distanceToOtherAgentSquared, directionToOtherAgent,
+                                                         perceptionTable, row)
                     
-            elif(otherAgentParticleId != self._agentId and not otherAgent.isInFreefall):
+            else:
+                numCrudeRejections += 1
                 otherAgentState._makeReciprocalCheck(parentAgent)
             # end - for loop
         
+        if(oc.ActiveCounts is not None):
+            oc.CountNeighbourChecks(numSkipped + numReciprocalChecks + numCrudeRejections + numPreciseChecks,
+                                    numReciprocalChecks, numCrudeRejections, numPreciseChecks)
+        
         if(self.nearbyList):
-            self._avVelocity.divide(self._nearbyWeightedTotal)
-            self._avPosition.divide(self._nearbyWeightedTotal)
+            scalarMult = 1.0 / self._nearbyWeightedTotal
+            store.setXYZAt(store.avVelocities, index, avVx * scalarMult, avVy * scalarMult, avVz * scalarMult)
+            store.setXYZAt(store.avPositions, index, avPx * scalarMult, avPy * scalarMult, avPz * scalarMult)
             
             if(self.crowdedList):
-                self._avCrowdedPos.divide(self._crowdingWeightedTotal)
+                scalarMult = 1.0 / self._crowdingWeightedTotal
+                avCPx, avCPy, avCPz = avCPx * scalarMult, avCPy * scalarMult, avCPz * scalarMult
                 if(self.collisionList):
-                    self._avCollisionDirection.divide(len(self.collisionList))
+                    scalarMult = 1.0 / len(self.collisionList)
+                    avCDx, avCDy, avCDz = avCDx * scalarMult, avCDy * scalarMult, avCDz * scalarMult
         else:
-            self._avVelocity.resetToVector(self._velocity)
-            self._avPosition.resetToVector(self._position)
-
-##############################        
-    def _recalculateAverages(self):
-        """Recalculates regional averages only - 
-        ***ASSUMES AVERAGES HAVE BEEN RESET AND THAT REGIONAL LISTS ARE UP TO DATE.***
-        """
-        if(self.nearbyList):
-            for otherAgent in self.nearbyList:
-                weighting = self._otherAgentWeightingLookup[otherAgent.agentId]
-                self._avVelocity.add(otherAgent.currentVelocity * weighting)
-                self._avPosition.add(otherAgent.currentPosition * weighting)
-                self._nearbyWeightedTotal += weighting
-            
-            self._avVelocity.divide(self._nearbyWeightedTotal)
-            self._avPosition.divide(self._nearbyWeightedTotal)
+            store.setXYZAt(store.avVelocities, index, vx, vy, vz)
+            store.setXYZAt(store.avPositions, index, px, py, pz)
             
-            if(self.crowdedList):
-                for otherAgent in self._crowdedList:
-                    weighting = self._otherAgentWeightingLookup[otherAgent.agentId]
-                    self._avCrowdedPos.add(otherAgent.currentPosition * weighting)
-                    self._crowdingWeightedTotal += weighting
-                    
-                self._avCrowdedPos.divide(self._crowdingWeightedTotal)
-                
-                if(self.collisionList):
-                    for otherAgent in self._crowdedList:
-                        self._avCollisionDirection.add(otherAgent.currentPosition)
-                        
-                    self._avCollisionDirection.divide(len(self.collisionList))      
+        store.setXYZAt(store.avCrowdedPositions, index, avCPx, avCPy, avCPz)
+        store.setXYZAt(store.avCollisionDirections, index, avCDx, avCDy, avCDz)
 
 ##############################
-    def _makeReciprocalCheck(self, otherAgent, distanceToOtherAgentSquared=0, directionToOtherAgent=None):
-        """Use this method where possible to avoid duplicating regional distance-checks that have already been made."""
+    def _makeReciprocalCheck(self, otherAgent, distanceToOtherAgentSquared=0, directionToOtherAgent=None,
+                             perceptionTable=None, otherAgentRow=None):
+        """Use this method where possible to avoid duplicating regional distance-checks that have already been made.
+        If directionToOtherAgent is given, perceptionTable & otherAgentRow (otherAgent's row in it) must be too."""
+        if(self._ignoresReciprocalChecks):
+            return   # (i.e. otherAgent is already accounted for, see restoreListsAndAveragesIfUnchanged)
+        
         self._reciprocalNearbyChecks.add(otherAgent.agentId)
         
         if(directionToOtherAgent is not None):
-            perceptionAttributes = otherAgent.state.perceptionAttributes
-            neighbourhoodRegion = perceptionAttributes.neighbourhoodSize
-            
-            if(distanceToOtherAgentSquared < neighbourhoodRegion **2):
-                angleToOtherAgent = abs(self._velocity.angleTo(directionToOtherAgent, True))
-                visibleAreaAngle = 180 - (perceptionAttributes.blindRegionAngle * 0.5)
+            if(distanceToOtherAgentSquared < perceptionTable.neighbourhoodSizesSquared[otherAgentRow]):
+                store, index = self._store, self._storeIndex
+                vx, _, vz = store.rowValues(store.velocities, index)
+                cosineToOtherAgent = AgentState._getHorizontalCosine(vx, vz, directionToOtherAgent.x, directionToOtherAgent.z)
+                visibleAreaCosine = perceptionTable.visibleAreaCosines[otherAgentRow]
                 
-                if(angleToOtherAgent < visibleAreaAngle):
-                    otherAgentPosition = otherAgent.currentPosition
+                if(cosineToOtherAgent > visibleAreaCosine):
+                    otherStore, otherIndex = otherAgent.state._store, otherAgent.state._storeIndex
+                    ox, oy, oz = otherStore.rowValues(otherStore.positions, otherIndex)
                     
                     self.nearbyList.append(otherAgent)
                     
-                    forwardAreaAngle = perceptionAttributes.forwardVisionAngle * 0.5
-                    weighting = self._calculateWeighting(directionToOtherAgent, neighbourhoodRegion, 
-                                                         angleToOtherAgent, forwardAreaAngle, visibleAreaAngle)
+                    weighting = AgentState._calculateWeighting(perceptionTable.weightingMode, directionToOtherAgent, 
+                                                               perceptionTable.neighbourhoodSizes[otherAgentRow], 
+                                                               cosineToOtherAgent, 
+                                                               perceptionTable.forwardAreaCosines[otherAgentRow], 
+                                                               visibleAreaCosine)
                     self._otherAgentWeightingLookup[otherAgent.agentId] = weighting
-                            
-                    self._avVelocity.add(otherAgent.currentVelocity * weighting)
-                    self._avPosition.add(otherAgentPosition * weighting)
+                    
+                    ovx, ovy, ovz = otherStore.rowValues(otherStore.velocities, otherIndex)
+                    store.addXYZAt(store.avVelocities, index, ovx * weighting, ovy * weighting, ovz * weighting)
+                    store.addXYZAt(store.avPositions, index, ox * weighting, oy * weighting, oz * weighting)
                     self._nearbyWeightedTotal += weighting
                     
-                    if(distanceToOtherAgentSquared < perceptionAttributes.nearRegionSize **2):
+                    if(distanceToOtherAgentSquared < perceptionTable.nearRegionSizesSquared[otherAgentRow]):
                         self.crowdedList.append(otherAgent)
-                        self._avCrowdedPos.add(otherAgentPosition * weighting)
+                        store.addXYZAt(store.avCrowdedPositions, index, ox * weighting, oy * weighting, oz * weighting)
                         self._crowdingWeightedTotal += weighting
                         
-                        if(distanceToOtherAgentSquared < perceptionAttributes.collisionRegionSize **2
-                            and angleToOtherAgent < 90):
+                        if(distanceToOtherAgentSquared < perceptionTable.collisionRegionSizesSquared[otherAgentRow]
+                            and cosineToOtherAgent > 0): # i.e. < 90 degrees
                             #"collided" if we're here
                             self._isCollided = True
                             self.collisionList.append(otherAgent)
-                            self._avCollisionDirection.add(otherAgentPosition)
+                            store.addXYZAt(store.avCollisionDirections, index, ox, oy, oz)
                         
                         
 # END OF CLASS
-##############################
\ No newline at end of file
+##############################
@@ -13,8 +13,13 @@
 from pyswarm.pyswarmObject import PyswarmObject
 import pyswarm.utils.general as util
 import pyswarm.utils.sceneInterface as scene
+import pyswarm.utils.frameTimings as ft
+import pyswarm.utils.behaviourProfiler as bp
+import pyswarm.utils.operationCounters as oc
 import pyswarm.vectors.vector3 as v3
 import pyswarm.agents.zoneGraph as zg
+import pyswarm.agents.agentArrayStore as aas
+import pyswarm.agents.parallelCalculator as pc
 
 import pyswarm.agents.agent as ag
 
@@ -31,13 +36,21 @@ class AgentsController(PyswarmObject):
     also manages interaction with the actual Pymel objects within Maya.
     """
     
-    def __init__(self, attributeGroupsController, behavioursController):
+    def __init__(self, attributeGroupsController, behavioursController, frameTimer=None):
+        """
+        :param frameTimer: FrameTimer to record the timings of each frame phase with, or None.
+        """
         self._globalAttributeGroup = attributeGroupsController.globalAttributeGroup
         self._particleIdsOrdering = []
         self._idToAgentLookup = {}
+        self._agentStore = aas.AgentArrayStore()   # per-frame vector data for all agents lives in here
         self._attributeGroupsController = attributeGroupsController
         self._behavioursController = behavioursController
-        self._zoneGraph = zg.ZoneGraph(self._attributeGroupsController)     
+        self._zoneGraph = zg.ZoneGraph(self._attributeGroupsController, self._agentStore)
+        self._parallelCalculator = pc.ParallelCalculator()
+        self._haveWarnedBatchCalculationsUnavailable = False
+        self._frameTimer = frameTimer if(frameTimer is not None) else ft.FrameTimer()
+        self._behaviourProfiler = bp.BehaviourProfiler()
         
         scene.AddStickinessPerParticleAttributeIfNecessary(self._particleShapeName)
 
@@ -65,6 +78,35 @@ class AgentsController(PyswarmObject):
         return self._zoneGraph.debugStr
     zoneDebugStr = property(_getZoneDebugStr)
 
+#############################
+    def __setstate__(self, state):
+        super(AgentsController, self).__setstate__(state)
+        if("_behaviourProfiler" not in state):   # i.e. saved before behaviour profiling was added
+            self._behaviourProfiler = bp.BehaviourProfiler()
+        if("_parallelCalculator" not in state):   # i.e. saved before parallel calculations were added
+            self._parallelCalculator = pc.ParallelCalculator()
+
+########
+    def _getFrameTimer(self):
+        return self._frameTimer
+    def _setFrameTimer(self, value):
+        self._frameTimer = value
+    frameTimer = property(_getFrameTimer, _setFrameTimer)
+    
+    def _getBehaviourProfiler(self):
+        return self._behaviourProfiler
+    behaviourProfiler = property(_getBehaviourProfiler)
+
+########
+    def _getParallelCalculator(self):
+        return self._parallelCalculator
+    parallelCalculator = property(_getParallelCalculator)
+
+########
+    def _getAgentStore(self):
+        return self._agentStore
+    agentStore = property(_getAgentStore)
+
 #############################        
     def agent(self, agentId):
         return self._idToAgagentId[agentId]
@@ -87,7 +129,6 @@ class AgentsController(PyswarmObject):
     
 #############################
     def refreshInternals(self):
-        self._zoneGraph.rebuildMapIfNecessary()
         self._getAllParticlesInfo()
         
 #############################
@@ -106,10 +147,11 @@ class AgentsController(PyswarmObject):
         """Performs one full iteration of updating all agent behaviour.
         Should be called from Maya once per frame update.
         """
+        if(self._behaviourProfiler.enabled):
+            self._behaviourProfiler.beginFrame(util.GetCurrentFrameNumber())
+        
         self._globalAttributeGroup.setStatusReadoutWorking(2, "Startup")
-        self._zoneGraph.rebuildMapIfNecessary()
-
-        self._getAllParticlesInfo()
+        self._getAllParticlesInfo()   # (times its own ParticleRead & ZoneUpdate phases)
         self._globalAttributeGroup.setStatusReadoutWorking(5)
         
         numberOfAgents = len(self._idToAgentLookup)
@@ -117,15 +159,23 @@ class AgentsController(PyswarmObject):
                                    if(numberOfAgents >= _CALCULATIONS_PER_UPDATE_REPORT_) else 1)
         progressUpdateStepSize = 90 / numberOfProgressUpdates
         self._calculateAgentsBehaviour(5, progressUpdateStepSize)
+        self._frameTimer.endPhase(ft.CalculationPhase)
         
         self._globalAttributeGroup.setStatusReadoutWorking(95, "Updating...")
         self._updateAllParticles()
         
         self._globalAttributeGroup.setStatusReadoutWorking(100, "Done!")
+        self._frameTimer.endPhase(ft.CommitPhase)
+        self._behaviourProfiler.endFrame()
         
 ########
     def onCalculationsCompleted(self):
         pass
+    
+########
+    def onDecommissioned(self):
+        """Should be called when the owning swarm is done with - stops any worker processes."""
+        self._parallelCalculator.shutdown()
 
 #############################
     def _buildParticleList(self, fullRebuild=True):
@@ -133,15 +183,19 @@ class AgentsController(PyswarmObject):
         of the corresponding nParticle ShapeNode.
         """
         if(fullRebuild):
+            for agentId in self._idToAgentLookup.iterkeys():
+                self._releaseAgentsDataBlobs(agentId)
             self._idToAgentLookup.clear()
+            self._agentStore.clear()
+            self._zoneGraph.removeAllAgents()
             
             if(self._particleCount > 0):
                 # particle IDs are NOT guaranteed to come in numerical order => have to use this list as reference
                 self._particleIdsOrdering = scene.ParticleIdsListForParticleShape(self._particleShapeName)
                 startingBehaviour = self._behavioursController.defaultBehaviour
                 if(self._particleIdsOrdering is not None):
-                    for particleId in self._particleIdsOrdering:
-                        newAgent = ag.Agent(particleId, self._attributeGroupsController, startingBehaviour)
+                    for newAgent in ag.AgentsForParticleIds(self._particleIdsOrdering, self._attributeGroupsController, 
+                                                            startingBehaviour, self._agentStore):
                         self._idToAgentLookup[newAgent.agentId] = newAgent
         else:
             numParticles = self._particleCount
@@ -153,16 +207,19 @@ class AgentsController(PyswarmObject):
                 sortedIdsList = sorted(self._particleIdsOrdering)
                 keysList = sorted(self._idToAgentLookup.keys())
                 lastKey = keysList[-1] if keysList else -1
-                newAgentsList = []
+                newParticleIds = []
                 startingBehaviour = self._behavioursController.defaultBehaviour
                 
                 for ptclId in reversed(sortedIdsList):
                     if(ptclId > lastKey):
-                        newAgent = ag.Agent(int(ptclId), self._attributeGroupsController, startingBehaviour)
-                        self._idToAgentLookup[newAgent.agentId] = newAgent   
-                        newAgentsList.append(newAgent)
+                        newParticleIds.append(int(ptclId))
                     else:
                         break
+                
+                newAgentsList = ag.AgentsForParticleIds(newParticleIds, self._attributeGroupsController, 
+                                                        startingBehaviour, self._agentStore)
+                for newAgent in newAgentsList:
+                    self._idToAgentLookup[newAgent.agentId] = newAgent
                     
                 self.onNewAgentsCreated(newAgentsList)
                 
@@ -173,11 +230,20 @@ class AgentsController(PyswarmObject):
                 agentSet = set(self._idToAgentLookup.keys())
                 
                 for agentId in agentSet.difference(particleSet):
+                    self._zoneGraph.removeAgent(self._idToAgentLookup[agentId])
                     del self._idToAgentLookup[agentId]
+                    self._agentStore.removeAgent(agentId)
+                    self._releaseAgentsDataBlobs(agentId)
             else:
                 util.LogWarning("Possible logic error - partial rebuild of %s but with no change in particle count." 
                                 % self._particleShapeName)
             
+#############################
+    def _releaseAgentsDataBlobs(self, agentId):
+        """Lets go of the blobs of an agent whose particle has gone - i.e. the ones it has whatever its behaviour."""
+        self._attributeGroupsController.agentMovementAttributeGroup.releaseDataBlobForAgent(agentId)
+        self._attributeGroupsController.agentPerceptionAttributeGroup.releaseDataBlobForAgent(agentId)
+            
 #############################            
     def _getSingleParticleInfo(self, particleId):            
         position = scene.GetSingleParticlePosition(self._particleShapeName, particleId) 
@@ -194,6 +260,7 @@ class AgentsController(PyswarmObject):
         information from their corresponding Maya-side particle instances.
         """
         numParticles = self._particleCount
+        agentsList = []
         if(numParticles == 0):
             self._buildParticleList(True)
         elif(numParticles != len(self._idToAgentLookup)):
@@ -210,16 +277,50 @@ class AgentsController(PyswarmObject):
                 # repeated call here because of shitty Maya bug whereby sometimes only get first item in request for goalsU...
                 positions = scene.ParticlePositionsListForParticleShape(self._particleShapeName) 
     
-            for i in xrange(numParticles):
-                j = i * 3
-                particleId = self._particleIdsOrdering[i]
-                agent = self._idToAgentLookup[particleId]
-                
-                agent.updateCurrentVectors(v3.Vector3(positions[j], positions[j + 1], positions[j + 2]), isFirstFrame)
-                self._zoneGraph.updateAgentPosition(agent)
+            # positions, velocities etc. for the whole swarm are updated in one go in the store, 
+            # the agents themselves then just need to be notified.
+            self._agentStore.updateFromPositionsList(self._particleIdsOrdering, positions, isFirstFrame, 
+                                                     self._globalAttributeGroup.accelerationDueToGravity)
+            agentsList = [self._idToAgentLookup[particleId] for particleId in self._particleIdsOrdering]
+            for agent in agentsList:
+                agent.onVectorsUpdatedInStore()
                 
             if(queryExtraInfo):
                 self._queryExtraInfo()
+        self._frameTimer.endPhase(ft.ParticleReadPhase)
+        
+        self._updateZoneGraph(agentsList)
+        self._restoreUnchangedListsAndAverages(agentsList)
+        self._frameTimer.endPhase(ft.ZoneUpdatePhase)
+
+#########
+    def _updateZoneGraph(self, agentsList):
+        self._zoneGraph.rebuildMapIfNecessary()
+        self._zoneGraph.updateAllAgentPositions(agentsList)
+        
+        # (rebuilt here rather than on the first lookup, i.e. mid-calculation)
+        if(self._behaviourProfiler.isProfiling):
+            startTime = ft.WallTime()
+            numListsRebuilt = self._zoneGraph.rebuildNeighbourListsIfNecessary()
+            self._behaviourProfiler.addNeighbourListsTime(numListsRebuilt, ft.WallTime() - startTime)
+        else:
+            self._zoneGraph.rebuildNeighbourListsIfNecessary()
+
+#########
+    def _restoreUnchangedListsAndAverages(self, agentsList):
+        """Agents for which nothing has changed since the previous frame get that frame's lists & averages back
+        rather than recalculating them (see AgentState.restoreListsAndAveragesIfUnchanged)."""
+        zoneGraph = self._zoneGraph
+        perceptionTableVersion = self._attributeGroupsController.agentPerceptionAttributeGroup.perceptionTable.version
+        numRestored = 0
+        for agent in agentsList:
+            nearbyAgents = zoneGraph.nearbyAgentsIterableForAgent(agent)
+            if(agent.state.restoreListsAndAveragesIfUnchanged(nearbyAgents, zoneGraph.neighbourListVersionForAgent(agent),
+                                                              perceptionTableVersion)):
+                numRestored += 1
+        
+        if(oc.ActiveCounts is not None):
+            oc.CountRestoredLists(numRestored)
 
 #########
     def _queryExtraInfo(self):
@@ -232,16 +333,83 @@ class AgentsController(PyswarmObject):
     def _calculateAgentsBehaviour(self, progressCurrentValue, progressUpdateStepSize):     
         """Iterates through all agents & calculates desired behaviour based on current PySwarm behaviour rules."""
 
+        useBatchCalculations = self._useBatchCalculations
+        useParallelCalculations = self._useParallelCalculations
+        batchAgentsLookup = {}
+        profiler = self._behaviourProfiler if(self._behaviourProfiler.isProfiling) else None
+        
         nextProgressUpdate = progressCurrentValue + progressUpdateStepSize
         for agent in self._idToAgentLookup.itervalues():
-            regionGenerator = self._zoneGraph.nearbyAgentsIterableForAgent(agent)
-            agent.calculateDesiredBehaviour(regionGenerator)
+            behaviour = agent.currentBehaviour
+            if(useBatchCalculations and agent.needsBehaviourCalculation and behaviour.supportsBatchCalculation):
+                batchAgentsLookup.setdefault(behaviour, []).append(agent)
+            elif(profiler is None):
+                regionGenerator = self._zoneGraph.nearbyAgentsIterableForAgent(agent)
+                agent.calculateDesiredBehaviour(regionGenerator)
+            else:
+                startTime = ft.WallTime()
+                regionGenerator = self._zoneGraph.nearbyAgentsIterableForAgent(agent)
+                agent.calculateDesiredBehaviour(regionGenerator)
+                profiler.addAgentTime(behaviour.behaviourId, ft.WallTime() - startTime)
             
             progressCurrentValue += 1
             if(progressCurrentValue == nextProgressUpdate):
                 self._globalAttributeGroup.setStatusReadoutWorking(progressCurrentValue)
                 nextProgressUpdate += progressUpdateStepSize
+        
+        parallelBatchesList = []
+        # (batches which can't be done in parallel go first - in either mode, so agents are always dealt with in the same order)
+        for behaviour, agentsList in sorted(batchAgentsLookup.iteritems(), key=lambda item: item[0].supportsParallelCalculation):
+            nearbyAgentsLists = [self._zoneGraph.nearbyAgentsIterableForAgent(agent) for agent in agentsList]
+            if(useParallelCalculations and behaviour.supportsParallelCalculation):
+                parallelBatchesList.append((behaviour, agentsList, nearbyAgentsLists))   # (all done together, below)
+                continue
+            
+            if(profiler is not None):
+                startTime = ft.WallTime()
+            desiredAccelerations = behaviour.getDesiredAccelerationsForAgents(agentsList, nearbyAgentsLists)
+            for agent, desiredAcceleration in zip(agentsList, desiredAccelerations.tolist()):
+                agent.setDesiredAccelerationFromBatch(*desiredAcceleration)
+            if(profiler is not None):
+                profiler.addBatchTime(behaviour.behaviourId, len(agentsList), ft.WallTime() - startTime)
+        
+        if(parallelBatchesList):
+            if(profiler is not None):
+                startTime = ft.WallTime()
+            agentStore = self._agentStore
+            agentsInStoreOrder = [self._idToAgentLookup[agentId] for agentId in agentStore.agentIds[: agentStore.count].tolist()]
+            desiredAccelerationsList = self._parallelCalculator.calculateBatches(
+                parallelBatchesList, agentsInStoreOrder, agentStore,
+                self._attributeGroupsController.agentPerceptionAttributeGroup.perceptionTable)
+            for (_, agentsList, _), desiredAccelerations in zip(parallelBatchesList, desiredAccelerationsList):
+                for agent, desiredAcceleration in zip(agentsList, desiredAccelerations.tolist()):
+                    agent.setDesiredAccelerationFromBatch(*desiredAcceleration)
+            if(profiler is not None):
+                profiler.addBatchTime(bp.ParallelBatchesId, sum([len(agentsList) for _, agentsList, _ in parallelBatchesList]),
+                                      ft.WallTime() - startTime)
+                
+########
+    def _getUseBatchCalculations(self):
+        if(self._globalAttributeGroup.useBatchCalculations):
+            if(aas.NumpyAvailable()):
+                return True
+            elif(not self._haveWarnedBatchCalculationsUnavailable):
+                util.LogWarning("Batch calculations need NumPy, which is not available - using per-agent calculations.",
+                                self._particleShapeName)
+                self._haveWarnedBatchCalculationsUnavailable = True
                 
+        return False
+    _useBatchCalculations = property(_getUseBatchCalculations)
+    
+########
+    def _getUseParallelCalculations(self):
+        if(self._useBatchCalculations and self._globalAttributeGroup.useParallelCalculations):
+            return True
+        else:
+            self._parallelCalculator.shutdown()   # no point keeping idle worker processes around.
+            return False
+    _useParallelCalculations = property(_getUseParallelCalculations)
+    
 #############################
     def _updateSingleParticle(self, particleId):
         singleParticle = self._idToAgentLookup[particleId]
@@ -253,10 +421,37 @@ class AgentsController(PyswarmObject):
         """Iterates though all agents & executes previously calculated behaviour.
         Note that this must be done subsequently to the calculations and on a separate iteration
         because it would otherwise affect the actual calculations.
+        
+        New velocities are gathered into a single buffer (ordered as per _particleIdsOrdering) and 
+        then pushed to Maya in one call, rather than one call per agent.
         """
-        for agent in self._idToAgentLookup.itervalues():
+        numParticles = len(self._particleIdsOrdering)
+        if(numParticles != len(self._idToAgentLookup)):
+            util.LogWarning("Particle ordering out of sync with agents list (%d vs %d) - updating particles individually." 
+                            % (numParticles, len(self._idToAgentLookup)), self._particleShapeName)
+            for agent in self._idToAgentLookup.itervalues():
+                self.setDebugColour(agent)
+                agent.commitNewBehaviour(self._particleShapeName)
+            return
+        
+        particleShapeName = self._particleShapeName
+        velocityBuffer = [0.0] * (numParticles * 3)
+        uncommittedIndices = []
+        for index, particleId in enumerate(self._particleIdsOrdering):
+            agent = self._idToAgentLookup[particleId]
             self.setDebugColour(agent)
-            agent.commitNewBehaviour(self._particleShapeName)
+            if(not agent.commitNewBehaviourToBuffer(particleShapeName, velocityBuffer, index)):
+                uncommittedIndices.append(index)
+        
+        if(len(uncommittedIndices) < numParticles):
+            if(uncommittedIndices):
+                # whole array is set at once, so must fill in existing values for any agents without new behaviour
+                currentVelocities = scene.ParticleVelocitiesListForParticleShape(particleShapeName)
+                for index in uncommittedIndices:
+                    j = index * 3
+                    velocityBuffer[j : j + 3] = currentVelocities[j : j + 3]
+                    
+            scene.SetParticleVelocitiesList(particleShapeName, velocityBuffer)
             
 #############################            
     def _paintBlack(self):
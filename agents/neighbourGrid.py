@@ -0,0 +1,242 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - without it, ZoneGraph uses its own per-zone agent sets instead.
+
+from pyswarm.pyswarmObject import PyswarmObject
+
+
+
+_ROUNDING_ERROR_CORRECTION_ = 0.00000001   # as per ZoneGraph._spatialKeyFromCoords
+
+
+
+#####################################
+def NumpyAvailable():
+    return (np is not None)
+
+#####################################
+
+
+
+#####################################
+class NeighbourGrid(PyswarmObject):
+    """
+    Cell-sorted neighbour search over all the agents in an AgentArrayStore, used by ZoneGraph in place of
+    its per-zone agent sets when NumPy is available.
+
+    Whenever positions change, agents are (comparison) sorted by cell key, giving start/end offsets into the sorted 
+    order for each *occupied* cell.  Cells are hashed sparsely & are never clamped to the scene bounds, so memory 
+    scales with the number of occupied cells and agents outside the bounds are treated like everyone else.
+    Cell keys run along the z-axis first, so any 3 adjacent cells in a z-row are one contiguous slice of the 
+    sorted agents - radius neighbours for every agent in a cell can then be found with a single array distance 
+    test against the 3 slices around it (or 9 slices, for 3D cells).
+    
+    Cells are 2D (x & z only) unless the swarm's vertical spread exceeds the cell size - in which case (e.g. agents 
+    piled up on top of each other, or flying swarms) cells are also divided along the y-axis, so that vertically 
+    separated agents are no longer tested against each other. This is decided afresh on every rebuild.
+
+    The result is a compact neighbour list for the whole swarm (or just for the requested rows - see rebuild): 
+    the neighbours of the agent in store row i are the store rows neighbourRows[neighbourOffsets[i] : neighbourOffsets[i + 1]].
+    Cell origin & size are set by the owning ZoneGraph; cells must be at least as large as the search radius.
+    """
+
+    def __init__(self, agentStore):
+        self._agentStore = agentStore
+
+        self._origin = (0.0, 0.0, 0.0)
+        self._cellSize = 0.0
+        self._cellSizeReciprocal = 0.0
+        self._usesVerticalAxis = False
+
+        self._needsRebuild = True
+        self._builtLayoutVersion = -1
+
+        self._keyStrideY = 1             # i.e. cell key = (((xCoord * strideX) + yCoord) * strideY) + zCoord
+        self._keyStrideZ = 1             # (the x-stride isn't needed afterwards).
+        self._occupiedCellKeys = None    # 
+        self._cellStarts = None          # indexed by occupied cell
+        self._cellEnds = None            #
+        self._sortedRows = None          # store row indices, in cell key order
+        self._sortedKeys = None          #
+        self._neighbourOffsets = None    # indexed by store row (length = count + 1)
+        self._neighbourRows = None       #
+
+#####################
+    def __str__(self):
+        return ("<NeighbourGrid cellSize=%.2f, origin=(%.2f, %.2f, %.2f), 3D=%s>" %
+                (self._cellSize, self._origin[0], self._origin[1], self._origin[2], 
+                 "Y" if(self._usesVerticalAxis) else "N"))
+
+########
+    def _getDebugStr(self):
+        if(self._needsRebuild or self._cellStarts is None):
+            return ("%s (not built)" % self)
+        else:
+            return ("%s occupiedCells=%d, neighbourPairs=%d" % (self, len(self._cellStarts), len(self._neighbourRows)))
+
+#####################
+    def _getAgentStore(self):
+        return self._agentStore
+    agentStore = property(_getAgentStore)
+
+    def _getNeedsRebuild(self):
+        return (self._needsRebuild or self._builtLayoutVersion != self._agentStore.layoutVersion)
+    needsRebuild = property(_getNeedsRebuild)
+
+    def _getUsesVerticalAxis(self):
+        """True if the cells were divided along the y-axis (i.e. 3D) as of the last rebuild."""
+        return self._usesVerticalAxis
+    usesVerticalAxis = property(_getUsesVerticalAxis)
+
+#####################
+    def setCellLayout(self, xOrigin, yOrigin, zOrigin, cellSize):
+        self._origin = (xOrigin, yOrigin, zOrigin)
+        self._cellSize = float(cellSize)
+        self._cellSizeReciprocal = 1.0 / self._cellSize
+
+        self._needsRebuild = True
+
+########
+    def invalidate(self):
+        """Should be called whenever agent positions have changed."""
+        self._needsRebuild = True
+
+#####################
+    def neighbourRowsForIndex(self, index):
+        """Returns array of store row indices of all agents within the cell size (the search radius) of
+        the agent in the given row.  Rebuilds first if necessary."""
+        if(self.needsRebuild):
+            self.rebuild()
+
+        return self._neighbourRows[self._neighbourOffsets[index] : self._neighbourOffsets[index + 1]]
+
+#####################
+    def rebuild(self, queryRows=None):
+        """Sorts agents into cells & finds neighbours for the agents in the given store rows (for all agents if None).
+        Neighbour lists for any rows not included will be empty until the next rebuild."""
+        agentStore = self._agentStore
+        positions = agentStore.vectorColumnView(agentStore.positions)
+
+        if(len(positions) > 1):
+            self._usesVerticalAxis = ((positions[:, 1].max() - positions[:, 1].min()) > self._cellSize)
+        else:
+            self._usesVerticalAxis = False
+        
+        if(len(positions) > 0):
+            cellKeys = self._cellKeys(positions)
+            self._sortIntoCells(cellKeys)
+            self._findNeighbours(positions, queryRows)
+        else:
+            self._occupiedCellKeys = self._cellStarts = self._cellEnds = np.zeros(0, dtype=np.int64)
+            self._sortedKeys = np.zeros(0, dtype=np.int64)
+            self._sortedRows = self._neighbourRows = np.zeros(0, dtype=np.intp)
+            self._neighbourOffsets = np.zeros(1, dtype=np.intp)
+
+        self._needsRebuild = False
+        self._builtLayoutVersion = agentStore.layoutVersion
+
+########
+    def _cellKeys(self, positions):
+        """Each agent's (unclamped) cell coordinates, flattened into a single integer key (z-axis varying fastest).
+        Coordinates are offset relative to the occupied cells, with a margin of 1 empty cell either side, so that
+        keys of adjacent cells never wrap around into the next row."""
+        cellCoords = np.floor(((positions - self._origin) * self._cellSizeReciprocal) + _ROUNDING_ERROR_CORRECTION_)
+        cellCoords = cellCoords.astype(np.int64)
+        if(not self._usesVerticalAxis):
+            cellCoords[:, 1] = 0
+            
+        cellCoords -= (cellCoords.min(axis=0) - 1)
+        strideX, strideY, strideZ = (cellCoords.max(axis=0) + 2).tolist()
+        self._keyStrideY = strideY
+        self._keyStrideZ = strideZ
+
+        return (((cellCoords[:, 0] * strideY) + cellCoords[:, 1]) * strideZ) + cellCoords[:, 2]
+
+########
+    def _sortIntoCells(self, cellKeys):
+        # NOTE - a comparison sort rather than a counting sort over the keys: a *stable* counting sort needs each
+        # agent's rank within its cell, which NumPy (pre-1.17, i.e. without radix sorting) can't compute without either
+        # sorting or a Python-level loop - and the loop is 3-10x slower than argsort from 1,000 to 100,000 agents.
+        # Keys are also sparse (see _cellKeys), so bincount-ing them would scale with the bounding box, not the agents.
+        self._sortedRows = np.argsort(cellKeys, kind='mergesort')  # stable, so rows within each cell stay in order.
+        sortedKeys = cellKeys[self._sortedRows]
+        
+        isFirstInCell = np.ones(len(sortedKeys), dtype=bool)
+        isFirstInCell[1:] = (sortedKeys[1:] != sortedKeys[:-1])
+        self._cellStarts = np.flatnonzero(isFirstInCell)
+        self._cellEnds = np.append(self._cellStarts[1:], len(sortedKeys))
+        self._occupiedCellKeys = sortedKeys[self._cellStarts]
+        self._sortedKeys = sortedKeys
+
+########
+    def _findNeighbours(self, positions, queryRows):
+        count = len(positions)
+        radius = self._cellSize
+        radiusSquared = radius **2
+        sortedRows = self._sortedRows
+        sortedKeys = self._sortedKeys
+        
+        if(queryRows is None):
+            isQueryRow = None
+            queryCells = slice(None)
+        else:
+            isQueryRow = np.zeros(count, dtype=bool)
+            isQueryRow[queryRows] = True
+            cellIndicesForRows = np.empty(count, dtype=np.intp)
+            cellIndicesForRows[sortedRows] = np.repeat(np.arange(len(self._cellStarts)), self._cellEnds - self._cellStarts)
+            queryCells = np.unique(cellIndicesForRows[isQueryRow])
+        
+        # key offsets from a cell to the middle cell of each adjacent z-row (including its own), 
+        # then start/end of the slice of sorted agents covering each of those z-rows, for every cell being searched.
+        yOffsets = (-1, 0, 1) if(self._usesVerticalAxis) else (0,)
+        zRowKeyOffsets = np.array([((xOffset * self._keyStrideY) + yOffset) * self._keyStrideZ
+                                   for xOffset in (-1, 0, 1) for yOffset in yOffsets], dtype=np.int64)
+        zRowLowKeys = self._occupiedCellKeys[queryCells][:, None] + (zRowKeyOffsets - 1)[None, :]
+        sliceStartsList = np.searchsorted(sortedKeys, zRowLowKeys, 'left').tolist()
+        sliceEndsList = np.searchsorted(sortedKeys, zRowLowKeys + 2, 'right').tolist()
+
+        fromRowsList = [np.zeros(0, dtype=np.intp)]
+        toRowsList = [np.zeros(0, dtype=np.intp)]
+        for cellStart, cellEnd, sliceStarts, sliceEnds in zip(self._cellStarts[queryCells].tolist(), 
+                                                              self._cellEnds[queryCells].tolist(),
+                                                              sliceStartsList, sliceEndsList):
+            memberRows = sortedRows[cellStart : cellEnd]
+            if(isQueryRow is not None):
+                memberRows = memberRows[isQueryRow[memberRows]]
+            candidateRows = np.concatenate([sortedRows[sliceStart : sliceEnd] 
+                                            for sliceStart, sliceEnd in zip(sliceStarts, sliceEnds)
+                                            if(sliceStart < sliceEnd)])  # never empty - includes this cell.
+
+            offsets = positions[candidateRows][None, :, :] - positions[memberRows][:, None, :]
+            # same tests as AgentState._recalculateListsAndAverages, i.e. horizontal distance plus a crude vertical check.
+            isNeighbour = (((offsets[:, :, 0] **2) + (offsets[:, :, 2] **2)) <= radiusSquared)
+            isNeighbour &= (np.abs(offsets[:, :, 1]) <= radius)
+            isNeighbour &= (memberRows[:, None] != candidateRows[None, :])
+
+            memberIndices, candidateIndices = np.nonzero(isNeighbour)
+            fromRowsList.append(memberRows[memberIndices])
+            toRowsList.append(candidateRows[candidateIndices])
+
+        fromRows = np.concatenate(fromRowsList)
+        toRows = np.concatenate(toRowsList)
+        self._neighbourRows = toRows[np.argsort(fromRows, kind='mergesort')]
+        neighbourCounts = np.bincount(fromRows, minlength=count)
+
+        self._neighbourOffsets = np.zeros(count + 1, dtype=np.intp)
+        np.cumsum(neighbourCounts, out=self._neighbourOffsets[1:])
+
+# END OF CLASS - NeighbourGrid
+#####################################
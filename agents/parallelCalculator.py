@@ -0,0 +1,830 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+import cPickle
+import itertools
+import multiprocessing
+import os
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - parallel calculations (like batch calculations) won't be available without it.
+
+from pyswarm.pyswarmObject import PyswarmObject
+import pyswarm.utils.general as util
+import pyswarm.utils.operationCounters as oc
+import pyswarm.agents.sharedArrayBlock as sab
+from pyswarm.attributes.agentPerceptionAttributeGroup import AgentPerceptionAttributeGroup
+
+
+
+_MIN_ROWS_PER_TILE_ = 250   # (agents being calculated) below this, shipping work to & from the workers costs more than it saves.
+_TILES_PER_WORKER_ = 2      # a few more tiles than workers evens out the load a little.
+_WORKER_CHECK_INTERVAL_ = 1.0   # (seconds) how often the main process checks that the workers are still alive, while waiting.
+
+_CLASSIFY_PAIRS_PHASE_, _CALCULATE_AGENTS_PHASE_ = range(2)   # see _TILE_FUNCTIONS_
+
+# control array shared with the workers (see _WorkerLoop)...
+_PHASE_INDEX_, _NUM_PAIRS_INDEX_, _NUM_TILES_INDEX_, _NEXT_TILE_INDEX_, _FAILED_INDEX_ = range(5)
+
+# ...tiles block (one row per tile of the current phase)...
+_TILE_STARTS_COLUMN_NAME_ = "__tileStarts"
+_TILE_ENDS_COLUMN_NAME_ = "__tileEnds"
+
+# ...agents block (one row per AgentArrayStore row, see ParallelCalculator)...
+_RANKS_COLUMN_NAME_ = "__ranks"                 # order in which the agent's lists would be recalculated, -1 if they aren't.
+_LIST_OFFSETS_COLUMN_NAME_ = "__listOffsets"    # (indexed by rank, not row) start of each candidate list in the pairs block.
+_IGNORES_RECIPROCAL_CHECKS_COLUMN_NAME_ = "__ignoresReciprocalChecks"
+_BEHAVIOUR_IDS_COLUMN_NAME_ = "__behaviourIds"  # index into the list of batches, -1 for agents not going through a kernel.
+_FINALISE_TIMES_COLUMN_NAME_ = "__finaliseTimes"  # } see _CalculateAgentsInTile
+_KERNEL_TIMES_COLUMN_NAME_ = "__kernelTimes"      # }
+_OUTPUT_COLUMN_NAME_ = "__desiredAccelerations"
+
+_PERCEPTION_COLUMN_NAMES_ = ("neighbourhoodSizes", "neighbourhoodSizesSquared", "nearRegionSizesSquared",
+                             "collisionRegionSizesSquared", "visibleAreaCosines", "forwardAreaCosines")
+_AVERAGE_COLUMN_NAMES_ = ("avPositions", "avVelocities", "avCrowdedPositions", "avCollisionDirections")
+_TOTAL_COLUMN_NAMES_ = ("nearbyWeightedTotals", "crowdingWeightedTotals")
+_COUNT_COLUMN_NAMES_ = ("numNearby", "numCrowded", "numCollided")
+_REGIONAL_STATS_COLUMN_NAMES_ = _AVERAGE_COLUMN_NAMES_ + _TOTAL_COLUMN_NAMES_ + _COUNT_COLUMN_NAMES_  # (as they stand beforehand)
+
+# ...& pairs block (one row per candidate of each agent whose lists are recalculated, in rank order).
+_SENDER_ROWS_COLUMN_NAME_ = "__senderRows"          # agent whose candidate list the pair is from,
+_CANDIDATE_ROWS_COLUMN_NAME_ = "__candidateRows"    # & the candidate.
+_WAS_CHECKED_COLUMN_NAME_ = "__wasChecked"          # True if the candidate was already in the sender's reciprocalNearbyChecks.
+_CHECKS_COLUMN_NAME_ = "__checks"                   # one of the _..._CHECK_ values below.
+_CLASSES_COLUMN_NAME_ = "__classes"                 # _NEARBY_ etc. bits, below.
+_WEIGHTINGS_COLUMN_NAME_ = "__weightings"                       # weighting of the candidate for the sender,
+_RECIPROCAL_WEIGHTINGS_COLUMN_NAME_ = "__reciprocalWeightings"  # & of the sender for the candidate.
+
+_SKIPPED_CHECK_, _RECIPROCAL_CHECK_, _CRUDE_REJECTION_CHECK_, _PRECISE_CHECK_ = range(4)  # as tallied by AgentState._recalculateListsAndAverages
+
+_NEARBY_, _CROWDED_, _COLLIDED_ = 1, 2, 4   # how the sender classified the candidate,
+_RECIPROCAL_SHIFT_ = 3                       # & (shifted up by this many bits) how the candidate classified the sender.
+
+
+
+#####################################
+def NumpyAvailable():
+    return (np is not None)
+
+#####################################
+def _FinalColumnName(columnName):
+    """Name of the column for the results of the regional stats column with the given name (the originals are left
+    as they are, so that tiles can be recalculated - see ParallelCalculator._calculateTiles)."""
+    return "__final" + columnName[0].upper() + columnName[1:]
+
+########
+def _ClassifyPairsInTile(setup, numPairs, pairsStart, pairsEnd):
+    """
+    Runs in the worker processes (or in the main process, see ParallelCalculator._calculateTiles) - first stage of
+    the parallel calculations, array equivalent of the checks made by AgentState._recalculateListsAndAverages for the
+    tile's rows of the pairs block, and the classification done by the resulting AgentState._makeReciprocalCheck calls.
+    Each pair is dealt with exactly as it would be by those (so the outcome is the same) - i.e. the candidate is:
+        - skipped, if it's the sender itself or in freefall.
+        - a reciprocal check, if it was already in the sender's reciprocalNearbyChecks, or would have been by the time the
+          sender's lists were recalculated - i.e. it's a processor of lower rank (recalculated first) which didn't find
+          the sender outside of its neighbourhood by way of a precise check.  (Candidate lists are symmetric, see ZoneGraph).
+        - otherwise crude & then precise checks, using the sender's PerceptionTable row - with the candidate classifying
+          the sender by that same row, unless it's ignoring reciprocal checks.
+    Results go into the pairs block.
+    """
+    agentsDescriptor, pairsDescriptor, weightingMode, _ = setup
+    agentsLookup = sab.AttachedColumns(agentsDescriptor)
+    pairsLookup = sab.AttachedColumns(pairsDescriptor)
+
+    senderRows = pairsLookup[_SENDER_ROWS_COLUMN_NAME_][pairsStart : pairsEnd]
+    candidateRows = pairsLookup[_CANDIDATE_ROWS_COLUMN_NAME_][pairsStart : pairsEnd]
+    positions = agentsLookup["positions"]
+    neighbourhoodSizes = agentsLookup["neighbourhoodSizes"]
+    neighbourhoodSizesSquared = agentsLookup["neighbourhoodSizesSquared"]
+    ranks = agentsLookup[_RANKS_COLUMN_NAME_]
+
+    offsets = positions[candidateRows] - positions[senderRows]    # i.e. direction to the candidate, as per the sender
+    distancesSquared = np.power(offsets[:, 0], 2.0) + np.power(offsets[:, 2], 2.0)   # (not "x * x" - see _HorizontalCosines)
+
+    isSkipped = (candidateRows == senderRows) | agentsLookup["isInFreefall"][candidateRows]
+    candidateRanks = ranks[candidateRows]
+    wasCheckedByCandidate = ((candidateRanks >= 0) & (candidateRanks < ranks[senderRows]) &
+                             ~(_IsWithinCrudeRadius(offsets, neighbourhoodSizes[candidateRows]) &
+                               (distancesSquared >= neighbourhoodSizesSquared[candidateRows])))
+    isReciprocalCheck = ~isSkipped & (pairsLookup[_WAS_CHECKED_COLUMN_NAME_][pairsStart : pairsEnd] | wasCheckedByCandidate)
+    isPreciseCheck = ~(isSkipped | isReciprocalCheck) & _IsWithinCrudeRadius(offsets, neighbourhoodSizes[senderRows])
+
+    checks = np.full(len(senderRows), _CRUDE_REJECTION_CHECK_, dtype=np.int8)
+    checks[isSkipped] = _SKIPPED_CHECK_
+    checks[isReciprocalCheck] = _RECIPROCAL_CHECK_
+    checks[isPreciseCheck] = _PRECISE_CHECK_
+    pairsLookup[_CHECKS_COLUMN_NAME_][pairsStart : pairsEnd] = checks
+
+    # everything else only applies within the sender's neighbourhood...
+    indices = np.flatnonzero(isPreciseCheck & (distancesSquared < neighbourhoodSizesSquared[senderRows]))
+    senders, candidates = senderRows[indices], candidateRows[indices]
+    offsets, distancesSquared = offsets[indices], distancesSquared[indices]
+    velocities = agentsLookup["velocities"]
+    visibleAreaCosines = agentsLookup["visibleAreaCosines"][senders]
+    nearRegionSizesSquared = agentsLookup["nearRegionSizesSquared"][senders]
+    collisionRegionSizesSquared = agentsLookup["collisionRegionSizesSquared"][senders]
+
+    # ...the sender's classification of the candidate...
+    cosines = _HorizontalCosines(velocities[senders], offsets)
+    isNearby = (cosines > visibleAreaCosines)
+    isCrowded = isNearby & (distancesSquared < nearRegionSizesSquared)
+    isCollided = isCrowded & (distancesSquared < collisionRegionSizesSquared) & (cosines > 0)
+    weightings = _Weightings(weightingMode, isNearby, offsets, cosines, senders, agentsLookup)
+
+    # ...& the candidate's of the sender (still with the sender's perception settings, as per _makeReciprocalCheck).
+    offsets = -offsets
+    cosines = _HorizontalCosines(velocities[candidates], offsets)
+    isReciprocalNearby = ~agentsLookup[_IGNORES_RECIPROCAL_CHECKS_COLUMN_NAME_][candidates] & (cosines > visibleAreaCosines)
+    isReciprocalCrowded = isReciprocalNearby & (distancesSquared < nearRegionSizesSquared)
+    isReciprocalCollided = isReciprocalCrowded & (distancesSquared < collisionRegionSizesSquared) & (cosines > 0)
+    reciprocalWeightings = _Weightings(weightingMode, isReciprocalNearby, offsets, cosines, senders, agentsLookup)
+
+    classes = np.zeros(len(checks), dtype=np.int8)
+    classes[indices] = ((isNearby * _NEARBY_) + (isCrowded * _CROWDED_) + (isCollided * _COLLIDED_) +
+                        (((isReciprocalNearby * _NEARBY_) + (isReciprocalCrowded * _CROWDED_) +
+                          (isReciprocalCollided * _COLLIDED_)) << _RECIPROCAL_SHIFT_))
+    pairsLookup[_CLASSES_COLUMN_NAME_][pairsStart : pairsEnd] = classes
+    for columnName, indexWeightings in ((_WEIGHTINGS_COLUMN_NAME_, weightings),
+                                        (_RECIPROCAL_WEIGHTINGS_COLUMN_NAME_, reciprocalWeightings)):
+        tileWeightings = np.zeros(len(checks), dtype=np.float64)
+        tileWeightings[indices] = indexWeightings
+        pairsLookup[columnName][pairsStart : pairsEnd] = tileWeightings
+
+########
+def _IsWithinCrudeRadius(offsets, radii):
+    """As per AgentState.withinCrudeRadiusOfPoint."""
+    return ((np.abs(offsets[:, 0]) <= radii) & (np.abs(offsets[:, 2]) <= radii) & (np.abs(offsets[:, 1]) <= radii))
+
+########
+def _HorizontalCosines(vectors, offsets):
+    """As per AgentState._getHorizontalCosine, for each row of the (n x 3) vectors & offsets.
+    NOTE - squares are np.power(..., 2.0) rather than "x * x", to match Python's "x **2" (which goes through the C
+    library's pow, & isn't always the same in the last bit) - here & everywhere else the per-agent code uses **."""
+    x1, z1, x2, z2 = vectors[:, 0], vectors[:, 2], offsets[:, 0], offsets[:, 2]
+    magnitudesSquared = (np.power(x1, 2.0) + np.power(z1, 2.0)) * (np.power(x2, 2.0) + np.power(z2, 2.0))
+    cosines = np.ones(len(vectors), dtype=np.float64)
+    hasMagnitude = (magnitudesSquared > 0)
+    cosines[hasMagnitude] = (((x1[hasMagnitude] * x2[hasMagnitude]) + (z1[hasMagnitude] * z2[hasMagnitude])) /
+                             np.sqrt(magnitudesSquared[hasMagnitude]))
+
+    return cosines
+
+########
+def _Weightings(weightingMode, isNearby, offsets, cosines, senders, agentsLookup):
+    """As per AgentState._calculateWeighting with the senders' PerceptionTable rows, where isNearby (zero elsewhere)."""
+    indices = np.flatnonzero(isNearby)
+    offsets, cosines, senders = offsets[indices], cosines[indices], senders[indices]
+
+    if(weightingMode == AgentPerceptionAttributeGroup._WeightingInverseSquare_):
+        distancesSquared = (np.power(offsets[:, 0], 2.0) + np.power(offsets[:, 1], 2.0)) + np.power(offsets[:, 2], 2.0)
+        proximityWeightings = np.full(len(indices), 1000.0)
+        isApart = (distancesSquared != 0)
+        proximityWeightings[isApart] = 1.0 / distancesSquared[isApart]
+    elif(weightingMode == AgentPerceptionAttributeGroup._WeightingLinear_):
+        distances = np.sqrt((np.power(offsets[:, 0], 2.0) + np.power(offsets[:, 1], 2.0)) + np.power(offsets[:, 2], 2.0))
+        neighbourhoodSizes = agentsLookup["neighbourhoodSizes"][senders]
+        proximityWeightings = (neighbourhoodSizes - distances) / neighbourhoodSizes
+    elif(weightingMode == AgentPerceptionAttributeGroup._WeightingNone_):
+        proximityWeightings = np.zeros(len(indices), dtype=np.float64)
+    else:
+        raise RuntimeError("Unrecognised proximity weighting option.")
+
+    forwardAreaCosines = agentsLookup["forwardAreaCosines"][senders]
+    visibleAreaCosines = agentsLookup["visibleAreaCosines"][senders]
+    angularWeightings = np.ones(len(indices), dtype=np.float64)
+    isOutsideForwardArea = ~(cosines > forwardAreaCosines)
+    angularWeightings[isOutsideForwardArea] = ((cosines[isOutsideForwardArea] - visibleAreaCosines[isOutsideForwardArea]) /
+                                               (forwardAreaCosines[isOutsideForwardArea] - visibleAreaCosines[isOutsideForwardArea]))
+
+    weightings = np.zeros(len(isNearby), dtype=np.float64)
+    weightings[indices] = proximityWeightings + angularWeightings
+
+    return weightings
+
+########
+def _CalculateAgentsInTile(setup, numPairs, rowsStart, rowsEnd):
+    """
+    Runs in the worker processes (or in the main process, see ParallelCalculator._calculateTiles) - second stage of
+    the parallel calculations, for agents rowsStart to rowsEnd of the agents block.  Adds up each agent's share of
+    the classified pairs (see _ClassifyPairsInTile) into its regional stats, then runs each behaviour's kernel over its
+    agents.  Results go into the agents block.
+
+    Everything is added up in exactly the same order as it would be per-agent, so that the sums come out exactly the
+    same too.  That's the order of the pairs block - pairs are in rank order, so the pair's index is the "time" at which
+    it would have been dealt with.  An agent being recalculated finalises its averages (see
+    AgentState._recalculateListsAndAverages) once its own candidates are done, i.e. at the end of its candidate list
+    (the finalise time) - anything coming in after that (only possible if agents' perception settings differ) is added
+    on top, as per AgentState._makeReciprocalCheck.  Kernels are given the stats as they stand at the end of their
+    batch (the kernel time), as with BehaviourBaseObject.getDesiredAccelerationsForAgents.
+    """
+    agentsDescriptor, pairsDescriptor, _, batchKernelsList = setup
+    agentsLookup = sab.AttachedColumns(agentsDescriptor)
+    pairsLookup = sab.AttachedColumns(pairsDescriptor)
+    numRows = rowsEnd - rowsStart
+
+    # every nearby classification made of (i.e. by) one of these agents - the sender's of the candidate & vice versa...
+    senderRows = pairsLookup[_SENDER_ROWS_COLUMN_NAME_][: numPairs]
+    candidateRows = pairsLookup[_CANDIDATE_ROWS_COLUMN_NAME_][: numPairs]
+    classes = pairsLookup[_CLASSES_COLUMN_NAME_][: numPairs]
+    reciprocalPairs = np.flatnonzero(((classes >> _RECIPROCAL_SHIFT_) & _NEARBY_).astype(bool) &
+                                     (candidateRows >= rowsStart) & (candidateRows < rowsEnd))
+    ownPairs = np.flatnonzero((classes & _NEARBY_).astype(bool) & (senderRows >= rowsStart) & (senderRows < rowsEnd))
+
+    pairs = np.concatenate((reciprocalPairs, ownPairs))   # (so each agent's own come after those from before its
+    rows = np.concatenate((candidateRows[reciprocalPairs], senderRows[ownPairs]))   # finalise time, as they should)
+    otherRows = np.concatenate((senderRows[reciprocalPairs], candidateRows[ownPairs]))
+    pairClasses = np.concatenate(((classes[reciprocalPairs] >> _RECIPROCAL_SHIFT_), classes[ownPairs]))
+    weightings = np.concatenate((pairsLookup[_RECIPROCAL_WEIGHTINGS_COLUMN_NAME_][reciprocalPairs],
+                                 pairsLookup[_WEIGHTINGS_COLUMN_NAME_][ownPairs]))
+
+    # ...split up into those before the finalise time, those before the kernel time & the rest.
+    isBeforeFinalise = (pairs < agentsLookup[_FINALISE_TIMES_COLUMN_NAME_][rows])
+    isBeforeKernel = (pairs < agentsLookup[_KERNEL_TIMES_COLUMN_NAME_][rows])
+    rows -= rowsStart
+    classifications = (rows, otherRows, pairClasses, weightings)
+
+    statsLookup = dict([(columnName, agentsLookup[columnName][rowsStart : rowsEnd].copy())
+                        for columnName in _REGIONAL_STATS_COLUMN_NAMES_])
+    _AddClassificationsToStats(statsLookup, classifications, isBeforeFinalise, agentsLookup)
+    _FinaliseStats(statsLookup, agentsLookup, rowsStart, rowsEnd)
+    _AddClassificationsToStats(statsLookup, classifications, ~isBeforeFinalise & isBeforeKernel, agentsLookup)
+    kernelStatsLookup = dict([(columnName, statsLookup[columnName].copy()) for columnName in _REGIONAL_STATS_COLUMN_NAMES_])
+    _AddClassificationsToStats(statsLookup, classifications, ~isBeforeKernel, agentsLookup)
+
+    for columnName, rowValues in statsLookup.iteritems():
+        agentsLookup[_FinalColumnName(columnName)][rowsStart : rowsEnd] = rowValues
+
+    behaviourIds = agentsLookup[_BEHAVIOUR_IDS_COLUMN_NAME_][rowsStart : rowsEnd]
+    for behaviourId, (behaviourClass, kernelParameters, kernelInputNames) in enumerate(batchKernelsList):
+        kernelIndices = np.flatnonzero(behaviourIds == behaviourId)
+        if(len(kernelIndices)):
+            kernelRows = rowsStart + kernelIndices
+            # (fancy indexing gives copies, so kernels can't change anyone else's inputs)
+            kernelInputs = dict([(inputName, agentsLookup[inputName][kernelRows]) for inputName in kernelInputNames])
+            for columnName in _AVERAGE_COLUMN_NAMES_:
+                kernelInputs[columnName] = kernelStatsLookup[columnName][kernelIndices]
+            kernelInputs["hasNeighbours"] = (kernelStatsLookup["numNearby"][kernelIndices] > 0)
+            kernelInputs["isCrowded"] = (kernelStatsLookup["numCrowded"][kernelIndices] > 0)
+            kernelInputs["isCollided"] = (kernelStatsLookup["numCollided"][kernelIndices] > 0)
+
+            agentsLookup[_OUTPUT_COLUMN_NAME_][kernelRows] = behaviourClass.calculateBatchKernel(kernelInputs, kernelParameters)
+
+########
+def _AddClassificationsToStats(statsLookup, classifications, isIncluded, agentsLookup):
+    """Adds the included classifications (see _CalculateAgentsInTile) to the regional stats, exactly as per
+    AgentState._recalculateListsAndAverages & _makeReciprocalCheck."""
+    if(not isIncluded.any()):
+        return
+
+    rows, otherRows, pairClasses, weightings = [values[isIncluded] for values in classifications]
+    otherPositions = agentsLookup["positions"][otherRows]
+    isCrowded = (pairClasses & _CROWDED_).astype(bool)
+    isCollided = (pairClasses & _COLLIDED_).astype(bool)
+
+    for columnName, rowIndices, rowValues in (
+            ("avVelocities", rows, agentsLookup["velocities"][otherRows] * weightings[:, None]),
+            ("avPositions", rows, otherPositions * weightings[:, None]),
+            ("avCrowdedPositions", rows[isCrowded], otherPositions[isCrowded] * weightings[isCrowded, None]),
+            ("avCollisionDirections", rows[isCollided], otherPositions[isCollided])):
+        sums = statsLookup[columnName]
+        for axis in xrange(3):
+            sums[:, axis] = _AddInOrder(sums[:, axis], rowIndices, rowValues[:, axis])
+
+    statsLookup["nearbyWeightedTotals"] = _AddInOrder(statsLookup["nearbyWeightedTotals"], rows, weightings)
+    statsLookup["crowdingWeightedTotals"] = _AddInOrder(statsLookup["crowdingWeightedTotals"], rows[isCrowded],
+                                                        weightings[isCrowded])
+    numRows = len(statsLookup["numNearby"])
+    statsLookup["numNearby"] += np.bincount(rows, minlength=numRows)
+    statsLookup["numCrowded"] += np.bincount(rows[isCrowded], minlength=numRows)
+    statsLookup["numCollided"] += np.bincount(rows[isCollided], minlength=numRows)
+
+########
+def _AddInOrder(sums, rowIndices, values):
+    """Returns the (1D) sums with each of values added to its row, one at a time in the order given - i.e. exactly as
+    a loop of "sums[row] += value" would.  np.bincount adds its weights up in order as well, but from 0.0 - so the only
+    difference is that a running total made up entirely of -0.0s comes out as 0.0, which is put right here."""
+    numRows = len(sums)
+    allIndices = np.concatenate((np.arange(numRows), rowIndices))
+    allValues = np.concatenate((sums, values))
+    newSums = np.bincount(allIndices, weights=allValues, minlength=numRows)
+
+    isNegativeZero = (allValues == 0) & np.signbit(allValues)
+    if(isNegativeZero.any()):
+        newSums[np.bincount(allIndices, weights=~isNegativeZero, minlength=numRows) == 0] = -0.0
+
+    return newSums
+
+########
+def _FinaliseStats(statsLookup, agentsLookup, rowsStart, rowsEnd):
+    """Final part of AgentState._recalculateListsAndAverages, for those rows being recalculated."""
+    isRecalculated = (agentsLookup[_RANKS_COLUMN_NAME_][rowsStart : rowsEnd] >= 0)
+    hasNeighbours = isRecalculated & (statsLookup["numNearby"] > 0)
+    isCrowded = hasNeighbours & (statsLookup["numCrowded"] > 0)
+    isCollided = isCrowded & (statsLookup["numCollided"] > 0)
+
+    scalarMults = (1.0 / statsLookup["nearbyWeightedTotals"][hasNeighbours])[:, None]
+    statsLookup["avVelocities"][hasNeighbours] *= scalarMults
+    statsLookup["avPositions"][hasNeighbours] *= scalarMults
+    statsLookup["avCrowdedPositions"][isCrowded] *= (1.0 / statsLookup["crowdingWeightedTotals"][isCrowded])[:, None]
+    statsLookup["avCollisionDirections"][isCollided] *= (1.0 / statsLookup["numCollided"][isCollided])[:, None]
+
+    hasNoNeighbours = isRecalculated & ~hasNeighbours
+    statsLookup["avVelocities"][hasNoNeighbours] = agentsLookup["velocities"][rowsStart : rowsEnd][hasNoNeighbours]
+    statsLookup["avPositions"][hasNoNeighbours] = agentsLookup["positions"][rowsStart : rowsEnd][hasNoNeighbours]
+
+########
+def _SplitEvenly(cumulativeWork, numTiles):
+    """Returns list of (start, end) indices, splitting the items whose cumulative work (numItems + 1 values, starting
+    at 0) is given into up to numTiles tiles of roughly equal work.  Empty tiles are left out."""
+    boundaries = np.searchsorted(cumulativeWork, (np.arange(numTiles + 1) * cumulativeWork[-1]) // numTiles)
+    boundaries[-1] = len(cumulativeWork) - 1
+    boundariesList = np.unique(boundaries).tolist()
+
+    return zip(boundariesList[:-1], boundariesList[1:])
+
+########
+def _SetWorkerExecutableIfNecessary():
+    """Inside Maya, sys.executable is Maya itself - so worker processes must be started with mayapy instead.
+    (Only applies to Windows, where workers are spawned rather than forked)."""
+    if(sys.platform == "win32"):
+        executableDirectory, executableName = os.path.split(sys.executable)
+        executableRoot, executableExtension = os.path.splitext(executableName)
+        if(executableRoot.lower() == "maya"):
+            multiprocessing.set_executable(os.path.join(executableDirectory, "mayapy" + executableExtension))
+
+#####################################
+_TILE_FUNCTIONS_ = (_ClassifyPairsInTile, _CalculateAgentsInTile)   # (by phase)
+
+########
+def _WorkerLoop(setupConnection, startSemaphore, doneSemaphore, control):
+    """
+    Body of each worker process (see _WorkerProcesses).  Waits to be started, then claims tiles of the current phase
+    from the tiles block & calculates them until there are none left, then signals that it's done - over & over, until
+    sent None instead of a setup.  The setup - (tiles block descriptor, tile function setup) - is only sent when it
+    changes, and is picked up each time the worker is started.
+    """
+    setup = None
+    while(True):
+        startSemaphore.acquire()
+        while(setupConnection.poll()):
+            setup = cPickle.loads(setupConnection.recv_bytes())
+        if(setup is None):
+            return
+
+        try:
+            tilesDescriptor, tileFunctionSetup = setup
+            tilesLookup = sab.AttachedColumns(tilesDescriptor)
+            tileFunction = _TILE_FUNCTIONS_[control[_PHASE_INDEX_]]
+            while(True):
+                with control.get_lock():
+                    tileIndex = control[_NEXT_TILE_INDEX_]
+                    control[_NEXT_TILE_INDEX_] = tileIndex + 1
+                if(tileIndex >= control[_NUM_TILES_INDEX_]):
+                    break
+                tileFunction(tileFunctionSetup, control[_NUM_PAIRS_INDEX_],
+                             int(tilesLookup[_TILE_STARTS_COLUMN_NAME_][tileIndex]),
+                             int(tilesLookup[_TILE_ENDS_COLUMN_NAME_][tileIndex]))
+        except Exception:
+            control[_FAILED_INDEX_] = 1   # (the main process then does everything itself, see ParallelCalculator._calculateTiles)
+        finally:
+            doneSemaphore.release()
+
+#####################################
+
+
+
+#####################################
+class _WorkerProcesses(PyswarmObject):
+    """
+    ParallelCalculator's worker processes - started once, then left idle in between phases (see _WorkerLoop) rather than
+    being sent tasks, so that nothing needs pickling from one frame to the next.  Each phase just needs the tiles
+    writing into the tiles block & a few values setting in the control array before the workers are woken up.
+    """
+
+    def __init__(self, numWorkers):
+        _SetWorkerExecutableIfNecessary()
+        self._control = multiprocessing.Array('l', 5)
+        self._doneSemaphore = multiprocessing.Semaphore(0)
+        self._tilesBlock = sab.SharedArrayBlock()
+        self._setupString = None   # (pickled) setup last sent to the workers.
+        self._workersList = []     # (process, setup connection, start semaphore) tuples.
+        for _ in xrange(numWorkers):
+            receivingConnection, sendingConnection = multiprocessing.Pipe(False)
+            startSemaphore = multiprocessing.Semaphore(0)
+            process = multiprocessing.Process(target=_WorkerLoop, args=(receivingConnection, startSemaphore,
+                                                                        self._doneSemaphore, self._control))
+            process.daemon = True
+            process.start()
+            self._workersList.append((process, sendingConnection, startSemaphore))
+
+#####################
+    def __str__(self):
+        return ("<_WorkerProcesses pids=%s>" % [process.pid for process, _, _ in self._workersList])
+
+########
+    def _getDebugStr(self):
+        return ("%s, tiles block=%s" % (self, self._tilesBlock))
+
+#####################
+    def calculateTiles(self, phase, tilesList, numPairs, setup):
+        """Has the workers calculate every tile - (start, end) tuples - of the given phase, and returns once they're
+        all done.  Raises RuntimeError if any of the workers fail."""
+        tileStarts, tileEnds = np.array(tilesList, dtype=np.int64).T
+        tilesLookup = { _TILE_STARTS_COLUMN_NAME_ : tileStarts, _TILE_ENDS_COLUMN_NAME_ : tileEnds }
+        self._tilesBlock.ensureLayout(sab.LayoutForArrays(tilesLookup), len(tilesList))
+        for columnName, columnArray in tilesLookup.iteritems():
+            self._tilesBlock.columns[columnName][: len(tilesList)] = columnArray
+
+        setupString = cPickle.dumps((self._tilesBlock.descriptor, setup), cPickle.HIGHEST_PROTOCOL)
+        if(setupString != self._setupString):
+            for _, setupConnection, _ in self._workersList:
+                setupConnection.send_bytes(setupString)
+            self._setupString = setupString
+
+        control = self._control   # (the workers are all idle, so no need for the lock)
+        control[_PHASE_INDEX_] = phase
+        control[_NUM_PAIRS_INDEX_] = numPairs
+        control[_NUM_TILES_INDEX_] = len(tilesList)
+        control[_NEXT_TILE_INDEX_] = 0
+        for _, _, startSemaphore in self._workersList:
+            startSemaphore.release()
+
+        numDone = 0
+        while(numDone < len(self._workersList)):
+            if(self._doneSemaphore.acquire(True, _WORKER_CHECK_INTERVAL_)):
+                numDone += 1
+            elif(not all([process.is_alive() for process, _, _ in self._workersList])):
+                raise RuntimeError("a worker process has stopped unexpectedly")
+        if(control[_FAILED_INDEX_]):
+            raise RuntimeError("a worker process raised an exception")
+
+########
+    def stop(self):
+        """Stops the workers - forcibly, if they don't stop of their own accord - & frees the tiles block."""
+        stopString = cPickle.dumps(None, cPickle.HIGHEST_PROTOCOL)
+        for _, setupConnection, startSemaphore in self._workersList:
+            try:
+                setupConnection.send_bytes(stopString)
+                startSemaphore.release()
+            except (IOError, OSError):   # i.e. the worker has already gone
+                pass
+        for process, _, _ in self._workersList:
+            process.join(_WORKER_CHECK_INTERVAL_)
+            if(process.is_alive()):
+                process.terminate()
+                process.join()
+
+        self._workersList = []
+        self._tilesBlock.release()
+
+# END OF CLASS - _WorkerProcesses
+#####################################
+
+
+
+#####################################
+class ParallelCalculator(PyswarmObject):
+    """
+    Farms out batch behaviour calculations - the neighbour classification (i.e. the regional stats, see
+    AgentState.updateRegionalStatsIfNecessary) as well as the kernel stage (see BehaviourBaseObject.calculateBatchKernel) -
+    to a set of long-lived worker processes.  Only the gathering of each batch's inputs (prepareBatchCalculation), passing the
+    results back to the agents & finishBatchCalculation are left to the main process.  Results are exactly the same
+    as for batch calculations done in the main process.
+
+    Agents whose lists are to be recalculated (the "processors") are ranked in the order the main process would have
+    done them in, and their candidate lists - exactly as given - laid end to end in that order in the pairs block.
+    Every agent in the swarm gets a row in the agents block, at its AgentArrayStore row - positions, velocities, freefall
+    flags, PerceptionTable row, rank, kernel inputs & regional stats so far.  Workers then:
+        - classify each pair (see _ClassifyPairsInTile) - tiles are even runs of pairs.
+        - add up each agent's share of those & run the kernels (see _CalculateAgentsInTile) - tiles are runs of agents
+          with roughly the same number of pairs.
+    Workers claim their tiles from a third block, and get nothing else but the blocks' descriptors & the kernels' parameters
+    - only sent to them when changed (see _WorkerProcesses) - all results go straight into the blocks.  Blocks are only
+    reallocated (and the workers only re-attach) when the swarm outgrows them.
+
+    The workers & blocks are created on first use and are never pickled.  Should the workers fail, a warning is logged and
+    all subsequent calculations are done in the main process as normal.
+    """
+
+    def __init__(self):
+        self._workers = None
+        self._agentsBlock = sab.SharedArrayBlock()
+        self._pairsBlock = sab.SharedArrayBlock()
+        self._numWorkers = max(1, multiprocessing.cpu_count() - 1)
+        self._hasFailed = False
+
+#####################
+    def __str__(self):
+        return ("<ParallelCalculator workers=%d, running=%s%s>" %
+                (self._numWorkers, "Y" if(self._workers is not None) else "N", " (FAILED)" if(self._hasFailed) else ""))
+
+########
+    def _getDebugStr(self):
+        return self.__str__()
+
+#####################
+    def __getstate__(self):
+        state = super(ParallelCalculator, self).__getstate__()
+        state["_workers"] = None
+        state["_agentsBlock"] = None
+        state["_pairsBlock"] = None
+
+        return state
+
+########
+    def __setstate__(self, state):
+        super(ParallelCalculator, self).__setstate__(state)
+        self.__dict__.pop("_sharedBlock", None)   # i.e. saved when there was just the one block
+        self.__dict__.pop("_pool", None)          # i.e. saved when the workers were a multiprocessing.Pool
+        self._workers = None
+        self._agentsBlock = sab.SharedArrayBlock()
+        self._pairsBlock = sab.SharedArrayBlock()
+
+#####################
+    def _getIsRunning(self):
+        return (self._workers is not None)
+    isRunning = property(_getIsRunning)
+
+#####################
+    def shutdown(self):
+        """Stops any worker processes & frees the shared blocks - they will be recreated if needed again."""
+        self._stopWorkers()
+        self._agentsBlock.release()
+        self._pairsBlock.release()
+
+#####################
+    def calculateBatches(self, batchesList, agentsInStoreOrder, agentStore, perceptionTable):
+        """Parallel equivalent of behaviour.getDesiredAccelerationsForAgents(agentsList, nearbyAgentsLists) for each
+        (behaviour, agentsList, nearbyAgentsLists) tuple in batchesList, one after the other - returns a list of the
+        results, in the same order.  Batches are calculated in the main process as normal if there are too few agents
+        to be worth splitting up.
+        ***ASSUMES CANDIDATE LISTS ARE SYMMETRIC (as per ZoneGraph) - i.e. if B is in A's list, A is in B's***
+
+        :param agentsInStoreOrder: every agent in the swarm, ordered by agentStore row.
+        :param perceptionTable: PerceptionTable of the swarm's perception attribute group.
+        """
+        numBatchAgents = sum([len(agentsList) for _, agentsList, _ in batchesList])
+        numTiles = self._numTilesForRows(numBatchAgents)
+        if(self._hasFailed or numTiles < 2):
+            return [behaviour.getDesiredAccelerationsForAgents(agentsList, nearbyAgentsLists)
+                    for behaviour, agentsList, nearbyAgentsLists in batchesList]
+
+        preparedBatchesList = []
+        for behaviour, agentsList, nearbyAgentsLists in batchesList:
+            desiredAccelerations, needsKernel, kernelInputs, kernelParameters = behaviour.prepareBatchCalculation(
+                agentsList, nearbyAgentsLists, includeRegionalStats=False)
+            preparedBatchesList.append((behaviour, agentsList, nearbyAgentsLists, desiredAccelerations, needsKernel,
+                                        kernelInputs, kernelParameters))
+
+        listsStatesList = [agent.state.listsStateForBatch() for agent in agentsInStoreOrder]
+        numPairs, batchPairEnds, kernelRowsList = self._fillBlocks(preparedBatchesList, agentsInStoreOrder, agentStore,
+                                                                   perceptionTable, listsStatesList)
+
+        batchKernelsList = [(type(behaviour), kernelParameters, tuple(kernelInputs.keys()))
+                            for behaviour, _, _, _, _, kernelInputs, kernelParameters in preparedBatchesList]
+        setup = (self._agentsBlock.descriptor, self._pairsBlock.descriptor, perceptionTable.weightingMode, batchKernelsList)
+        self._calculateTiles(_CLASSIFY_PAIRS_PHASE_, _SplitEvenly(np.arange(numPairs + 1), numTiles), numPairs, setup)
+        self._calculateTiles(_CALCULATE_AGENTS_PHASE_, self._agentTiles(agentStore.count, numPairs, numTiles),
+                             numPairs, setup)
+
+        self._passResultsToAgents(preparedBatchesList, agentsInStoreOrder, agentStore, listsStatesList,
+                                  numPairs, batchPairEnds)
+
+        outputColumn = self._agentsBlock.columns[_OUTPUT_COLUMN_NAME_]
+        for (_, _, _, desiredAccelerations, needsKernel, _, _), kernelRows in zip(preparedBatchesList, kernelRowsList):
+            desiredAccelerations[needsKernel] = outputColumn[kernelRows]
+
+        return [preparedBatch[3] for preparedBatch in preparedBatchesList]
+
+########
+    def _numTilesForRows(self, numRows):
+        return min(self._numWorkers * _TILES_PER_WORKER_, numRows // _MIN_ROWS_PER_TILE_)
+
+########
+    def _fillBlocks(self, preparedBatchesList, agentsInStoreOrder, agentStore, perceptionTable, listsStatesList):
+        """Fills in the agents & pairs blocks - returns tuple (number of pairs, end of each batch's pairs, list of the
+        store rows of each batch's kernel rows)."""
+        numRows = agentStore.count
+        (nearbyWeightedTotals, crowdingWeightedTotals, numNearby, numCrowded, numCollided,
+         needsFullListsRebuild, ignoresReciprocalChecks, _) = zip(*listsStatesList) if(listsStatesList) else ((),) * 8
+        needsFullListsRebuild = np.array(needsFullListsRebuild, dtype=bool)
+
+        # processors are ranked in the order they'd be recalculated in (see prepareBatchCalculation)...
+        processorRowsList, candidateListsList, kernelRowsList, batchNumProcessors = [], [], [], []
+        for _, agentsList, nearbyAgentsLists, _, needsKernel, _, _ in preparedBatchesList:
+            kernelIndices = np.flatnonzero(needsKernel)
+            kernelRows = np.fromiter((agentsList[index].state.storeIndex for index in kernelIndices.tolist()),
+                                     np.intp, len(kernelIndices))
+            isProcessor = needsFullListsRebuild[kernelRows]
+            processorRowsList.append(kernelRows[isProcessor])
+            candidateListsList.extend([nearbyAgentsLists[index] for index in kernelIndices[isProcessor].tolist()])
+            kernelRowsList.append(kernelRows)
+            batchNumProcessors.append(np.count_nonzero(isProcessor))
+        processorRows = np.concatenate(processorRowsList)
+        numProcessors = len(processorRows)
+
+        # ...& their candidate lists laid out end to end in the pairs block.
+        listLengths = np.fromiter(itertools.imap(len, candidateListsList), np.intp, numProcessors)
+        listOffsets = np.zeros(numProcessors + 1, dtype=np.int64)
+        np.cumsum(listLengths, out=listOffsets[1:])
+        numPairs = int(listOffsets[-1])
+        batchPairEnds = listOffsets[np.cumsum(batchNumProcessors)]
+
+        objectIds = np.fromiter(itertools.imap(id, agentsInStoreOrder), np.int64, numRows)   # (cheaper than agentIds)
+        objectIdsOrder = np.argsort(objectIds)
+        candidateObjectIds = np.fromiter(itertools.imap(id, itertools.chain.from_iterable(candidateListsList)),
+                                         np.int64, numPairs)
+        candidateRows = objectIdsOrder[np.searchsorted(objectIds[objectIdsOrder], candidateObjectIds)]
+        senderRows = np.repeat(processorRows, listLengths)
+
+        checkedPairKeys = [(senderRow * numRows) + agentStore.indexForAgentId(agentId)
+                           for senderRow in processorRows.tolist() for agentId in listsStatesList[senderRow][7]]
+        wasChecked = (np.in1d((senderRows * numRows) + candidateRows, checkedPairKeys) if(checkedPairKeys)
+                      else np.zeros(numPairs, dtype=bool))
+
+        ranks = np.full(numRows, -1, dtype=np.int64)
+        ranks[processorRows] = np.arange(numProcessors)
+        behaviourIds = np.full(numRows, -1, dtype=np.int32)
+        finaliseTimes = np.full(numRows, numPairs, dtype=np.int64)
+        finaliseTimes[processorRows] = listOffsets[1:]
+        kernelTimes = np.full(numRows, numPairs, dtype=np.int64)
+        for behaviourId, (kernelRows, batchPairEnd) in enumerate(zip(kernelRowsList, batchPairEnds.tolist())):
+            behaviourIds[kernelRows] = behaviourId
+            kernelTimes[kernelRows] = batchPairEnd
+
+        tableRows = np.fromiter((agent.state.perceptionAttributes.tableIndex for agent in agentsInStoreOrder),
+                                np.intp, numRows)
+        agentArraysLookup = { "positions" : agentStore.vectorColumnView(agentStore.positions),
+                              "velocities" : agentStore.vectorColumnView(agentStore.velocities),
+                              "isInFreefall" : agentStore.isInFreefall[: numRows].astype(bool),
+                              _RANKS_COLUMN_NAME_ : ranks,
+                              _IGNORES_RECIPROCAL_CHECKS_COLUMN_NAME_ : np.array(ignoresReciprocalChecks, dtype=bool),
+                              _BEHAVIOUR_IDS_COLUMN_NAME_ : behaviourIds,
+                              _FINALISE_TIMES_COLUMN_NAME_ : finaliseTimes,
+                              _KERNEL_TIMES_COLUMN_NAME_ : kernelTimes,
+                              "nearbyWeightedTotals" : np.array(nearbyWeightedTotals, dtype=np.float64),
+                              "crowdingWeightedTotals" : np.array(crowdingWeightedTotals, dtype=np.float64),
+                              "numNearby" : np.array(numNearby, dtype=np.int64),
+                              "numCrowded" : np.array(numCrowded, dtype=np.int64),
+                              "numCollided" : np.array(numCollided, dtype=np.int64) }
+        for columnName in _AVERAGE_COLUMN_NAMES_:
+            agentArraysLookup[columnName] = agentStore.vectorColumnView(getattr(agentStore, columnName))
+        for columnName in _PERCEPTION_COLUMN_NAMES_:
+            agentArraysLookup[columnName] = np.frombuffer(getattr(perceptionTable, columnName), dtype=np.float64)[tableRows]
+
+        layoutArraysLookup = dict(agentArraysLookup)
+        layoutArraysLookup[_LIST_OFFSETS_COLUMN_NAME_] = listOffsets
+        layoutArraysLookup[_OUTPUT_COLUMN_NAME_] = np.zeros((0, 3), dtype=np.float64)
+        for columnName in _REGIONAL_STATS_COLUMN_NAMES_:
+            layoutArraysLookup[_FinalColumnName(columnName)] = agentArraysLookup[columnName]
+        for kernelInputs in [preparedBatch[5] for preparedBatch in preparedBatchesList]:
+            layoutArraysLookup.update(kernelInputs)
+
+        self._agentsBlock.ensureLayout(sab.LayoutForArrays(layoutArraysLookup), numRows + 1)   # (+1 for listOffsets)
+        columnsLookup = self._agentsBlock.columns
+        for columnName, agentArray in agentArraysLookup.iteritems():
+            columnsLookup[columnName][: numRows] = agentArray
+        columnsLookup[_LIST_OFFSETS_COLUMN_NAME_][: numProcessors + 1] = listOffsets
+        for kernelRows, kernelInputs in zip(kernelRowsList, [preparedBatch[5] for preparedBatch in preparedBatchesList]):
+            for inputName, inputArray in kernelInputs.iteritems():
+                if(inputName not in agentArraysLookup):   # (positions & velocities are already in)
+                    columnsLookup[inputName][kernelRows] = inputArray
+
+        pairArraysLookup = { _SENDER_ROWS_COLUMN_NAME_ : senderRows.astype(np.int64),
+                             _CANDIDATE_ROWS_COLUMN_NAME_ : candidateRows.astype(np.int64),
+                             _WAS_CHECKED_COLUMN_NAME_ : wasChecked }
+        layoutArraysLookup = dict(pairArraysLookup)
+        layoutArraysLookup[_CHECKS_COLUMN_NAME_] = np.zeros(0, dtype=np.int8)
+        layoutArraysLookup[_CLASSES_COLUMN_NAME_] = np.zeros(0, dtype=np.int8)
+        layoutArraysLookup[_WEIGHTINGS_COLUMN_NAME_] = np.zeros(0, dtype=np.float64)
+        layoutArraysLookup[_RECIPROCAL_WEIGHTINGS_COLUMN_NAME_] = np.zeros(0, dtype=np.float64)
+
+        self._pairsBlock.ensureLayout(sab.LayoutForArrays(layoutArraysLookup), numPairs)
+        columnsLookup = self._pairsBlock.columns
+        for columnName, pairArray in pairArraysLookup.iteritems():
+            columnsLookup[columnName][: numPairs] = pairArray
+
+        return (numPairs, batchPairEnds.tolist(), kernelRowsList)
+
+########
+    def _agentTiles(self, numRows, numPairs, numTiles):
+        """Splits the agents block into tiles with roughly the same amount of work - i.e. pairs to add up."""
+        columnsLookup = self._pairsBlock.columns
+        cumulativeWork = np.zeros(numRows + 1, dtype=np.int64)
+        np.cumsum(1 + np.bincount(columnsLookup[_SENDER_ROWS_COLUMN_NAME_][: numPairs], minlength=numRows) +
+                  np.bincount(columnsLookup[_CANDIDATE_ROWS_COLUMN_NAME_][: numPairs], minlength=numRows),
+                  out=cumulativeWork[1:])
+
+        return _SplitEvenly(cumulativeWork, numTiles)
+
+########
+    def _calculateTiles(self, phase, tilesList, numPairs, setup):
+        """Calculates every tile - (start, end) tuples - of the given phase (see _TILE_FUNCTIONS_), in the worker
+        processes unless there's only one, and returns once they're all done.
+        Tiles only ever write their results to the blocks (never their inputs), so can be recalculated if need be."""
+        if(len(tilesList) > 1 and not self._hasFailed):
+            try:
+                if(self._workers is None):
+                    self._workers = _WorkerProcesses(self._numWorkers)
+                    util.LogDebug("Started %d worker processes for parallel calculations." % self._numWorkers)
+                self._workers.calculateTiles(phase, tilesList, numPairs, setup)
+                return
+            except Exception as e:
+                util.LogWarning("Parallel calculations failed (%s) - calculating in the main process from now on." % e)
+                self._stopWorkers()   # (the blocks stay, this frame's inputs are still in them)
+                self._hasFailed = True
+
+        tileFunction = _TILE_FUNCTIONS_[phase]
+        for tileStart, tileEnd in tilesList:
+            tileFunction(setup, numPairs, tileStart, tileEnd)
+
+########
+    def _passResultsToAgents(self, preparedBatchesList, agentsInStoreOrder, agentStore, listsStatesList,
+                             numPairs, batchPairEnds):
+        """Averages go straight into the store, lists via AgentState.addToListsFromBatch - batch by batch, each followed
+        by its finishBatchCalculation, so that the lists are as they would have been at that point - & weighted totals
+        via AgentState.setWeightedTotalsFromBatch."""
+        agentsColumnsLookup = self._agentsBlock.columns
+        pairsColumnsLookup = self._pairsBlock.columns
+        numRows = len(agentsInStoreOrder)
+        for columnName in _AVERAGE_COLUMN_NAMES_:
+            agentStore.vectorColumnView(getattr(agentStore, columnName))[:] = \
+                agentsColumnsLookup[_FinalColumnName(columnName)][: numRows]
+
+        senderRows = pairsColumnsLookup[_SENDER_ROWS_COLUMN_NAME_][: numPairs]
+        candidateRows = pairsColumnsLookup[_CANDIDATE_ROWS_COLUMN_NAME_][: numPairs]
+        classes = pairsColumnsLookup[_CLASSES_COLUMN_NAME_][: numPairs]
+        if(oc.ActiveCounts is not None):
+            checkCounts = np.bincount(pairsColumnsLookup[_CHECKS_COLUMN_NAME_][: numPairs], minlength=4).tolist()
+            oc.CountNeighbourChecks(numPairs, checkCounts[_RECIPROCAL_CHECK_], checkCounts[_CRUDE_REJECTION_CHECK_],
+                                    checkCounts[_PRECISE_CHECK_])
+
+        # each nearby classification (see _CalculateAgentsInTile), ordered by sender's batch, then agent, then time.
+        reciprocalPairs = np.flatnonzero(((classes >> _RECIPROCAL_SHIFT_) & _NEARBY_).astype(bool))
+        ownPairs = np.flatnonzero((classes & _NEARBY_).astype(bool))
+        pairs = np.concatenate((reciprocalPairs, ownPairs))
+        rows = np.concatenate((candidateRows[reciprocalPairs], senderRows[ownPairs]))
+        batchIds = np.searchsorted(batchPairEnds, pairs, 'right')
+        order = np.lexsort((pairs, rows, batchIds))
+        rows, batchIds = rows[order], batchIds[order]
+        otherRows = np.concatenate((senderRows[reciprocalPairs], candidateRows[ownPairs]))[order]
+        pairClasses = np.concatenate(((classes[reciprocalPairs] >> _RECIPROCAL_SHIFT_), classes[ownPairs]))[order]
+        isCrowded = (pairClasses & _CROWDED_).astype(bool)
+        isCollided = (pairClasses & _COLLIDED_).astype(bool)
+
+        agentsArray = np.empty(numRows, dtype=object)
+        agentsArray[:] = agentsInStoreOrder
+        nearbyAgents = agentsArray[otherRows].tolist()
+        crowdedAgents = agentsArray[otherRows[isCrowded]].tolist()
+        collidedAgents = agentsArray[otherRows[isCollided]].tolist()
+
+        isFirstForAgent = np.ones(len(rows), dtype=bool)
+        isFirstForAgent[1:] = ((rows[1:] != rows[:-1]) | (batchIds[1:] != batchIds[:-1]))
+        starts = np.append(np.flatnonzero(isFirstForAgent), len(rows))
+        crowdedStarts = np.append(0, np.cumsum(isCrowded))[starts]
+        collidedStarts = np.append(0, np.cumsum(isCollided))[starts]
+        batchStarts = np.searchsorted(batchIds[starts[:-1]], np.arange(len(preparedBatchesList) + 1)).tolist()
+
+        agentStarts = zip(rows[starts[:-1]].tolist(), starts[:-1].tolist(), starts[1:].tolist(),
+                          crowdedStarts[:-1].tolist(), crowdedStarts[1:].tolist(),
+                          collidedStarts[:-1].tolist(), collidedStarts[1:].tolist())
+        for batchId, (behaviour, agentsList) in enumerate([preparedBatch[:2] for preparedBatch in preparedBatchesList]):
+            for row, start, end, crowdedStart, crowdedEnd, collidedStart, collidedEnd in \
+                    agentStarts[batchStarts[batchId] : batchStarts[batchId + 1]]:
+                agentsInStoreOrder[row].state.addToListsFromBatch(nearbyAgents[start : end],
+                                                                  crowdedAgents[crowdedStart : crowdedEnd],
+                                                                  collidedAgents[collidedStart : collidedEnd])
+            behaviour.finishBatchCalculation(agentsList)
+
+        isRecalculated = (agentsColumnsLookup[_RANKS_COLUMN_NAME_][: numRows] >= 0)
+        isChanged = isRecalculated.copy()
+        isChanged[rows] = True
+        changedRows = np.flatnonzero(isChanged)
+        for row, nearbyWeightedTotal, crowdingWeightedTotal, wasRecalculated in zip(
+                changedRows.tolist(),
+                agentsColumnsLookup[_FinalColumnName("nearbyWeightedTotals")][changedRows].tolist(),
+                agentsColumnsLookup[_FinalColumnName("crowdingWeightedTotals")][changedRows].tolist(),
+                isRecalculated[changedRows].tolist()):
+            agentsInStoreOrder[row].state.setWeightedTotalsFromBatch(nearbyWeightedTotal, crowdingWeightedTotal,
+                                                                     wasRecalculated)
+
+########
+    def _stopWorkers(self):
+        if(self._workers is not None):
+            self._workers.stop()
+            self._workers = None
+
+# END OF CLASS - ParallelCalculator
+#####################################
@@ -0,0 +1,207 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+import atexit
+import itertools
+import mmap
+import os
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - shared blocks are only used by the parallel calculations, which need it anyway.
+
+from pyswarm.pyswarmObject import PyswarmObject
+
+
+
+_MINIMUM_CAPACITY_ = 256
+_COLUMN_ALIGNMENT_ = 16   # bytes
+
+
+
+#####################################
+def LayoutForArrays(arraysLookup):
+    """Returns the layout (see SharedArrayBlock) matching the given dict of 1D or (n x m) NumPy arrays."""
+    return tuple(sorted([(columnName, columnArray.dtype.str, (columnArray.shape[1] if(columnArray.ndim > 1) else 1))
+                         for columnName, columnArray in arraysLookup.iteritems()]))
+
+########
+def AttachedColumns(blockDescriptor):
+    """
+    For use by the *other* processes - returns dict of NumPy arrays (column name -> array with one row per
+    capacity row), using the block given by blockDescriptor (see SharedArrayBlock.descriptor).
+    Only re-attaches if the block has been reallocated since the last call, so cheap to call every time.
+    """
+    blockKey, path, generation, layout, capacity = blockDescriptor
+    attachedGeneration, columnsLookup = _attachedBlocksLookup.get(blockKey, (None, None))
+    if(attachedGeneration != generation):
+        with open(path, "r+b") as blockFile:
+            blockBuffer = mmap.mmap(blockFile.fileno(), _BlockSize(layout, capacity))  # (the mapping outlives the file object)
+        columnsLookup = _ColumnsForBuffer(blockBuffer, layout, capacity)
+        _attachedBlocksLookup[blockKey] = (generation, columnsLookup)   # (any earlier generation's mapping goes)
+
+    return columnsLookup
+
+_attachedBlocksLookup = {}   # block key -> (generation, columnsLookup) of the latest attachment, for AttachedColumns
+
+#####################################
+def _AlignedSize(numBytes):
+    return ((numBytes + _COLUMN_ALIGNMENT_ - 1) // _COLUMN_ALIGNMENT_) * _COLUMN_ALIGNMENT_
+
+########
+def _BlockSize(layout, capacity):
+    return max(1, sum([_AlignedSize(capacity * valuesPerRow * np.dtype(dtypeString).itemsize)
+                       for _, dtypeString, valuesPerRow in layout]))
+
+########
+def _ColumnsForBuffer(blockBuffer, layout, capacity):
+    columnsLookup = {}
+    offset = 0
+    for columnName, dtypeString, valuesPerRow in layout:
+        dtype = np.dtype(dtypeString)
+        column = np.frombuffer(blockBuffer, dtype=dtype, count=(capacity * valuesPerRow), offset=offset)
+        columnsLookup[columnName] = column.reshape(capacity, valuesPerRow) if(valuesPerRow > 1) else column
+        offset += _AlignedSize(capacity * valuesPerRow * dtype.itemsize)
+
+    return columnsLookup
+
+########
+def _RemoveBlockFile(path):
+    """Deletes the block file at path.  POSIX lets a file go while still mapped (the memory lives on until the
+    last mapping does), Windows doesn't - so if it's still open elsewhere it's left for _RemoveBlockFiles instead."""
+    try:
+        os.remove(path)
+        _blockFilePaths.discard(path)
+    except OSError:
+        pass
+
+def _RemoveBlockFiles():
+    """Deletes any block files not yet deleted (see _RemoveBlockFile) - run at exit."""
+    for path in list(_blockFilePaths):
+        _RemoveBlockFile(path)
+
+_blockFilePaths = set()
+atexit.register(_RemoveBlockFiles)
+
+_blockNumbers = itertools.count()   # for SharedArrayBlock keys
+
+#####################################
+
+
+
+#####################################
+class SharedArrayBlock(PyswarmObject):
+    """
+    A set of NumPy arrays ("columns") living in a single block of memory which other processes can attach to,
+    so that they can read & write the arrays directly rather than having copies pickled back & forth.
+    The block is a memory-mapped temporary file (Python 2.7 has no multiprocessing.shared_memory) and only
+    ever lives as long as this process - it is never pickled.
+
+    Columns are defined by a layout - a tuple of (column name, NumPy dtype string, values per row) tuples - and
+    all have the same number of rows, the capacity.  The owning process calls ensureLayout before writing to
+    the columns (which reallocates if the layout has changed or more rows are needed - capacity is doubled,
+    as with AgentArrayStore) and passes descriptor to the other processes, which then use AttachedColumns.
+    Every reallocation gets a new file & generation number, so the other processes know to re-attach.  Each block
+    also has its own key, so the other processes can be attached to several blocks at once.
+
+    ParallelCalculator keeps the whole swarm's per-frame working set in two of these - one row per agent (positions,
+    velocities, freefall flags, PerceptionTable columns, kernel inputs, averages & results) & one row per candidate
+    pair of agents (which agents, & how they classified each other) - so the workers never need any agent state
+    pickled to them.
+
+    IMPORTANT - as with AgentArrayStore, the column arrays are replaced on reallocation, so don't hang on to them.
+    """
+
+    def __init__(self):
+        self._key = "%d-%d" % (os.getpid(), next(_blockNumbers))
+        self._path = None
+        self._generation = 0
+        self._layout = ()
+        self._capacity = 0
+        self._columnsLookup = {}
+
+#####################
+    def __str__(self):
+        return ("<SharedArrayBlock generation=%d, capacity=%d, columns=%d>" %
+                (self._generation, self._capacity, len(self._layout)))
+
+########
+    def _getDebugStr(self):
+        return ("%s path=%s, layout=%s" % (self, self._path, self._layout))
+
+#####################
+    def __getstate__(self):
+        state = super(SharedArrayBlock, self).__getstate__()
+        state["_path"] = None
+        state["_layout"] = ()
+        state["_capacity"] = 0
+        state["_columnsLookup"] = {}
+
+        return state
+
+#####################
+    def _getColumns(self):
+        """Dict of column name -> NumPy array (capacity rows)."""
+        return self._columnsLookup
+    columns = property(_getColumns)
+
+    def _getCapacity(self):
+        return self._capacity
+    capacity = property(_getCapacity)
+
+    def _getDescriptor(self):
+        """Small picklable tuple - (key, path, generation, layout, capacity) - for AttachedColumns."""
+        return (self._key, self._path, self._generation, self._layout, self._capacity)
+    descriptor = property(_getDescriptor)
+
+#####################
+    def ensureLayout(self, layout, numRows):
+        """Reallocates if the layout is different, or if there are fewer than numRows rows.  Note that the
+        contents are NOT preserved when reallocating."""
+        if(layout != self._layout or numRows > self._capacity):
+            newCapacity = max(self._capacity, _MINIMUM_CAPACITY_)
+            while(newCapacity < numRows):
+                newCapacity *= 2
+
+            self._allocate(layout, newCapacity)
+
+########
+    def _allocate(self, layout, capacity):
+        self.release()
+
+        fileHandle, path = tempfile.mkstemp(prefix="pyswarm_", suffix=".shm")
+        _blockFilePaths.add(path)
+        with os.fdopen(fileHandle, "r+b") as blockFile:
+            blockSize = _BlockSize(layout, capacity)
+            blockFile.truncate(blockSize)
+            blockBuffer = mmap.mmap(blockFile.fileno(), blockSize)
+
+        self._path = path
+        self._generation += 1
+        self._layout = layout
+        self._capacity = capacity
+        self._columnsLookup = _ColumnsForBuffer(blockBuffer, layout, capacity)
+
+########
+    def release(self):
+        """Lets go of the block (the memory itself is freed once nobody is using it any more)."""
+        self._columnsLookup = {}   # (the columns hold the only reference to the mapping)
+        if(self._path is not None):
+            _RemoveBlockFile(self._path)   # (just this block's - any others are still in use)
+        self._path = None
+        self._layout = ()
+        self._capacity = 0
+
+# END OF CLASS - SharedArrayBlock
+#####################################
@@ -11,63 +11,56 @@
 
 
 import itertools
+import math
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - only needed for the NeighbourGrid lookups.
 
 from pyswarm.pyswarmObject import PyswarmObject
 from pyswarm.attributes.attributeGroupObject import AttributeGroupListener
 import pyswarm.vectors.vector3 as v3
 import pyswarm.utils.general as util
+import pyswarm.agents.neighbourGrid as ng
 
 
 
 #############################
 class _Zone(PyswarmObject):
     
-    def __init__(self, xMin, xMax, zMin, zMax):
-        self.regionalSetsList = [set()]
-        self.regionIterable = _ZoneRegionIteratable(self.regionalSetsList)
+    def __init__(self, spatialKey, zoneSize, xOrigin, yOrigin, zOrigin, usesVerticalAxis):
+        self.agentsLookup = {}   # agentId -> agent
         
-        self._xMin = xMin
-        self._xMax = xMax
-        self._zMin = zMin
-        self._zMax = zMax
+        self._xMin = xOrigin + (spatialKey[0] * zoneSize)
+        self._xMax = self._xMin + zoneSize
+        if(usesVerticalAxis):
+            self._yMin = yOrigin + (spatialKey[1] * zoneSize)
+            self._yMax = self._yMin + zoneSize
+        else:
+            self._yMin = -float("inf")
+            self._yMax = float("inf")
+        self._zMin = zOrigin + (spatialKey[2] * zoneSize)
+        self._zMax = self._zMin + zoneSize
     
     ################    
     def __str__(self):
-        return ("<xMin=%.2f, xMax=%.2f, zMin=%.2f, zMax=%.2f>" %
-                (self._xMin, self._xMax, self._zMin, self._zMax))    
+        return ("<xMin=%.2f, xMax=%.2f, yMin=%.2f, yMax=%.2f, zMin=%.2f, zMax=%.2f>" %
+                (self._xMin, self._xMax, self._yMin, self._yMax, self._zMin, self._zMax))    
         
     ################
     def _getDebugStr(self):
-        agentStringsList = [("\n\t%s" % agent) for agent in self.agentSet]
-        return ("<xMin=%.2f, xMax=%.2f, zMin=%.2f, zMax=%.2f, count=%d\nagents=%s \n>" %
-                (self._xMin, self._xMax, self._zMin, self._zMax, len(self.agentSet), "".join(agentStringsList)))    
-        
-    ################    
-    def _getAgentSet(self):
-        return self.regionalSetsList[0]
-    agentSet = property(_getAgentSet)
-    
-    ################    
-    def setNeighbouringZones(self, neighboursList):
-        del self.regionalSetsList[1:]
-        
-        for zone in neighboursList:
-            self.regionalSetsList.append(zone.agentSet)
-    
-    ################        
-    def addNeighbouringZone(self, neighbour):
-        if(neighbour not in self.regionalSetsList):
-            self.regionalSetsList.append(neighbour.agentSet)
-        else:
-            raise ValueError
+        agentStringsList = [("\n\t%s" % agent) for agent in self.agentsLookup.itervalues()]
+        return ("<xMin=%.2f, xMax=%.2f, yMin=%.2f, yMax=%.2f, zMin=%.2f, zMax=%.2f, count=%d\nagents=%s \n>" %
+                (self._xMin, self._xMax, self._yMin, self._yMax, self._zMin, self._zMax, 
+                 len(self.agentsLookup), "".join(agentStringsList)))    
     
     ################
-    def addNewAgent(self, agent):
-        self.agentSet.add(agent)
+    def addNewAgent(self, agentId, agent):
+        self.agentsLookup[agentId] = agent
     
     ################
-    def removeAgent(self, agent):
-        self.agentSet.remove(agent)
+    def removeAgent(self, agentId):
+        del self.agentsLookup[agentId]
 
 # END OF CLASS _Zone
 ##############################
@@ -90,132 +83,132 @@ class _ZoneRegionIteratable(object):
     
 #############################
 class ZoneGraph(PyswarmObject, AttributeGroupListener):
+    """Spatial lookup of agents, i.e. which other agents are potentially within the neighbourhood of a given agent.
+    
+    Lookups return the agent's neighbour list - all other agents that were within maxNeighbourhoodSize plus the 
+    neighbourListSkin distance when the list was built.  Lists are kept symmetric (if B is in A's list then A is in B's)
+    and an agent's list is only rebuilt once the agent has moved more than a third of the skin distance since it 
+    was last built.  Whenever the membership of a pair of agents was last decided, one of them has since moved less 
+    than a third of the skin and the other less than two thirds - so any agent actually within the neighbourhood
+    is always in the list (i.e. no stale results), while slow-moving agents very rarely need a rebuild.
     
-    def __init__(self, attributeGroupsController):
+    Lists are built by searching zones of size maxNeighbourhoodSize + skin, aligned with the lower corner of the 
+    scene bounds. Zones are hashed sparsely, i.e. only created when an agent is in them (and deleted again when 
+    emptied), and are not limited to the scene bounds - so memory scales with the number of occupied zones & agents 
+    that stray outside the bounds cost no more to look up than any others.
+    If an AgentArrayStore is given (and NumPy is available), the search is done by a cell-sorted NeighbourGrid 
+    over the store's positions, otherwise agents are kept in per-zone lookups and the surrounding zones are searched.
+    Either way, zones are 2D (x & z only, 9 surrounding zones searched) unless the swarm's vertical spread exceeds 
+    the zone size - in which case (e.g. a World War Z pile-up, or flying swarms) they're also divided along the y-axis 
+    and the surrounding 27 zones are searched, so that vertically separated agents aren't tested against each other.
+    
+    Zones, neighbour lists & pending rebuilds are all keyed on (integer) agent ids rather than on the agents 
+    themselves - hashing & comparing Agent instances goes through their agentId properties every time.
+    """
+    
+    def __init__(self, attributeGroupsController, agentStore=None):
         self._currentFrameIteration = 0
         
         self._globalAttributeGroup = attributeGroupsController.globalAttributeGroup
         self._lowerBoundsVector = v3.Vector3(self._globalAttributeGroup.lowerBounds)
         self._upperBoundsVector = v3.Vector3(self._globalAttributeGroup.upperBounds)
+        self._neighbourListSkin = self._globalAttributeGroup.neighbourListSkin
         self._globalAttributeGroup.addListener(self)
         
         self._perceptionAttributesGroup = attributeGroupsController.agentPerceptionAttributeGroup
-        self._zoneSize = self._perceptionAttributesGroup.maxNeighbourhoodSize
+        self._maxNeighbourhoodSize = self._perceptionAttributesGroup.maxNeighbourhoodSize
         self._perceptionAttributesGroup.addListener(self)
         
         self._needsRebuild = True
         
+        self._zoneSize = 0.0
         self._zoneSizeReciprocal = 0.0
         self._xZoneOrigin = 0.0
+        self._yZoneOrigin = 0.0
         self._zZoneOrigin = 0.0
-        self._resolutionX = 0.0
-        self._resolutionZ = 0.0
         
-        self._zoneMap = []
+        self._zonesLookup = {}         # spatial key (x, y, z) -> _Zone, occupied zones only.
         self._previousKeyLookup = {}
-        self._useSpatialHashing = True
+        self._usesVerticalAxis = False # (y part of spatial keys is always 0 if not)
+        
+        if(agentStore is not None and ng.NumpyAvailable()):
+            self._neighbourGrid = ng.NeighbourGrid(agentStore)
+        else:
+            self._neighbourGrid = None
+        self._rowAgents = None             # only used with the NeighbourGrid -
+        self._rowAgentsLayoutVersion = -1  # maps store rows back to agent instances.
+        
+        self._agentLookup = {}
+        self._neighbourListsLookup = {}         # agentId -> dict of neighbouring agentId -> agent
+        self._neighbourListVersionsLookup = {}  # agentId -> version of the above, changes whenever the list does.
+        self._nextNeighbourListVersion = 0      # (never reset, so versions are never re-used)
+        self._listReferencePositionsLookup = {} # agentId -> (x, y, z) position when list was last built.
+        self._agentIdsNeedingListRebuild = set()
         
         self.rebuildMapIfNecessary()
 
-########################################            
-    def _makeZonesNeighbours(self, zoneA, zoneB):
-        zoneA.addNeighbouringZone(zoneB)
-        zoneB.addNeighbouringZone(zoneA)
-
 ########################################        
     def rebuildMapIfNecessary(self):
         if(self._needsRebuild):
-            zoneSize = self._zoneSize
-            sizeX = self._upperBoundsVector.x - self._lowerBoundsVector.x
-            sizeZ = self._upperBoundsVector.z - self._lowerBoundsVector.z
-            resolutionX = int((sizeX / zoneSize) + 1)
-            resolutionZ = int((sizeZ / zoneSize) + 1)
-            overspillX = ((resolutionX * zoneSize) - sizeX) / 2
-            overspillZ = ((resolutionZ * zoneSize) - sizeZ) / 2
+            self._zoneSize = self._maxNeighbourhoodSize + self._neighbourListSkin
+            self._zoneSizeReciprocal = 1.0 / float(self._zoneSize)
+            self._xZoneOrigin = self._lowerBoundsVector.x
+            self._yZoneOrigin = self._lowerBoundsVector.y
+            self._zZoneOrigin = self._lowerBoundsVector.z
             
-            self._zoneSizeReciprocal = 1.0 / float(zoneSize)
-            self._xZoneOrigin = self._lowerBoundsVector.x - overspillX
-            self._zZoneOrigin = self._lowerBoundsVector.z - overspillZ
-            self._resolutionX = resolutionX
-            self._resolutionZ = resolutionZ
+            self._zonesLookup = {}                   # 
+            self._previousKeyLookup = {}             # agents will be re-added (& neighbour lists rebuilt)
+            self._neighbourListsLookup = {}          # on their next call to updateAgentPosition.
+            self._neighbourListVersionsLookup = {}   #
+            self._listReferencePositionsLookup = {}  #
+            self._agentIdsNeedingListRebuild.clear()
             
-            self._zoneMap = []
-            self._previousKeyLookup = {}
-            self._useSpatialHashing = True
-            
-            if(resolutionX == 1 and resolutionZ == 1):
-                self._useSpatialHashing = False
-                self._zoneMap = []
-                
-                util.LogWarning("Grid too small or agent neighbourhood region too large. Agent lookups will NOT be optimised.")
-            else:
-                zMinBase = self._zZoneOrigin
-                zMaxBase = zMinBase + zoneSize
-                xMin = self._xZoneOrigin
-                xMax = xMin + zoneSize
+            if(self._neighbourGrid is not None):
+                self._neighbourGrid.setCellLayout(self._xZoneOrigin, self._yZoneOrigin, self._zZoneOrigin, self._zoneSize)
                 
-                for xIndex in range(resolutionX): # enclosing iteration == x-axis
-                    zMin = zMinBase
-                    zMax = zMaxBase
-                    currentRowZ = []
-                    previousRowZ = self._zoneMap[xIndex-1] if(xIndex > 0) else None
-                    
-                    for zIndex in range(resolutionZ):  # nested iteration == z-axis
-                        newZone = _Zone(xMin, xMax, zMin, zMax)
-                        if(previousRowZ is not None):
-                            if(zIndex > 0): 
-                                self._makeZonesNeighbours(newZone, previousRowZ[zIndex-1])
-                                
-                            self._makeZonesNeighbours(newZone, previousRowZ[zIndex])
-    
-                            if(zIndex < resolutionZ-1): 
-                                self._makeZonesNeighbours(newZone, previousRowZ[zIndex+1])
-                        if(zIndex > 0):
-                            self._makeZonesNeighbours(newZone, currentRowZ[zIndex-1])
-                        
-                        zMin += zoneSize
-                        zMax += zoneSize
-                        
-                        currentRowZ.append(newZone)
-                    
-                    self._zoneMap.append(currentRowZ)
-                    xMin += zoneSize
-                    xMax += zoneSize
-                            
-                util.LogDebug("Rebuilt ZoneGraph - res= %dx%d (zone size=%.2f)\nX=%.2f to %2f,Z=%.2f to %.2f" %
-                    (self._resolutionX, self._resolutionZ, self._zoneSize, 
-                     self._xZoneOrigin, xMax - zoneSize, self._zZoneOrigin, zMax - zoneSize))
-                
-                self._needsRebuild = False
-#         margin = 0
-#         import vectors.vector3 as v3
-#         vecA = v3.Vector3(zoneA._xMin + margin, 0, zoneA._zMin + margin)
-#         vecB = v3.Vector3(zoneB._xMin + margin, 0, zoneB._zMin + margin)
-#         
-#         print("zone%s:%s NOW NEIGHBOURS zone%s:%s" % 
-#               (self._spatialKeyFromVector(vecA), zoneA, self._spatialKeyFromVector(vecB), zoneB))
+            util.LogDebug("Rebuilt ZoneGraph - zone size=%.2f (skin=%.2f), origin X=%.2f, Y=%.2f, Z=%.2f" %
+                          (self._zoneSize, self._neighbourListSkin, self._xZoneOrigin, self._yZoneOrigin, self._zZoneOrigin))
+            
+            self._needsRebuild = False
 
 ########################################            
     def __str__(self):
-        if(self._useSpatialHashing):
-            zoneStringsList = []
-            for xIndex, zArray in enumerate(self._zoneMap):
-                for zIndex, zone in enumerate(zArray):
-                    zoneStringsList.append("(%d,%d)=%s\n" % (xIndex, zIndex, zone))
-            return "".join(zoneStringsList)
+        if(self._neighbourGrid is not None):
+            return self._neighbourGrid.__str__()
         else:
-            return "UNOPTIMISED... Agents list: ".join([(("%s, " % agent) for agent in self._zoneMap)])
+            zoneStringsList = [("(%d,%d,%d)=%s\n" % (key[0], key[1], key[2], zone)) 
+                               for key, zone in sorted(self._zonesLookup.iteritems())]
+            return "".join(zoneStringsList)
         
 ########################################
     def _getDebugStr(self):
-        if(self._useSpatialHashing):
-            zoneStringsList = []
-            for xIndex, zArray in enumerate(self._zoneMap):
-                for zIndex, zone in enumerate(zArray):
-                    zoneStringsList.append("(%d,%d)=%s\n" % (xIndex, zIndex, zone.debugStr))
-            return "".join(zoneStringsList)
+        if(self._neighbourGrid is not None):
+            return self._neighbourGrid.debugStr
         else:
-            return "UNOPTIMISED... Agents list: ".join([(("%s, " % agent) for agent in self._zoneMap)])
+            zoneStringsList = [("(%d,%d,%d)=%s\n" % (key[0], key[1], key[2], zone.debugStr)) 
+                               for key, zone in sorted(self._zonesLookup.iteritems())]
+            return "".join(zoneStringsList)
+
+########################################
+    def __setstate__(self, state):
+        super(ZoneGraph, self).__setstate__(state)
+        
+        if("_agentIdsNeedingListRebuild" not in state):   # i.e. saved before membership was keyed on agent ids
+            del self._agentsNeedingListRebuild
+            self._agentIdsNeedingListRebuild = set()
+            self._needsRebuild = True   # (zones & neighbour lists are then rebuilt from scratch)
+        if("_usesVerticalAxis" not in state):   # i.e. saved with 2D (x, z) spatial keys
+            self._usesVerticalAxis = False
+            self._needsRebuild = True
+        if("_neighbourListVersionsLookup" not in state):   # i.e. saved before neighbour lists were versioned
+            self._neighbourListVersionsLookup = {}
+            self._nextNeighbourListVersion = 0
+            self._needsRebuild = True
+
+########################################
+    def _getZoneSize(self):
+        return self._zoneSize
+    zoneSize = property(_getZoneSize)
 
 ########################################        
     def onAttributeChanged(self, sectionObject, attributeName):
@@ -226,80 +219,257 @@ class ZoneGraph(PyswarmObject, AttributeGroupListener):
                 self._lowerBoundsVector = v3.Vector3(self._globalAttributeGroup.lowerBounds)
                 self._upperBoundsVector = v3.Vector3(self._globalAttributeGroup.upperBounds)
                 self._needsRebuild = True
+            if(self._neighbourListSkin != self._globalAttributeGroup.neighbourListSkin):
+                self._neighbourListSkin = self._globalAttributeGroup.neighbourListSkin
+                self._needsRebuild = True
         elif(sectionObject == self._perceptionAttributesGroup):
-            if(self._zoneSize != self._perceptionAttributesGroup.maxNeighbourhoodSize):
-                self._zoneSize = self._perceptionAttributesGroup.maxNeighbourhoodSize
+            if(self._maxNeighbourhoodSize != self._perceptionAttributesGroup.maxNeighbourhoodSize):
+                self._maxNeighbourhoodSize = self._perceptionAttributesGroup.maxNeighbourhoodSize
                 self._needsRebuild = True
 
+########
+    def listensToAttribute(self, sectionObject, attributeName):
+        if(sectionObject == self._globalAttributeGroup):
+            return (attributeName in self._globalAttributeGroup.zoneLayoutAttributeLabels)
+        else:
+            return True
+
 ########################################       
     def updateAgentPosition(self, agent):
-        if(self._useSpatialHashing):
-            spatialKey = self._spatialKeyFromVector(agent.currentPosition)
-            previousSpatialKey = self._previousKeyLookup.get(agent.agentId)
+        agentId = agent.agentId
+        previousAgent = self._agentLookup.get(agentId)
+        if(previousAgent is not agent):
+            if(previousAgent is not None):
+                self.removeAgent(previousAgent)  # i.e. has been replaced by a new instance
+            self._agentLookup[agentId] = agent
+        
+        position = agent.currentPosition
+        if(self._neighbourGrid is not None):
+            self._neighbourGrid.invalidate()
+        else:
+            spatialKey = self._spatialKeyFromVector(position)
+            previousSpatialKey = self._previousKeyLookup.get(agentId)
             
             if(spatialKey != previousSpatialKey):
-                agentZone = self._zoneForSpatialKey(spatialKey)
-                agentZone.addNewAgent(agent)
-                
+                self._addAgentToZone(agentId, agent, spatialKey)
                 if(previousSpatialKey is not None):
-                    previousZone = self._zoneForSpatialKey(previousSpatialKey)
-                    previousZone.removeAgent(agent)
+                    self._removeAgentFromZone(agentId, previousSpatialKey)
 
-                self._previousKeyLookup[agent.agentId] = spatialKey
+                self._previousKeyLookup[agentId] = spatialKey
+        
+        referencePosition = self._listReferencePositionsLookup.get(agentId)
+        if(referencePosition is None):
+            self._agentIdsNeedingListRebuild.add(agentId)
+        else:
+            dx = position.x - referencePosition[0]
+            dy = position.y - referencePosition[1]
+            dz = position.z - referencePosition[2]
+            maxDisplacement = self._neighbourListSkin / 3.0
+            if(((dx * dx) + (dy * dy) + (dz * dz)) > (maxDisplacement * maxDisplacement)):
+                self._agentIdsNeedingListRebuild.add(agentId)
             
 ########################################                
     def updateAllAgentPositions(self, agentsList):
-        if(self._useSpatialHashing):
-            for agent in agentsList:
-                self.updateAgentPosition(agent)
+        for agent in agentsList:
+            self.updateAgentPosition(agent)
                 
 ########################################                
-    def nearbyAgentsIterableForAgent(self, agent):
-        if(self._useSpatialHashing):
-            spatialKey = self._spatialKeyFromVector(agent.currentPosition)
-            currentZone = self._zoneForSpatialKey(spatialKey)
+    def rebuildNeighbourListsIfNecessary(self):
+        """Rebuilds the lists of any agents that have moved far enough since they were last built.  Otherwise 
+        done as needed by nearbyAgentsIterableForAgent - only worth calling to get the rebuilds done up front.
+        Returns the number of lists rebuilt."""
+        numLists = len(self._agentIdsNeedingListRebuild)
+        if(numLists):
+            self._rebuildNeighbourLists()
+            
+        return numLists
 
-            return currentZone.regionIterable
-        else:
-            return self._zoneMap
+########
+    def nearbyAgentsIterableForAgent(self, agent):
+        if(self._agentIdsNeedingListRebuild):
+            self._rebuildNeighbourLists()
+        
+        neighbourList = self._neighbourListsLookup.get(agent.agentId)
+        return neighbourList.viewvalues() if(neighbourList is not None) else ()
+    
+########
+    def neighbourListVersionForAgent(self, agent):
+        """Changes whenever the agent's neighbour list does, i.e. if it's the same as on a previous frame then so 
+        is the list.  None if the agent has no list yet.  Should be called after nearbyAgentsIterableForAgent."""
+        return self._neighbourListVersionsLookup.get(agent.agentId)
 
 ########################################                
     def removeAgent(self, agent):
-        if(self._useSpatialHashing):
-            spatialKey = self._previousKeyLookup.get(agent.agentId)
-            zone = self._zoneForSpatialKey(spatialKey)
-            zone.removeAgent(agent)
+        agentId = agent.agentId
+        self._agentLookup.pop(agentId, None)
+        self._listReferencePositionsLookup.pop(agentId, None)
+        self._agentIdsNeedingListRebuild.discard(agentId)
+        self._neighbourListVersionsLookup.pop(agentId, None)
+        version = self._nextNeighbourListVersion
+        self._nextNeighbourListVersion += 1
+        for otherAgentId in self._neighbourListsLookup.pop(agentId, ()):
+            otherNeighbourList = self._neighbourListsLookup.get(otherAgentId)
+            if(otherNeighbourList is not None):
+                otherNeighbourList.pop(agentId, None)
+                self._neighbourListVersionsLookup[otherAgentId] = version
+        
+        if(self._neighbourGrid is not None):
+            self._neighbourGrid.invalidate()
         else:
-            self._zoneMap.remove(agent)
+            spatialKey = self._previousKeyLookup.pop(agentId, None)
+            if(spatialKey is not None):
+                self._removeAgentFromZone(agentId, spatialKey)
 
-########################################        
-    def _zoneForSpatialKey(self, key):
-        xRow = self._zoneMap[key[0]]
-        return xRow[key[1]]
+########
+    def removeAllAgents(self):
+        self._agentLookup.clear()
+        self._neighbourListsLookup.clear()
+        self._neighbourListVersionsLookup.clear()
+        self._listReferencePositionsLookup.clear()
+        self._agentIdsNeedingListRebuild.clear()
+        self._zonesLookup.clear()
+        self._previousKeyLookup.clear()
+        
+        if(self._neighbourGrid is not None):
+            self._neighbourGrid.invalidate()
+
+########################################
+    def _addAgentToZone(self, agentId, agent, spatialKey):
+        agentZone = self._zonesLookup.get(spatialKey)
+        if(agentZone is None):
+            agentZone = _Zone(spatialKey, self._zoneSize, self._xZoneOrigin, self._yZoneOrigin, self._zZoneOrigin,
+                              self._usesVerticalAxis)
+            self._zonesLookup[spatialKey] = agentZone
+        agentZone.addNewAgent(agentId, agent)
+        
+########
+    def _removeAgentFromZone(self, agentId, spatialKey):
+        zone = self._zonesLookup[spatialKey]
+        zone.removeAgent(agentId)
+        if(not zone.agentsLookup):
+            del self._zonesLookup[spatialKey]
+
+########################################
+    def _rebuildNeighbourLists(self):
+        agentIdsList = list(self._agentIdsNeedingListRebuild)
+        self._agentIdsNeedingListRebuild.clear()
+        agentsList = [self._agentLookup[agentId] for agentId in agentIdsList]
+        
+        if(self._neighbourGrid is not None):
+            storeRows = [agent.state.storeIndex for agent in agentsList]
+            self._neighbourGrid.rebuild(storeRows)
+            neighbourListsList = [self._neighboursForStoreRows(self._neighbourGrid.neighbourRowsForIndex(storeRow)) 
+                                  for storeRow in storeRows]
+        else:
+            self._updateVerticalAxisUsage()
+            neighbourListsList = [self._neighboursWithinZoneSizeOfAgent(agentId, agent) 
+                                  for agentId, agent in zip(agentIdsList, agentsList)]
+        
+        for agentId, agent, neighbourList in zip(agentIdsList, agentsList, neighbourListsList):
+            self._setNeighbourList(agentId, agent, neighbourList)
+            
+            position = agent.currentPosition
+            self._listReferencePositionsLookup[agentId] = (position.x, position.y, position.z)
+
+########
+    def _updateVerticalAxisUsage(self):
+        """Per-zone lookups only - switches between 2D & 3D zones (as the NeighbourGrid does with its cells) if the 
+        swarm's vertical spread has crossed the zone size, re-zoning all agents if so."""
+        yCoordsList = [agent.currentPosition.y for agent in self._agentLookup.itervalues()]
+        usesVerticalAxis = (len(yCoordsList) > 1 and (max(yCoordsList) - min(yCoordsList)) > self._zoneSize)
+        
+        if(usesVerticalAxis != self._usesVerticalAxis):
+            self._usesVerticalAxis = usesVerticalAxis
+            self._zonesLookup.clear()
+            self._previousKeyLookup.clear()
+            for agentId, agent in self._agentLookup.iteritems():
+                spatialKey = self._spatialKeyFromVector(agent.currentPosition)
+                self._addAgentToZone(agentId, agent, spatialKey)
+                self._previousKeyLookup[agentId] = spatialKey
+                
+            util.LogDebug("ZoneGraph now using %s zones." % ("3D" if(usesVerticalAxis) else "2D"))
+
+########
+    def _setNeighbourList(self, agentId, agent, newNeighbours):
+        """Sets the agent's neighbour list (dict of agentId -> agent), updating those of the agents being 
+        added or removed to match - all of which get a new version (see neighbourListVersionForAgent)."""
+        neighbourListsLookup = self._neighbourListsLookup
+        versionsLookup = self._neighbourListVersionsLookup
+        previousNeighbours = neighbourListsLookup.get(agentId, {})
+        version = self._nextNeighbourListVersion
+        self._nextNeighbourListVersion += 1
+        
+        for otherAgentId in previousNeighbours.viewkeys() - newNeighbours.viewkeys():
+            otherNeighbourList = neighbourListsLookup.get(otherAgentId)
+            if(otherNeighbourList is not None):
+                otherNeighbourList.pop(agentId, None)
+                versionsLookup[otherAgentId] = version
+        for otherAgentId in newNeighbours.viewkeys() - previousNeighbours.viewkeys():
+            neighbourListsLookup.setdefault(otherAgentId, {})[agentId] = agent
+            versionsLookup[otherAgentId] = version
+            
+        neighbourListsLookup[agentId] = newNeighbours
+        versionsLookup[agentId] = version
+
+########
+    def _neighboursWithinZoneSizeOfAgent(self, agentId, agent):
+        """Returns dict of agentId -> agent.  Same tests as the NeighbourGrid, i.e. horizontal distance plus a 
+        crude vertical check."""
+        position = agent.currentPosition
+        x, y, z = position.x, position.y, position.z
+        radius = self._zoneSize
+        radiusSquared = radius **2
+        
+        xKey, yKey, zKey = self._spatialKeyFromCoords(x, y, z)
+        yOffsets = (-1, 0, 1) if(self._usesVerticalAxis) else (0,)
+        neighbours = {}
+        for neighbourKey in ((xKey + xOffset, yKey + yOffset, zKey + zOffset) 
+                             for xOffset in (-1, 0, 1) for yOffset in yOffsets for zOffset in (-1, 0, 1)):
+            neighbourZone = self._zonesLookup.get(neighbourKey)
+            if(neighbourZone is not None):
+                for otherAgentId, otherAgent in neighbourZone.agentsLookup.iteritems():
+                    otherPosition = otherAgent.currentPosition
+                    dx = otherPosition.x - x
+                    dz = otherPosition.z - z
+                    if(((dx * dx) + (dz * dz)) <= radiusSquared and abs(otherPosition.y - y) <= radius and 
+                       otherAgentId != agentId):
+                        neighbours[otherAgentId] = otherAgent
+                        
+        return neighbours
+
+########
+    def _neighboursForStoreRows(self, storeRows):
+        """Returns dict of agentId -> agent for the given rows of the AgentArrayStore."""
+        agentStore = self._neighbourGrid.agentStore
+        if(self._rowAgentsLayoutVersion != agentStore.layoutVersion):
+            agentIds = agentStore.agentIds[: agentStore.count].tolist()
+            self._rowAgents = np.empty(len(agentIds), dtype=object)
+            self._rowAgents[:] = [self._agentLookup[agentId] for agentId in agentIds]
+            self._rowAgentsLayoutVersion = agentStore.layoutVersion
+            
+        return dict(zip(agentStore.agentIds[storeRows].tolist(), self._rowAgents[storeRows].tolist()))
                 
 ########################################            
     def _spatialKeyFromVector(self, vector):
-        return self._spatialKeyFromCoords(vector.x, vector.z)
+        return self._spatialKeyFromCoords(vector.x, vector.y, vector.z)
 
 ########################################        
-    def _spatialKeyFromCoords(self, xCoord, zCoord):
+    def _spatialKeyFromCoords(self, xCoord, yCoord, zCoord):
         roundingErrorCorrection = 0.00000001
         
         xNormalised = (xCoord - self._xZoneOrigin) * self._zoneSizeReciprocal
-        xNormalised = int(xNormalised + roundingErrorCorrection)
-        if(xNormalised < 0):    
-            xNormalised = 0
-        elif(xNormalised >= self._resolutionX):    
-            xNormalised = self._resolutionX - 1
+        xNormalised = int(math.floor(xNormalised + roundingErrorCorrection))
+        
+        if(self._usesVerticalAxis):
+            yNormalised = (yCoord - self._yZoneOrigin) * self._zoneSizeReciprocal
+            yNormalised = int(math.floor(yNormalised + roundingErrorCorrection))
+        else:
+            yNormalised = 0
         
         zNormalised = (zCoord - self._zZoneOrigin)  * self._zoneSizeReciprocal
-        zNormalised = int(zNormalised + roundingErrorCorrection)
-        if(zNormalised < 0):    
-            zNormalised = 0
-        elif(zNormalised >= self._resolutionZ):    
-            zNormalised = self._resolutionZ -1
+        zNormalised = int(math.floor(zNormalised + roundingErrorCorrection))
 
-        key = (xNormalised, zNormalised)
+        key = (xNormalised, yNormalised, zNormalised)
         
         return key
                        
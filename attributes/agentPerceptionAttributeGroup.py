@@ -10,6 +10,11 @@
 # ------------------------------------------------------------
 
 
+import array
+import math as mth
+
+from pyswarm.pyswarmObject import PyswarmObject
+
 import pyswarm.ui.uiBuilder as uib
 
 import pyswarm.attributes.attributeGroupObject as ago
@@ -29,6 +34,13 @@ class PerceptionAttributesDataBlob(ago._DataBlobBaseObject):
         
         self.blindRegionAngle = 0
         self.forwardVisionAngle = 0
+        
+        # cosines of the half-angles either side of the agent's heading - lets AgentState classify other agents
+        # with dot products rather than working out actual angles (see AgentState._recalculateListsAndAverages).
+        self.visibleAreaCosine = -1.0   # other agents are visible if cos(angle to them) > this
+        self.forwardAreaCosine = 1.0    # ...and get full angular weighting if > this
+        
+        self.tableIndex = None   # row in the group's PerceptionTable
 
 #####################    
     def __str__(self):
@@ -36,11 +48,129 @@ class PerceptionAttributesDataBlob(ago._DataBlobBaseObject):
                 (self.neighbourhoodSize, self.nearRegionSize, self.collisionRegionSize,
                  self.blindRegionAngle, self.forwardVisionAngle))
 
+#####################
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if("visibleAreaCosine" not in state):   # i.e. saved before the cosines were added
+            self.updateAreaCosines()
+
+#####################
+    def updateAreaCosines(self):
+        """Recalculates visibleAreaCosine & forwardAreaCosine - must be called whenever either angle changes."""
+        self.visibleAreaCosine = mth.cos(mth.radians(180 - (self.blindRegionAngle * 0.5)))
+        self.forwardAreaCosine = mth.cos(mth.radians(self.forwardVisionAngle * 0.5))
+
 # END OF CLASS - PerceptionAttributesDataBlob
 ###########################################
 
 
 
+##########################################
+class PerceptionTable(PyswarmObject):
+    """
+    The perception values of every data blob, "compiled" into contiguous arrays (one row per blob, see 
+    PerceptionAttributesDataBlob.tableIndex) in the form the neighbour calculations actually use - i.e. radii 
+    already squared, field of vision as cosines - plus the group-wide proximity weighting option.
+    
+    Rows are only ever written when the blobs themselves are updated (i.e. when the group's attributes change),
+    so AgentState can read straight from here each frame rather than going through the blobs.  The version is 
+    incremented on every such change, so callers can tell if anything has changed since they last looked.
+    
+    When a blob is released (i.e. its agent has gone), the last row is moved into its place so that the table only
+    ever has as many rows as there are blobs - moved blobs' tableIndex is updated, their values stay the same.
+    """
+    
+    def __init__(self):
+        self.neighbourhoodSizes = array.array('d')
+        self.neighbourhoodSizesSquared = array.array('d')
+        self.nearRegionSizesSquared = array.array('d')
+        self.collisionRegionSizesSquared = array.array('d')
+        self.visibleAreaCosines = array.array('d')
+        self.forwardAreaCosines = array.array('d')
+        
+        self.weightingMode = AgentPerceptionAttributeGroup._WeightingInverseSquare_
+        self.version = 0
+        
+        self._dataBlobs = []   # blob for each row
+        
+#####################
+    def __setstate__(self, state):
+        super(PerceptionTable, self).__setstate__(state)
+        if("version" not in state):   # i.e. saved before the table was versioned
+            self.version = 0
+        if("_dataBlobs" not in state):   # i.e. saved before rows could be freed - the group rebuilds the table
+            self._dataBlobs = None
+
+#####################
+    def __str__(self):
+        return ("<PerceptionTable rows=%d, weighting=%s>" % 
+                (len(self), AgentPerceptionAttributeGroup._WeightingStrings_[self.weightingMode]))
+    
+########
+    def _getDebugStr(self):
+        rowStrings = [("\n\t%d: neighbSizeSqu=%.2f, nearSizeSqu=%.2f, collSizeSqu=%.2f, visCos=%.3f, forwdCos=%.3f" %
+                       (index, self.neighbourhoodSizesSquared[index], self.nearRegionSizesSquared[index], 
+                        self.collisionRegionSizesSquared[index], self.visibleAreaCosines[index], 
+                        self.forwardAreaCosines[index]))
+                      for index in xrange(len(self))]
+        return ("%s%s" % (self, ''.join(rowStrings)))
+    
+#####################
+    def __len__(self):
+        return len(self.neighbourhoodSizes)
+    
+########
+    def _getNeedsRebuilding(self):
+        """True if the table was saved before rows could be freed (so doesn't know which blob has which row)."""
+        return (self._dataBlobs is None)
+    needsRebuilding = property(_getNeedsRebuilding)
+    
+########
+    def _columns(self):
+        return (self.neighbourhoodSizes, self.neighbourhoodSizesSquared, self.nearRegionSizesSquared,
+                self.collisionRegionSizesSquared, self.visibleAreaCosines, self.forwardAreaCosines)
+    
+#####################
+    def addRowForBlob(self, dataBlob):
+        dataBlob.tableIndex = len(self)
+        for column in self._columns():
+            column.append(0.0)
+        self._dataBlobs.append(dataBlob)
+        
+        self.updateRowForBlob(dataBlob)
+    
+########
+    def removeRowForBlob(self, dataBlob):
+        index = dataBlob.tableIndex
+        lastIndex = len(self) - 1
+        if(index != lastIndex):
+            for column in self._columns():
+                column[index] = column[lastIndex]
+            movedBlob = self._dataBlobs[lastIndex]
+            movedBlob.tableIndex = index
+            self._dataBlobs[index] = movedBlob
+        
+        for column in self._columns():
+            column.pop()
+        self._dataBlobs.pop()
+        dataBlob.tableIndex = None
+    
+########
+    def updateRowForBlob(self, dataBlob):
+        index = dataBlob.tableIndex
+        self.neighbourhoodSizes[index] = dataBlob.neighbourhoodSize
+        self.neighbourhoodSizesSquared[index] = dataBlob.neighbourhoodSize **2
+        self.nearRegionSizesSquared[index] = dataBlob.nearRegionSize **2
+        self.collisionRegionSizesSquared[index] = dataBlob.collisionRegionSize **2
+        self.visibleAreaCosines[index] = dataBlob.visibleAreaCosine
+        self.forwardAreaCosines[index] = dataBlob.forwardAreaCosine
+        self.version += 1
+
+# END OF CLASS - PerceptionTable
+###########################################
+
+
+
 ##########################################
 class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
     
@@ -56,6 +186,8 @@ class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
     def __init__(self):
         super(AgentPerceptionAttributeGroup, self).__init__(AgentPerceptionAttributeGroup.BehaviourTypeName())
         
+        self._perceptionTable = PerceptionTable()
+        
         self._proximityWeightingOption = AgentPerceptionAttributeGroup._WeightingInverseSquare_
         self._proximityWeightingString = at.StringAttribute("Proximity Weighting", 
                                                       AgentPerceptionAttributeGroup._WeightingStrings_[self._proximityWeightingOption],
@@ -74,6 +206,17 @@ class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
         
         self.onValueChanged(self._neighbourhoodSize) # sets up the min/max values for regions
 
+#####################
+    def __setstate__(self, state):
+        super(AgentPerceptionAttributeGroup, self).__setstate__(state)
+        
+        # i.e. saved before the table was added, or before its rows could be freed
+        if("_perceptionTable" not in state or self._perceptionTable.needsRebuilding):
+            self._perceptionTable = PerceptionTable()
+            for dataBlob in (self._dataBlobs.values() + self._dataBlobRepository.values()):
+                self._perceptionTable.addRowForBlob(dataBlob)
+            self._perceptionTable.weightingMode = self._proximityWeightingOption
+
 ##################### 
     def populateUiLayout(self):
         regionSizeFrame = uib.MakeFrameLayout("Region Size")
@@ -102,7 +245,14 @@ class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
         
 #####################        
     def _createDataBlobForAgent(self, agent):
-        return PerceptionAttributesDataBlob(agent)
+        dataBlob = PerceptionAttributesDataBlob(agent)
+        self._perceptionTable.addRowForBlob(dataBlob)
+        
+        return dataBlob
+
+#########
+    def _onDataBlobReleased(self, dataBlob):
+        self._perceptionTable.removeRowForBlob(dataBlob)
 
 #########
     def _updateDataBlobWithAttribute(self, dataBlob, attribute):
@@ -114,8 +264,14 @@ class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
             dataBlob.collisionRegionSize = self._getCollisionRegionSizeForBlob(dataBlob)
         elif(attribute is self._blindRegionAngle):
             dataBlob.blindRegionAngle = self._getBlindRegionAngleForBlob(dataBlob)
+            dataBlob.updateAreaCosines()
         elif(attribute is self._forwardVisionAngle):
             dataBlob.forwardVisionAngle = self._getForwardVisionAngleForBlob(dataBlob)
+            dataBlob.updateAreaCosines()
+        else:
+            return
+        
+        self._perceptionTable.updateRowForBlob(dataBlob)
 
 #####################            
     def onValueChanged(self, changedAttribute):
@@ -127,6 +283,8 @@ class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
             self._collisionRegionSize.maximumValue = self._nearRegionSize.value
         elif(changedAttribute is self._proximityWeightingString):
             self._proximityWeightingOption = AgentPerceptionAttributeGroup._WeightingStrings_.index(changedAttribute.value)
+            self._perceptionTable.weightingMode = self._proximityWeightingOption
+            self._perceptionTable.version += 1
 
 #####################         
     def _getMaxNeighbourhoodSize(self):
@@ -135,6 +293,12 @@ class AgentPerceptionAttributeGroup(ago.AttributeGroupObject):
         return (self._neighbourhoodSize.value + 
                 (self._neighbourhoodSize.value * self._neighbourhoodSize_Random.randomizeMultiplierAttribute))
     maxNeighbourhoodSize = property(_getMaxNeighbourhoodSize)
+    
+#####################
+    def _getPerceptionTable(self):
+        """PerceptionTable holding the perception values of every agent in this swarm instance."""
+        return self._perceptionTable
+    perceptionTable = property(_getPerceptionTable)
 
 #####################
     def _getUseNoWeighting(self):
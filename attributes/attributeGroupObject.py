@@ -22,6 +22,16 @@ import pyswarm.attributes.attributeTypes as at
 
 
 
+########################################
+def _DefaultsFileKey(attribute):
+    """Key for the attribute in the default values file - without any trailing colon from the UI label, as 
+    ConfigParser takes the first ':' or '=' on a line as the separator (so "Label: = x" reads back as "Label", "= x")."""
+    return attribute.attributeLabel.rstrip(":").rstrip()
+
+########################################
+
+
+
 ########################################
 class AttributeGroupListener(object):
     __metaclass__ = ABCMeta
@@ -29,6 +39,11 @@ class AttributeGroupListener(object):
     @abstractmethod
     def onAttributeChanged(self, sectionObject, attributeName):
         raise NotImplemented
+    
+    def listensToAttribute(self, sectionObject, attributeName):
+        """Override to only be notified about some attributes - onAttributeChanged is skipped for those where this 
+        returns False (it's always called when attributeName is None, i.e. when several attributes have changed)."""
+        return True
 
 #END OF CLASS - AttributeGroupListener
 ########################################
@@ -39,6 +54,9 @@ class AttributeGroupListener(object):
 class _DataBlobBaseObject(object):
     """Convenience class to provide common agentId accessor for dataBlob objects.
     """
+    
+    attributesVersion = 0   # group's attributesVersion when the blob was last brought up to date (class-level => 0 for older saves)
+    
     def __init__(self, agent):
         self._agentId = agent.agentId
         self.onUnassignedCallback = None
@@ -152,6 +170,9 @@ class AttributeGroupObject(PyswarmObject, at.SingleAttributeDelegate):
         self._dataBlobRepository = {}
         self._listeners = set()
         self._inBulkUpdate = False
+        self._attributesRegistry = None   # see _allAttributes
+        self._attributesVersion = 1       # (new blobs start at 0, i.e. out of date)
+        self._pendingAttributes = []      # see applyPendingAttributeChanges
  
 #####################
     def __str__(self):
@@ -171,6 +192,7 @@ class AttributeGroupObject(PyswarmObject, at.SingleAttributeDelegate):
         
         strongListenerRefs = [ref() for ref in self._listeners]
         state["_listeners"] = strongListenerRefs
+        state["_attributesRegistry"] = None
            
         return state
        
@@ -180,11 +202,25 @@ class AttributeGroupObject(PyswarmObject, at.SingleAttributeDelegate):
         
         self._listeners = set([weakref.ref(listener, self._removeDeadListenerReference) 
                                for listener in self._listeners])
+        self._attributesRegistry = None   # (rebuilt when next needed - subclasses may yet add attributes missing from older saves)
+        if("_pendingAttributes" not in state):   # i.e. saved before blob updates were deferred
+            self._attributesVersion = 1
+            self._pendingAttributes = []
                            
 #####################    
     def _getBehaviourId(self):
         return self._behaviourId
     behaviourId = property(_getBehaviourId)
+    
+    def _getLocationAttributes(self):
+        """List of the group's LocationAttributes (see attributeTypes.SyncBoundLocators)."""
+        return [attribute for attribute in self._allAttributes() if(isinstance(attribute, at.LocationAttribute))]
+    locationAttributes = property(_getLocationAttributes)
+    
+    def _getAttributesVersion(self):
+        """Incremented every time any of the group's attributes changes."""
+        return self._attributesVersion
+    attributesVersion = property(_getAttributesVersion)
       
 #####################    
     @abstractmethod
@@ -202,9 +238,19 @@ class AttributeGroupObject(PyswarmObject, at.SingleAttributeDelegate):
         raise NotImplemented
    
 #####################    
-    _ALLATTRIBUTES_RECURSIVE_CHECK_ = ["debugStr"] # list of attributes (i.e. property accessors) which also call
-    #                                             # "_allAttributes" - they must be skipped to avoid a recursive loop
     def _allAttributes(self):
+        """Returns list of all the group's attributes.  They're found by reflection the first time this is called, 
+        which is relatively expensive, and then kept - so all attributes must have been created (i.e. in __init__, or 
+        __setstate__ for older saves) before then."""
+        if(self._attributesRegistry is None):
+            self._attributesRegistry = self._findAllAttributes()
+            
+        return self._attributesRegistry
+    
+########
+    _ALLATTRIBUTES_RECURSIVE_CHECK_ = ["debugStr", "locationAttributes"] # list of attributes (i.e. property accessors)
+    #                                                                    # which also call "_allAttributes" - they must be skipped to avoid a recursive loop
+    def _findAllAttributes(self):
         attributesList = []
         for attributeName in filter(lambda atNm: 
                                     atNm not in AttributeGroupObject._ALLATTRIBUTES_RECURSIVE_CHECK_, 
@@ -258,17 +304,83 @@ Recommend this is hard-coded rather than done at runtime." % attributeName)
         if(newBlob is None):
             newBlob = self._createDataBlobForAgent(agent)
             newBlob.onUnassignedCallback = self._dataBlobUnassignedCallback
+        if(newBlob.attributesVersion != self._attributesVersion):
             for attribute in self._allAttributes():
                 self._updateDataBlobWithAttribute(newBlob, attribute)
+            newBlob.attributesVersion = self._attributesVersion
 
         self._dataBlobs[agentId] = newBlob
 
         return newBlob
     
+########
+    def getDataBlobsForAgents(self, agentsList):
+        """Bulk equivalent of [getDataBlobForAgent(agent) for agent in agentsList] - for large numbers of new agents.
+        Randomised attribute values are calculated for all the new blobs in one go, per attribute."""
+        dataBlobsList = []
+        outOfDateBlobsList = []
+        for agent in agentsList:
+            agentId = agent.agentId
+            if(agentId in self._dataBlobs):
+                raise RuntimeError("Re-requesting dataBlob which is already assigned")
+            
+            dataBlob = self._dataBlobRepository.pop(agentId, None)
+            if(dataBlob is None):
+                dataBlob = self._createDataBlobForAgent(agent)
+                dataBlob.onUnassignedCallback = self._dataBlobUnassignedCallback
+            if(dataBlob.attributesVersion != self._attributesVersion):
+                outOfDateBlobsList.append(dataBlob)
+                
+            self._dataBlobs[agentId] = dataBlob
+            dataBlobsList.append(dataBlob)
+        
+        if(outOfDateBlobsList):
+            self._updateDataBlobsWithAttributes(outOfDateBlobsList, self._allAttributes())
+        
+        return dataBlobsList
+    
+########
+    def _updateDataBlobsWithAttributes(self, dataBlobsList, attributesList):
+        """Updates each blob with each attribute, then marks the blobs as up to date.  Randomised attribute values 
+        are calculated for all the blobs in one go, per attribute."""
+        attributeIds = set([id(attribute) for attribute in attributesList])
+        randomizeControllers = [attribute for attribute in self._allAttributes() 
+                                if(isinstance(attribute, at.RandomizeController) and 
+                                   id(attribute._parentAttribute) in attributeIds)]
+        agentIds = [dataBlob.agentId for dataBlob in dataBlobsList]
+        try:
+            for randomizeController in randomizeControllers:
+                randomizeController.prefetchValuesForIntegerIds(agentIds)
+            for attribute in attributesList:
+                for dataBlob in dataBlobsList:
+                    self._updateDataBlobWithAttribute(dataBlob, attribute)
+        finally:
+            for randomizeController in randomizeControllers:
+                randomizeController.clearPrefetchedValues()
+        
+        for dataBlob in dataBlobsList:
+            dataBlob.attributesVersion = self._attributesVersion
+    
 ########
     def _dataBlobUnassignedCallback(self, agentId):
         self._dataBlobRepository[agentId] = self._dataBlobs.pop(agentId)
         
+########
+    def releaseDataBlobForAgent(self, agentId):
+        """For agents which have gone for good (rather than just moved to another behaviour, see onUnassigned) - 
+        forgets the agent's blob, if there is one."""
+        dataBlob = self._dataBlobs.pop(agentId, None)
+        if(dataBlob is None):
+            dataBlob = self._dataBlobRepository.pop(agentId, None)
+        if(dataBlob is not None):
+            self._onDataBlobReleased(dataBlob)
+            
+########
+    def _onDataBlobReleased(self, dataBlob):
+        """Called when a blob is let go of by releaseDataBlobForAgent.
+        Implement in subclasses if required."""
+        pass
+        
 ########
     def purgeDataBlobRepository(self):
         del self._dataBlobRepository[:]
@@ -281,9 +393,9 @@ Recommend this is hard-coded rather than done at runtime." % attributeName)
            
         attributeLookup = {}
         for attribute in filter(lambda at: not at.excludeFromDefaults, self._allAttributes()):
-            attributeLookup[attribute.attributeLabel] = attribute
+            attributeLookup[_DefaultsFileKey(attribute)] = attribute
             if(attribute.nestedAttribute is not None):
-                attributeLookup[attribute.nestedAttribute.attributeLabel] = attribute.nestedAttribute
+                attributeLookup[_DefaultsFileKey(attribute.nestedAttribute)] = attribute.nestedAttribute
            
         attributeReadCount = 0
         try:
@@ -323,7 +435,7 @@ Recommend this is hard-coded rather than done at runtime." % attributeName)
                 ####
                 def _saveAttribute(configWriter, sectionTitle, attribute):
                     try:
-                        configWriter.set(sectionTitle, attribute.attributeLabel, attribute.value)
+                        configWriter.set(sectionTitle, _DefaultsFileKey(attribute), attribute.value)
                         util.LogDebug("Added default attribute value: %s = %s" % (attribute.attributeLabel, attribute.value))
                     except Exception as e:
                         util.LogWarning("Could not write attribute %s to file (%s)" % (attribute.attributeLabel, e))
@@ -353,18 +465,34 @@ Recommend this is hard-coded rather than done at runtime." % attributeName)
     def _notifyListeners(self, changedAttributeName):
         if(not self._inBulkUpdate):
             for listenerRef in self._listeners:
-                listenerRef().onAttributeChanged(self, changedAttributeName)
+                listener = listenerRef()
+                if(changedAttributeName is None or listener.listensToAttribute(self, changedAttributeName)):
+                    listener.onAttributeChanged(self, changedAttributeName)
     
 #####################            
     def onValueChanged(self, changedAttribute): # overridden SingleAttributeDelegate method
-        for dataBlob in self._dataBlobs.itervalues():
-            self._updateDataBlobWithAttribute(dataBlob, changedAttribute)
-            
-        for dataBlob in self._dataBlobRepository.itervalues():
-            self._updateDataBlobWithAttribute(dataBlob, changedAttribute)
+        """Blobs are NOT updated here (which would mean going through every agent on every tick of a UI slider) -
+        the change is just noted, and applied to all blobs in one go by applyPendingAttributeChanges."""
+        self._attributesVersion += 1
+        if(not any(attribute is changedAttribute for attribute in self._pendingAttributes)):
+            self._pendingAttributes.append(changedAttribute)
             
         self._notifyListeners(changedAttribute.attributeLabel)
     
+########
+    def applyPendingAttributeChanges(self):
+        """Updates the assigned blobs with any attributes changed since the last call.  Called at the start of each
+        frame, before any blob values are read.  Blobs in the repository are left as they are - they're brought up 
+        to date, if need be, when they're next assigned (see getDataBlobForAgent)."""
+        if(self._pendingAttributes):
+            pendingAttributes = self._pendingAttributes
+            self._pendingAttributes = []
+            
+            outOfDateBlobsList = [dataBlob for dataBlob in self._dataBlobs.itervalues()
+                                  if(dataBlob.attributesVersion != self._attributesVersion)]
+            if(outOfDateBlobsList):
+                self._updateDataBlobsWithAttributes(outOfDateBlobsList, pendingAttributes)
+    
     
 # END OF CLASS
 #############################
\ No newline at end of file
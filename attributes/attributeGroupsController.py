@@ -16,6 +16,8 @@ from pyswarm.pyswarmObject import PyswarmObject
 import pyswarm.utils.general as util
 import pyswarm.utils.fileLocations as fl
 
+import pyswarm.attributes.attributeTypes as at
+
 import pyswarm.attributes.globalAttributeGroup as ga
 import pyswarm.attributes.agentPerceptionAttributeGroup as apa
 import pyswarm.attributes.agentMovementAttributeGroup as ama
@@ -99,7 +101,11 @@ class AttributeGroupsController(PyswarmObject):
     
 #####################    
     def onFrameUpdated(self):
+        at.SyncBoundLocators([attribute for attributes in self._allAttributeGroups() 
+                              for attribute in attributes.locationAttributes])
+        
         for attributes in self._allAttributeGroups():
+            attributes.applyPendingAttributeChanges()
             attributes.onFrameUpdated()
             
 ########
@@ -11,8 +11,13 @@
 
 
 from abc import ABCMeta, abstractmethod
-import random
 import weakref
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - randomized values for many agents are just calculated one at a time without it.
 
 from pyswarm.pyswarmObject import PyswarmObject
 import pyswarm.vectors.vector3 as v3
@@ -21,6 +26,30 @@ import pyswarm.utils.sceneInterface as scene
 
 
 
+_UINT64_MASK_ = 0xFFFFFFFFFFFFFFFF
+_GOLDEN_GAMMA_ = 0x9E3779B97F4A7C15        # SplitMix64 constants (see _HashedInteger)
+_MIX_MULTIPLIER_1_ = 0xBF58476D1CE4E5B9
+_MIX_MULTIPLIER_2_ = 0x94D049BB133111EB
+_UNIFORM_SCALE_ = 2.0 ** -52               # top 53 bits of hash -> [0, 2)
+_BY_AGENT_ID_STREAM_KEY_ = 0               # shared by all attributes, so "By Agent ID" gives each agent the same factor for each
+
+
+
+#####################
+def SyncBoundLocators(locationAttributes):
+    """Brings any LocationAttributes with bound locators up to date with the locators' current positions - the same as 
+    calling verifyLocatorIfNecessary on each of them, except that all the locators are read in one go.  Only attributes
+    whose locators have actually moved are updated (and so notify their delegates)."""
+    boundAttributes = [attribute for attribute in locationAttributes if(attribute.hasBoundLocator)]
+    if(boundAttributes):
+        positionsList = scene.Vector3sFromLocators([attribute.getRawAttribute() for attribute in boundAttributes])
+        for attribute, position in zip(boundAttributes, positionsList):
+            attribute._syncWithLocatorPosition(position)
+
+#####################
+
+
+
 #####################
 class SingleAttributeDelegate(object):
     __metaclass__ = ABCMeta
@@ -34,6 +63,44 @@ class SingleAttributeDelegate(object):
 
 
 
+#####################
+def _HashedInteger(streamKey, integerId):
+    """Stateless 64-bit hash of (streamKey, integerId) - the SplitMix64 generator's output for counter integerId."""
+    z = (streamKey + (integerId + 1) * _GOLDEN_GAMMA_) & _UINT64_MASK_
+    z = ((z ^ (z >> 30)) * _MIX_MULTIPLIER_1_) & _UINT64_MASK_
+    z = ((z ^ (z >> 27)) * _MIX_MULTIPLIER_2_) & _UINT64_MASK_
+    
+    return z ^ (z >> 31)
+
+########
+def _HashedUniform(streamKey, integerId):
+    """Returns pseudo-random float in [-1, 1), always the same for a given (streamKey, integerId)."""
+    return (_HashedInteger(streamKey, integerId) >> 11) * _UNIFORM_SCALE_ - 1.0
+
+########
+def _HashedUniforms(streamKey, integerIds):
+    """Equivalent of [_HashedUniform(streamKey, integerId) for integerId in integerIds] - values are identical,
+    but all calculated in one go if NumPy is available."""
+    if(np is None or len(integerIds) == 0):
+        return [_HashedUniform(streamKey, integerId) for integerId in integerIds]
+    
+    with np.errstate(over="ignore"):   # (uint64 arithmetic wraps around, as intended)
+        z = np.asarray(integerIds, dtype=np.int64).astype(np.uint64)
+        z = (z + np.uint64(1)) * np.uint64(_GOLDEN_GAMMA_) + np.uint64(streamKey)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX_MULTIPLIER_1_)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX_MULTIPLIER_2_)
+        z ^= (z >> np.uint64(31))
+    
+    return ((z >> np.uint64(11)).astype(np.float64) * _UNIFORM_SCALE_ - 1.0).tolist()
+
+########
+def _StreamKeyForLabel(label):
+    return _HashedInteger(0, zlib.crc32(label) & 0xFFFFFFFF)   # (crc32 rather than hash(), which isn't stable across processes)
+
+#####################
+
+
+
 ##################################################### 
 class _SingleAttributeBaseObject(PyswarmObject):
     """Base class for attribute types."""
@@ -248,25 +315,14 @@ class FloatAttribute(IntAttribute):
 
 ##################################################### 
 class RandomizerAttribute(FloatAttribute):
+    """
+    Randomizes the parent attribute's value per agent, by up to +/- (parent value * this value).
+    The random factor for each agent comes from _HashedUniform(s) rather than the random module - no state is kept
+    (or disturbed), so values are the same every time, for any agent ID, in any process.
+    "By Agent ID" randomizing uses the same factor for a given agent across all attributes, whereas "Pure Random"
+    uses a different factor for each attribute.
+    """
     
-    #static variables
-    _GlobalIntToRandomLookup = []
-    _RandomSequencePreviousState = None
-    
-    @staticmethod
-    def _RandomValueForInt(intKey):
-        if(not RandomizerAttribute._RandomSequencePreviousState):
-            random.seed(0)
-        elif(RandomizerAttribute._RandomSequencePreviousState is not None):
-            random.setstate(RandomizerAttribute._RandomSequencePreviousState)
-            RandomizerAttribute._RandomSequencePreviousState = None
-            
-        while(len(RandomizerAttribute._GlobalIntToRandomLookup) <= intKey):
-            RandomizerAttribute._GlobalIntToRandomLookup.append(random.uniform(-1.0, 1.0))
-            
-        return RandomizerAttribute._GlobalIntToRandomLookup[intKey]
-
-#####################    
     def __init__(self, parentAttribute):
         if(type(parentAttribute) != IntAttribute and type(parentAttribute) != FloatAttribute):
             raise TypeError("Attempt to create randomizer for non-valueType attribute")
@@ -274,7 +330,6 @@ class RandomizerAttribute(FloatAttribute):
             util.LogWarning("Delegate attribute for randomized attribute \'%s\' is None" % parentAttribute.attributeLabel)
         
         super(RandomizerAttribute, self).__init__(parentAttribute.attributeLabel + " Randomize", 0, parentAttribute.delegate, 0.0, 1.0)
-        self._localIntToRandomLookup = {}
         self._parentAttribute = parentAttribute
         
 #####################         
@@ -287,33 +342,47 @@ class RandomizerAttribute(FloatAttribute):
         else:
             return returnValue
         
-#####################
-    def getLocalRandomizedValueForIntegerId(self, integerId):
+########
+    def _localStreamKey(self):
+        return _StreamKeyForLabel(self.attributeLabel)
+    
+########
+    def _randomizedValue(self, streamKey, integerId):
         if(self.value != 0):
-            if(RandomizerAttribute._GlobalIntToRandomLookup and RandomizerAttribute._RandomSequencePreviousState is not None):
-                RandomizerAttribute._RandomSequencePreviousState = random.getstate()
-            
-            randomValue = self._localIntToRandomLookup.get(integerId)
-            if(randomValue is None):
-                randomValue = random.uniform(-1.0, 1.0)
-                self._localIntToRandomLookup[integerId] = randomValue
-                
-            diff = self._parentAttribute.value * self.value * randomValue
+            diff = self._parentAttribute.value * self.value * _HashedUniform(streamKey, integerId)
             result = self._parentAttribute._getValueFromInput(self._parentAttribute.value + diff)
             
             return self._clampIfNecessary(result)
         else:
             return self._parentAttribute.value
+        
+########
+    def _randomizedValues(self, streamKey, integerIds):
+        parentValue = self._parentAttribute.value
+        if(self.value != 0):
+            scale = parentValue * self.value
+            return [self._clampIfNecessary(self._parentAttribute._getValueFromInput(parentValue + scale * randomValue))
+                    for randomValue in _HashedUniforms(streamKey, integerIds)]
+        else:
+            return [parentValue] * len(integerIds)
+
+#####################
+    def getLocalRandomizedValueForIntegerId(self, integerId):
+        return self._randomizedValue(self._localStreamKey(), integerId)
+        
+########
+    def getLocalRandomizedValuesForIntegerIds(self, integerIds):
+        """Bulk equivalent of getLocalRandomizedValueForIntegerId - returns list of values, ordered as per integerIds."""
+        return self._randomizedValues(self._localStreamKey(), integerIds)
 
 #####################    
     def getGlobalRandomizedValueForIntegerId(self, integerId):
-        if(self.value != 0):
-            diff = self._parentAttribute.value * self.value * RandomizerAttribute._RandomValueForInt(integerId)
-            result = self._parentAttribute._getValueFromInput(self._parentAttribute.value + diff)
-            
-            return self._clampIfNecessary(result)
-        else:
-            return self._parentAttribute.value
+        return self._randomizedValue(_BY_AGENT_ID_STREAM_KEY_, integerId)
+        
+########
+    def getGlobalRandomizedValuesForIntegerIds(self, integerIds):
+        """Bulk equivalent of getGlobalRandomizedValueForIntegerId - returns list of values, ordered as per integerIds."""
+        return self._randomizedValues(_BY_AGENT_ID_STREAM_KEY_, integerIds)
     
 #####################            
     def _updateDelegate(self):
@@ -328,6 +397,8 @@ class RandomizerAttribute(FloatAttribute):
 ##################################################### 
 class RandomizeController(_SingleAttributeBaseObject):
     __OptionStrings__ = ["Off", "By Agent ID", "Pure Random"]
+    
+    _prefetchedValuesLookup = None   # see prefetchValuesForIntegerIds (class-level default => also None for older saves)
     __Off__, __ById__, __PureRandom__ = range(3)
     
     @staticmethod
@@ -406,6 +477,11 @@ class RandomizeController(_SingleAttributeBaseObject):
  
 #####################        
     def valueForIntegerId(self, integerId):
+        if(self._prefetchedValuesLookup is not None):
+            prefetchedValue = self._prefetchedValuesLookup.get(integerId)
+            if(prefetchedValue is not None):
+                return prefetchedValue
+            
         if(self._value == RandomizeController.__Off__):
             return self._parentAttribute.value
         elif(self._value == RandomizeController.__ById__):
@@ -415,6 +491,26 @@ class RandomizeController(_SingleAttributeBaseObject):
         else:
             raise RuntimeError("Selected has unrecognized enum value: %s" % self._value)
         
+########
+    def prefetchValuesForIntegerIds(self, integerIds):
+        """Calculates the values for a whole batch of IDs in one go - valueForIntegerId then just looks them up, 
+        until clearPrefetchedValues is called.  Intended for creating data blobs in bulk (see 
+        AttributeGroupObject.getDataBlobsForAgents) - values are NOT updated if the attributes change meanwhile."""
+        if(self._value == RandomizeController.__Off__):
+            valuesList = [self._parentAttribute.value] * len(integerIds)
+        elif(self._value == RandomizeController.__ById__):
+            valuesList = self._randomizerAttribute.getGlobalRandomizedValuesForIntegerIds(integerIds)
+        elif(self._value == RandomizeController.__PureRandom__):
+            valuesList = self._randomizerAttribute.getLocalRandomizedValuesForIntegerIds(integerIds)
+        else:
+            raise RuntimeError("Selected has unrecognized enum value: %s" % self._value)
+        
+        self._prefetchedValuesLookup = dict(zip(integerIds, valuesList))
+        
+########
+    def clearPrefetchedValues(self):
+        self._prefetchedValuesLookup = None
+        
 #####################            
     def _updateDelegate(self):
         super(RandomizeController, self)._updateDelegate()
@@ -536,9 +632,17 @@ class LocationAttribute(MayaObjectAttribute):
     def verifyLocatorIfNecessary(self):
         """Recommended that this method is periodically called to ensure attribute
         is correctly updated with any changes in the bound locator's location.
+        (Or SyncBoundLocators, for several attributes at once).
         """
-        if(self.hasBoundLocator):
-            self.value = self._boundLocator
+        SyncBoundLocators([self])
+        
+########
+    def _syncWithLocatorPosition(self, position):
+        """Updates value with position of the bound locator (as read by SyncBoundLocators), if it has moved."""
+        if(position is None):
+            self.value = self._boundLocator   # (no longer a locator - value's setter deals with it as before)
+        elif(position != self._value):
+            self._updateValue(position)
 
 #####################            
     def clearBoundLocator(self):
@@ -220,12 +220,6 @@ class WorldWarZAttributeGroup(ago.AttributeGroupObject, ago._FollowOnBehaviourAt
     def onBehaviourListUpdated(self, behaviourIDsList, defaultBehaviourId):
         self._updateFollowOnBehaviourOptions(behaviourIDsList, defaultBehaviourId)
     
-#####################
-    def onFrameUpdated(self):
-        self._basePyramidGoal.verifyLocatorIfNecessary()
-        self._wallLipGoal.verifyLocatorIfNecessary()
-        self._finalGoal.verifyLocatorIfNecessary()
-
 #####################        
     def onValueChanged(self, changedAttribute):
         super(WorldWarZAttributeGroup, self).onValueChanged(changedAttribute)
@@ -34,7 +34,7 @@ class _PreferencesWindow(object):
     _invalid_, _withMayaScene_, _manual_ = range(3)
     
 ######################
-    def __init__(self, accelerationAttribute, listRebuildAttribute, onPreferencesUpdatedMethod, sceneSaveMethod,
+    def __init__(self, accelerationAttribute, neighbourListSkinAttribute, onPreferencesUpdatedMethod, sceneSaveMethod,
                  quickSetupEnableSelfCollide, quickSetupDisableFriction,
                  quickSetupEnableGravity, quickSetupChangeRenderType,
                  quickSetupEnableGroundPlane, quickSetupChangeSpaceScale,
@@ -46,11 +46,12 @@ class _PreferencesWindow(object):
                                                            accelerationAttribute.value, 
                                                            minimumValue=accelerationAttribute.minimumValue, 
                                                            maximumValue=accelerationAttribute.maximumValue)
-        self._listRebuildFrequency = at.IntAttribute(listRebuildAttribute.attributeLabel, 
-                                                     listRebuildAttribute.value)
+        self._neighbourListSkin = at.FloatAttribute(neighbourListSkinAttribute.attributeLabel, 
+                                                    neighbourListSkinAttribute.value,
+                                                    minimumValue=neighbourListSkinAttribute.minimumValue)
 
         self._pairAttributeWithParentAttribute(self._accelerationDueToGravity, accelerationAttribute)
-        self._pairAttributeWithParentAttribute(self._listRebuildFrequency, listRebuildAttribute)
+        self._pairAttributeWithParentAttribute(self._neighbourListSkin, neighbourListSkinAttribute)
         
         self._onPreferencesUpdatedMethod = onPreferencesUpdatedMethod
         self._sceneSaveMethod = sceneSaveMethod
@@ -134,7 +135,7 @@ class _PreferencesWindow(object):
                                                                               "(disabling can boost performance if you have a small number of agents).")[1]
             
             uib.MakeFieldGroup(self._accelerationDueToGravity, leftColumnWidth=_PREFERENCES_WINDOW_LEFT_COLUMN_WIDTH_)
-            uib.MakeFieldGroup(self._listRebuildFrequency, leftColumnWidth=_PREFERENCES_WINDOW_LEFT_COLUMN_WIDTH_)
+            uib.MakeFieldGroup(self._neighbourListSkin, leftColumnWidth=_PREFERENCES_WINDOW_LEFT_COLUMN_WIDTH_)
             
             self._saveFrequencyRadioButtons = uib.MakeRadioButtonGroup("Save Frequency:",
                                                                        ("Maya Scene", "Manual"),
@@ -233,7 +234,8 @@ class _PreferencesWindow(object):
 
 #####################        
     def _closeWindow(self, *args):
-        util.EvalDeferred(uib.DestroyWindowIfNecessary, self._window)
+        if(self._window is not None):
+            util.EvalDeferred(uib.DestroyWindowIfNecessary, self._window)
 
         self._window = None
         self._saveFrequencyRadioButtons = None
@@ -280,11 +282,15 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         self._statusLabel = None
         self._progressBar = None
         self._statusNeedsReset = True
+        self._frameTimingsLabel = None
         
         self._accelerationDueToGravity = at.FloatAttribute("Acceleration Due To Gravity:", -38.0, 
                                                            minimumValue=float("-inf"), maximumValue=0)
-        self._listRebuildFrequency = at.IntAttribute("List Rebuild Frequency:", 5)
+        self._neighbourListSkin = at.FloatAttribute("Neighbour List Skin:", 1.0, minimumValue=0.0)
         self._useDebugColours = at.BoolAttribute("Debug Colour Particles", True)
+        self._useBatchCalculations = at.BoolAttribute("Batch Calculations", False)
+        self._useParallelCalculations = at.BoolAttribute("Parallel Calculations", False)
+        self._frameTimingsEnabled = at.BoolAttribute("Frame Timings", False)
         
         self._quickSetupEnableSelfCollide = at.BoolAttribute("Enable Self Collide", True, annotation=self._getQuickSetupEnableSelfCollide.__doc__)
         self._quickSetupDisableFriction = at.BoolAttribute("Disable Friction", True, annotation=self._getQuickSetupDisableFriction.__doc__)
@@ -295,9 +301,9 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         self._quickSetupTranslateAbovePlane = at.BoolAttribute("Translate Above Plane", True, annotation=self._getQuickSetupTranslateAbovePlane.__doc__)
         
         self._accelerationDueToGravity.annotation = self._getAccelerationDueToGravity.__doc__
-        self._listRebuildFrequency.annotation = self._getListRebuildFrequency.__doc__
+        self._neighbourListSkin.annotation = self._getNeighbourListSkin.__doc__
         
-        self._preferencesWindow = _PreferencesWindow(self._accelerationDueToGravity, self._listRebuildFrequency, 
+        self._preferencesWindow = _PreferencesWindow(self._accelerationDueToGravity, self._neighbourListSkin, 
                                                      self._onPreferencesUpdated, sceneSaveMethod,
                                                      self._quickSetupEnableSelfCollide, self._quickSetupDisableFriction,
                                                      self._quickSetupDisableIgnoreGravity, self._quickSetupChangeRenderType,
@@ -319,6 +325,7 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         state["nameChangeCallback"] = None
         state["_statusLabel"] = None
         state["_progressBar"] = None
+        state["_frameTimingsLabel"] = None
         state["_preferencesWindow"] = None
         state["saveMethod"] = self._preferencesWindow._sceneSaveMethod
         state["statusEnabled"] = self._progressUpdatesEnabled
@@ -328,9 +335,19 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
 ########   
     def __setstate__(self, state):
         super(GlobalAttributeGroup, self).__setstate__(state)
+        if("_neighbourListSkin" not in state):   # i.e. session saved before "List Rebuild Frequency" was replaced
+            self._neighbourListSkin = at.FloatAttribute("Neighbour List Skin:", 1.0, minimumValue=0.0)
+            self._neighbourListSkin.annotation = self._getNeighbourListSkin.__doc__
+        if("_useBatchCalculations" not in state):
+            self._useBatchCalculations = at.BoolAttribute("Batch Calculations", False)
+        if("_useParallelCalculations" not in state):
+            self._useParallelCalculations = at.BoolAttribute("Parallel Calculations", False)
+        if("_frameTimingsEnabled" not in state):
+            self._frameTimingsEnabled = at.BoolAttribute("Frame Timings", False)
+            self._frameTimingsLabel = None
         
         sceneSaveMethod = state["saveMethod"]
-        self._preferencesWindow = _PreferencesWindow(self._accelerationDueToGravity, self._listRebuildFrequency, 
+        self._preferencesWindow = _PreferencesWindow(self._accelerationDueToGravity, self._neighbourListSkin, 
                                                      self._onPreferencesUpdated, sceneSaveMethod,
                                                      self._quickSetupEnableSelfCollide, self._quickSetupDisableFriction,
                                                      self._quickSetupDisableIgnoreGravity, self._quickSetupChangeRenderType,
@@ -360,6 +377,11 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         self._preferencesWindow._progressUpdatesEnabled = value
     _progressUpdatesEnabled = property(_getProgressUpdatesEnabled, _setProgressUpdatesEnabled)
     
+    def _getStatusReadoutVisible(self):
+        """False if UI has not been built (e.g. running headless)."""
+        return (self._progressBar is not None and self._statusLabel is not None)
+    _statusReadoutVisible = property(_getStatusReadoutVisible)
+    
 #####################        
     def _createDataBlobForAgent(self, agent):
         # Not needed for global attributes
@@ -380,16 +402,17 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
             self._progressUpdatesEnabled = True
             self.setStatusReadoutIdle()
         elif(not enabled and (self._progressUpdatesEnabled or forceUpdate)):
-            self._progressBar.setEnable(False)
-            self._progressBar.setProgress(0)
-            self._statusLabel.setBackgroundColor(colour.StatusTextfieldBackground_Default)
-            self._statusLabel.setText("N/A")
+            if(self._statusReadoutVisible):
+                self._progressBar.setEnable(False)
+                self._progressBar.setProgress(0)
+                self._statusLabel.setBackgroundColor(colour.StatusTextfieldBackground_Default)
+                self._statusLabel.setText("N/A")
             self._statusNeedsReset = True
             self._progressUpdatesEnabled = False
 
 ######################
     def setStatusReadoutIdle(self):
-        if(self._progressUpdatesEnabled):
+        if(self._progressUpdatesEnabled and self._statusReadoutVisible):
             if(self._statusNeedsReset):
                 self._progressBar.setEnable(False)
                 self._statusLabel.setBackgroundColor(colour.StatusTextfieldBackground_Default)
@@ -401,7 +424,7 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         
 ########
     def setStatusReadoutWorking(self, progressPercentage, statusReadout="Working..."):
-        if(self._progressUpdatesEnabled):
+        if(self._progressUpdatesEnabled and self._statusReadoutVisible):
             if(self._statusNeedsReset):
                 self._progressBar.setEnable(True)
                 self._statusLabel.setBackgroundColor(colour.StatusTextfieldBackground_Default)
@@ -413,15 +436,16 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
 
 ########        
     def setStatusReadoutError(self):
-        self._statusLabel.setBackgroundColor(colour.StatusTextfieldBackground_Error)
-        self._statusLabel.setText("Error!")
+        if(self._statusReadoutVisible):
+            self._statusLabel.setBackgroundColor(colour.StatusTextfieldBackground_Error)
+            self._statusLabel.setText("Error!")
         self._statusNeedsReset = True
         
-#####################    
-    def onFrameUpdated(self):
-        self._sceneBounds1.verifyLocatorIfNecessary()
-        self._sceneBounds2.verifyLocatorIfNecessary()
-
+########
+    def setFrameTimingsReadout(self, readoutText):
+        if(self._frameTimingsLabel is not None):
+            self._frameTimingsLabel.setText(readoutText)
+        
 #####################    
     def populateUiLayout(self):
         borderLayoutTop = uib.MakeBorderingLayout()
@@ -435,6 +459,9 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         uib.MakeLocationField(self._sceneBounds1, leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, annotation=self._getSceneBounds1.__doc__)
         uib.MakeLocationField(self._sceneBounds2, leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, annotation=self._getSceneBounds2.__doc__)
         uib.MakeCheckboxGroup(self._useDebugColours, "Enable", leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, annotation=self._getUseDebugColours.__doc__)
+        uib.MakeCheckboxGroup(self._useBatchCalculations, "Enable", leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, annotation=self._getUseBatchCalculations.__doc__)
+        uib.MakeCheckboxGroup(self._useParallelCalculations, "Enable", leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, annotation=self._getUseParallelCalculations.__doc__)
+        uib.MakeCheckboxGroup(self._frameTimingsEnabled, "Enable", leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, annotation=self._getFrameTimingsEnabled.__doc__)
         uib.SetAsChildLayout(columnLayoutBottom, borderLayoutMid)
         
         borderLayoutBottom = uib.MakeBorderingLayout()
@@ -447,6 +474,9 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
             self.setStatusReadoutIdle()
         else:
             self.setStatusUpdatesEnabled(False, forceUpdate=True)
+        self._frameTimingsLabel = uib.MakeReadoutField("Timings:", "Off" if(not self.frameTimingsEnabled) else "", 
+                                                       leftColumnWidth=_TOP_PANEL_LEFT_COLUMN_WIDTH_, 
+                                                       annotation=self._getFrameTimingsEnabled.__doc__)[1]
         
         uib.SetAsChildLayout(columnLayoutBottom, borderLayoutBottom, columnLayoutTop, borderLayoutTop)
         
@@ -494,6 +524,13 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
     def _setSceneBounds2(self, value):
         self._sceneBounds2.value = value
     sceneBounds2 = property(_getSceneBounds2, _setSceneBounds2)
+    
+########
+    def _getZoneLayoutAttributeLabels(self):
+        """Labels of the attributes that lowerBounds, upperBounds & neighbourListSkin are derived from."""
+        
+        return (self._sceneBounds1.attributeLabel, self._sceneBounds2.attributeLabel, self._neighbourListSkin.attributeLabel)
+    zoneLayoutAttributeLabels = property(_getZoneLayoutAttributeLabels)
 
 #####################     
     def _getAccelerationDueToGravity(self):
@@ -504,13 +541,14 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
     accelerationDueToGravity = property(_getAccelerationDueToGravity)
 
 #####################     
-    def _getListRebuildFrequency(self):
-        """Number of frames between each recalculation of which agents are nearby, in close proximity etc.
-        A lower value (higher frequency) will cause faster "reaction" times in agents, but will also increase the
-        amount of CPU calculation required."""
+    def _getNeighbourListSkin(self):
+        """Extra distance, on top of the neighbourhood size, within which other agents are kept as potential neighbours.
+        An agent's list of potential neighbours is only rebuilt after it has moved more than a third of this distance,
+        so a larger value means fewer rebuilds but more potential neighbours to check each frame.  Does not affect 
+        the results themselves - which agents are nearby, in close proximity etc. is recalculated every frame."""
         
-        return self._listRebuildFrequency.value
-    listRebuildFrequency = property(_getListRebuildFrequency)
+        return self._neighbourListSkin.value
+    neighbourListSkin = property(_getNeighbourListSkin)
 
 #####################     
     def _getUseDebugColours(self):
@@ -519,6 +557,34 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
         return self._useDebugColours.value
     useDebugColours = property(_getUseDebugColours)  
 
+#####################     
+    def _getUseBatchCalculations(self):
+        """If enabled (and NumPy is available), behaviours which support it will calculate for all their agents at
+        once using array operations, rather than one agent at a time.  Much faster for large swarms - disable
+        for debugging."""
+        
+        return self._useBatchCalculations.value
+    useBatchCalculations = property(_getUseBatchCalculations)
+    
+########
+    def _getUseParallelCalculations(self):
+        """If enabled, as well as Batch Calculations, the batch calculations (nearby agent checks included) are split 
+        up between several worker processes.  Results are exactly the same either way.  Only worthwhile for large swarms."""
+        
+        return self._useParallelCalculations.value
+    useParallelCalculations = property(_getUseParallelCalculations)
+    
+########
+    def _getFrameTimingsEnabled(self):
+        """If enabled, the time taken by each phase of each frame update is recorded (readout shows the latest frame, 
+        in milliseconds - attr=attributes, bhvr=behaviours, read=particle read, zone=zone update, calc=behaviour 
+        calculations, cmt=commit).  Recorded timings are available via the SwarmController's frameTimings."""
+        
+        return self._frameTimingsEnabled.value
+    def _setFrameTimingsEnabled(self, value):
+        self._frameTimingsEnabled.value = value
+    frameTimingsEnabled = property(_getFrameTimingsEnabled, _setFrameTimingsEnabled)
+
 #####################
     def _getQuickSetupEnableSelfCollide(self):
         """If enabled, pressing "Quick Setup" will enable self collisions on the corresponding nParticles."""
@@ -572,10 +638,12 @@ class GlobalAttributeGroup(ago.AttributeGroupObject):
     
 #####################
     def onValueChanged(self, changedAttribute):
-        super(GlobalAttributeGroup, self).onValueChanged(changedAttribute)
-        
         if(changedAttribute is self._sceneBounds1 or changedAttribute is self._sceneBounds2):
-            self._updateBoundsVectors()
+            self._updateBoundsVectors()   # (before listeners are notified, so they see the new bounds)
+        elif(changedAttribute is self._frameTimingsEnabled):
+            self.setFrameTimingsReadout("" if(self.frameTimingsEnabled) else "Off")
+            
+        super(GlobalAttributeGroup, self).onValueChanged(changedAttribute)
 
 #####################            
     def _onParticleNameChange(self, *args):
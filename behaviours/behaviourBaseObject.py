@@ -15,6 +15,12 @@ import weakref
 
 from pyswarm.pyswarmObject import PyswarmObject
 import pyswarm.vectors.vector3 as v3
+import pyswarm.vectors.vectorArrays as va
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - only needed for the batch calculation methods.
 
 
 
@@ -39,6 +45,8 @@ class BehaviourBaseObject(PyswarmObject):
     
     __metaclass__ = ABCMeta
     
+    _frameSnapshot = None   # see frameSnapshot (class-level default => also None for older saves)
+    
 ##########################
     def __init__(self, attributeGroup, delegate=None):
         if(delegate is not None and not isinstance(delegate, BehaviourDelegate)): 
@@ -46,6 +54,7 @@ class BehaviourBaseObject(PyswarmObject):
         else:
             self._delegate = weakref.ref(delegate) if(delegate is not None) else None
             self._attributeGroup = attributeGroup
+            self._frameSnapshot = None
 
 ##########################
     def __str__(self):
@@ -55,6 +64,7 @@ class BehaviourBaseObject(PyswarmObject):
     def __getstate__(self):
         state = super(BehaviourBaseObject, self).__getstate__()
         state["_delegate"] = self.delegate
+        state["_frameSnapshot"] = None   # (retaken on the next frame)
         
         return state
 
@@ -79,6 +89,22 @@ class BehaviourBaseObject(PyswarmObject):
         return self._delegate() if(self._delegate is not None) else None
     delegate = property(_getDelegate)
     
+##########################
+    def _getFrameSnapshot(self):
+        """Immutable snapshot of the swarm-wide values used by the per-agent calculations (see _makeFrameSnapshot),
+        taken at the start of each frame."""
+        if(self._frameSnapshot is None):   # i.e. onFrameUpdated not yet called
+            self._frameSnapshot = self._makeFrameSnapshot()
+        return self._frameSnapshot
+    frameSnapshot = property(_getFrameSnapshot)
+    
+########
+    def _makeFrameSnapshot(self):
+        """Override to return an immutable object (e.g. a namedtuple) holding the swarm-wide values (bounds, global
+        attribute values and so on) which subclasses read for every agent - so that, within a frame, each is a plain
+        attribute lookup rather than a chain of property calls.  Values changed mid-frame are picked up on the next."""
+        return None
+    
 ##########################
     def _notifyDelegateBehaviourEndedForAgent(self, agent, followOnBehaviourID):
         """Should be called by subclasses to notify the delegate (if one exists)
@@ -89,8 +115,9 @@ class BehaviourBaseObject(PyswarmObject):
   
 ##########################          
     def onFrameUpdated(self):
-        """Can be implemented by subclasses if necessary, to set up everything for a new frame."""
-        pass  # default does nothing
+        """Can be implemented by subclasses if necessary, to set up everything for a new frame.
+        Overriding implementations must call this one (it takes the frameSnapshot)."""
+        self._frameSnapshot = self._makeFrameSnapshot()
     
 ########
     def onCalculationsCompleted(self):
@@ -114,6 +141,18 @@ class BehaviourBaseObject(PyswarmObject):
             except:
                 pass
             agent.state.behaviourAttributes = self.attributeGroup.getDataBlobForAgent(agent)
+            
+########
+    def assignAgents(self, agentsList):
+        """Bulk equivalent of assignAgent, for large numbers of agents."""
+        newAgentsList = [agent for agent in agentsList if(agent.currentBehaviour is not self)]
+        for agent in newAgentsList:
+            agent.currentBehaviour = self
+            if(agent.state.behaviourAttributes is not None):   # (i.e. not a brand new agent)
+                agent.state.behaviourAttributes.onUnassigned()
+        
+        for agent, dataBlob in zip(newAgentsList, self.attributeGroup.getDataBlobsForAgents(newAgentsList)):
+            agent.state.behaviourAttributes = dataBlob
 
 ##########################    
     @abstractmethod
@@ -122,6 +161,64 @@ class BehaviourBaseObject(PyswarmObject):
         Should return a Vector3.
         """
         raise NotImplementedError
+    
+########
+    def _getSupportsBatchCalculation(self):
+        """Override (returning True) in subclasses which implement getDesiredAccelerationsForAgents."""
+        return False
+    supportsBatchCalculation = property(lambda obj:obj._getSupportsBatchCalculation()) # lambda needed for inheritance (see PyswarmObject.debugStr)
+    
+########
+    def getDesiredAccelerationsForAgents(self, agentsList, nearbyAgentsLists):
+        """Batch equivalent of getDesiredAccelerationForAgent - calculates behaviour for all the given
+        agents in one go.  Only used if supportsBatchCalculation is True.
+        
+        :param agentsList: list of agents, all of which are following this behaviour.
+        :param nearbyAgentsLists: list of nearby agents iterables, one per agent in agentsList.
+        :returns: (n x 3) NumPy array of desired accelerations, ordered as per agentsList.
+        """
+        raise NotImplementedError
+
+########
+    def _getSupportsParallelCalculation(self):
+        """Override (returning True) in subclasses which implement prepareBatchCalculation, calculateBatchKernel
+        & finishBatchCalculation, i.e. which can split getDesiredAccelerationsForAgents into those three stages."""
+        return False
+    supportsParallelCalculation = property(lambda obj:obj._getSupportsParallelCalculation())
+
+########
+    def prepareBatchCalculation(self, agentsList, nearbyAgentsLists, includeRegionalStats=True):
+        """First stage of a batch calculation - runs in the main process.  Does everything that needs the agents
+        themselves (e.g. updating regional stats) and gathers the inputs for calculateBatchKernel.
+        
+        :param includeRegionalStats: if False, regional stats are NOT updated here and the kernel inputs derived from 
+                                     them ("avPositions", "avVelocities", "avCrowdedPositions", "avCollisionDirections", 
+                                     "hasNeighbours", "isCrowded" & "isCollided") are left out - the ParallelCalculator 
+                                     calculates those itself, in its worker processes.
+        :returns: tuple - (desiredAccelerations, needsKernel, kernelInputs, kernelParameters), where:
+            - desiredAccelerations = (n x 3) array, ordered as per agentsList, already filled in for agents NOT needing the kernel.
+            - needsKernel = boolean array, True for each agent whose row should be filled in by the kernel.
+            - kernelInputs = dict of arrays, one row per agent needing the kernel (in the same order).
+            - kernelParameters = dict of (picklable) values which apply to all agents.
+        """
+        raise NotImplementedError
+
+########
+    @classmethod
+    def calculateBatchKernel(cls, kernelInputs, kernelParameters):
+        """Second stage of a batch calculation.  Must be a pure function of its arguments (and so deterministic),
+        with each row of the results depending only on the same row of kernelInputs - the rows may be split up
+        and calculated in separate processes.
+
+        :returns: (n x 3) NumPy array of desired accelerations, one row per row of kernelInputs.
+        """
+        raise NotImplementedError
+
+########
+    def finishBatchCalculation(self, agentsList):
+        """Third & final stage of a batch calculation - runs in the main process once every agent's regional stats
+        and desired acceleration are in, e.g. for anything that depends on both."""
+        pass
 
 ########    
     def getCompoundDesiredAcceleration(self, agent, nearbyAgentsList):
@@ -280,8 +377,111 @@ class BehaviourBaseObject(PyswarmObject):
             madeChanges = True
             
         return madeChanges
+    
+################################
+    @classmethod
+    def _clampMovementIfNecessaryBatch(cls, velocities, accelerations, desiredAccelerations, 
+                                       maxAccelerations, maxVelocities, maxTurnRates, maxTurnAngleRateOfChange, maxTurnVelocities):
+        """Array equivalent of _clampMovementIfNecessary - all arguments are either (n x 3) arrays of vectors or
+        arrays (or scalars) of per-agent values.  Returns the clamped copy of desiredAccelerations.
+        """
+        numAgents = len(velocities)
+        maxAccelerations = _AsPerAgentArray(maxAccelerations, numAgents)
+        maxVelocities = _AsPerAgentArray(maxVelocities, numAgents)
+        maxTurnRates = _AsPerAgentArray(maxTurnRates, numAgents)
+        maxTurnAngleRateOfChange = _AsPerAgentArray(maxTurnAngleRateOfChange, numAgents)
+        maxTurnVelocities = _AsPerAgentArray(maxTurnVelocities, numAgents)
+        
+        desiredAccelerations, rotationClamped = cls._clampRotationIfNecessaryBatch(velocities, accelerations, desiredAccelerations,
+                                                                                    maxAccelerations, maxTurnRates, 
+                                                                                    maxTurnAngleRateOfChange, maxTurnVelocities)
+        notClamped = ~rotationClamped
+        desiredAccelerations[notClamped] = cls._clampDesiredAccelerationIfNecessaryBatch(velocities[notClamped],
+                                                                                          desiredAccelerations[notClamped], 
+                                                                                          maxAccelerations[notClamped], 
+                                                                                          maxVelocities[notClamped])
+        return desiredAccelerations
+    
+########
+    @classmethod
+    def _clampRotationIfNecessaryBatch(cls, velocities, accelerations, desiredAccelerations, 
+                                       maxAccelerations, maxTurnAngles, maxTurnAngleRateOfChange, maxTurnVelocities):
+        """Array equivalent of _clampRotationIfNecessary. 
+        Returns tuple - (clamped copy of desiredAccelerations, boolean array with True where turn rate was clamped).
+        """
+        desiredAccelerations = np.array(desiredAccelerations, dtype=np.float64)
+        potentialVelocities = velocities + desiredAccelerations
+        desiredTurnAngles = va.AnglesTo(velocities, potentialVelocities)
+        
+        # smooth out sudden changes in direction by checking rate of change of *angular* velocity (as per scalar version)
+        checkRateOfChange = (maxAccelerations **2 > va.MagnitudesSquared(velocities))
+        previousTurnAngles = va.AnglesTo(velocities - accelerations, velocities)
+        desiredRatesOfChange = desiredTurnAngles - previousTurnAngles
+        tooFast = checkRateOfChange & (desiredRatesOfChange > maxTurnAngleRateOfChange)
+        tooSlow = checkRateOfChange & (desiredRatesOfChange < -maxTurnAngleRateOfChange)
+        limitRateOfChange = tooFast | tooSlow
+        if(limitRateOfChange.any()):
+            limitAngles = np.where(tooFast, previousTurnAngles + maxTurnAngleRateOfChange, 
+                                   previousTurnAngles - maxTurnAngleRateOfChange)
+            potentialVelocities[limitRateOfChange] = va.RotatedInHorizontal(potentialVelocities[limitRateOfChange],
+                                                                            (limitAngles - desiredTurnAngles)[limitRateOfChange])
+            accelerationMagnitudes = va.Magnitudes(desiredAccelerations[limitRateOfChange])
+            desiredAccelerations[limitRateOfChange] = va.Normalised(potentialVelocities[limitRateOfChange] - 
+                                                                    velocities[limitRateOfChange], accelerationMagnitudes)
+            desiredTurnAngles = np.where(limitRateOfChange, limitAngles, desiredTurnAngles)
+        
+        # restrict the turn rate to a maximum value, slowing to the 'turningSpeed' if at or above the max rate.
+        turningLeft = (desiredTurnAngles > maxTurnAngles)
+        turningRight = (desiredTurnAngles < -maxTurnAngles)
+        limitTurnRate = turningLeft | turningRight
+        if(limitTurnRate.any()):
+            limitAngles = np.where(turningLeft, maxTurnAngles, -maxTurnAngles)
+            potentialVelocities[limitTurnRate] = va.RotatedInHorizontal(potentialVelocities[limitTurnRate],
+                                                                        (limitAngles - desiredTurnAngles)[limitTurnRate])
+            desiredAccelerations[limitTurnRate] = cls._clampDesiredAccelerationIfNecessaryBatch(
+                velocities[limitTurnRate], potentialVelocities[limitTurnRate] - velocities[limitTurnRate],
+                maxAccelerations[limitTurnRate], maxTurnVelocities[limitTurnRate])
+        
+        return (desiredAccelerations, limitTurnRate)
+    
+########
+    @classmethod
+    def _matchPreferredVelocityIfNecessaryBatch(cls, velocities, desiredAccelerations, preferredVelocities, maxAccelerations):
+        """Array equivalent of _matchPreferredVelocityIfNecessary - returns adjusted copy of desiredAccelerations."""
+        desiredAccelerations = np.array(desiredAccelerations, dtype=np.float64)
+        accelerationMagnitudes = va.Magnitudes(desiredAccelerations)
+        
+        needsChange = ((va.Magnitudes(velocities) < preferredVelocities) & (accelerationMagnitudes < maxAccelerations))
+        isNull = needsChange & va.IsNull(desiredAccelerations)
+        desiredAccelerations[isNull] = va.Normalised(velocities[isNull], maxAccelerations[isNull])
+        
+        isNotNull = needsChange & ~isNull
+        desiredAccelerations[isNotNull] *= (maxAccelerations[isNotNull] / accelerationMagnitudes[isNotNull])[:, None]
+        
+        return desiredAccelerations
+    
+########
+    @classmethod
+    def _clampDesiredAccelerationIfNecessaryBatch(cls, velocities, desiredAccelerations, maxAccelerations, maxVelocities):
+        """Array equivalent of _clampDesiredAccelerationIfNecessary - returns clamped copy of desiredAccelerations."""
+        desiredAccelerations = va.ClampedMagnitudes(desiredAccelerations, maxAccelerations)
+        
+        desiredVelocities = velocities + desiredAccelerations
+        velocityTooHigh = (va.Magnitudes(desiredVelocities) > maxVelocities)
+        desiredAccelerations[velocityTooHigh] = (va.ClampedMagnitudes(desiredVelocities[velocityTooHigh], maxVelocities[velocityTooHigh]) - 
+                                                 velocities[velocityTooHigh])
+        
+        return desiredAccelerations
 
 
 # END OF CLASS
 #############################
 
+
+
+#############################
+def _AsPerAgentArray(value, numAgents):
+    """Broadcasts value (if a scalar) to a float array of length numAgents."""
+    return np.array(np.broadcast_to(np.asarray(value, dtype=np.float64), (numAgents,)))
+
+#############################
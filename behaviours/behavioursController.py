@@ -54,7 +54,7 @@ class BehavioursController(PyswarmObject, BehaviourDelegate):
         elif(gd.AttributesAreWorldWarZ(newAttributeGroup)):
             newBehaviour = gd.WorldWarZ(newAttributeGroup, self.defaultBehaviour, self)
         elif(fp.AttributesAreFollowPath(newAttributeGroup)):
-            newBehaviour = fp.FollowPath(newAttributeGroup, self.defaultBehaviour, self)
+            newBehaviour = fp.FollowPath(newAttributeGroup, self._attributeGroupsController, self.defaultBehaviour, self)
         else:
             raise RuntimeError("Cannot create new behavior, unrecognised attribute type: %s" % type(newAttributeGroup))
         
@@ -10,11 +10,19 @@
 # ------------------------------------------------------------
 
 
+from collections import namedtuple
 import random
 
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - batch calculations won't be available without it.
+
 from pyswarm.utils import colours
 import pyswarm.attributes.behaviour.classicBoidAttributeGroup as cb
 import pyswarm.vectors.vector3 as v3
+import pyswarm.vectors.vectorArrays as va
+import pyswarm.agents.agentArrayStore as aas
 
 from pyswarm.behaviours.behaviourBaseObject import BehaviourBaseObject
 
@@ -29,6 +37,16 @@ def AttributesAreClassicBoid(attributeGroup):
     return isinstance(attributeGroup, cb.ClassicBoidAttributeGroup)
     
 ######################
+def _RandomUniforms(lowerLimits, upperLimits, randomFractions):
+    """Array equivalent of random.uniform, given pre-drawn random.random() values (same formula, so same results)."""
+    return lowerLimits + ((upperLimits - lowerLimits) * randomFractions)
+
+######################
+_ClassicBoidFrameSnapshot = namedtuple("_ClassicBoidFrameSnapshot", ["lowerBoundsU", "lowerBoundsV", "upperBoundsU", "upperBoundsV",
+                                                                     "matchAlignmentHeadingOnly", "minVelocity", 
+                                                                     "maxTurnRateChange"])   # see ClassicBoid._makeFrameSnapshot
+
+######################
 
     
 
@@ -44,6 +62,16 @@ class ClassicBoid(BehaviourBaseObject):
         
         self._doNotClampMovement = False
         
+######################
+    def _makeFrameSnapshot(self):  # overridden BehaviourBaseObject method
+        lowerGridBounds = self._globalAttributeGroup.lowerBounds
+        upperGridBounds = self._globalAttributeGroup.upperBounds
+        
+        return _ClassicBoidFrameSnapshot(lowerGridBounds.u, lowerGridBounds.v, upperGridBounds.u, upperGridBounds.v,
+                                         bool(self.attributeGroup.matchAlignmentHeadingOnly),
+                                         self._movementAttributeGroup.minVelocity,
+                                         self._movementAttributeGroup.maxTurnRateChange)
+        
 ######################         
     def getDesiredAccelerationForAgent(self, agent, nearbyAgentsList):
         if(self.attributeGroup.shouldKickstartAgent(agent.agentId)):
@@ -55,14 +83,15 @@ class ClassicBoid(BehaviourBaseObject):
             if(not agent.isInFreefall):
                 agent.state.updateRegionalStatsIfNecessary(agent, nearbyAgentsList)
                 movementAttributes = agent.state.movementAttributes
+                frame = self.frameSnapshot
                 
-                if(self._avoidMapEdgeBehaviour(agent, desiredAcceleration)): # avoiding map edge trumps "normal" behaviour
-                    self._clampMovementIfNecessary(agent,                    # => don't do anything else if we're doing this.
+                if(self._avoidMapEdgeBehaviour(agent, desiredAcceleration, frame)): # avoiding map edge trumps "normal" behaviour
+                    self._clampMovementIfNecessary(agent,                           # => don't do anything else if we're doing this.
                                                    desiredAcceleration, 
                                                    movementAttributes.maxAcceleration, 
                                                    movementAttributes.maxVelocity, 
                                                    movementAttributes.maxTurnRate,
-                                                   self._movementAttributeGroup.maxTurnRateChange,
+                                                   frame.maxTurnRateChange,
                                                    movementAttributes.preferredTurnVelocity)
                 elif(self._avoidNearbyAgentsBehaviour(agent, desiredAcceleration)):
                     self._clampMovementIfNecessary(agent, 
@@ -70,7 +99,7 @@ class ClassicBoid(BehaviourBaseObject):
                                                    movementAttributes.maxAcceleration, 
                                                    movementAttributes.maxVelocity, 
                                                    movementAttributes.maxTurnRate,
-                                                   self._movementAttributeGroup.maxTurnRateChange,
+                                                   frame.maxTurnRateChange,
                                                    movementAttributes.preferredTurnVelocity)
                 else:
                     behaviourAttributes = agent.state.behaviourAttributes
@@ -78,17 +107,17 @@ class ClassicBoid(BehaviourBaseObject):
                     weightingTotal = 0
                     
                     if(self._avoidNearbyAgentsBehaviour(agent, tempVector)):
-                        desiredAcceleration.add(tempVector * behaviourAttributes.separationWeighting)
+                        desiredAcceleration.addScaled(tempVector, behaviourAttributes.separationWeighting)
                         weightingTotal += behaviourAttributes.separationWeighting
                         tempVector.reset()
                     
-                    if(self._matchSwarmHeadingBehaviour(agent, tempVector)):
-                        desiredAcceleration.add(tempVector * behaviourAttributes.alignmentWeighting)
+                    if(self._matchSwarmHeadingBehaviour(agent, tempVector, frame)):
+                        desiredAcceleration.addScaled(tempVector, behaviourAttributes.alignmentWeighting)
                         weightingTotal += behaviourAttributes.alignmentWeighting
                         tempVector.reset()
                         
                     if(self._matchSwarmPositionBehaviour(agent, tempVector)):   # - TODO check if we want this or not???
-                        desiredAcceleration.add(tempVector * behaviourAttributes.cohesionWeighting)
+                        desiredAcceleration.addScaled(tempVector, behaviourAttributes.cohesionWeighting)
                         weightingTotal += behaviourAttributes.cohesionWeighting
                         
                     if(weightingTotal > 0):
@@ -97,37 +126,294 @@ class ClassicBoid(BehaviourBaseObject):
                         self._searchForSwarmBehaviour(agent, desiredAcceleration)
                     
                     self._matchPreferredVelocityIfNecessary(agent, desiredAcceleration)
-                    self._kickstartAgentMovementIfNecessary(agent, desiredAcceleration)
+                    self._kickstartAgentMovementIfNecessary(agent, desiredAcceleration, frame)
                     self._clampMovementIfNecessary(agent, 
                                                    desiredAcceleration, 
                                                    movementAttributes.maxAcceleration, 
                                                    movementAttributes.maxVelocity, 
                                                    movementAttributes.maxTurnRate,
-                                                   self._movementAttributeGroup.maxTurnRateChange,
+                                                   frame.maxTurnRateChange,
                                                    movementAttributes.preferredTurnVelocity)
             self._setDebugColoursForAgent(agent)
             
             return desiredAcceleration
         
+######################
+    def _getSupportsBatchCalculation(self):
+        return va.NumpyAvailable()
+    
+    def _getSupportsParallelCalculation(self):
+        return va.NumpyAvailable()
+    
+########
+    def getDesiredAccelerationsForAgents(self, agentsList, nearbyAgentsLists):
+        """Batch (NumPy) version of getDesiredAccelerationForAgent, for all given agents at once.
+        Applies the same rules, in the same order (map edge trumps avoidance trumps flocking), as the
+        per-agent version - the only differences are rounding errors and the order of random number calls.
+        """
+        desiredAccelerations, needsKernel, kernelInputs, kernelParameters = self.prepareBatchCalculation(agentsList, 
+                                                                                                         nearbyAgentsLists)
+        if(needsKernel.any()):
+            desiredAccelerations[needsKernel] = self.calculateBatchKernel(kernelInputs, kernelParameters)
+        self.finishBatchCalculation(agentsList)
+        
+        return desiredAccelerations
+    
+########
+    def prepareBatchCalculation(self, agentsList, nearbyAgentsLists, includeRegionalStats=True):
+        """See BehaviourBaseObject.prepareBatchCalculation.  Kickstarted agents are dealt with here, as are regional
+        stats (if included) - everyone else (i.e. those not in freefall) goes through the kernel.
+        """
+        desiredAccelerations = np.zeros((len(agentsList), 3), dtype=np.float64)
+        needsKernel = np.zeros(len(agentsList), dtype=np.bool_)
+        attributeGroup = self.attributeGroup
+        
+        for index, agent in enumerate(agentsList):
+            if(attributeGroup.shouldKickstartAgent(agent.agentId)):
+                desiredAccelerations[index] = attributeGroup.getKickstartVector().valueAsTuple
+            elif(not agent.isInFreefall):
+                if(includeRegionalStats):
+                    agent.state.updateRegionalStatsIfNecessary(agent, nearbyAgentsLists[index])
+                needsKernel[index] = True
+        
+        kernelAgents = [agent for index, agent in enumerate(agentsList) if(needsKernel[index])]
+        
+        return (desiredAccelerations, needsKernel, self._gatherKernelInputs(kernelAgents, includeRegionalStats), 
+                self._gatherKernelParameters())
+    
+########
+    def finishBatchCalculation(self, agentsList):
+        """See BehaviourBaseObject.finishBatchCalculation - sets debug colours (for all but kickstarted agents)."""
+        attributeGroup = self.attributeGroup
+        for agent in agentsList:
+            if(not attributeGroup.shouldKickstartAgent(agent.agentId)):
+                self._setDebugColoursForAgent(agent)
+    
+########
+    def _gatherKernelInputs(self, agentsList, includeRegionalStats=True):
+        """Per-agent arrays needed by calculateBatchKernel (minus those from the regional stats, if not included).
+        ***ASSUMES REGIONAL STATS FOR ALL AGENTS ARE UP TO DATE***
+        
+        Random numbers are drawn here too (one per agent, in agentsList order - no agent ever needs more than one) 
+        rather than in the kernel, so that the kernel's results don't depend on how its rows are split up.
+        """
+        numAgents = len(agentsList)
+        states = [agent.state for agent in agentsList]
+        behaviourAttributes = [state.behaviourAttributes for state in states]
+        movementAttributes = [state.movementAttributes for state in states]
+        
+        kernelInputs = {}
+        for columnName in ("positions", "velocities", "accelerations"):
+            kernelInputs[columnName] = aas.VectorRowsForAgentStates(states, columnName)
+        
+        if(includeRegionalStats):
+            for columnName in ("avPositions", "avVelocities", "avCrowdedPositions", "avCollisionDirections"):
+                kernelInputs[columnName] = aas.VectorRowsForAgentStates(states, columnName)
+            kernelInputs["hasNeighbours"] = np.fromiter((bool(state.nearbyList) for state in states), np.bool_, numAgents)
+            kernelInputs["isCrowded"] = np.fromiter((bool(state.crowdedList) for state in states), np.bool_, numAgents)
+            kernelInputs["isCollided"] = np.fromiter((bool(state.collisionList) for state in states), np.bool_, numAgents)
+        
+        for inputName, attributeName in (("separationWeightings", "separationWeighting"),
+                                         ("alignmentWeightings", "alignmentWeighting"), 
+                                         ("cohesionWeightings", "cohesionWeighting"),
+                                         ("alignmentThresholds", "alignmentDirectionThreshold"),
+                                         ("cohesionThresholds", "cohesionPositionThreshold")):
+            kernelInputs[inputName] = np.fromiter((getattr(attributes, attributeName) for attributes in behaviourAttributes), 
+                                                  np.float64, numAgents)
+        for inputName, attributeName in (("maxAccelerations", "maxAcceleration"), 
+                                         ("maxVelocities", "maxVelocity"),
+                                         ("maxTurnRates", "maxTurnRate"),
+                                         ("preferredVelocities", "preferredVelocity"),
+                                         ("preferredTurnVelocities", "preferredTurnVelocity")):
+            kernelInputs[inputName] = np.fromiter((getattr(attributes, attributeName) for attributes in movementAttributes), 
+                                                  np.float64, numAgents)
+        
+        kernelInputs["randomFractions"] = np.fromiter((random.random() for _ in xrange(numAgents)), np.float64, numAgents)
+        
+        return kernelInputs
+    
+########
+    def _gatherKernelParameters(self):
+        frame = self.frameSnapshot
+        
+        return { "lowerBounds" : (frame.lowerBoundsU, frame.lowerBoundsV),
+                 "upperBounds" : (frame.upperBoundsU, frame.upperBoundsV),
+                 "matchAlignmentHeadingOnly" : frame.matchAlignmentHeadingOnly,
+                 "minVelocity" : frame.minVelocity,
+                 "maxTurnRateChange" : frame.maxTurnRateChange }
+    
+########
+    @classmethod
+    def calculateBatchKernel(cls, kernelInputs, kernelParameters):
+        """Array equivalent of the main part of getDesiredAccelerationForAgent (see _gatherKernelInputs 
+        & _gatherKernelParameters for the arguments).
+        """
+        positions = kernelInputs["positions"]
+        velocities = kernelInputs["velocities"]
+        isCrowded = kernelInputs["isCrowded"]
+        isCollided = kernelInputs["isCollided"]
+        maxAccelerations = kernelInputs["maxAccelerations"]
+        maxVelocities = kernelInputs["maxVelocities"]
+        
+        desiredAccelerations = np.zeros((len(positions), 3), dtype=np.float64)
+        
+        # avoiding map edge trumps "normal" behaviour => don't do anything else if we're doing this...
+        isAvoidingMapEdge = cls._avoidMapEdgeBehaviourBatch(positions, velocities, maxAccelerations, maxVelocities, 
+                                                             kernelParameters["lowerBounds"], kernelParameters["upperBounds"],
+                                                             desiredAccelerations)
+        
+        # ... avoiding nearby agents comes next...
+        canAvoid = ~isAvoidingMapEdge & (kernelInputs["separationWeightings"] > 0)
+        isAvoidingCollision = canAvoid & isCollided
+        isAvoidingCrowd = canAvoid & ~isCollided & isCrowded
+        if(isAvoidingCollision.any()):
+            avoidVectors = va.Normalised(-kernelInputs["avCollisionDirections"][isAvoidingCollision], 
+                                         maxAccelerations[isAvoidingCollision])
+            desiredAccelerations[isAvoidingCollision] = avoidVectors - velocities[isAvoidingCollision]
+        if(isAvoidingCrowd.any()):
+            desiredAccelerations[isAvoidingCrowd] = (positions[isAvoidingCrowd] - 
+                                                     kernelInputs["avCrowdedPositions"][isAvoidingCrowd])
+        
+        # ... and finally, "normal" flocking.
+        isFlocking = ~(isAvoidingMapEdge | isAvoidingCollision | isAvoidingCrowd)
+        if(isFlocking.any()):
+            flockingInputs = dict([(inputName, inputArray[isFlocking]) for inputName, inputArray in kernelInputs.iteritems()])
+            desiredAccelerations[isFlocking] = cls._flockingBehaviourBatch(flockingInputs, kernelParameters)
+        
+        # collision avoidance drives the velocity directly, so isn't clamped (as per _doNotClampMovement).
+        needsClamping = ~isAvoidingCollision
+        if(needsClamping.any()):
+            desiredAccelerations[needsClamping] = cls._clampMovementIfNecessaryBatch(
+                velocities[needsClamping], kernelInputs["accelerations"][needsClamping], desiredAccelerations[needsClamping], 
+                maxAccelerations[needsClamping], maxVelocities[needsClamping], kernelInputs["maxTurnRates"][needsClamping],
+                kernelParameters["maxTurnRateChange"], kernelInputs["preferredTurnVelocities"][needsClamping])
+        
+        return desiredAccelerations
+    
+########
+    @classmethod
+    def _flockingBehaviourBatch(cls, kernelInputs, kernelParameters):
+        """Array equivalent of the separation/alignment/cohesion part of getDesiredAccelerationForAgent. 
+        Note that, as with the per-agent version, separation never contributes here (agents that would separate
+        have already been dealt with by the avoidance rules) and the un-weighted alignment result is carried 
+        over into the cohesion result if matching velocity (rather than heading only).
+        """
+        positions = kernelInputs["positions"]
+        velocities = kernelInputs["velocities"]
+        hasNeighbours = kernelInputs["hasNeighbours"]
+        maxAccelerations = kernelInputs["maxAccelerations"]
+        alignmentWeightings = kernelInputs["alignmentWeightings"]
+        cohesionWeightings = kernelInputs["cohesionWeightings"]
+        avVelocities = kernelInputs["avVelocities"]
+        
+        numAgents = len(positions)
+        desiredAccelerations = np.zeros((numAgents, 3), dtype=np.float64)
+        tempVectors = np.zeros((numAgents, 3), dtype=np.float64)
+        weightingTotals = np.zeros(numAgents, dtype=np.float64)
+        
+        # alignment
+        canAlign = hasNeighbours & (alignmentWeightings > 0)
+        if(kernelParameters["matchAlignmentHeadingOnly"]):
+            desiredRotationAngles = va.AnglesTo(velocities, avVelocities)
+            isAligning = canAlign & (np.abs(desiredRotationAngles) > kernelInputs["alignmentThresholds"])
+            results = va.RotatedInHorizontal(velocities[isAligning], desiredRotationAngles[isAligning]) - velocities[isAligning]
+            desiredAccelerations[isAligning] += results * alignmentWeightings[isAligning, None]
+            weightingTotals[isAligning] += alignmentWeightings[isAligning]
+        else:
+            tempVectors[canAlign] = avVelocities[canAlign] - velocities[canAlign]
+        
+        # cohesion
+        differenceVectors = kernelInputs["avPositions"] - positions
+        isCohering = (hasNeighbours & (cohesionWeightings > 0) & 
+                      (kernelInputs["cohesionThresholds"] **2 < va.MagnitudesSquared(differenceVectors, True)))
+        tempVectors[isCohering] += differenceVectors[isCohering] * cohesionWeightings[isCohering, None]
+        desiredAccelerations[isCohering] += tempVectors[isCohering] * cohesionWeightings[isCohering, None]
+        weightingTotals[isCohering] += cohesionWeightings[isCohering]
+        
+        isWeighted = (weightingTotals > 0)
+        desiredAccelerations[isWeighted] /= weightingTotals[isWeighted, None]
+        
+        isSearching = ~isWeighted & ~hasNeighbours
+        if(isSearching.any()):
+            desiredAccelerations[isSearching] = cls._searchForSwarmBehaviourBatch(velocities[isSearching], 
+                                                                                  maxAccelerations[isSearching], 
+                                                                                  kernelInputs["maxTurnRates"][isSearching],
+                                                                                  kernelInputs["randomFractions"][isSearching])
+        
+        desiredAccelerations = cls._matchPreferredVelocityIfNecessaryBatch(velocities, desiredAccelerations, 
+                                                                           kernelInputs["preferredVelocities"], maxAccelerations)
+        
+        # kickstart (see _kickstartAgentMovementIfNecessary)
+        minVelocity = kernelParameters["minVelocity"]
+        needsKickstart = ((va.Magnitudes(desiredAccelerations) < minVelocity) & (va.Magnitudes(velocities) < minVelocity) &
+                          hasNeighbours & ~kernelInputs["isCollided"] & ~kernelInputs["isCrowded"])
+        if(needsKickstart.any()):
+            desiredAccelerations[needsKickstart] = cls._randomlyRotatedVectorsBatch(maxAccelerations[needsKickstart],
+                                                                                    kernelInputs["randomFractions"][needsKickstart])
+        
+        return desiredAccelerations
+    
+########
+    @classmethod
+    def _searchForSwarmBehaviourBatch(cls, velocities, maxAccelerations, maxTurnRates, randomFractions):
+        """Array equivalent of _searchForSwarmBehaviour, for agents with no neighbours."""
+        desiredAccelerations = np.zeros_like(velocities)
+        
+        isStationary = va.IsNull(velocities)
+        if(isStationary.any()):
+            desiredAccelerations[isStationary] = cls._randomlyRotatedVectorsBatch(maxAccelerations[isStationary],
+                                                                                  randomFractions[isStationary])
+        
+        isMoving = ~isStationary
+        if(isMoving.any()):
+            desiredRotationAngles = _RandomUniforms(-maxTurnRates[isMoving], maxTurnRates[isMoving], randomFractions[isMoving])
+            desiredAccelerations[isMoving] = velocities[isMoving] - va.RotatedInHorizontal(velocities[isMoving], 
+                                                                                            desiredRotationAngles)
+        return desiredAccelerations
+    
+########
+    @classmethod
+    def _randomlyRotatedVectorsBatch(cls, magnitudes, randomFractions):
+        """Horizontal vectors of the given magnitudes, each pointing in a random direction."""
+        vectors = np.zeros((len(magnitudes), 3), dtype=np.float64)
+        vectors[:, 0] = magnitudes
+        
+        return va.RotatedInHorizontal(vectors, _RandomUniforms(-179, 179, randomFractions))
+    
+########
+    @classmethod
+    def _avoidMapEdgeBehaviourBatch(cls, positions, velocities, maxAccelerations, maxVelocities, lowerBounds, upperBounds,
+                                    desiredAccelerations):
+        """Array equivalent of _avoidMapEdgeBehaviour - adds to desiredAccelerations in place and returns 
+        boolean array, True for each agent where changes were made.  Bounds are (u, v) tuples."""
+        madeChanges = np.zeros(len(positions), dtype=np.bool_)
+        
+        for axis, lowerBound, upperBound in ((0, lowerBounds[0], upperBounds[0]), (2, lowerBounds[1], upperBounds[1])):
+            belowLowerBound = (positions[:, axis] < lowerBound) & (velocities[:, axis] < maxVelocities)
+            aboveUpperBound = ~belowLowerBound & (upperBound < positions[:, axis]) & (-maxVelocities < velocities[:, axis])
+            desiredAccelerations[belowLowerBound, axis] += maxAccelerations[belowLowerBound]
+            desiredAccelerations[aboveUpperBound, axis] -= maxAccelerations[aboveUpperBound]
+            madeChanges |= (belowLowerBound | aboveUpperBound)
+        
+        return madeChanges
+    
 ######################         
-    def _avoidMapEdgeBehaviour(self, agent, desiredAcceleration):
+    def _avoidMapEdgeBehaviour(self, agent, desiredAcceleration, frame):
         madeChanges = False
         
-        lowerGridBounds = self._globalAttributeGroup.lowerBounds
-        upperGridBounds = self._globalAttributeGroup.upperBounds
         movementAttributes = agent.state.movementAttributes
         
-        if(agent.currentPosition.x < lowerGridBounds.u and agent.currentVelocity.x < movementAttributes.maxVelocity):
+        if(agent.currentPosition.x < frame.lowerBoundsU and agent.currentVelocity.x < movementAttributes.maxVelocity):
             desiredAcceleration.x += movementAttributes.maxAcceleration 
             madeChanges = True
-        elif(upperGridBounds.u < agent.currentPosition.x and -(movementAttributes.maxVelocity) < agent.currentVelocity.x):
+        elif(frame.upperBoundsU < agent.currentPosition.x and -(movementAttributes.maxVelocity) < agent.currentVelocity.x):
             desiredAcceleration.x -= movementAttributes.maxAcceleration
             madeChanges = True
         
-        if(agent.currentPosition.z < lowerGridBounds.v and agent.currentVelocity.z < movementAttributes.maxVelocity):
+        if(agent.currentPosition.z < frame.lowerBoundsV and agent.currentVelocity.z < movementAttributes.maxVelocity):
             desiredAcceleration.z += movementAttributes.maxAcceleration 
             madeChanges = True
-        elif(upperGridBounds.v < agent.currentPosition.z and -(movementAttributes.maxVelocity) < agent.currentVelocity.z):
+        elif(frame.upperBoundsV < agent.currentPosition.z and -(movementAttributes.maxVelocity) < agent.currentVelocity.z):
             desiredAcceleration.z -= movementAttributes.maxAcceleration
             madeChanges = True
     
@@ -166,7 +452,7 @@ class ClassicBoid(BehaviourBaseObject):
             return False
             
 ####################### 
-    def _matchSwarmHeadingBehaviour(self, agent, desiredAcceleration):
+    def _matchSwarmHeadingBehaviour(self, agent, desiredAcceleration, frame):
         """
         Adds UN-WEIGHTED alignment result to desiredAcceleration
         """
@@ -174,7 +460,7 @@ class ClassicBoid(BehaviourBaseObject):
         
         if(agent.hasNeighbours and weighting > 0):
             
-            if(self.attributeGroup.matchAlignmentHeadingOnly):
+            if(frame.matchAlignmentHeadingOnly):
                 desiredRotationAngle = agent.currentVelocity.angleTo(agent.state.avVelocity)
                 desiredAngleMagnitude = abs(desiredRotationAngle)
                 
@@ -205,7 +491,7 @@ class ClassicBoid(BehaviourBaseObject):
             if(state.behaviourAttributes.cohesionPositionThreshold **2 < distanceFromSwarmAvrgSquared):
                 differenceVector = state.avPosition - agent.currentPosition
                 
-                desiredAcceleration.add(weighting * differenceVector)
+                desiredAcceleration.addScaled(differenceVector, weighting)
                 
                 return True
 
@@ -228,22 +514,22 @@ class ClassicBoid(BehaviourBaseObject):
                 desiredRotationAngle = random.uniform(-movementAttributes.maxTurnRate, movementAttributes.maxTurnRate)
                 desiredDirection = v3.Vector3(agent.currentVelocity)
                 desiredDirection.rotateInHorizontal(desiredRotationAngle)
-                desiredAcceleration.resetToVector(agent.currentVelocity - desiredDirection)         
+                desiredAcceleration.setDifference(agent.currentVelocity, desiredDirection)         
             
             return True
 
         return False            
 
 ######################                     
-    def _kickstartAgentMovementIfNecessary(self, agent, desiredAcceleration):
+    def _kickstartAgentMovementIfNecessary(self, agent, desiredAcceleration, frame):
         """
         Occasionally a group of stationary agents can influence each other to remain still,
         collectively getting stuck.  This method corrects this behaviour.
         """
         magAccel = desiredAcceleration.magnitude()
         
-        if(magAccel < self._movementAttributeGroup.minVelocity and 
-           agent.currentVelocity.magnitude() < self._movementAttributeGroup.minVelocity and 
+        if(magAccel < frame.minVelocity and 
+           agent.currentVelocity.magnitude() < frame.minVelocity and 
            agent.hasNeighbours and not agent.isCollided and not agent.isCrowded):
             desiredAcceleration.reset(agent.state.movementAttributes.maxAcceleration, 0, 0)
             desiredHeading = random.uniform(-179, 179)
@@ -10,6 +10,8 @@
 # ------------------------------------------------------------
 
 
+from collections import namedtuple
+
 from pyswarm.utils import sceneInterface
 import pyswarm.attributes.behaviour.followPathAttributeGroup as fp
 import pyswarm.vectors.vector3 as v3
@@ -27,6 +29,10 @@ def AttributesAreFollowPath(attributeGroup):
     return (isinstance(attributeGroup, fp.FollowPathAttributeGroup))
 
 #######################
+_FollowPathFrameSnapshot = namedtuple("_FollowPathFrameSnapshot", 
+                                      ["taperStart", "taperEnd", "pathInfluenceMagnitude"])   # see FollowPath._makeFrameSnapshot
+
+#######################
 
 
 
@@ -60,7 +66,7 @@ class FollowPath(BehaviourBaseObject):
         self._endParam = 0
         self._endVector = v3.Vector3()
         
-        self._currentlyFollowingSet = set()
+        self._currentlyFollowingIds = set()
         
         self._normalBehaviour = normalBehaviorInstance
         
@@ -74,9 +80,16 @@ class FollowPath(BehaviourBaseObject):
                  self.attributeGroup.taperEnd, 
                  self.attributeGroup.pathInfluenceMagnitude))
         
+########    
+    def __setstate__(self, selfDict):
+        super(FollowPath, self).__setstate__(selfDict)
+        
+        if("_currentlyFollowingIds" not in selfDict):   # i.e. saved before membership was keyed on agent ids
+            self._currentlyFollowingIds = set([agent.agentId for agent in self.__dict__.pop("_currentlyFollowingSet")])
+        
 #############################
     def _getDebugStr(self):
-        agentStringsList = [("\n\t%s" % agent) for agent in self._currentlyFollowingSet]
+        agentStringsList = [("\n\t%d" % agentId) for agentId in sorted(self._currentlyFollowingIds)]
         
         return ("<crv=%s, strt=%s, end=%s (prm=%.2f), following:%s>" % 
                 (self._pathCurve, self._startVector, self._endVector, self._endParam, ''.join(agentStringsList)))
@@ -88,18 +101,26 @@ class FollowPath(BehaviourBaseObject):
 
 ################################      
     def _getCurrentFollowCount(self):
-        return len(self._currentlyFollowingSet)
+        return len(self._currentlyFollowingIds)
     currentFollowCount = property(_getCurrentFollowCount)
     
 ################################ 
     def onFrameUpdated(self):  # overridden BehaviourBaseObject method
         """Re-checks curve points from Maya in case the curve has moved..."""
+        super(FollowPath, self).onFrameUpdated()
+        
         if(self._pathCurve is not None):
             self._startVector = sceneInterface.Vector3FromPymelPoint(self._pathCurve.getPointAtParam(0.0, space='world'))
             self._endParam = self._pathCurve.findParamFromLength(self._pathCurve.length())
             endPoint = self._pathCurve.getPointAtParam(self._endParam, space='world')
             self._endVector = sceneInterface.Vector3FromPymelPoint(endPoint)    
             
+########
+    def _makeFrameSnapshot(self):  # overridden BehaviourBaseObject method
+        return _FollowPathFrameSnapshot(self.attributeGroup.taperStart, 
+                                        self.attributeGroup.taperEnd, 
+                                        self.attributeGroup.pathInfluenceMagnitude)
+            
 #################################
     def onAgentUpdated(self, agent):
         self._normalBehaviour.onAgentUpdated(agent)    
@@ -117,16 +138,17 @@ class FollowPath(BehaviourBaseObject):
             pyswarmCurveClosestPoint = sceneInterface.Vector3FromPymelPoint(pymelClosestCurvePoint)
             behaviourAttributes = agent.state.behaviourAttributes
             movementAttributes = agent.state.movementAttributes
+            frame = self.frameSnapshot
             
             if(pyswarmCurveClosestPoint.distanceSquaredFrom(self._endVector) < behaviourAttributes.goalDistanceThreshold **2):
                 self.endCurveBehaviourForAgent(agent)
             else:
-                self._currentlyFollowingSet.add(agent)
+                self._currentlyFollowingIds.add(agent.agentId)
                 
                 currentParamValue = self._pathCurve.getParamAtPoint(pymelClosestCurvePoint, space='world')
                 lengthAlongCurve = currentParamValue / self._endParam
-                fromStartWidth = (1 - lengthAlongCurve) * behaviourAttributes.pathDevianceThreshold * self.attributeGroup.taperStart
-                fromEndWidth = lengthAlongCurve * behaviourAttributes.pathDevianceThreshold * self.attributeGroup.taperEnd
+                fromStartWidth = (1 - lengthAlongCurve) * behaviourAttributes.pathDevianceThreshold * frame.taperStart
+                fromEndWidth = lengthAlongCurve * behaviourAttributes.pathDevianceThreshold * frame.taperEnd
                 finalWidth = fromStartWidth + fromEndWidth
                 
                 if(pyswarmCurveClosestPoint.distanceSquaredFrom(agent.currentPosition) > finalWidth **2):
@@ -137,13 +159,13 @@ class FollowPath(BehaviourBaseObject):
                     pyswarmTangentVector = sceneInterface.Vector3FromPymelVector(tangent)
                     
                     desiredAcceleration += pyswarmTangentVector
-                    desiredAcceleration.normalise(self.attributeGroup.pathInfluenceMagnitude)
+                    desiredAcceleration.normalise(frame.pathInfluenceMagnitude)
             
-            if(self.attributeGroup.pathInfluenceMagnitude < 1.0):
+            if(frame.pathInfluenceMagnitude < 1.0):
                 normalDesiredAcceleration = self._normalBehaviour.getCompoundDesiredAcceleration(agent, nearbyAgents)
-                normalBehaviourInfluence = 1 - self.attributeGroup.pathInfluenceMagnitude
+                normalBehaviourInfluence = 1 - frame.pathInfluenceMagnitude
                 normalDesiredAcceleration *= normalBehaviourInfluence
-                desiredAcceleration *= self.attributeGroup.pathInfluenceMagnitude
+                desiredAcceleration *= frame.pathInfluenceMagnitude
                 desiredAcceleration.add(normalDesiredAcceleration)
             
             self._matchPreferredVelocityIfNecessary(agent, desiredAcceleration)
@@ -156,8 +178,9 @@ class FollowPath(BehaviourBaseObject):
     
 ################################   
     def endCurveBehaviourForAgent(self, agent):
-        if(agent in self._currentlyFollowingSet):
-            self._currentlyFollowingSet.remove(agent)     
+        agentId = agent.agentId
+        if(agentId in self._currentlyFollowingIds):
+            self._currentlyFollowingIds.remove(agentId)     
             self._notifyDelegateBehaviourEndedForAgent(agent, self.attributeGroup.followOnBehaviourID)
             
 # END OF CLASS
@@ -10,6 +10,7 @@
 # ------------------------------------------------------------
 
 
+from collections import namedtuple
 import random
 
 from pyswarm.utils import colours
@@ -40,6 +41,12 @@ def AttributesAreWorldWarZ(attributeGroup):
     return (isinstance(attributeGroup, wwz.WorldWarZAttributeGroup))
 
 #######################
+_WorldWarZFrameSnapshot = namedtuple("_WorldWarZFrameSnapshot", 
+                                     ["basePyramidGoal", "wallLipHeight", "numberOfLeaders", "useInfectionSpread",
+                                      "pyramidJumpOnProbability", "basePyramidPushUpwardsForce", 
+                                      "basePyramidPushInwardsForce"])   # see WorldWarZ._makeFrameSnapshot
+
+#######################
 
 
 
@@ -92,7 +99,7 @@ class WorldWarZ(BehaviourBaseObject):
         self._baseToFinalDirection = v3.Vector3() # direction vector from baseLocator to finalLocator
         
         self._leaderPositions = []
-        self._basePyramidDistanceLookup = {}
+        self._basePyramidDistanceLookup = {}   # agentId -> distance vector from the basePyramidGoal
         
         self._normalBehaviour = normalBehaviourInstance
         
@@ -113,6 +120,14 @@ class WorldWarZ(BehaviourBaseObject):
         self._performInfectionSpreadReset = True
         self._performCollapse = False
         
+#######################
+    def __setstate__(self, selfDict):
+        super(WorldWarZ, self).__setstate__(selfDict)
+        
+        if(any([not isinstance(key, (int, long)) for key in self._basePyramidDistanceLookup])):   # i.e. saved before lookup was keyed on agent ids
+            self._basePyramidDistanceLookup = dict([(agent.agentId, distance) 
+                                                    for agent, distance in self._basePyramidDistanceLookup.iteritems()])
+        
 #######################        
     def __str__(self):            
         return ("<%s - pos=%s, lip=%s, final=%s, base->final=%s, infect=%s>" % 
@@ -126,7 +141,7 @@ class WorldWarZ(BehaviourBaseObject):
 #########    
     def _getDebugStr(self):
         leadersString = ', '.join([("%d" % agentId) for agentId in self.attributeGroup.allLeaderIds])
-        pyramidString = ''.join([("\t%s\n" % agent) for agent in self._basePyramidDistanceLookup])
+        pyramidString = ''.join([("\t%d\n" % agentId) for agentId in sorted(self._basePyramidDistanceLookup)])
         
         return ("<ldrs=%s, avDist=%s, maxDist=%s, avPos=%s\natLoctn=\n%s>" % 
                 (leadersString,
@@ -137,6 +152,7 @@ class WorldWarZ(BehaviourBaseObject):
     def onFrameUpdated(self):  # overridden BehaviourBaseObject method
         """Lists of agents must be rebuild on every frame, this method clears the lists
         and sets up everything for a new frame."""
+        super(WorldWarZ, self).onFrameUpdated()
         
         if(self.attributeGroup.useInfectionSpread):
             self._performInfectionSpreadReset = not self._infectionSpreadMode
@@ -155,6 +171,18 @@ class WorldWarZ(BehaviourBaseObject):
         # now, re-check goal location in case it's moved within the scene...  
         self._baseToFinalDirection = self.attributeGroup.finalGoal - self.attributeGroup.basePyramidGoal
 
+########
+    def _makeFrameSnapshot(self):  # overridden BehaviourBaseObject method
+        attributeGroup = self.attributeGroup
+        
+        return _WorldWarZFrameSnapshot(v3.Vector3(attributeGroup.basePyramidGoal), 
+                                       attributeGroup.wallLipGoal.y,
+                                       attributeGroup.numberOfLeaders,
+                                       attributeGroup.useInfectionSpread,
+                                       attributeGroup.pyramidJumpOnProbability,
+                                       attributeGroup.basePyramidPushUpwardsForce,
+                                       attributeGroup.basePyramidPushInwardsForce)
+
 #######################
     def onAgentUpdated(self, agent):
         """Checks current location of agent to determine appropriate list it should be put
@@ -162,7 +190,8 @@ class WorldWarZ(BehaviourBaseObject):
         """
         self._normalBehaviour.onAgentUpdated(agent)
         
-        baseToAgentVec = agent.currentPosition - self.attributeGroup.basePyramidGoal
+        frame = self.frameSnapshot
+        baseToAgentVec = agent.currentPosition - frame.basePyramidGoal
         agentAttributes = agent.state.behaviourAttributes
         agentStatus = self._effectiveGoalStatusForAgent(agent)
         
@@ -175,7 +204,7 @@ class WorldWarZ(BehaviourBaseObject):
                 # still on top of wall moving towards final goal
                 agentStatus = wwz.WorldWarZDataBlob.overWallLip
         else:
-            if(agent.currentPosition.y >= (self.attributeGroup.wallLipGoal.y - 0.1)): # TODO - make this check more robust.
+            if(agent.currentPosition.y >= (frame.wallLipHeight - 0.1)): # TODO - make this check more robust.
                 # agent has reached top of the wall, now will move twds final goal
                 agentStatus = wwz.WorldWarZDataBlob.atWallLip
             elif(baseToAgentVec.magnitudeSquared(True) < agentAttributes.pyramidJoinAtDistance **2):
@@ -209,7 +238,8 @@ class WorldWarZ(BehaviourBaseObject):
                     agentStatus = wwz.WorldWarZDataBlob.goalChase
                     
         self._setGoalStatusForAgent(agent, agentStatus, baseToAgentVec)
-        self._setDebugColourForAgent(agent)
+        if(agent.currentBehaviour is self):   # i.e. not just handed over to the follow-on behaviour at the final goal
+            self._setDebugColourForAgent(agent)
 
 #######################
     def getDesiredAccelerationForAgent(self, agent, nearbyAgentsList):  # overridden BehaviourBaseObject method
@@ -269,7 +299,7 @@ class WorldWarZ(BehaviourBaseObject):
 #######################
     def _inBasePyramidBehaviour(self, agent, desiredAcceleration):
         if(self._goalStatusForAgent(agent) == wwz.WorldWarZDataBlob.inBasePyramid):        
-            directionToGoal = self.attributeGroup.basePyramidGoal - agent.currentPosition
+            directionToGoal = self.frameSnapshot.basePyramidGoal - agent.currentPosition
             horizontalComponent = directionToGoal.horizontalVector()
             horizontalComponent.normalise(self._basePyramidPushUpwardsMagnitudeHorizontal())
             
@@ -279,7 +309,7 @@ class WorldWarZ(BehaviourBaseObject):
             if(not self._performCollapse):
                 desiredAcceleration.y = self._basePyramidPushUpwardsMagnitudeVertical()
                 
-                distance = self._basePyramidDistanceLookup[agent]
+                distance = self._basePyramidDistanceLookup[agent.agentId]
                 if(distance < self._basePyramidAverageDistance()):
                     diff = self._basePyramidAverageDistance().magnitude() - distance.magnitude()
                     proportion = diff / self._basePyramidAverageDistance().magnitude()
@@ -302,7 +332,7 @@ class WorldWarZ(BehaviourBaseObject):
                 # as the basePyramid grows in size, it's perceived 'boundary' (i.e. the position at which agents are said 
                 # to have joined the pyramid and can start their 'climbing' behaviour) is not fixed. So to determine it, we
                 # look at other agents in the immediate vicinity and see if they themselves are in the pyramid.
-                if(self._goalStatusForAgent(nearbyAgent) == wwz.WorldWarZDataBlob.inBasePyramid and 
+                if(AgentIsInBasePyramid(nearbyAgent) and   # (nearby agent may be following some other behaviour)
                    (nearbyAgent.currentPosition.distanceSquaredFrom(agent.currentPosition) < joinPyramidDistanceSquared) and
                    (nearbyAgent.currentVelocity.magnitudeSquared(True) < goalChaseSpeedSquared or # TODO - should comp-to nearbyAgent's *own* GC speed..
                     agent.currentVelocity.magnitudeSquared(True) < goalChaseSpeedSquared or 
@@ -368,10 +398,11 @@ class WorldWarZ(BehaviourBaseObject):
         """Registers agent as having arrived at the basePyramid, behaviour
         for the agent will be switched from 'goalChase' to basePyramid 'push-up' behaviour.
         """
-        if(not agent in self._basePyramidDistanceLookup):
+        agentId = agent.agentId
+        if(not agentId in self._basePyramidDistanceLookup):
             
             if(distanceVector is None):
-                distanceVector = agent.currentPosition - self.attributeGroup.basePyramidGoal
+                distanceVector = agent.currentPosition - self.frameSnapshot.basePyramidGoal
             self._agentDistance_runningTotal.u += distanceVector.magnitude(True)
             self._agentDistance_runningTotal.v += distanceVector.y
             self._needsAverageDistanceCalc = True         
@@ -384,15 +415,16 @@ class WorldWarZ(BehaviourBaseObject):
             self._agentPosition_runningTotal.add(agent.currentPosition)
             self._needsAveragePositionCalc = True   
             
-            self._basePyramidDistanceLookup[agent] = distanceVector
+            self._basePyramidDistanceLookup[agentId] = distanceVector
           
 #########
     def _deRegisterAgentFromBasePyramid(self, agent):
         """Should be called when agent leaves/falls out of basePyramid, switches out
         of 'push-up' behaviour
         """
-        if(agent in self._basePyramidDistanceLookup):            
-            distanceVec = agent.currentPosition - self.attributeGroup.basePyramidGoal
+        agentId = agent.agentId
+        if(agentId in self._basePyramidDistanceLookup):            
+            distanceVec = agent.currentPosition - self.frameSnapshot.basePyramidGoal
             self._agentDistance_runningTotal.u -= distanceVec.magnitude(True)
             self._agentDistance_runningTotal.v -= distanceVec.y
             self._needsAverageDistanceCalc = True  
@@ -400,7 +432,7 @@ class WorldWarZ(BehaviourBaseObject):
             self._agentPosition_runningTotal.subtract(agent.currentPosition)
             self._needsAveragePositionCalc = True       
             
-            del self._basePyramidDistanceLookup[agent]
+            del self._basePyramidDistanceLookup[agentId]
 
 #######################
     def _basePyramidAverageDistance(self):
@@ -434,13 +466,13 @@ class WorldWarZ(BehaviourBaseObject):
     def _basePyramidPushUpwardsMagnitudeHorizontal(self):
         """Acceleration applied by each agent in the horizontal direction (towards 
         the baseLocator) after having joined the basePyramid."""
-        return self.attributeGroup.basePyramidPushInwardsForce
+        return self.frameSnapshot.basePyramidPushInwardsForce
 
 #########     
     def _basePyramidPushUpwardsMagnitudeVertical(self):
         """Acceleration applied by each agent in the vertical direction (towards 
         the lipLocator) after having joined the basePyramid."""
-        return self.attributeGroup.basePyramidPushUpwardsForce
+        return self.frameSnapshot.basePyramidPushUpwardsForce
         
 #######################
     def _goalChaseAttractorPositionForAgent(self, agent):
@@ -448,16 +480,17 @@ class WorldWarZ(BehaviourBaseObject):
         towards (when following goalChase behaviour)."""
         
         returnValue = None
-        numLeaders = self.attributeGroup.numberOfLeaders
+        frame = self.frameSnapshot
+        numLeaders = frame.numberOfLeaders
 
         if(agent.state.behaviourAttributes.didArriveAtBasePyramid or 
            numLeaders == 0 or self.attributeGroup.agentIsLeader(agent.agentId)):
-            returnValue = self.attributeGroup.basePyramidGoal
+            returnValue = frame.basePyramidGoal
         elif(numLeaders == 1):
             returnValue = self._leaderPositions[0]
         else:
             candidateLeaderPosition = None
-            minDistanceSquared = agent.currentPosition.distanceSquaredFrom(self.attributeGroup.basePyramidGoal)
+            minDistanceSquared = agent.currentPosition.distanceSquaredFrom(frame.basePyramidGoal)
             for leaderPosition in self._leaderPositions:
                 candidateDistanceSquared = agent.currentPosition.distanceSquaredFrom(leaderPosition)
                 if(candidateDistanceSquared < minDistanceSquared):
@@ -467,9 +500,10 @@ class WorldWarZ(BehaviourBaseObject):
             if(candidateLeaderPosition is not None):
                 returnValue = candidateLeaderPosition
             else:
-                returnValue = self.attributeGroup.basePyramidGoal
+                returnValue = frame.basePyramidGoal
                 
         if(self._performCollapse):
+            returnValue = v3.Vector3(returnValue)   # (copy - must not invert the goal, or the leader's position, itself)
             returnValue.invert()        
         
         return returnValue
@@ -478,13 +512,14 @@ class WorldWarZ(BehaviourBaseObject):
     def _getShouldJump(self, agent):
         """Returns True if agent should jump up onto basePyramid, False otherwise."""
         
-        distanceVec = agent.currentPosition - self.attributeGroup.basePyramidGoal
+        frame = self.frameSnapshot
+        distanceVec = agent.currentPosition - frame.basePyramidGoal
         distance = distanceVec.magnitude(True)
         behaviourAttributes = agent.state.behaviourAttributes
         
         if(distance > behaviourAttributes.pyramidJoinAtDistance and # TODO - should add the distances here?? or not??
            distance < behaviourAttributes.pyramidJoinAtDistance + behaviourAttributes.pyramidJumpOnDistance and 
-           random.uniform(0, 1.0) < self.attributeGroup.pyramidJumpOnProbability):
+           random.uniform(0, 1.0) < frame.pyramidJumpOnProbability):
             return True
         else:
             return False
@@ -546,7 +581,7 @@ class WorldWarZ(BehaviourBaseObject):
             if(status == wwz.WorldWarZDataBlob.inBasePyramid):
                 agent.debugColour = colours.WorldWarZ_InBasePyramid(agent)
             elif(status == wwz.WorldWarZDataBlob.goalChase):
-                if(self.attributeGroup.useInfectionSpread and self.attributeGroup.agentIsLeader(agent.agentId)):
+                if(self.frameSnapshot.useInfectionSpread and self.attributeGroup.agentIsLeader(agent.agentId)):
                     agent.debugColour =  colours.WorldWarZ_IsLeader
                 else:
                     agent.debugColour = colours.WorldWarZ_ChasingGoal
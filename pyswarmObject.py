@@ -27,6 +27,8 @@ class PyswarmObject(object):
     It's purely for logging and debugging.
     """
     
+    __slots__ = ()   # so that slotted subclasses (e.g. the vectors) really have no __dict__ - others still get one as normal.
+    
     def _getDebugStr(self):
         """
         Override to provide a seperate output for self.debugStr property
@@ -25,6 +25,8 @@ import pyswarm.ui.agentSelectionWindow as asw
 import pyswarm.utils.general as util
 import pyswarm.utils.sceneInterface as scene
 import pyswarm.utils.fileLocations as fl
+import pyswarm.utils.frameTimings as ft
+import pyswarm.utils.operationCounters as oc
 import pyswarm.utils.packageInfo as pi
 
 import pyswarm.pyswarmObject as pso
@@ -271,6 +273,44 @@ def _OnFrameUpdated():
     for swarmInstance in _SwarmInstances_:
         swarmInstance._onFrameUpdated()
 
+#####
+def UpdateSwarmForFrame(attributeGroupsController, behavioursController, agentsController, frameTimer, operationCounters):
+    """
+    One frame update of a single swarm, i.e. the body of SwarmController._onFrameUpdated - reads info from the scene 
+    & updates internal state, processes the info, then updates the nParticle instance within the scene with the results.
+    Also used by the headless benchmarks (utils.benchmarks), so that they measure exactly the same pipeline.
+    
+    Frame timings & operation counts are recorded if enabled (by the global attribute group & operationCounters 
+    respectively).  Exceptions are left to the caller, which should then discard the frame from the frameTimer, 
+    operationCounters & the agentsController's behaviourProfiler.
+    """
+    globalAttributeGroup = attributeGroupsController.globalAttributeGroup
+    if(globalAttributeGroup.frameTimingsEnabled):
+        frameTimer.beginFrame(util.GetCurrentFrameNumber())
+    if(operationCounters.enabled):
+        operationCounters.beginFrame(util.GetCurrentFrameNumber())
+    
+    globalAttributeGroup.setStatusReadoutWorking(1, "Reading...")
+    
+    attributeGroupsController.onFrameUpdated()
+    frameTimer.endPhase(ft.AttributesPhase)
+    
+    if(globalAttributeGroup.enabled):
+        behavioursController.onFrameUpdated()
+        frameTimer.endPhase(ft.BehavioursPhase)
+        agentsController.onFrameUpdated()   # (times its own phases)
+    
+    globalAttributeGroup.setStatusReadoutIdle()
+    
+    attributeGroupsController.onCalculationsCompleted()
+    behavioursController.onCalculationsCompleted()
+    agentsController.onCalculationsCompleted()
+    frameTimer.endPhase(ft.CommitPhase)
+    operationCounters.endFrame()
+    
+    if(frameTimer.endFrame()):
+        globalAttributeGroup.setFrameTimingsReadout(frameTimer.readoutString())
+
 ###########################################
 _HaveRunSceneSetup = False # static to ensure that _SceneSetup operations are not duplicated
 
@@ -350,7 +390,10 @@ class SwarmController(pso.PyswarmObject, uic.UiControllerDelegate):
         
         self._attributeGroupsController = ac.AttributeGroupsController(particleShapeNode, SaveSceneToFile, boundingLocators)
         self._behavioursController = bc.BehavioursController(self._attributeGroupsController)
-        self._agentsController = agc.AgentsController(self._attributeGroupsController, self._behavioursController)
+        self._frameTimer = ft.FrameTimer()
+        self._agentsController = agc.AgentsController(self._attributeGroupsController, self._behavioursController, 
+                                                      self._frameTimer)
+        self._operationCounters = oc.OperationCounters()
         self._uiController = uic.UiController(self._attributeGroupsController, self)
         self._behaviourAssignmentSelectionWindow = asw.AgentSelectionWindow(self._attributeGroupsController.globalAttributeGroup)
         
@@ -374,6 +417,11 @@ class SwarmController(pso.PyswarmObject, uic.UiControllerDelegate):
 ########        
     def __setstate__(self, state):
         super(SwarmController, self).__setstate__(state)
+        if("_frameTimer" not in state):   # i.e. saved before frame timings were added
+            self._frameTimer = ft.FrameTimer()
+            self._agentsController.frameTimer = self._frameTimer
+        if("_operationCounters" not in state):   # i.e. saved before operation counters were added
+            self._operationCounters = oc.OperationCounters()
         self._behaviourAssignmentSelectionWindow = asw.AgentSelectionWindow(self._globalAttributeGroup)
                                                                             
         self.showUI()
@@ -393,6 +441,30 @@ class SwarmController(pso.PyswarmObject, uic.UiControllerDelegate):
         return self._attributeGroupsController
     attributeGroupsController = property(_getAttributeGroupsController)
     
+#############################    
+    def _getFrameTimings(self):
+        """List of frameTimings.FrameTiming tuples for the most recent frames (oldest first), recorded while 
+        frame timings are enabled (see enableFrameTimings)."""
+        return self._frameTimer.frameTimings
+    frameTimings = property(_getFrameTimings)
+    
+    def _getFrameTimer(self):
+        """The frameTimings.FrameTimer, for averages, readouts etc."""
+        return self._frameTimer
+    frameTimer = property(_getFrameTimer)
+    
+    def _getBehaviourProfiler(self):
+        """The behaviourProfiler.BehaviourProfiler - per-behaviour costs of recent frames (see enableBehaviourProfiling), 
+        which can be aggregated over a range of frames & exported as CSV or JSON."""
+        return self._agentsController.behaviourProfiler
+    behaviourProfiler = property(_getBehaviourProfiler)
+    
+    def _getOperationCounters(self):
+        """The operationCounters.OperationCounters - counts of the work done by the inner loops on recent frames
+        (see enableOperationCounters)."""
+        return self._operationCounters
+    operationCounters = property(_getOperationCounters)
+    
 #############################        
     def _onFrameUpdated(self):
         """
@@ -402,21 +474,12 @@ class SwarmController(pso.PyswarmObject, uic.UiControllerDelegate):
         instance within the scene with the results. 
         """
         try:
-            self._globalAttributeGroup.setStatusReadoutWorking(1, "Reading...")
-            
-            self._attributeGroupsController.onFrameUpdated()
-            
-            if(self._globalAttributeGroup.enabled):
-                self._behavioursController.onFrameUpdated()
-                self._agentsController.onFrameUpdated()
-            
-            self._globalAttributeGroup.setStatusReadoutIdle()
-            
-            self._attributeGroupsController.onCalculationsCompleted()
-            self._behavioursController.onCalculationsCompleted()
-            self._agentsController.onCalculationsCompleted()
-            
+            UpdateSwarmForFrame(self._attributeGroupsController, self._behavioursController, self._agentsController,
+                                self._frameTimer, self._operationCounters)
         except Exception as e:
+            self._frameTimer.discardFrame()
+            self._agentsController.behaviourProfiler.discardFrame()
+            self._operationCounters.discardFrame()
             self._globalAttributeGroup.setStatusReadoutError()
             util.StopPlayback()
             util.LogException(e)
@@ -442,11 +505,49 @@ class SwarmController(pso.PyswarmObject, uic.UiControllerDelegate):
         self._globalAttributeGroup.enabled = False
         util.LogInfo("updates DISABLED.", self.particleShapeName)
         
+########
+    def enableFrameTimings(self, enable=True):
+        """
+        Enables/disables recording of the time taken by each phase of each frame update.  Timings for the 
+        most recent frames are then available via the frameTimings property, and shown in the UI.
+        
+        :param enable: True == record frame timings, False == stop recording (previous timings are kept).
+        """
+        self._globalAttributeGroup.frameTimingsEnabled = enable
+        
+########
+    def enableBehaviourProfiling(self, enable=True):
+        """
+        Enables/disables recording, per behaviour, of the number of agents calculated and the time taken to 
+        calculate them on each frame, along with the time spent rebuilding neighbour lists.  Results are 
+        available via the behaviourProfiler property.
+        
+        :param enable: True == record behaviour costs, False == stop recording (previous results are kept).
+        """
+        self._agentsController.behaviourProfiler.enabled = enable
+        
+########
+    def enableOperationCounters(self, enable=True):
+        """
+        Enables/disables counting of the work done by the inner loops on each frame - candidate pairs visited
+        when building neighbour lists, crude & precise distance checks, angleTo calls, Vector3s created and
+        calls to the Maya scene.  Counts are available via the operationCounters property.
+        NOTE - counting slows updates down a little, so frame timings taken at the same time will be pessimistic.
+        
+        :param enable: True == count operations, False == stop counting (previous counts are kept).
+        """
+        self._operationCounters.enabled = enable
+        
 ########
     def _decommision(self):
         """
         Kind of a destructor, cleans up internal resources used by this SwarmController instance.
         """
+        if(self._agentsController is not None):
+            self._agentsController.onDecommissioned()
+        if(self._operationCounters is not None):
+            self._operationCounters.enabled = False
+            self._operationCounters = None
         self._attributeGroupsController = None
         self._behavioursController = None
         self._agentsController = None
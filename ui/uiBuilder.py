@@ -22,7 +22,10 @@ The module is roughly split into sections:
 """
 
 
-import pymel.core as pm
+try:
+    import pymel.core as pm
+except ImportError:
+    pm = None   # running outside of Maya - module can be imported, but UI cannot be built
 import sys
 
 import pyswarm.attributes.attributeTypes as at
@@ -1165,6 +1168,27 @@ def MakeProgressBar(initialStatus, maxValue=100, leftColumnWidth=__LEFT_COLUMN_W
     
     return (rowLayout, statusLabel, progressBar)
 
+#####################
+def MakeReadoutField(label, initialText, leftColumnWidth=__LEFT_COLUMN_WIDTH__, annotation=None):
+    """
+    Creates & returns a non-editable text field, for showing a readout which is updated from code.
+    
+    :param label: string, text for label to the left of the field.
+    :param initialText: string, initial text for the field.
+    :param leftColumnWidth: float, width of label column.
+    :param annotation: toolTip annotation, or None. 
+    """
+    rowLayout = MakeRowLayout(2, leftColumnWidth=leftColumnWidth)
+    
+    MakeText(label, annotation)
+    readoutField = pm.textField(text=initialText, editable=False)
+    if(annotation is not None):
+        readoutField.setAnnotation(annotation)
+    
+    SetAsChildLayout(rowLayout)
+    
+    return (rowLayout, readoutField)
+
 #####################    
 def GetFilePathFromUser(isReadOnly, initialFolderPath=None, fileExtensionMask=None):
     """
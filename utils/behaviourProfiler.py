@@ -0,0 +1,380 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+import collections
+import csv
+import json
+import math
+
+from pyswarm.pyswarmObject import PyswarmObject
+
+
+
+NeighbourListsId = "<Neighbour Lists>"   # "behaviour id" under which ZoneGraph neighbour list rebuilds are reported
+RegionalStatsId = "<Regional Stats>"     # ...and under which agents' nearby/crowded/collision classification is reported
+ParallelBatchesId = "<Parallel Batches>" # ...and batches done by worker processes (classification included, see ParallelCalculator)
+
+_DEFAULT_MAX_FRAMES_ = 1000
+
+_HISTOGRAM_BINS_PER_OCTAVE_ = 8     # => p95 over a range of frames is accurate to within ~9%
+_HISTOGRAM_MIN_TIME_ = 0.000001     # seconds, i.e. bin 0 is anything up to a microsecond
+_HISTOGRAM_NUM_BINS_ = 200          # ...and the last bin anything over ~30 seconds
+
+_CSV_COLUMNS_ = ("frame", "behaviourId", "agentCount", "totalMs", "meanMs", "p95Ms")
+
+
+
+#####################################
+ActiveProfiler = None   # the BehaviourProfiler profiling the current frame, if any (see AgentState.updateRegionalStatsIfNecessary).
+
+#####################################
+
+
+
+#####################################
+def _Percentile95(sortedTimes):
+    return sortedTimes[max(0, int(math.ceil(0.95 * len(sortedTimes))) - 1)] if(sortedTimes) else 0.0
+
+########
+def _HistogramBin(seconds):
+    if(seconds <= _HISTOGRAM_MIN_TIME_):
+        return 0
+    else:
+        return min(_HISTOGRAM_NUM_BINS_ - 1,
+                   int(math.ceil(math.log(seconds / _HISTOGRAM_MIN_TIME_, 2) * _HISTOGRAM_BINS_PER_OCTAVE_)))
+
+########
+def _HistogramPercentile95(histogram):
+    """Upper edge of the bin containing the 95th percentile of the given (merged) histogram - dict of bin -> count -
+    or None if it's empty."""
+    if(not histogram):
+        return None
+    
+    targetCount = math.ceil(0.95 * sum(histogram.itervalues()))
+    runningCount = 0
+    for binIndex in sorted(histogram):
+        runningCount += histogram[binIndex]
+        if(runningCount >= targetCount):
+            return _HISTOGRAM_MIN_TIME_ * (2.0 ** (float(binIndex) / _HISTOGRAM_BINS_PER_OCTAVE_))
+
+    return 0.0
+
+########
+def _MillisecondsString(seconds):
+    return ("%.4f" % (seconds * 1000.0)) if(seconds is not None) else ""
+
+#####################################
+
+
+
+#####################################
+class BehaviourCost(collections.namedtuple("BehaviourCost", ["agentCount", "totalTime", "p95Time"])):
+    """Cost of one behaviour (or of the neighbour list rebuilds, or regional stats) - times are in seconds, agentCount 
+    is the number of agents calculated (or the number of neighbour lists rebuilt, or of agents whose regional stats
+    were recalculated).  p95Time is None where there are no per-agent times - i.e. for the neighbour list rebuilds
+    & regional stats, and for behaviours whose agents were all calculated in batches (which are timed as a whole)."""
+
+    __slots__ = ()
+
+    def _getMeanTime(self):
+        return (self.totalTime / self.agentCount) if(self.agentCount) else 0.0
+    meanTime = property(_getMeanTime)
+
+# END OF CLASS - BehaviourCost
+#####################################
+
+
+
+#####################################
+class BehaviourProfile(collections.namedtuple("BehaviourProfile",
+                                              ["firstFrame", "lastFrame", "numFrames", "neighbourLists", "regionalStats",
+                                               "behaviours"])):
+    """Costs over one frame (firstFrame == lastFrame) or a range of frames.  neighbourLists is a BehaviourCost
+    for the ZoneGraph neighbour list rebuilds, regionalStats one for sorting agents' neighbour list candidates
+    into their nearby/crowded/collision lists & averages (AgentState.updateRegionalStatsIfNecessary, which the 
+    behaviours trigger), and behaviours a dict of behaviourId -> BehaviourCost for the behaviour rules alone."""
+
+    __slots__ = ()
+
+    def _getNeighbourListsTime(self):
+        """All neighbour related time - list rebuilds plus regional stats."""
+        return self.neighbourLists.totalTime + self.regionalStats.totalTime
+    neighbourListsTime = property(_getNeighbourListsTime)
+    
+    def _getBehaviourRulesTime(self):
+        return sum([behaviourCost.totalTime for behaviourCost in self.behaviours.itervalues()])
+    behaviourRulesTime = property(_getBehaviourRulesTime)
+
+# END OF CLASS - BehaviourProfile
+#####################################
+
+
+
+#####################################
+class BehaviourProfiler(PyswarmObject):
+    """
+    Attributes the time spent calculating agents' behaviour to the behaviours themselves - per behaviour id,
+    the number of agents calculated and the total & 95th percentile time per agent - as well as the time spent
+    rebuilding the ZoneGraph's neighbour lists and updating agents' regional stats from them.  One BehaviourProfile 
+    per frame is kept for the last maxFrames frames, which can be aggregated over any range of those frames & 
+    exported as CSV or JSON.
+
+    Regional stats are timed by the AgentStates themselves (via ActiveProfiler, while a frame is being profiled),
+    and that time is taken off the agent or batch time that the owner next adds - the behaviours trigger the
+    updates, but they're neighbour work rather than behaviour rules.
+    Batch calculations are timed as a whole, so only their agent count & total time are kept (i.e. they don't 
+    contribute to the p95s).  Per-frame p95s are exact, whereas those aggregated over several frames come from 
+    a log-scale histogram (see _HISTOGRAM_BINS_PER_OCTAVE_) - otherwise every agent's time for every frame would 
+    have to be kept.
+
+    Profiling is off by default.  The owner calls beginFrame only while enabled (& endFrame regardless), and only 
+    has to time anything (and call the add... methods) while isProfiling is True.  Only one frame can be profiled 
+    at a time, across all instances.  Recorded profiles are not saved with the scene.
+    """
+
+    def __init__(self, maxFrames=_DEFAULT_MAX_FRAMES_):
+        self._enabled = False
+        self._frameProfiles = collections.deque(maxlen=maxFrames)   # (BehaviourProfile, histograms) tuples
+
+        self._currentFrameNumber = None
+        self._currentAgentTimes = None   # behaviourId -> list of seconds per agent.  None => not profiling the current frame.
+        self._currentBatchTotals = None  # behaviourId -> [agent count, seconds]
+        self._currentNeighbourListsCount = 0
+        self._currentNeighbourListsTime = 0.0
+        self._currentRegionalStatsCount = 0
+        self._currentRegionalStatsTime = 0.0
+        self._pendingRegionalStatsTime = 0.0  # regional stats time not yet taken off an agent or batch time.
+
+#####################
+    def __str__(self):
+        return ("<BehaviourProfiler enabled=%s, frames=%d/%d>" %
+                ("Y" if(self._enabled) else "N", len(self._frameProfiles), self.maxFrames))
+
+########
+    def _getDebugStr(self):
+        return "\n".join([self._profileString(profile) for profile, _ in self._frameProfiles])
+
+########
+    def _profileString(self, profile):
+        behaviourStringsList = [("%s=%d/%.1fms(p95 %s)" %
+                                 (behaviourId, cost.agentCount, cost.totalTime * 1000.0, _MillisecondsString(cost.p95Time)))
+                                for behaviourId, cost in sorted(profile.behaviours.iteritems())]
+        return ("<frames %s-%s: lists=%d/%.1fms, stats=%d/%.1fms, %s>" %
+                (profile.firstFrame, profile.lastFrame, profile.neighbourLists.agentCount,
+                 profile.neighbourLists.totalTime * 1000.0, profile.regionalStats.agentCount,
+                 profile.regionalStats.totalTime * 1000.0, ", ".join(behaviourStringsList)))
+
+#####################
+    def __getstate__(self):
+        state = super(BehaviourProfiler, self).__getstate__()
+        state["_frameProfiles"] = collections.deque(maxlen=self.maxFrames)
+        state["_currentFrameNumber"] = None
+        state["_currentAgentTimes"] = None
+        state["_currentBatchTotals"] = None
+
+        return state
+
+#####################
+    def _getEnabled(self):
+        return self._enabled
+    def _setEnabled(self, value):
+        self._enabled = value
+        if(not value):
+            self.discardFrame()
+    enabled = property(_getEnabled, _setEnabled)
+
+    def _getIsProfiling(self):
+        """True between beginFrame & endFrame while enabled, i.e. when the current frame should be timed."""
+        return (self._currentAgentTimes is not None)
+    isProfiling = property(_getIsProfiling)
+
+    def _getMaxFrames(self):
+        return self._frameProfiles.maxlen
+    maxFrames = property(_getMaxFrames)
+
+    def _getFrameProfiles(self):
+        """List of per-frame BehaviourProfiles, oldest first."""
+        return [profile for profile, _ in self._frameProfiles]
+    frameProfiles = property(_getFrameProfiles)
+
+#####################
+    def beginFrame(self, frameNumber):
+        global ActiveProfiler
+        
+        self._currentFrameNumber = frameNumber
+        self._currentAgentTimes = {}
+        self._currentBatchTotals = {}
+        self._currentNeighbourListsCount = 0
+        self._currentNeighbourListsTime = 0.0
+        self._currentRegionalStatsCount = 0
+        self._currentRegionalStatsTime = 0.0
+        self._pendingRegionalStatsTime = 0.0
+        ActiveProfiler = self
+
+########
+    def addAgentTime(self, behaviourId, seconds):
+        """seconds includes any regional stats updated since the last add... call (which is taken off)."""
+        self._currentAgentTimes.setdefault(behaviourId, []).append(max(0.0, seconds - self._pendingRegionalStatsTime))
+        self._pendingRegionalStatsTime = 0.0
+
+    def addBatchTime(self, behaviourId, agentCount, seconds):
+        """As addAgentTime, for a batch of agentCount agents calculated together."""
+        if(agentCount > 0):
+            batchTotals = self._currentBatchTotals.setdefault(behaviourId, [0, 0.0])
+            batchTotals[0] += agentCount
+            batchTotals[1] += max(0.0, seconds - self._pendingRegionalStatsTime)
+        self._pendingRegionalStatsTime = 0.0
+
+    def addNeighbourListsTime(self, listsCount, seconds):
+        self._currentNeighbourListsCount += listsCount
+        self._currentNeighbourListsTime += seconds
+        
+    def addRegionalStatsTime(self, seconds):
+        """One agent's regional stats update, from within an agent or batch time that is still to be added."""
+        self._currentRegionalStatsCount += 1
+        self._currentRegionalStatsTime += seconds
+        self._pendingRegionalStatsTime += seconds
+
+########
+    def endFrame(self):
+        """Records the current frame's profile.  Returns False if the frame wasn't being profiled."""
+        if(self._currentAgentTimes is None):
+            return False
+
+        behaviourCostsLookup = {}
+        histogramsLookup = {}
+        for behaviourId in set(self._currentAgentTimes) | set(self._currentBatchTotals):
+            agentTimes = sorted(self._currentAgentTimes.get(behaviourId, ()))
+            batchCount, batchTime = self._currentBatchTotals.get(behaviourId, (0, 0.0))
+            behaviourCostsLookup[behaviourId] = BehaviourCost(len(agentTimes) + batchCount, sum(agentTimes) + batchTime,
+                                                              _Percentile95(agentTimes) if(agentTimes) else None)
+            histogram = histogramsLookup[behaviourId] = {}
+            for seconds in agentTimes:
+                binIndex = _HistogramBin(seconds)
+                histogram[binIndex] = histogram.get(binIndex, 0) + 1
+
+        neighbourListsCost = BehaviourCost(self._currentNeighbourListsCount, self._currentNeighbourListsTime, None)
+        regionalStatsCost = BehaviourCost(self._currentRegionalStatsCount, self._currentRegionalStatsTime, None)
+        profile = BehaviourProfile(self._currentFrameNumber, self._currentFrameNumber, 1,
+                                   neighbourListsCost, regionalStatsCost, behaviourCostsLookup)
+        self._frameProfiles.append((profile, histogramsLookup))
+        self.discardFrame()
+
+        return True
+
+########
+    def discardFrame(self):
+        """Stops profiling the current frame (if any) without recording it."""
+        global ActiveProfiler
+        
+        if(ActiveProfiler is self):
+            ActiveProfiler = None
+        self._currentFrameNumber = None
+        self._currentAgentTimes = None
+        self._currentBatchTotals = None
+
+########
+    def clear(self):
+        self._frameProfiles.clear()
+
+#####################
+    def aggregateProfile(self, firstFrame=None, lastFrame=None):
+        """Returns BehaviourProfile aggregated over the recorded frames from firstFrame to lastFrame inclusive
+        (None == from the first, or to the last, recorded frame), or None if no frames were recorded in that range."""
+        profilesList = self._profilesInRange(firstFrame, lastFrame)
+        if(not profilesList):
+            return None
+
+        agentCountsLookup = collections.defaultdict(int)
+        totalTimesLookup = collections.defaultdict(float)
+        histogramsLookup = collections.defaultdict(dict)
+        listsCount = statsCount = 0
+        listsTime = statsTime = 0.0
+        for profile, frameHistogramsLookup in profilesList:
+            listsCount += profile.neighbourLists.agentCount
+            listsTime += profile.neighbourLists.totalTime
+            statsCount += profile.regionalStats.agentCount
+            statsTime += profile.regionalStats.totalTime
+            for behaviourId, cost in profile.behaviours.iteritems():
+                agentCountsLookup[behaviourId] += cost.agentCount
+                totalTimesLookup[behaviourId] += cost.totalTime
+                histogram = histogramsLookup[behaviourId]
+                for binIndex, count in frameHistogramsLookup[behaviourId].iteritems():
+                    histogram[binIndex] = histogram.get(binIndex, 0) + count
+
+        behaviourCostsLookup = dict([(behaviourId, BehaviourCost(agentCountsLookup[behaviourId],
+                                                                 totalTimesLookup[behaviourId],
+                                                                 _HistogramPercentile95(histogram)))
+                                     for behaviourId, histogram in histogramsLookup.iteritems()])
+
+        return BehaviourProfile(profilesList[0][0].firstFrame, profilesList[-1][0].lastFrame, len(profilesList),
+                                BehaviourCost(listsCount, listsTime, None), BehaviourCost(statsCount, statsTime, None),
+                                behaviourCostsLookup)
+
+########
+    def _profilesInRange(self, firstFrame, lastFrame):
+        return [(profile, histogramsLookup) for profile, histogramsLookup in self._frameProfiles
+                if((firstFrame is None or profile.firstFrame >= firstFrame) and
+                   (lastFrame is None or profile.lastFrame <= lastFrame))]
+
+#####################
+    def exportCsv(self, filePath, firstFrame=None, lastFrame=None):
+        """Writes one row per behaviour (and one each for the neighbour lists & regional stats) per frame, followed 
+        by the same aggregated over all of those frames (with frame == "all").  p95s are blank where not available."""
+        profilesList = [profile for profile, _ in self._profilesInRange(firstFrame, lastFrame)]
+        aggregateProfile = self.aggregateProfile(firstFrame, lastFrame)
+        if(aggregateProfile is not None):
+            profilesList.append(aggregateProfile)
+
+        with open(filePath, "wb") as csvFile:
+            csvWriter = csv.writer(csvFile)
+            csvWriter.writerow(_CSV_COLUMNS_)
+            for profile in profilesList:
+                frameLabel = profile.firstFrame if(profile.numFrames == 1) else "all"
+                costsList = ([(NeighbourListsId, profile.neighbourLists), (RegionalStatsId, profile.regionalStats)] + 
+                             sorted(profile.behaviours.iteritems()))
+                for behaviourId, cost in costsList:
+                    csvWriter.writerow((frameLabel, behaviourId, cost.agentCount, _MillisecondsString(cost.totalTime),
+                                        _MillisecondsString(cost.meanTime), _MillisecondsString(cost.p95Time)))
+
+########
+    def exportJson(self, filePath, firstFrame=None, lastFrame=None):
+        """Writes {"frames" : [per-frame profile, ...], "aggregate" : profile over all of those frames}."""
+        exportDict = { "frames" : [self._profileDict(profile)
+                                   for profile, _ in self._profilesInRange(firstFrame, lastFrame)],
+                       "aggregate" : self._profileDict(self.aggregateProfile(firstFrame, lastFrame)) }
+
+        with open(filePath, "w") as jsonFile:
+            json.dump(exportDict, jsonFile, indent=2, sort_keys=True)
+
+########
+    def _profileDict(self, profile):
+        if(profile is None):
+            return None
+
+        return { "firstFrame" : profile.firstFrame,
+                 "lastFrame" : profile.lastFrame,
+                 "numFrames" : profile.numFrames,
+                 "neighbourLists" : self._costDict(profile.neighbourLists),
+                 "regionalStats" : self._costDict(profile.regionalStats),
+                 "behaviourRulesMs" : profile.behaviourRulesTime * 1000.0,
+                 "behaviours" : dict([(behaviourId, self._costDict(cost))
+                                      for behaviourId, cost in profile.behaviours.iteritems()]) }
+
+    def _costDict(self, cost):
+        return { "agentCount" : cost.agentCount,
+                 "totalMs" : cost.totalTime * 1000.0,
+                 "meanMs" : cost.meanTime * 1000.0,
+                 "p95Ms" : (cost.p95Time * 1000.0) if(cost.p95Time is not None) else None }
+
+# END OF CLASS - BehaviourProfiler
+#####################################
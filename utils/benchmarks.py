@@ -0,0 +1,755 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Headless benchmark suite - runs the real AttributeGroupsController/BehavioursController/AgentsController
+stack against the headless scene backend (i.e. no Maya) for a set of canned scenarios, so that optimisation
+work can be compared on the same footing.
+
+Each scenario is parameterised (see BenchmarkParameters) by agent count, neighbourhood size and neighbour list
+skin (which determines how often neighbour lists get rebuilt - a larger skin means fewer rebuilds but longer
+lists), and reports per-phase frame times (see frameTimings.AllPhases) and peak memory - plus, optionally, the
+number of objects allocated per frame and counts of the work done by the inner loops (see operationCounters).
+
+Typical usage, from Python:
+    import pyswarm.utils.benchmarks as bm
+
+    result = bm.RunBenchmark(bm.ScenarioWithName("mosh-pit"), bm.BenchmarkParameters(agentCount=5000))
+    print bm.ResultsTableString([result])
+
+...or from the command line (with the folder containing the pyswarm package on the PYTHONPATH):
+    python -m pyswarm.utils.benchmarks --agents 1000 10000 --scenario sparse-flock mosh-pit
+
+Note that peak memory is the high-water mark for the whole process - so, from the command line, each run is
+made in a fresh process unless --in-process is given.
+
+CheckParallelCalculations (or --check-parallel) runs each scenario with & without the parallel calculations and
+checks that the results are exactly the same.
+"""
+
+
+import argparse
+import collections
+import gc
+import json
+import math
+import os
+import os.path as osp
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    import resource
+except ImportError:     # i.e. Windows
+    resource = None
+
+from pyswarm.pyswarmObject import PyswarmObject
+import pyswarm.utils.fileLocations as fl
+import pyswarm.utils.frameTimings as ft
+import pyswarm.utils.operationCounters as oc
+import pyswarm.utils.headlessSceneBackend as hsb
+import pyswarm.utils.sceneInterface as scene
+import pyswarm.attributes.attributeGroupsController as agc
+import pyswarm.behaviours.behavioursController as bc
+import pyswarm.behaviours.classicBoid as cb
+import pyswarm.behaviours.worldWarZ as gd
+import pyswarm.behaviours.followPath as fp
+import pyswarm.agents.agentsController as ac
+import pyswarm.swarmController as sc
+
+
+
+_MODULE_NAME_ = "pyswarm.utils.benchmarks"    # (for running in a new process - __name__ is "__main__" when run as a script)
+_PARTICLE_SHAPE_NAME_ = "benchmarkParticleShape"
+_TIME_STEP_ = 1.0 / 24.0
+
+_DEFAULT_AGENT_COUNTS_ = (1000, 10000, 100000)
+
+
+
+#####################################
+def PeakMemoryUsageKb():
+    """Peak resident set size of this process so far, in kilobytes, or None if not available on this platform."""
+    if(resource is None):
+        return None
+
+    peakUsage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peakUsage / 1024) if(sys.platform == "darwin") else peakUsage    # (OSX reports bytes, Linux kilobytes)
+
+#####################################
+
+
+
+#####################################
+class BenchmarkParameters(collections.namedtuple("BenchmarkParameters",
+                                                 ["agentCount", "neighbourhoodSize", "neighbourListSkin",
+                                                  "numFrames", "warmUpFrames", "randomSeed"])):
+    """Parameters for a single benchmark run.  Warm-up frames are run (but not timed) before the timed frames."""
+
+    __slots__ = ()
+
+    def __new__(cls, agentCount=1000, neighbourhoodSize=4.0, neighbourListSkin=1.0,
+                numFrames=20, warmUpFrames=3, randomSeed=1):
+        return super(BenchmarkParameters, cls).__new__(cls, agentCount, neighbourhoodSize, neighbourListSkin,
+                                                       numFrames, warmUpFrames, randomSeed)
+
+# END OF CLASS - BenchmarkParameters
+#####################################
+
+
+
+#####################################
+class BenchmarkResult(collections.namedtuple("BenchmarkResult",
+                                             ["scenarioName", "parameters", "frameTimings", "averageFrameTiming",
+                                              "peakMemoryKb", "finalAgentCount", "objectsAllocatedPerFrame",
+                                              "averageOperationCounts", "errorString"])):
+    """Results of a single benchmark run - frameTimings is the list of FrameTimings for each of the timed frames.
+    objectsAllocatedPerFrame is None unless the run was made with countObjects=True, and averageOperationCounts
+    (a dict of operationCounters counter name -> mean count per frame) is None unless made with countOperations=True
+    (see RunBenchmark).
+    If the run failed, errorString describes why (and the timings are for whichever frames completed beforehand)."""
+
+    __slots__ = ()
+
+    def _getSucceeded(self):
+        return (self.errorString is None)
+    succeeded = property(_getSucceeded)
+
+    def _getMeanFrameTime(self):
+        """Mean total (wall-clock) frame time, in seconds, or None if no frames were timed."""
+        return self.averageFrameTiming.totalWallTime if(self.averageFrameTiming is not None) else None
+    meanFrameTime = property(_getMeanFrameTime)
+
+    def _getMedianFrameTime(self):
+        """Median total (wall-clock) frame time, in seconds, or None if no frames were timed."""
+        return self.frameTimePercentile(0.5)
+    medianFrameTime = property(_getMedianFrameTime)
+
+    def _getP95FrameTime(self):
+        """95th percentile total (wall-clock) frame time, in seconds, or None if no frames were timed."""
+        return self.frameTimePercentile(0.95)
+    p95FrameTime = property(_getP95FrameTime)
+
+########
+    def frameTimePercentile(self, fraction):
+        """Nearest-rank percentile (fraction between 0 and 1) of the total frame times, or None if no frames were timed."""
+        frameTimes = sorted([frameTiming.totalWallTime for frameTiming in self.frameTimings])
+        if(not frameTimes):
+            return None
+
+        return frameTimes[max(0, int(math.ceil(fraction * len(frameTimes))) - 1)]
+
+# END OF CLASS - BenchmarkResult
+#####################################
+
+
+
+#####################################
+class BenchmarkRun(PyswarmObject):
+    """The scene and controllers for a single run of a scenario - passed to the scenario's hooks."""
+
+    def __init__(self, scenario, parameters, countObjects=False, countOperations=False, useParallelCalculations=None):
+        """If useParallelCalculations is not None, batch calculations are turned on - with or without the parallel
+        calculations - rather than being left as per the attribute defaults."""
+        self.scenario = scenario
+        self.parameters = parameters
+        self.random = random.Random(parameters.randomSeed)
+        self.objectCountsList = [] if(countObjects) else None   # objects allocated on each timed frame
+        self.countOperations = countOperations
+        self.operationCounters = oc.OperationCounters(parameters.numFrames)   # (enabled from the first timed frame)
+        self.finalParticlesString = None        # } set by onFinished
+        self.usedParallelCalculations = False   # }
+
+        self.backend = hsb.HeadlessSceneBackend(timeStep=_TIME_STEP_)
+        scene.SetSceneBackend(self.backend)
+        positionsList, velocitiesList = scenario.initialParticles(self)
+        self.particleShape = self.backend.addParticleShape(_PARTICLE_SHAPE_NAME_, positionsList, velocitiesList)
+
+        self.frameTimer = ft.FrameTimer(parameters.numFrames)
+        self.attributeGroupsController = agc.AttributeGroupsController(_PARTICLE_SHAPE_NAME_, lambda: None)
+        globalAttributes = self.attributeGroupsController.globalAttributeGroup
+        globalAttributes._neighbourListSkin.value = parameters.neighbourListSkin
+        globalAttributes._useDebugColours.value = False   # (one more scene call per agent per frame otherwise)
+        self.attributeGroupsController.agentPerceptionAttributeGroup._neighbourhoodSize.value = parameters.neighbourhoodSize
+        if(useParallelCalculations is not None):
+            globalAttributes._useBatchCalculations.value = True
+            globalAttributes._useParallelCalculations.value = useParallelCalculations
+
+        self.behavioursController = bc.BehavioursController(self.attributeGroupsController)
+        self.agentsController = ac.AgentsController(self.attributeGroupsController, self.behavioursController,
+                                                    frameTimer=self.frameTimer)
+        self.agentsController._buildParticleList()   # (as SwarmController does - so the agents exist for scenario.setUp)
+
+#####################
+    def __str__(self):
+        return ("<BenchmarkRun \"%s\", %s, frame=%d>" %
+                (self.scenario.name, self.parameters, self.backend.currentFrame))
+
+#####################
+    def addBehaviour(self, attributeGroup):
+        """Creates the behaviour for a newly added attribute group (as the SwarmController would), and returns it."""
+        self.behavioursController.createBehaviourForNewAttributeGroup(attributeGroup)
+        return self.behavioursController.behaviourWithId(attributeGroup.behaviourId)
+
+#####################
+    def runFrame(self, timed):
+        """Does one frame update, via the same function as SwarmController._onFrameUpdated, then advances the scene."""
+        self.attributeGroupsController.globalAttributeGroup.frameTimingsEnabled = timed
+        if(timed and self.countOperations):
+            self.operationCounters.enabled = True
+        countObjects = (timed and self.objectCountsList is not None)
+        if(countObjects):
+            numObjectsBefore = len(gc.get_objects())
+        
+        sc.UpdateSwarmForFrame(self.attributeGroupsController, self.behavioursController, self.agentsController,
+                               self.frameTimer, self.operationCounters)
+        
+        if(countObjects):
+            self.objectCountsList.append(len(gc.get_objects()) - numObjectsBefore)
+        self._checkPerceptionTable()
+
+        self.backend.advanceFrame()
+
+########
+    def _checkPerceptionTable(self):
+        """The PerceptionTable should have exactly one row per agent, however many have come & gone."""
+        numRows = len(self.attributeGroupsController.agentPerceptionAttributeGroup.perceptionTable)
+        numAgents = len(self.agentsController.allAgents)
+        if(numRows != numAgents):
+            raise RuntimeError("PerceptionTable has %d rows for %d agents" % (numRows, numAgents))
+
+#####################
+    def onFinished(self):
+        self.finalParticlesString = repr((self.particleShape.positionsList(), self.particleShape.velocitiesList()))
+        self.usedParallelCalculations = self.agentsController.parallelCalculator.isRunning   # (i.e. workers still up)
+        self.frameTimer.discardFrame()
+        self.agentsController.behaviourProfiler.discardFrame()
+        self.operationCounters.enabled = False   # (also discards any unfinished frame)
+        self.agentsController.onDecommissioned()
+
+# END OF CLASS - BenchmarkRun
+#####################################
+
+
+
+#####################################
+class BenchmarkScenario(PyswarmObject):
+    """
+    Base class for the canned scenarios.  Subclasses must set name & description, and implement initialParticles.
+    Agents are spread over a square on the ground plane whose size is scaled with the agent count, so that
+    the density of a scenario (and so the number of neighbours per agent) stays the same whatever the count.
+    """
+
+    name = None
+    description = None
+    agentSpacing = 1.0    # average distance between neighbouring agents
+    behaviourType = cb.ClassicBoid   # behaviour the agents should all have once set up (checked by RunBenchmark)
+
+    def __str__(self):
+        return ("<%s \"%s\">" % (type(self).__name__, self.name))
+
+#####################
+    def initialParticles(self, run):
+        """Returns (positionsList, velocitiesList) - lists of (x, y, z) tuples - of the particles present at the start."""
+        raise NotImplementedError
+
+########
+    def setUp(self, run):
+        """Called once the run's controllers (and the initial agents) have been created, e.g. to add behaviours. 
+        Default does nothing."""
+        pass
+
+########
+    def onFrameStarted(self, run):
+        """Called (untimed) before each frame update, e.g. to emit or kill particles. Default does nothing."""
+        pass
+
+#####################
+    def _regionHalfWidth(self, agentCount):
+        return 0.5 * self.agentSpacing * math.sqrt(agentCount)
+
+########
+    def _randomPositions(self, run, agentCount, centre=(0.0, 0.0)):
+        halfWidth = self._regionHalfWidth(agentCount)
+        uniform = run.random.uniform
+        return [(centre[0] + uniform(-halfWidth, halfWidth), 0.0, centre[1] + uniform(-halfWidth, halfWidth))
+                for _ in xrange(agentCount)]
+
+########
+    def _randomVelocities(self, run, agentCount, speed, heading=None):
+        """Random velocities on the ground plane, either in any direction or roughly (+/- 45 degrees) along the
+        given heading (in radians)."""
+        velocitiesList = []
+        for _ in xrange(agentCount):
+            if(heading is None):
+                angle = run.random.uniform(0.0, 2.0 * math.pi)
+            else:
+                angle = heading + run.random.uniform(-0.25 * math.pi, 0.25 * math.pi)
+            velocitiesList.append((speed * math.cos(angle), 0.0, speed * math.sin(angle)))
+
+        return velocitiesList
+
+# END OF CLASS - BenchmarkScenario
+#####################################
+
+
+
+#####################################
+class SparseFlockScenario(BenchmarkScenario):
+
+    name = "sparse-flock"
+    description = "Classic boids, spread out & heading roughly the same way - few neighbours per agent."
+    agentSpacing = 4.0
+
+    def initialParticles(self, run):
+        agentCount = run.parameters.agentCount
+        return (self._randomPositions(run, agentCount), self._randomVelocities(run, agentCount, 2.0, heading=0.0))
+
+# END OF CLASS - SparseFlockScenario
+#####################################
+
+
+
+#####################################
+class MoshPitScenario(BenchmarkScenario):
+
+    name = "mosh-pit"
+    description = "Classic boids, densely packed & milling about in all directions - lots of neighbours, lots of rebuilds."
+    agentSpacing = 0.75
+
+    def initialParticles(self, run):
+        agentCount = run.parameters.agentCount
+        return (self._randomPositions(run, agentCount), self._randomVelocities(run, agentCount, 4.0))
+
+# END OF CLASS - MoshPitScenario
+#####################################
+
+
+
+#####################################
+class WorldWarZPileUpScenario(BenchmarkScenario):
+
+    name = "wwz-pile-up"
+    description = "Every agent following a World War Z behaviour, converging on a wall at the edge of the crowd."
+    agentSpacing = 1.0
+    behaviourType = gd.WorldWarZ
+
+    def initialParticles(self, run):
+        agentCount = run.parameters.agentCount
+        return (self._randomPositions(run, agentCount), self._randomVelocities(run, agentCount, 2.0, heading=0.0))
+
+########
+    def setUp(self, run):
+        # wall is just beyond the +x edge of the crowd, with the final goal further out still - so the
+        # agents pile up at the base of the wall rather than immediately reaching the final goal.
+        wallDistance = self._regionHalfWidth(run.parameters.agentCount) + 5.0
+        attributeGroup = run.attributeGroupsController.addWorldWarZAttributeGroup(wallLipGoal=(wallDistance, 10.0, 0.0),
+                                                                                 basePyramidGoalHeight=None,
+                                                                                 finalGoal=(wallDistance + 10.0, 10.0, 0.0))
+        behaviour = run.addBehaviour(attributeGroup)
+        behaviour.assignAgents(list(run.agentsController.allAgents))
+
+# END OF CLASS - WorldWarZPileUpScenario
+#####################################
+
+
+
+#####################################
+class FollowPathStreamScenario(BenchmarkScenario):
+
+    name = "follow-path-stream"
+    description = "Every agent following a FollowPath behaviour, streaming along a curve across the crowd."
+    agentSpacing = 1.0
+    behaviourType = fp.FollowPath
+
+    def initialParticles(self, run):
+        agentCount = run.parameters.agentCount
+        return (self._randomPositions(run, agentCount), self._randomVelocities(run, agentCount, 2.0, heading=0.0))
+
+########
+    def setUp(self, run):
+        # gently winding curve from one side of the crowd to well beyond the other (so few agents reach the end)
+        halfWidth = self._regionHalfWidth(run.parameters.agentCount)
+        numPoints = 8
+        curvePoints = [(-halfWidth + (4.0 * halfWidth * index / (numPoints - 1)), 0.0,
+                        0.25 * halfWidth * math.sin(index * math.pi / 2.0))
+                       for index in xrange(numPoints)]
+        curve = run.backend.addCurve("benchmarkCurve", curvePoints)
+
+        attributeGroup = run.attributeGroupsController.addFollowPathAttributeGroup(curve)
+        behaviour = run.addBehaviour(attributeGroup)
+        behaviour.assignAgents(list(run.agentsController.allAgents))
+
+# END OF CLASS - FollowPathStreamScenario
+#####################################
+
+
+
+#####################################
+class EmitterScenario(BenchmarkScenario):
+
+    name = "emitter"
+    description = ("Classic boids, with particles continually spawned at an emitter & the oldest killed off - "
+                   "exercises agent creation/deletion & zone graph upkeep.")
+    agentSpacing = 1.0
+    turnoverPerBurst = 0.04     # fraction of the agent count emitted (and killed) every other frame
+
+    def initialParticles(self, run):
+        agentCount = run.parameters.agentCount
+        return (self._randomPositions(run, agentCount), self._randomVelocities(run, agentCount, 2.0))
+
+########
+    def onFrameStarted(self, run):
+        # AgentsController only picks up births/deaths on frames where the particle count changes (and only in
+        # one direction), so new particles appear on one frame & the killed ones disappear on the next.
+        if(run.backend.currentFrame % 2):
+            return
+
+        numParticles = max(1, int(run.parameters.agentCount * self.turnoverPerBurst))
+        particleShape = run.particleShape
+        for particleId in particleShape.particleIdsList()[:numParticles]:
+            particleShape.kill(particleId)  # (takes effect after the next frame, as with Maya)
+
+        emitterPosition = (0.0, 0.0, 0.0)
+        particleShape.emit([emitterPosition] * numParticles, self._randomVelocities(run, numParticles, 6.0))
+
+# END OF CLASS - EmitterScenario
+#####################################
+
+
+
+#####################################
+AllScenarios = (SparseFlockScenario(), MoshPitScenario(), WorldWarZPileUpScenario(),
+                FollowPathStreamScenario(), EmitterScenario())
+
+########
+def ScenarioWithName(name):
+    for scenario in AllScenarios:
+        if(scenario.name == name):
+            return scenario
+
+    raise ValueError("Unrecognised benchmark scenario: %s (available: %s)" %
+                     (name, ", ".join([scenario.name for scenario in AllScenarios])))
+
+#####################################
+
+
+
+#####################################
+def RunBenchmark(scenario, parameters=BenchmarkParameters(), countObjects=False, countOperations=False):
+    """Runs the given scenario in this process, returning a BenchmarkResult.
+    Uses a temporary copy of the attribute defaults file, and restores the previous scene backend afterwards.
+    
+    If countObjects is True, also counts objects allocated per frame - NOTE this is the *net* increase in
+    garbage-collector-tracked objects (containers, class instances etc.) over the frame, as Python 2 has no
+    count of all allocations; temporaries freed within the frame aren't included. (Counting is done outside
+    of the frame timings, but does slow the run down somewhat.)
+    If countOperations is True, also counts the work done by the inner loops on each timed frame (see
+    operationCounters) - NOTE this is done *within* the frame timings, so they'll be somewhat pessimistic."""
+    run, errorString = _RunScenario(scenario, parameters, countObjects, countOperations)
+
+    frameTimer = run.frameTimer if(run is not None) else ft.FrameTimer()
+    objectCountsList = run.objectCountsList if(run is not None) else None
+    objectsAllocatedPerFrame = (float(sum(objectCountsList)) / len(objectCountsList)) if(objectCountsList) else None
+    averageOperationCounts = run.operationCounters.averageCounts() if(run is not None and countOperations) else None
+    
+    return BenchmarkResult(scenario.name, parameters, frameTimer.frameTimings, frameTimer.averageFrameTiming(),
+                           PeakMemoryUsageKb(), (run.particleShape.getCount() if(run is not None) else 0),
+                           objectsAllocatedPerFrame, 
+                           (averageOperationCounts.counts if(averageOperationCounts is not None) else None),
+                           errorString)
+
+########
+def CheckParallelCalculations(scenario, parameters=BenchmarkParameters()):
+    """Runs the given scenario twice in this process, with the same seed - once with batch calculations in the main
+    process, once with the parallel calculations - and returns None if the particles end up in exactly the same
+    place with exactly the same velocities, or a string describing the problem if not.
+    NOTE the parallel calculations only kick in for large enough swarms (see parallelCalculator._MIN_ROWS_PER_TILE_)."""
+    serialRun, errorString = _RunScenario(scenario, parameters, useParallelCalculations=False)
+    if(errorString is not None):
+        return "Serial run failed - %s" % errorString
+    parallelRun, errorString = _RunScenario(scenario, parameters, useParallelCalculations=True)
+    if(errorString is not None):
+        return "Parallel run failed - %s" % errorString
+    elif(parallelRun.finalParticlesString != serialRun.finalParticlesString):
+        return "Final particle positions/velocities differ"
+    elif(not parallelRun.usedParallelCalculations and
+         any([agent.currentBehaviour.supportsParallelCalculation for agent in parallelRun.agentsController.allAgents])):
+        return "Parallel calculations weren't used (too few agents?)"
+    else:
+        return None   # (including scenarios whose behaviours can't be calculated in parallel at all - nothing to compare)
+
+########
+def _CheckAgentsBehaviour(run):
+    """Raises RuntimeError unless every agent has the behaviour the scenario intends for it, once set up."""
+    agentsList = run.agentsController.allAgents
+    behaviourType = run.scenario.behaviourType
+    numWrongAgents = len([agent for agent in agentsList if(not isinstance(agent.currentBehaviour, behaviourType))])
+    if(not agentsList or numWrongAgents):
+        raise RuntimeError("%d of %d agents don't have a %s behaviour after setting up \"%s\"" %
+                           (numWrongAgents, len(agentsList), behaviourType.__name__, run.scenario.name))
+
+########
+def _RunScenario(scenario, parameters, countObjects=False, countOperations=False, useParallelCalculations=None):
+    """Does the run for RunBenchmark & CheckParallelCalculations - returns (BenchmarkRun, error string or None)."""
+    previousBackend = scene.GetSceneBackend()
+    tempDirectory = tempfile.mkdtemp(prefix="pyswarmBenchmark")
+    defaultsFilePath = osp.join(tempDirectory, osp.basename(fl.DefaultAttributeValuesLocation()))
+    shutil.copyfile(fl.DefaultAttributeValuesLocation(), defaultsFilePath)
+    fl.SetDefaultAttributeValuesLocation(defaultsFilePath)
+
+    random.seed(parameters.randomSeed)  # (some behaviours use the global random generator)
+    run = None
+    errorString = None
+    try:
+        run = BenchmarkRun(scenario, parameters, countObjects, countOperations, useParallelCalculations)
+        scenario.setUp(run)
+        _CheckAgentsBehaviour(run)
+        for frameIndex in xrange(parameters.warmUpFrames + parameters.numFrames):
+            scenario.onFrameStarted(run)
+            run.runFrame(frameIndex >= parameters.warmUpFrames)
+    except Exception as e:
+        errorString = "%s: %s" % (type(e).__name__, e)
+    finally:
+        if(run is not None):
+            run.onFinished()
+        fl.SetDefaultAttributeValuesLocation(None)
+        scene.SetSceneBackend(previousBackend)
+        shutil.rmtree(tempDirectory, ignore_errors=True)
+
+    return (run, errorString)
+
+########
+def RunBenchmarkInNewProcess(scenario, parameters=BenchmarkParameters(), countObjects=False, countOperations=False):
+    """As RunBenchmark, but in a fresh Python process - so that the peak memory figure is for this run alone."""
+    packageParentDirectory = osp.dirname(osp.dirname(osp.dirname(osp.abspath(__file__))))
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join([packageParentDirectory] +
+                                                ([environment["PYTHONPATH"]] if(environment.get("PYTHONPATH")) else []))
+
+    resultsFileHandle, resultsFilePath = tempfile.mkstemp(suffix=".json", prefix="pyswarmBenchmark")
+    os.close(resultsFileHandle)
+    try:
+        commandLine = [sys.executable, "-m", _MODULE_NAME_, "--in-process", "--quiet",
+                       "--scenario", scenario.name,
+                       "--agents", str(parameters.agentCount),
+                       "--neighbourhood", str(parameters.neighbourhoodSize),
+                       "--skin", str(parameters.neighbourListSkin),
+                       "--frames", str(parameters.numFrames),
+                       "--warm-up", str(parameters.warmUpFrames),
+                       "--seed", str(parameters.randomSeed),
+                       "--json", resultsFilePath] + (["--count-objects"] if(countObjects) else []) + \
+                      (["--count-operations"] if(countOperations) else [])
+        returnCode = subprocess.call(commandLine, env=environment)
+        if(osp.getsize(resultsFilePath) == 0):
+            return BenchmarkResult(scenario.name, parameters, [], None, None, 0, None, None,
+                                   "Benchmark process exited with code %d" % returnCode)
+
+        return ImportResultsJson(resultsFilePath)[0]   # (failed runs still write their results)
+    finally:
+        os.remove(resultsFilePath)
+
+#####################################
+
+
+
+#####################################
+def ResultsTableString(resultsList):
+    """Human-readable table of the mean per-phase (wall-clock) frame times, in milliseconds, of the given results."""
+    headersList = ["scenario", "agents", "nbhd", "skin", "total"] + list(ft.AllPhases) + ["peak MB", "objs/frame"]
+    rowsList = []
+    for result in resultsList:
+        parameters = result.parameters
+        row = [result.scenarioName, str(parameters.agentCount),
+               "%.1f" % parameters.neighbourhoodSize, "%.1f" % parameters.neighbourListSkin]
+        if(result.averageFrameTiming is not None):
+            wallTimes = result.averageFrameTiming.wallTimes
+            row.append("%.1f" % (result.meanFrameTime * 1000.0))
+            row.extend([("%.1f" % (wallTimes[phaseName] * 1000.0)) if(phaseName in wallTimes) else "-"
+                        for phaseName in ft.AllPhases])
+        else:
+            row.extend(["-"] * (len(ft.AllPhases) + 1))
+        row.append(("%.1f" % (result.peakMemoryKb / 1024.0)) if(result.peakMemoryKb is not None) else "-")
+        row.append(("%.1f" % result.objectsAllocatedPerFrame) if(result.objectsAllocatedPerFrame is not None) else "-")
+        if(not result.succeeded):
+            row.append("FAILED - %s" % result.errorString)
+        rowsList.append(row)
+
+    columnWidths = [max([len(headersList[column])] + [len(row[column]) for row in rowsList])
+                    for column in xrange(len(headersList))]
+    linesList = ["  ".join([text.rjust(width) for text, width in zip(row, columnWidths)] + row[len(columnWidths):])
+                 for row in [headersList] + rowsList]
+
+    return "\n".join(linesList)
+
+########
+def OperationCountsTableString(resultsList):
+    """Human-readable table of the mean per-frame operation counts (see operationCounters) of the given results, 
+    along with candidate pairs per agent - which should stay roughly flat as the agent count goes up."""
+    headersList = (["scenario", "agents"] + [oc._COUNTER_ABBREVIATIONS_[counterName] for counterName in oc.AllCounters] +
+                   ["pairs/agent"])
+    rowsList = []
+    for result in resultsList:
+        row = [result.scenarioName, str(result.parameters.agentCount)]
+        counts = result.averageOperationCounts
+        if(counts is not None):
+            row.extend([("%.0f" % counts.get(counterName, 0)) for counterName in oc.AllCounters])
+            numAgents = result.finalAgentCount
+            row.append(("%.1f" % (counts.get(oc.CandidatePairsCounter, 0) / numAgents)) if(numAgents) else "-")
+        else:
+            row.extend(["-"] * (len(oc.AllCounters) + 1))
+        rowsList.append(row)
+
+    columnWidths = [max([len(headersList[column])] + [len(row[column]) for row in rowsList])
+                    for column in xrange(len(headersList))]
+    linesList = ["  ".join([text.rjust(width) for text, width in zip(row, columnWidths)])
+                 for row in [headersList] + rowsList]
+
+    return "\n".join(linesList)
+
+#####################################
+
+
+
+#####################################
+def ExportResultsJson(resultsList, filePath):
+    with open(filePath, "w") as jsonFile:
+        json.dump([_ResultDict(result) for result in resultsList], jsonFile, indent=2, sort_keys=True)
+
+########
+def ImportResultsJson(filePath):
+    with open(filePath, "r") as jsonFile:
+        return [_ResultFromDict(resultDict) for resultDict in json.load(jsonFile)]
+
+########
+def _ResultDict(result):
+    return { "scenario" : result.scenarioName,
+             "parameters" : result.parameters._asdict(),
+             "frameTimings" : [_FrameTimingDict(frameTiming) for frameTiming in result.frameTimings],
+             "averageFrameTiming" : _FrameTimingDict(result.averageFrameTiming),
+             "peakMemoryKb" : result.peakMemoryKb,
+             "finalAgentCount" : result.finalAgentCount,
+             "objectsAllocatedPerFrame" : result.objectsAllocatedPerFrame,
+             "averageOperationCounts" : result.averageOperationCounts,
+             "error" : result.errorString }
+
+def _ResultFromDict(resultDict):
+    return BenchmarkResult(resultDict["scenario"],
+                           BenchmarkParameters(**resultDict["parameters"]),
+                           [_FrameTimingFromDict(frameTimingDict) for frameTimingDict in resultDict["frameTimings"]],
+                           _FrameTimingFromDict(resultDict["averageFrameTiming"]),
+                           resultDict["peakMemoryKb"],
+                           resultDict["finalAgentCount"],
+                           resultDict.get("objectsAllocatedPerFrame"),
+                           resultDict.get("averageOperationCounts"),
+                           resultDict["error"])
+
+########
+def _FrameTimingDict(frameTiming):
+    if(frameTiming is None):
+        return None
+
+    return { "frame" : frameTiming.frameNumber, "wallTimes" : frameTiming.wallTimes, "cpuTimes" : frameTiming.cpuTimes }
+
+def _FrameTimingFromDict(frameTimingDict):
+    if(frameTimingDict is None):
+        return None
+
+    return ft.FrameTiming(frameTimingDict["frame"], frameTimingDict["wallTimes"], frameTimingDict["cpuTimes"])
+
+#####################################
+
+
+
+#####################################
+def _Main(argumentsList):
+    parser = argparse.ArgumentParser(description="Runs PySwarm's headless benchmark scenarios.")
+    parser.add_argument("--scenario", nargs="+", choices=[scenario.name for scenario in AllScenarios],
+                        help="scenario(s) to run (default: all)")
+    parser.add_argument("--agents", nargs="+", type=int, default=list(_DEFAULT_AGENT_COUNTS_),
+                        help="agent count(s) to run each scenario with")
+    parser.add_argument("--neighbourhood", nargs="+", type=float, default=[BenchmarkParameters().neighbourhoodSize],
+                        help="neighbourhood size(s) to run each scenario with")
+    parser.add_argument("--skin", nargs="+", type=float, default=[BenchmarkParameters().neighbourListSkin],
+                        help="neighbour list skin(s) to run each scenario with")
+    parser.add_argument("--frames", type=int, default=BenchmarkParameters().numFrames, help="number of timed frames")
+    parser.add_argument("--warm-up", type=int, default=BenchmarkParameters().warmUpFrames, help="number of untimed frames first")
+    parser.add_argument("--seed", type=int, default=BenchmarkParameters().randomSeed)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--count-objects", action="store_true", help="also count objects allocated per frame")
+    parser.add_argument("--count-operations", action="store_true", 
+                        help="also count the work done by the inner loops each frame (slows the timings down a little)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run everything in this process (peak memory figures will then be cumulative)")
+    parser.add_argument("--quiet", action="store_true", help="don't print the results table")
+    parser.add_argument("--check-parallel", action="store_true",
+                        help=("instead of timing anything, check that the parallel calculations give exactly the same "
+                              "results as batch calculations in this process"))
+    arguments = parser.parse_args(argumentsList)
+
+    scenariosList = ([ScenarioWithName(name) for name in arguments.scenario] if(arguments.scenario) else
+                     list(AllScenarios))
+    if(arguments.check_parallel):
+        return _CheckParallelCalculations(scenariosList, arguments)
+    runFunction = RunBenchmark if(arguments.in_process) else RunBenchmarkInNewProcess
+
+    resultsList = []
+    for scenario in scenariosList:
+        for agentCount in arguments.agents:
+            for neighbourhoodSize in arguments.neighbourhood:
+                for neighbourListSkin in arguments.skin:
+                    parameters = BenchmarkParameters(agentCount, neighbourhoodSize, neighbourListSkin,
+                                                     arguments.frames, arguments.warm_up, arguments.seed)
+                    if(not arguments.quiet):
+                        print "Running %s, %s..." % (scenario.name, parameters)
+                    resultsList.append(runFunction(scenario, parameters, arguments.count_objects,
+                                                   arguments.count_operations))
+
+    if(arguments.json):
+        ExportResultsJson(resultsList, arguments.json)
+    if(not arguments.quiet):
+        print "\n" + ResultsTableString(resultsList)
+        if(arguments.count_operations):
+            print "\n" + OperationCountsTableString(resultsList)
+
+    return 0 if(all([result.succeeded for result in resultsList])) else 1
+
+########
+def _CheckParallelCalculations(scenariosList, arguments):
+    numFailures = 0
+    for scenario in scenariosList:
+        for agentCount in arguments.agents:
+            for neighbourhoodSize in arguments.neighbourhood:
+                for neighbourListSkin in arguments.skin:
+                    parameters = BenchmarkParameters(agentCount, neighbourhoodSize, neighbourListSkin,
+                                                     arguments.frames, arguments.warm_up, arguments.seed)
+                    problemString = CheckParallelCalculations(scenario, parameters)
+                    if(problemString is not None):
+                        numFailures += 1
+                    if(not arguments.quiet or problemString is not None):
+                        print "%s, %s: %s" % (scenario.name, parameters, problemString or "identical")
+
+    return 0 if(numFailures == 0) else 1
+
+#####################################
+
+
+
+if(__name__ == "__main__"):
+    sys.exit(_Main(sys.argv[1:]))
+
+
+# END OF MODULE
+#############################################
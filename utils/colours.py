@@ -60,8 +60,12 @@ FollowPath_OnPath = (0.5, 0.5, 0)
 
 
 def _GetDefaultTextfieldBackground(brighten=0.0):
-    import pymel.core as pm
-    win = pm.window()
+    try:
+        import pymel.core as pm
+        win = pm.window()
+    except (ImportError, RuntimeError):  # i.e. no Maya, or Maya running without UI
+        return (0.27 + brighten, 0.27 + brighten, 0.27 + brighten)
+    
     row = pm.rowLayout()
     txtField = pm.textField()
     backgroundColour = tuple(txtField.getBackgroundColor())
@@ -20,8 +20,10 @@ import pyswarm.utils.packageInfo as pi
 
 
 _UserProvidedFilePath_ = None
+_UserProvidedDefaultsFilePath_ = None
 _SAVE_FILE_EXTENSION_ = ".pkl"
 _DEFAULT_VALUES_FILENAME_ = "attributeValueDefaults.ini"
+_PERFORMANCE_BASELINES_FILENAME_ = "performanceBaselines.json"
 
 _BADGE_IMAGE_ = "swarmTitle_square.jpg" # 
 _BADGE_IMAGE_PIXEL_WIDTH_ = 150         # IMPORTANT - update the pixel width if you change the image.
@@ -63,8 +65,8 @@ def _AutoGeneratedSavePath():
         folderPath = osp.join(folderPath, "scripts" + osp.sep)
         if(osp.exists(folderPath)):
             return folderPath
-    else:
-        raise RuntimeError("Could not find \"scripts\" folder in your Maya project database. ")
+    
+    raise RuntimeError("Could not find \"scripts\" folder in your Maya project database. ")
                 
 #####
 def SaveFolderLocation():
@@ -78,7 +80,7 @@ def SaveFolderLocation():
         else:
             return _AutoGeneratedSavePath()
     except RuntimeError as e:
-        util.LogWarning(e + ("Using path:" % util.GetProjectWorkingDirectory()))
+        util.LogWarning("%sUsing path: %s" % (e, util.GetProjectWorkingDirectory()))
     
     return util.GetProjectWorkingDirectory()
 
@@ -87,15 +89,33 @@ def SaveFileExtension():
     return _SAVE_FILE_EXTENSION_
 
 ##########################################
+def SetDefaultAttributeValuesLocation(filePath):
+    """Overrides the location of the attribute defaults file (which gets re-written whenever new attributes 
+    are found to be missing from it) - e.g. so headless/benchmark runs leave the packaged file alone.
+    Pass None to revert to the packaged file."""
+    global _UserProvidedDefaultsFilePath_
+    
+    _UserProvidedDefaultsFilePath_ = filePath
+
+####
 def DefaultAttributeValuesLocation():
-    filePath = osp.dirname(pyswarm.resources.__file__)
-    filePath = osp.normpath(osp.join(filePath, _DEFAULT_VALUES_FILENAME_))
+    if(_UserProvidedDefaultsFilePath_):
+        filePath = osp.normpath(_UserProvidedDefaultsFilePath_)
+    else:
+        filePath = osp.dirname(pyswarm.resources.__file__)
+        filePath = osp.normpath(osp.join(filePath, _DEFAULT_VALUES_FILENAME_))
     
     if(not osp.exists(filePath)):
         raise IOError("Could not find defaults file at: %s" % filePath)
     else:
         return filePath
     
+##########################################
+def PerformanceBaselinesLocation():
+    """Baselines file for utils.performanceGate (not checked for existence - it's created when recording)."""
+    filePath = osp.dirname(pyswarm.resources.__file__)
+    return osp.normpath(osp.join(filePath, _PERFORMANCE_BASELINES_FILENAME_))
+    
 ##########################################
 def LogoImageLocation():
     filePath = osp.dirname(pyswarm.resources.__file__)
@@ -0,0 +1,216 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+import collections
+import os
+import sys
+import time
+
+from pyswarm.pyswarmObject import PyswarmObject
+
+
+
+#################################################
+#############    FRAME PHASES    ################
+#################################################
+
+AttributesPhase = "Attributes"          # attribute groups' onFrameUpdated (incl. pending attribute changes)
+BehavioursPhase = "Behaviours"          # behaviours' onFrameUpdated
+ParticleReadPhase = "Particle Read"     # reading positions & velocities from the scene
+ZoneUpdatePhase = "Zone Update"         # ZoneGraph positions & neighbour list rebuilds
+CalculationPhase = "Calculation"        # behaviour calculations for every agent
+CommitPhase = "Commit"                  # writing results back to the scene
+
+AllPhases = (AttributesPhase, BehavioursPhase, ParticleReadPhase, ZoneUpdatePhase, CalculationPhase, CommitPhase)
+
+_PHASE_ABBREVIATIONS_ = { AttributesPhase : "attr", BehavioursPhase : "bhvr", ParticleReadPhase : "read",
+                          ZoneUpdatePhase : "zone", CalculationPhase : "calc", CommitPhase : "cmt" }
+
+_DEFAULT_MAX_FRAMES_ = 100
+
+
+
+#####################################
+if(sys.platform == "win32"):
+    WallTime = time.clock   # (time.time only ticks every few milliseconds on Windows)
+    
+    def CpuTime():
+        """time.clock is wall-clock time on Windows, so have to use the (coarser) process times instead."""
+        userTime, systemTime = os.times()[:2]
+        return userTime + systemTime
+else:
+    WallTime = time.time
+    CpuTime = time.clock
+
+#####################################
+
+
+
+#####################################
+class FrameTiming(collections.namedtuple("FrameTiming", ["frameNumber", "wallTimes", "cpuTimes"])):
+    """Timings for one frame - wallTimes & cpuTimes are dicts of phase name -> seconds (phases that
+    didn't run that frame, e.g. everything after the Attributes phase if the swarm is disabled, are missing)."""
+
+    __slots__ = ()
+
+    def _getTotalWallTime(self):
+        return sum(self.wallTimes.itervalues())
+    totalWallTime = property(_getTotalWallTime)
+
+    def _getTotalCpuTime(self):
+        return sum(self.cpuTimes.itervalues())
+    totalCpuTime = property(_getTotalCpuTime)
+
+# END OF CLASS - FrameTiming
+#####################################
+
+
+
+#####################################
+class FrameTimer(PyswarmObject):
+    """
+    Records wall-clock & CPU time spent in each phase (see AllPhases above) of a frame update, keeping the
+    last maxFrames frames in a ring buffer.
+
+    Usage - beginFrame, then endPhase at the end of each phase (time is attributed to a phase from the end of the
+    previous one, and is added to any already recorded for that phase on the same frame), then endFrame.
+    Outside of beginFrame/endFrame, i.e. whenever frame timings are switched off, endPhase does nothing but
+    check a single attribute - so callers needn't check whether timings are enabled themselves.
+
+    Recorded timings are not saved with the scene.
+    """
+
+    def __init__(self, maxFrames=_DEFAULT_MAX_FRAMES_):
+        self._frameTimings = collections.deque(maxlen=maxFrames)
+
+        self._currentFrameNumber = None
+        self._currentWallTimes = None   # None => not currently timing a frame.
+        self._currentCpuTimes = None
+        self._lastWallTime = 0.0
+        self._lastCpuTime = 0.0
+
+#####################
+    def __str__(self):
+        return ("<FrameTimer frames=%d/%d, timing=%s>" %
+                (len(self._frameTimings), self.maxFrames, "Y" if(self._currentWallTimes is not None) else "N"))
+
+########
+    def _getDebugStr(self):
+        return "\n".join([self.readoutString(frameTiming) for frameTiming in self._frameTimings])
+
+#####################
+    def __getstate__(self):
+        state = super(FrameTimer, self).__getstate__()
+        state["_frameTimings"] = collections.deque(maxlen=self.maxFrames)
+        state["_currentFrameNumber"] = None
+        state["_currentWallTimes"] = None
+        state["_currentCpuTimes"] = None
+
+        return state
+
+#####################
+    def _getMaxFrames(self):
+        return self._frameTimings.maxlen
+    maxFrames = property(_getMaxFrames)
+
+    def _getFrameTimings(self):
+        """List of FrameTiming tuples, oldest first."""
+        return list(self._frameTimings)
+    frameTimings = property(_getFrameTimings)
+
+    def _getLatestFrameTiming(self):
+        """Most recently completed FrameTiming, or None."""
+        return self._frameTimings[-1] if(self._frameTimings) else None
+    latestFrameTiming = property(_getLatestFrameTiming)
+
+#####################
+    def beginFrame(self, frameNumber):
+        self._currentFrameNumber = frameNumber
+        self._currentWallTimes = {}
+        self._currentCpuTimes = {}
+        self._lastWallTime = WallTime()
+        self._lastCpuTime = CpuTime()
+
+########
+    def endPhase(self, phaseName):
+        currentWallTimes = self._currentWallTimes
+        if(currentWallTimes is not None):
+            wallTime = WallTime()
+            cpuTime = CpuTime()
+            currentWallTimes[phaseName] = currentWallTimes.get(phaseName, 0.0) + (wallTime - self._lastWallTime)
+            self._currentCpuTimes[phaseName] = self._currentCpuTimes.get(phaseName, 0.0) + (cpuTime - self._lastCpuTime)
+            self._lastWallTime = wallTime
+            self._lastCpuTime = cpuTime
+
+########
+    def endFrame(self):
+        """Adds the current frame's timings to the ring buffer.  Returns False if no frame was being timed."""
+        if(self._currentWallTimes is None):
+            return False
+
+        self._frameTimings.append(FrameTiming(self._currentFrameNumber, self._currentWallTimes, self._currentCpuTimes))
+        self.discardFrame()
+
+        return True
+
+########
+    def discardFrame(self):
+        """Stops timing the current frame (if any) without recording it, e.g. if the frame update failed."""
+        self._currentFrameNumber = None
+        self._currentWallTimes = None
+        self._currentCpuTimes = None
+
+########
+    def clear(self):
+        self._frameTimings.clear()
+
+#####################
+    def averageFrameTiming(self, numFrames=None):
+        """Returns FrameTiming (with frameNumber=None) of per-phase times averaged over the last numFrames
+        recorded frames (or all of them if None), or None if there are none."""
+        frameTimings = list(self._frameTimings)[-numFrames:] if(numFrames) else list(self._frameTimings)
+        if(not frameTimings):
+            return None
+
+        wallTotals = collections.defaultdict(float)
+        cpuTotals = collections.defaultdict(float)
+        for frameTiming in frameTimings:
+            for phaseName, wallTime in frameTiming.wallTimes.iteritems():
+                wallTotals[phaseName] += wallTime
+            for phaseName, cpuTime in frameTiming.cpuTimes.iteritems():
+                cpuTotals[phaseName] += cpuTime
+
+        numFrames = float(len(frameTimings))
+        return FrameTiming(None,
+                           dict([(phaseName, total / numFrames) for phaseName, total in wallTotals.iteritems()]),
+                           dict([(phaseName, total / numFrames) for phaseName, total in cpuTotals.iteritems()]))
+
+########
+    def readoutString(self, frameTiming=None):
+        """Compact one-line summary (wall-clock times, in milliseconds) of the given FrameTiming, or of the
+        latest one if None."""
+        if(frameTiming is None):
+            frameTiming = self.latestFrameTiming
+            if(frameTiming is None):
+                return "No frames timed"
+
+        phaseStringsList = [("%s %.1f" % (_PHASE_ABBREVIATIONS_.get(phaseName, phaseName),
+                                          frameTiming.wallTimes[phaseName] * 1000.0))
+                            for phaseName in AllPhases if(phaseName in frameTiming.wallTimes)]
+        frameString = ("#%s " % frameTiming.frameNumber) if(frameTiming.frameNumber is not None) else ""
+
+        return ("%s%.1fms (cpu %.1f) - %s" %
+                (frameString, frameTiming.totalWallTime * 1000.0, frameTiming.totalCpuTime * 1000.0,
+                 ", ".join(phaseStringsList)))
+
+# END OF CLASS - FrameTimer
+#####################################
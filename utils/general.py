@@ -27,8 +27,10 @@ manipulation, and some general purpose Python methods.
 
 import logging
 import os
-import pymel.core as pm
-import pymel.core.system as sm
+try:
+    import pymel.core as pm
+except ImportError:
+    pm = None   # running outside of Maya - scene related calls go through sceneInterface's headless backend
 
 import pyswarm.utils.packageInfo as pi
 
@@ -150,7 +152,8 @@ def GetProjectRootDirectory():
     """
     Returns full filepath (as a string) to root directory of the current Maya project.
     """
-    return pm.workspace.getPath()
+    import pyswarm.utils.sceneInterface as scene  # (imported here to avoid circular import)
+    return scene.GetProjectRootDirectory()
 
 #####
 def GetProjectWorkingDirectory():
@@ -158,7 +161,8 @@ def GetProjectWorkingDirectory():
     Returns full filepath (as a string) to directory containing the current Maya scene file.
     (i.e. usually the 'scenes' folder in the project database).
     """
-    return pm.workspace.getcwd()
+    import pyswarm.utils.sceneInterface as scene
+    return scene.GetProjectWorkingDirectory()
 
 #####
 def GetCurrentSceneName():
@@ -166,7 +170,8 @@ def GetCurrentSceneName():
     Returns the name only (*not* the full path) of the current Maya scene.
     (i.e. last name that scene was saved as).
     """
-    sceneFile = sm.sceneName()
+    import pyswarm.utils.sceneInterface as scene
+    sceneFile = scene.GetSceneFilePath()
     sceneFile = os.path.split(sceneFile)[1]
     
     return os.path.splitext(sceneFile)[0]
@@ -179,27 +184,31 @@ def IsStartingFrame():
     """
     Returns True if we are in first frame of playback, False otherwise.
     """
-    return GetCurrentFrameNumber() <= int(pm.playbackOptions(minTime=True, q=True))
+    import pyswarm.utils.sceneInterface as scene
+    return scene.IsStartingFrame()
     
 def GetCurrentFrameNumber():
     """
     Returns the current frame number of the Maya scene, as an integer.
     """
-    return int(pm.currentTime(query=True))
+    import pyswarm.utils.sceneInterface as scene
+    return scene.GetCurrentFrameNumber()
 
 #####
 def ScenePlaybackInProgress():
     """
     Returns True if the Maya scene is currently 'playing', False otherwise.
     """
-    return pm.play(query=True, state=True)
+    import pyswarm.utils.sceneInterface as scene
+    return scene.ScenePlaybackInProgress()
     
 #####
 def StopPlayback():
     """
     Stops playback of the current Maya scene (if currently in progress).
     """
-    pm.play(state=False)
+    import pyswarm.utils.sceneInterface as scene
+    scene.StopPlayback()
 
 ######################################
 
@@ -238,12 +247,15 @@ def AddSceneSavedScriptJobIfNecessary(saveMethod):
     """
     Will add a script job, if one doesn't exist already, which saves PySwarm to a file automatically when the Maya scene is saved.
     The script job will be removed automatically when the scene is closed.
+    Does nothing when running outside of Maya (no scene to save).
     
     :param saveMethod: reference to a bound method that will save PySwarm to a file (will be invoked by the script job).
     """
     global __SaveSceneScriptJobNumber__
     
     _ClearSceneSavedScriptJobReference()
+    if(pm is None):
+        return
     
     methodName = saveMethod.__name__
     scriptJobsList = pm.scriptJob(listJobs=True)
@@ -264,7 +276,9 @@ def RemoveSceneSavedScriptJob():
     """
     global __SaveSceneScriptJobNumber__
     
-    if(SceneSavedScriptJobExists()):
+    if(pm is None):
+        return
+    elif(SceneSavedScriptJobExists()):
         if(pm.scriptJob(exists=__SaveSceneScriptJobNumber__)):
             pm.scriptJob(kill=__SaveSceneScriptJobNumber__)
             LogInfo("Removed \"SceneSaved\" script job #%d" % __SaveSceneScriptJobNumber__)
@@ -331,6 +345,9 @@ def AddScriptNodesIfNecessary(moduleReference, sceneSetupMethod, frameUpdateMeth
     :param frameUpdateMethod: bound method to run when Maya frame updates within the scene.
     :param sceneCloseMethod: bound method to run when the Maya scene closes.
     """
+    if(pm is None):
+        return   # running outside of Maya - no scene to add them to
+    
     swarmControllerModuleName = moduleReference.__name__
     modulePath = os.path.dirname(os.path.dirname(moduleReference.__file__))
     moduleHandle = ("__%s_IMPORT_FOR_SCRIPTNODE_UPDATES__" % pi.PackageName().upper())
@@ -396,6 +413,7 @@ def EvalDeferred(boundMethod, *args, **kwargs):
     from within the main module. As such, this is the only way to provided the same functionality 
     for bound methods from within modules and classes (Method adds this module to main, then 
     evaluates bound methods via _MakeDeferredEvaluations).
+    Outside of Maya there is no run loop to defer to, so the method is just run immediately.
     
     :param boundMethod: bound method to be run deferred; will be passed any provided 'args' and 'kwargs' arguments.
     """
@@ -405,6 +423,8 @@ def EvalDeferred(boundMethod, *args, **kwargs):
     
     if(not callable(boundMethod)):
         raise TypeError("Non-callable object \"%s\" passed to EvalDeferred." % boundMethod)
+    elif(pm is None):
+        boundMethod(*args, **kwargs)
     else:
         if(not __DeferredEvaluationsQueue__):
             importString = ("if(\"%s\" not in globals()): globals()[\"%s\"] = "
@@ -0,0 +1,611 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+# 
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Headless (i.e. no Maya) implementation of the SceneBackend interface.
+
+Keeps particle arrays, per-particle attributes, locators and curves in memory and integrates
+particle velocities into positions each time the frame is advanced - a crude stand-in for an
+nParticle node and its nucleus solver, but enough to run the agents/behaviours code outside
+of Maya (e.g. for profiling, benchmarking or on render nodes).
+
+Typical usage:
+    import pyswarm.utils.sceneInterface as scene
+    import pyswarm.utils.headlessSceneBackend as hsb
+
+    backend = hsb.HeadlessSceneBackend()
+    scene.SetSceneBackend(backend)
+    particleShape = backend.addParticleShape("nParticleShape1", positionsList)
+    ...
+    backend.advanceFrame()
+
+Note that the positions/velocities of particles are stored as flat lists [x0, y0, z0, x1...], ordered by
+particle *index* - exactly as would be returned from Maya.
+"""
+
+
+import os
+
+from pyswarm.pyswarmObject import PyswarmObject
+import pyswarm.vectors.vector3 as v3
+import pyswarm.utils.general as util
+
+from pyswarm.utils.sceneBackend import SceneBackend
+
+
+
+#####################################
+class HeadlessSceneObject(PyswarmObject):
+    """Base class for headless scene objects, stands in for a Pymel node."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __str__(self):
+        return self._name
+
+    def _getDebugStr(self):
+        return ("<%s \"%s\">" % (type(self).__name__, self._name))
+
+    def name(self):
+        return self._name
+
+# END OF CLASS - HeadlessSceneObject
+#####################################
+
+
+
+#####################################
+class HeadlessLocator(HeadlessSceneObject):
+
+    def __init__(self, name, position=(0, 0, 0)):
+        super(HeadlessLocator, self).__init__(name)
+
+        self.position = v3.Vector3(position[0], position[1], position[2])
+
+    def _getDebugStr(self):
+        return ("<Locator \"%s\", pos=%s>" % (self._name, self.position))
+
+########
+    def setPosition(self, x, y, z):
+        self.position.reset(x, y, z)
+
+# END OF CLASS - HeadlessLocator
+#####################################
+
+
+
+#####################################
+class HeadlessCurve(HeadlessSceneObject):
+    """Piecewise-linear curve through the given points.  Implements the subset of the
+    Pymel NurbsCurve interface used by PySwarm.  The curve's parameter runs from 0 to (numPoints - 1),
+    with whole numbers at each of the points (as with a degree 1 Maya curve).
+    'space' arguments are accepted for compatibility but ignored (always world space).
+    """
+
+    def __init__(self, name, points):
+        super(HeadlessCurve, self).__init__(name)
+
+        if(len(points) < 2):
+            raise ValueError("Curve %s needs at least 2 points, got %d" % (name, len(points)))
+
+        self._points = [v3.Vector3(point[0], point[1], point[2]) for point in points]
+        self._segmentLengths = [self._points[i].distanceFrom(self._points[i + 1], False)
+                                for i in xrange(len(self._points) - 1)]
+
+########
+    def _getDebugStr(self):
+        return ("<Curve \"%s\", %d points, length=%.3f>" % (self._name, len(self._points), self.length()))
+
+########
+    def _getMaxParam(self):
+        return float(len(self._points) - 1)
+
+    def _segmentAndFractionForParam(self, param):
+        param = min(max(param, 0.0), self._getMaxParam())
+        segment = min(int(param), len(self._segmentLengths) - 1)
+
+        return (segment, param - segment)
+
+#####################
+    def length(self):
+        return sum(self._segmentLengths)
+
+########
+    def getPointAtParam(self, param, space='world'):
+        segment, fraction = self._segmentAndFractionForParam(param)
+        startPoint = self._points[segment]
+
+        return startPoint + ((self._points[segment + 1] - startPoint) * fraction)
+
+########
+    def findParamFromLength(self, length):
+        for segment, segmentLength in enumerate(self._segmentLengths):
+            if(length <= segmentLength):
+                return (segment + (length / segmentLength)) if(segmentLength > 0) else float(segment)
+            length -= segmentLength
+
+        return self._getMaxParam()
+
+########
+    def tangent(self, param, space='world'):
+        segment, _ = self._segmentAndFractionForParam(param)
+        tangentVector = self._points[segment + 1] - self._points[segment]
+        tangentVector.normalise()
+
+        return tangentVector
+
+########
+    def getParamAtPoint(self, point, space='world'):
+        return self._closestParamAndPoint(point)[0]
+
+    def closestPoint(self, point, space='world'):
+        return self._closestParamAndPoint(point)[1]
+
+########
+    def _closestParamAndPoint(self, point):
+        closestDistanceSquared = float('inf')
+        closestParam = 0.0
+        closestPoint = None
+
+        for segment in xrange(len(self._segmentLengths)):
+            startPoint = self._points[segment]
+            segmentVector = self._points[segment + 1] - startPoint
+            segmentLengthSquared = segmentVector.magnitudeSquared()
+
+            if(segmentLengthSquared > 0):
+                fraction = ((point.x - startPoint.x) * segmentVector.x +
+                            (point.y - startPoint.y) * segmentVector.y +
+                            (point.z - startPoint.z) * segmentVector.z) / segmentLengthSquared
+                fraction = min(max(fraction, 0.0), 1.0)
+            else:
+                fraction = 0.0
+
+            candidatePoint = startPoint + (segmentVector * fraction)
+            distanceSquared = candidatePoint.distanceSquaredFrom(point, False)
+            if(distanceSquared < closestDistanceSquared):
+                closestDistanceSquared = distanceSquared
+                closestParam = segment + fraction
+                closestPoint = candidatePoint
+
+        return (closestParam, closestPoint)
+
+# END OF CLASS - HeadlessCurve
+#####################################
+
+
+
+#####################################
+class HeadlessParticleShape(HeadlessSceneObject):
+    """In-memory stand-in for an nParticle shape node.
+    As with Maya, particles are referenced either by ID (unique, never re-used) or by index (position
+    within the arrays, which will change as particles are removed).
+    """
+
+    def __init__(self, name, positions=None, velocities=None):
+        super(HeadlessParticleShape, self).__init__(name)
+
+        self._particleIds = []
+        self._idToIndexLookup = {}
+        self._positions = []
+        self._velocities = []
+        self._perParticleAttributes = {}
+        self._perParticleDefaults = {}
+        self._nextParticleId = 0
+
+        self.addPerParticleAttribute('lifespanPP', float('inf'))
+        self.addPerParticleAttribute('rgbPP', (0, 0, 0))
+
+        if(positions):
+            self.emit(positions, velocities)
+
+        self._initialState = None
+        self.saveInitialState()
+
+########
+    def _getDebugStr(self):
+        return ("<ParticleShape \"%s\", ids=%s>" % (self._name, self._particleIds))
+
+#####################
+    def getCount(self):
+        return len(self._particleIds)
+
+########
+    def indexForParticleId(self, particleId):
+        try:
+            return self._idToIndexLookup[particleId]
+        except KeyError:
+            raise ValueError("No particle with id %s in %s" % (particleId, self._name))
+
+#####################
+    def emit(self, positions, velocities=None):
+        """Adds new particles.
+
+        :param positions: list of (x, y, z) tuples.
+        :param velocities: list of (x, y, z) tuples, or None for zero velocity.
+        :returns: list of IDs of the new particles.
+        """
+        newIds = []
+        for i, position in enumerate(positions):
+            velocity = velocities[i] if(velocities is not None) else (0, 0, 0)
+            particleId = self._nextParticleId
+            self._nextParticleId += 1
+
+            self._idToIndexLookup[particleId] = len(self._particleIds)
+            self._particleIds.append(particleId)
+            self._positions.extend((float(position[0]), float(position[1]), float(position[2])))
+            self._velocities.extend((float(velocity[0]), float(velocity[1]), float(velocity[2])))
+            newIds.append(particleId)
+
+        for attributeName, valuesList in self._perParticleAttributes.iteritems():
+            valuesList.extend([self._perParticleDefaults[attributeName]] * len(newIds))
+
+        return newIds
+
+########
+    def kill(self, particleId):
+        """IMPORTANT - WILL NOT TAKE EFFECT UNTIL AFTER NEXT FRAME UPDATE (as with Maya)."""
+        self.setPerParticleValue('lifespanPP', particleId, 0.0)
+
+########
+    def _removeDeadParticles(self):
+        lifespans = self._perParticleAttributes['lifespanPP']
+        survivingIndices = [index for index, lifespan in enumerate(lifespans) if(lifespan > 0)]
+
+        if(len(survivingIndices) < len(self._particleIds)):
+            self._particleIds = [self._particleIds[index] for index in survivingIndices]
+            self._idToIndexLookup = dict((particleId, index) for index, particleId in enumerate(self._particleIds))
+            self._positions = [value for index in survivingIndices for value in self._positions[index * 3 : index * 3 + 3]]
+            self._velocities = [value for index in survivingIndices for value in self._velocities[index * 3 : index * 3 + 3]]
+            for attributeName, valuesList in self._perParticleAttributes.items():
+                self._perParticleAttributes[attributeName] = [valuesList[index] for index in survivingIndices]
+
+#####################
+    def hasPerParticleAttribute(self, attributeName):
+        return attributeName in self._perParticleAttributes
+
+    def addPerParticleAttribute(self, attributeName, defaultValue=0.0):
+        if(not self.hasPerParticleAttribute(attributeName)):
+            self._perParticleDefaults[attributeName] = defaultValue
+            self._perParticleAttributes[attributeName] = [defaultValue] * self.getCount()
+
+########
+    def perParticleAttributeList(self, attributeName):
+        return list(self._perParticleAttributes[attributeName])
+
+    def getPerParticleValue(self, attributeName, particleId):
+        return self._perParticleAttributes[attributeName][self.indexForParticleId(particleId)]
+
+    def setPerParticleValue(self, attributeName, particleId, value):
+        self._perParticleAttributes[attributeName][self.indexForParticleId(particleId)] = value
+
+#####################
+    def particleIdsList(self):
+        return list(self._particleIds)
+
+    def positionsList(self):
+        return list(self._positions)
+
+    def velocitiesList(self):
+        return list(self._velocities)
+
+########
+    def getPosition(self, particleId):
+        j = self.indexForParticleId(particleId) * 3
+        return self._positions[j : j + 3]
+
+    def getVelocity(self, particleId):
+        j = self.indexForParticleId(particleId) * 3
+        return self._velocities[j : j + 3]
+
+    def setVelocity(self, particleId, velocity):
+        j = self.indexForParticleId(particleId) * 3
+        self._velocities[j : j + 3] = [float(velocity[0]), float(velocity[1]), float(velocity[2])]
+
+    def setVelocitiesList(self, velocitiesList):
+        if(len(velocitiesList) != len(self._velocities)):
+            raise ValueError("Expected %d velocity values for %s, got %d" %
+                             (len(self._velocities), self._name, len(velocitiesList)))
+        self._velocities = [float(value) for value in velocitiesList]
+
+#####################
+    def saveInitialState(self):
+        """Stores current state of the particles, which will be restored on HeadlessSceneBackend.rewind."""
+        self._initialState = (list(self._particleIds), list(self._positions), list(self._velocities),
+                              dict((attributeName, list(valuesList))
+                                   for attributeName, valuesList in self._perParticleAttributes.iteritems()),
+                              self._nextParticleId)
+
+    def restoreInitialState(self):
+        particleIds, positions, velocities, perParticleAttributes, nextParticleId = self._initialState
+
+        self._particleIds = list(particleIds)
+        self._idToIndexLookup = dict((particleId, index) for index, particleId in enumerate(self._particleIds))
+        self._positions = list(positions)
+        self._velocities = list(velocities)
+        self._nextParticleId = nextParticleId
+        for attributeName in self._perParticleAttributes.keys():
+            self._perParticleAttributes[attributeName] = (list(perParticleAttributes[attributeName])
+                                                          if(attributeName in perParticleAttributes) else
+                                                          [self._perParticleDefaults[attributeName]] * self.getCount())
+
+########
+    def advanceFrame(self, timeStep, gravity, groundPlaneHeight):
+        """Removes dead particles, then integrates velocities into positions (simple Euler step)."""
+        self._removeDeadParticles()
+
+        positions = self._positions
+        velocities = self._velocities
+
+        if(gravity):
+            gravityStep = gravity * timeStep
+            for j in xrange(1, len(velocities), 3):
+                velocities[j] += gravityStep
+
+        for j in xrange(len(positions)):
+            positions[j] += velocities[j] * timeStep
+
+        if(groundPlaneHeight is not None):
+            for j in xrange(1, len(positions), 3):
+                if(positions[j] < groundPlaneHeight):
+                    positions[j] = groundPlaneHeight
+                    if(velocities[j] < 0):
+                        velocities[j] = 0.0
+
+# END OF CLASS - HeadlessParticleShape
+#####################################
+
+
+
+###########################################
+class HeadlessSceneBackend(SceneBackend):
+    """In-memory scene backend, see module description.
+
+    :param startFrame: first frame of 'playback' (as with Maya's time slider minimum).
+    :param timeStep: multiplier applied to velocities when integrating positions.  Defaults to 1 as PySwarm
+                     agents measure velocity (and so write it back) as distance travelled per frame.
+    :param gravity: acceleration, per frame, added to particle's vertical velocity each frame.
+    :param groundPlaneHeight: particles will not fall below this height, or None for no ground plane.
+    :param projectDirectory: stands in for the Maya project directory (uses current working directory if None).
+    :param sceneName: stands in for the Maya scene name.
+    """
+
+    def __init__(self, startFrame=1, timeStep=1.0, gravity=0.0, groundPlaneHeight=None,
+                 projectDirectory=None, sceneName="headlessScene"):
+        self.timeStep = timeStep
+        self.gravity = gravity
+        self.groundPlaneHeight = groundPlaneHeight
+        self.spaceScale = 1.0
+        self.projectDirectory = projectDirectory if(projectDirectory is not None) else os.getcwd()
+        self.sceneName = sceneName
+
+        self._startFrame = int(startFrame)
+        self._currentFrame = self._startFrame
+        self._objectsLookup = {}
+        self._selectionList = []
+        self._selectedParticlesLookup = {}
+
+#####################
+    def _getCurrentFrame(self):
+        return self._currentFrame
+    currentFrame = property(_getCurrentFrame)
+
+########
+    def _addObject(self, sceneObject):
+        if(sceneObject.name() in self._objectsLookup):
+            raise ValueError("Object named \"%s\" already exists in headless scene." % sceneObject.name())
+
+        self._objectsLookup[sceneObject.name()] = sceneObject
+        return sceneObject
+
+    def addParticleShape(self, name, positions=None, velocities=None):
+        """Adds & returns a new HeadlessParticleShape; positions/velocities are lists of (x, y, z) tuples."""
+        return self._addObject(HeadlessParticleShape(name, positions, velocities))
+
+    def addLocator(self, name, position=(0, 0, 0)):
+        return self._addObject(HeadlessLocator(name, position))
+
+    def addCurve(self, name, points):
+        return self._addObject(HeadlessCurve(name, points))
+
+    def removeObject(self, name):
+        sceneObject = self._objectsLookup.pop(name)
+        if(sceneObject in self._selectionList):
+            self._selectionList.remove(sceneObject)
+
+########
+    def setSelection(self, objectsList):
+        self._selectionList = [self.objectFromObjectName(sceneObject) for sceneObject in objectsList]
+        self._selectedParticlesLookup.clear()
+
+########
+    def _particleShape(self, particleShapeName):
+        return self.objectFromObjectName(particleShapeName, objectType=HeadlessParticleShape)
+
+    def _allParticleShapes(self):
+        return [sceneObject for sceneObject in self._objectsLookup.itervalues()
+                if(isinstance(sceneObject, HeadlessParticleShape))]
+
+#####################
+    def advanceFrame(self, numberOfFrames=1):
+        """Moves the scene forward by given number of frames, removing any killed particles & updating
+        the positions of the others.  Equivalent to Maya's playback advancing the time slider."""
+        for _ in xrange(numberOfFrames):
+            for particleShape in self._allParticleShapes():
+                particleShape.advanceFrame(self.timeStep, self.gravity, self.groundPlaneHeight)
+            self._currentFrame += 1
+
+########
+    def rewind(self):
+        """Goes back to the start frame and restores particles to their initial states."""
+        for particleShape in self._allParticleShapes():
+            particleShape.restoreInitialState()
+        self._currentFrame = self._startFrame
+
+#####################
+    def objectFromObjectName(self, objectName, bypassTransformNodes=True, objectType=None):
+        if(isinstance(objectName, HeadlessSceneObject)):
+            result = objectName
+        else:
+            try:
+                result = self._objectsLookup[objectName]
+            except KeyError:
+                raise ValueError("No object named \"%s\" in headless scene." % objectName)
+
+        if(objectType is None or isinstance(result, objectType)):
+            return result
+        else:
+            raise TypeError("Cannot make scene object from %s - needed type %s, got %s" %
+                            (objectName, objectType, type(result)))
+
+########
+    def selectedParticleShapeNodes(self, particleShapeName=None, suppressPymelBugWarning=False):
+        return [sceneObject for sceneObject in self._selectionList
+                if(isinstance(sceneObject, HeadlessParticleShape) and
+                   (particleShapeName is None or sceneObject.name() == particleShapeName))]
+
+    def selectedParticles(self, particleShapeName):
+        if(self.selectedParticleShapeNodes(particleShapeName)):
+            return self.particleIdsList(particleShapeName)
+        else:
+            return list(self._selectedParticlesLookup.get(particleShapeName, []))
+
+    def selectParticlesInList(self, particleIds, particleShapeName):
+        self._selectionList = []
+        self._selectedParticlesLookup = { particleShapeName : sorted(particleIds) }
+
+    def selectedLocators(self):
+        return [sceneObject for sceneObject in self._selectionList if(isinstance(sceneObject, HeadlessLocator))]
+
+    def objectsInSceneOfType(self, objectType):
+        return [sceneObject for sceneObject in self._objectsLookup.itervalues() if(isinstance(sceneObject, objectType))]
+
+########
+    def locatorType(self):
+        return HeadlessLocator
+
+    def particleType(self):
+        return HeadlessParticleShape
+
+    def curveType(self):
+        return HeadlessCurve
+
+#####################
+    def vector3FromLocator(self, locator):
+        if(isinstance(locator, HeadlessLocator)):
+            return v3.Vector3(locator.position)
+        elif(isinstance(locator, basestring)):
+            return self.vector3FromLocator(self.objectFromObjectName(locator))
+        else:
+            return None
+
+########
+    def vector3sFromLocators(self, locatorsList):
+        return [self.vector3FromLocator(locator) for locator in locatorsList]
+
+########
+    def pointFromVector3(self, vector3):
+        return v3.Vector3(vector3.x, vector3.y, vector3.z)
+
+    def vector3FromPoint(self, point):
+        return v3.Vector3(point.x, point.y, point.z)
+
+    def vectorFromVector3(self, vector3):
+        return v3.Vector3(vector3.x, vector3.y, vector3.z)
+
+    def vector3FromVector(self, vector):
+        return v3.Vector3(vector.x, vector.y, vector.z)
+
+#####################
+    def particleIdsList(self, particleShapeName):
+        return self._particleShape(particleShapeName).particleIdsList()
+
+########
+    def particlePositionsList(self, particleShapeName):
+        return self._particleShape(particleShapeName).positionsList()
+
+    def singleParticlePosition(self, particleShapeName, particleId):
+        return self._particleShape(particleShapeName).getPosition(particleId)
+
+    def setSingleParticlePosition(self, particleShapeName, particleId, position):
+        # mirrors the Maya backend, which (incorrectly...) sets velocity
+        self._particleShape(particleShapeName).setVelocity(particleId, (position.x, position.y, position.z))
+
+########
+    def particleVelocitiesList(self, particleShapeName):
+        return self._particleShape(particleShapeName).velocitiesList()
+
+    def singleParticleVelocity(self, particleShapeName, particleId):
+        return self._particleShape(particleShapeName).getVelocity(particleId)
+
+    def setSingleParticleVelocity(self, particleShapeName, particleId, velocityVector):
+        self._particleShape(particleShapeName).setVelocity(particleId,
+                                                           (velocityVector.x, velocityVector.y, velocityVector.z))
+
+    def setParticleVelocitiesList(self, particleShapeName, velocitiesList):
+        self._particleShape(particleShapeName).setVelocitiesList(velocitiesList)
+
+########
+    def stickinessScalesList(self, particleShapeName):
+        return self._particleShape(particleShapeName).perParticleAttributeList('stickinessScalePP')
+
+    def singleParticleStickinessScale(self, particleShapeName, particleId):
+        return self._particleShape(particleShapeName).getPerParticleValue('stickinessScalePP', particleId)
+
+    def setSingleParticleStickinessScale(self, particleShapeName, particleId, value):
+        self._particleShape(particleShapeName).setPerParticleValue('stickinessScalePP', particleId, value)
+
+########
+    def killParticle(self, particleShapeName, particleId):
+        self._particleShape(particleShapeName).kill(particleId)
+
+    def setParticleColour(self, particleShapeName, particleId, colour):
+        if(type(colour) != tuple):
+            colour = (colour, colour, colour)
+        self._particleShape(particleShapeName).setPerParticleValue('rgbPP', particleId, colour)
+
+    def addStickinessPerParticleAttributeIfNecessary(self, particleShapeName):
+        self._particleShape(particleShapeName).addPerParticleAttribute('stickinessScalePP', 0.0)
+
+#####################
+    def nucleusSpaceScale(self):
+        return self.spaceScale
+
+    def quickSceneSetup(self, particleShapeName, enableSelfCollide, disableFriction, disableIgnoreGravity,
+                        changeRenderType, enableGroundPlane, changeSpaceScale, translateAbovePlane):
+        util.LogInfo("Quick scene setup not applicable to headless scene, no changes made.")
+
+########
+    def currentFrameNumber(self):
+        return self._currentFrame
+
+    def isStartingFrame(self):
+        return self._currentFrame <= self._startFrame
+
+    def playbackInProgress(self):
+        return False
+
+    def stopPlayback(self):
+        pass
+
+########
+    def projectRootDirectory(self):
+        return self.projectDirectory
+
+    def projectWorkingDirectory(self):
+        return self.projectDirectory
+
+    def sceneFilePath(self):
+        return self.sceneName
+
+# END OF CLASS - HeadlessSceneBackend
+###########################################
@@ -0,0 +1,350 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+# 
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Maya implementation of the SceneBackend interface - all the actual PyMel/maya.cmds calls
+made by PySwarm against the scene live here.
+Importing this module outside of Maya will raise an ImportError.
+"""
+
+
+import pymel.core as pm
+import pymel.core.nodetypes as pmn  # Eclipse doesn't like pm.nodetypes for some reason...
+import pymel.core.language as la    # (perhaps an issue with the Pymel predefinitions?)
+import pymel.core.system as sm
+import maya.cmds as cmds
+
+import pyswarm.vectors.vector3 as v3
+import pyswarm.utils.general as util
+
+from pyswarm.utils.sceneBackend import SceneBackend
+
+
+
+###########################################
+class MayaSceneBackend(SceneBackend):
+
+    def objectFromObjectName(self, objectName, bypassTransformNodes=True, objectType=None):
+        """Converts Maya object string to a Pymel object, if necessary.
+        If the object is already a Pymel object, no action is taken.
+        """
+        if(isinstance(objectName, pm.PyNode)):
+            result = self._pymelObjectWithType(objectName, objectType) if(bypassTransformNodes) else objectName
+        else:
+            value = pm.PyNode(objectName)
+            result = self._pymelObjectWithType(value, objectType) if(bypassTransformNodes) else value
+
+        if(objectType is None or isinstance(result, objectType)):
+            return result
+        else:
+            raise TypeError("Cannot make Pymel object from %s - needed type %s, got %s" %
+                            (objectName, objectType, type(objectName)))
+
+########
+    def _pymelObjectWithType(self, pymelObject, pymelType):
+        """Checks given object is of correct type.
+        Will inspect the corresponding shape node if a transform node is given.
+        """
+        if(pymelType is not None and isinstance(pymelObject, pymelType)):
+            return pymelObject
+        elif(isinstance(pymelObject, pmn.Transform)):
+            shapeNode = pymelObject.getShape()
+            if((pymelType is None and isinstance(pymelObject, pm.PyNode)) or
+               isinstance(shapeNode, pymelType)):
+                return shapeNode
+        elif(pymelType is None and isinstance(pymelObject, pm.PyNode)):
+            return pymelObject
+
+        return None
+
+########
+    def selectedParticleShapeNodes(self, particleShapeName=None, suppressPymelBugWarning=False):
+        selectionList = []
+        try:
+            selectionList = pm.ls(selection=True)
+        except Exception:
+            if(not suppressPymelBugWarning):
+                util.LogWarning("There's a bug in earlier versions of Maya's PyMel - it can break if you have individual "
+                                "particles selected (i.e. in component mode). Nothing I can do about that unfortunately. "
+                                "You may want to try again *without* individual particles selected.")
+
+        returnList = []
+        for selectedObject in selectionList:
+            result = self._pymelObjectWithType(selectedObject, self.particleType())
+            if(result is not None and
+               (particleShapeName is None or result.name() == particleShapeName)):
+                returnList.append(result)
+
+        return returnList
+
+########
+    def selectedParticles(self, particleShapeName):
+        if(self.selectedParticleShapeNodes(particleShapeName, suppressPymelBugWarning=True)):
+            return self.particleIdsList(particleShapeName)
+        else:
+            # using cmds instead of PyMel as a workaround here - there's a bug in earlier versions
+            # of PyMel where the 'ls' command breaks if you have particle components selected (nice!)
+            selectionList = cmds.ls(selection=True)
+            returnList = []
+            for selectedObject in selectionList:
+                if(cmds.objectType(selectedObject, isType="nParticle")):
+                    particleComponentStrings = selectedObject.split(".pt[")
+                    candidateName = particleComponentStrings[0]
+                    if(candidateName == particleShapeName):
+                        index = int( particleComponentStrings[1].strip(']') )
+                        returnList.append(index)
+
+            return returnList
+
+########
+    def selectParticlesInList(self, particleIds, particleShapeName):
+        def _addToSelection(rangeStart, rangeEnd, particleShapeName):
+            indexSpecifier = (str(rangeStart) if(rangeStart == rangeEnd) else ("%d:%d" % (rangeStart, rangeEnd)))
+            pm.select(("%s.pt[%s]" % (particleShapeName, indexSpecifier)), add=True)
+
+        pm.select(clear=True)
+        rangeStart = -1
+        rangeEnd = -1
+        for particleId in sorted(particleIds):
+            if(rangeStart == -1):
+                rangeStart = particleId
+                rangeEnd = particleId
+            elif(particleId == rangeEnd + 1):
+                rangeEnd = particleId
+            else:
+                _addToSelection(rangeStart, rangeEnd, particleShapeName)
+                rangeStart = particleId
+                rangeEnd = particleId
+
+        if(rangeStart != -1):
+            _addToSelection(rangeStart, rangeEnd, particleShapeName)
+
+########
+    def selectedLocators(self):
+        selectionList = []
+        try:
+            selectionList = pm.ls(selection=True)
+        except Exception:
+            util.LogWarning("There's a bug in earlier versions of Maya's PyMel - it can break if you have individual "
+                            "particles selected (i.e. in component mode). Nothing I can do about that unfortunately. "
+                            "You may want to try again *without* individual particles selected.")
+        returnList = []
+        for selectedObject in selectionList:
+            result = self._pymelObjectWithType(selectedObject, self.locatorType())
+            if(result is not None):
+                returnList.append(result)
+
+        return returnList
+
+########
+    def objectsInSceneOfType(self, objectType):
+        return [pymelObject for pymelObject in pm.ls() if(isinstance(pymelObject, objectType))]
+
+########
+    def locatorType(self):
+        return pmn.Locator
+
+    def particleType(self):
+        return pmn.NParticle
+
+    def curveType(self):
+        return pmn.NurbsCurve
+
+#####################
+    def vector3FromLocator(self, locator):
+        if(isinstance(locator, pmn.Locator)):
+            coOrdsString = locator.getPosition()
+            coOrds = coOrdsString.split()
+            return v3.Vector3(float(coOrds[0]), float(coOrds[1]), float(coOrds[2]))
+        elif(isinstance(locator, basestring)):
+            return self.vector3FromLocator(self.objectFromObjectName(locator))
+        else:
+            return None
+        
+########
+    def vector3sFromLocators(self, locatorsList):
+        return [self.vector3FromLocator(locator) for locator in locatorsList]  # (there's no multi-object query for this)
+
+########
+    def pointFromVector3(self, vector3):
+        return pm.datatypes.Point(vector3.x, vector3.y, vector3.z)
+
+    def vector3FromPoint(self, point):
+        return v3.Vector3(point.x, point.y, point.z)
+
+    def vectorFromVector3(self, vector3):
+        return pm.datatypes.Vector(vector3.x, vector3.y, vector3.z)
+
+    def vector3FromVector(self, vector):
+        return v3.Vector3(vector.x, vector.y, vector.z)
+
+#####################
+    def particleIdsList(self, particleShapeName):
+        return map(int, pm.getParticleAttr(particleShapeName + ".pt[:]", at='particleId', a=True))
+
+########
+    def particlePositionsList(self, particleShapeName):
+        return pm.getParticleAttr(particleShapeName + ".pt[:]", at='worldPosition', a=True)
+
+    def singleParticlePosition(self, particleShapeName, particleId):
+        return pm.particle(particleShapeName, q=True, at='worldPosition', id=particleId)
+
+    def setSingleParticlePosition(self, particleShapeName, particleId, position):
+        pm.particle(particleShapeName, e=True, at='velocity', id=particleId, vv=(position.x, position.y, position.z))
+
+########
+    def particleVelocitiesList(self, particleShapeName):
+        return pm.getParticleAttr(particleShapeName + ".pt[:]", at='velocity', a=True)
+
+    def singleParticleVelocity(self, particleShapeName, particleId):
+        return pm.particle(particleShapeName, q=True, at='velocity', id=particleId)
+
+    def setSingleParticleVelocity(self, particleShapeName, particleId, velocityVector):
+        pm.particle(particleShapeName, e=True, at='velocity', id=particleId,
+                    vv=(velocityVector.x, velocityVector.y, velocityVector.z))
+
+    def setParticleVelocitiesList(self, particleShapeName, velocitiesList):
+        numParticles = len(velocitiesList) / 3
+        velocityTuples = zip(velocitiesList[0::3], velocitiesList[1::3], velocitiesList[2::3])
+        cmds.setAttr(particleShapeName + ".velocity", numParticles, *velocityTuples, type='vectorArray')
+
+########
+    def stickinessScalesList(self, particleShapeName):
+        return pm.getParticleAttr(particleShapeName + ".pt[:]", at='stickinessScalePP', a=True)
+
+    def singleParticleStickinessScale(self, particleShapeName, particleId):
+        return pm.particle(particleShapeName, q=True, at='stickinessScalePP', id=particleId)
+
+    def setSingleParticleStickinessScale(self, particleShapeName, particleId, value):
+        pm.particle(particleShapeName, e=True, at='stickinessScalePP', id=particleId, fv=value)
+
+########
+    def killParticle(self, particleShapeName, particleId):
+        pm.particle(particleShapeName, e=True, at='lifespanPP', id=particleId, fv=0.0)
+
+    def setParticleColour(self, particleShapeName, particleId, colour):
+        if(type(colour) == tuple):
+            pm.particle(particleShapeName, e=True, at="rgbPP", id=particleId, vv=(colour[0], colour[1], colour[2]))
+        else: # assuming colour is a float => greyscalse colour
+            pm.particle(particleShapeName, e=True, at="rgbPP", id=particleId, vv=(colour, colour, colour))
+
+########
+    def addStickinessPerParticleAttributeIfNecessary(self, particleShapeName):
+        if(not pm.attributeQuery('stickinessScalePP', node=particleShapeName, exists=True)):
+            pm.addAttr(particleShapeName, longName='stickinessScalePP', dataType='doubleArray')
+            util.LogDebug("Added PP attribute stickinessScalePP to %s" % particleShapeName)
+        if(not pm.attributeQuery('stickinessScalePP0', node=particleShapeName, exists=True)):
+            pm.addAttr(particleShapeName, longName='stickinessScalePP0', dataType='doubleArray')
+            util.LogDebug("Added PP attribute stickinessScalePP0 to %s" % particleShapeName)
+
+#####################
+    def nucleusSpaceScale(self):
+        nucleus = pm.ls(la.mel.getActiveNucleusNode(False, True))[0]
+        return nucleus.attr('spaceScale').get()
+
+########
+    def quickSceneSetup(self, particleShapeName, enableSelfCollide, disableFriction, disableIgnoreGravity,
+                        changeRenderType, enableGroundPlane, changeSpaceScale, translateAbovePlane):
+        util.LogInfo("Performing quick scene setup...")
+        changesMade = False
+
+        selfCollide = particleShapeName + ".selfCollide"
+        if(enableSelfCollide and not pm.getAttr(selfCollide)):
+            pm.setAttr(selfCollide, True)
+            changesMade = True
+            util.LogInfo("Enabled %s selfCollide." % particleShapeName)
+
+        friction = particleShapeName + ".friction"
+        if(disableFriction and pm.getAttr(friction) > 0):
+            pm.setAttr(friction, 0.0)
+            changesMade = True
+            util.LogInfo("Set %s friction = 0." % particleShapeName)
+
+        ignoreSolverGravity = particleShapeName + ".ignoreSolverGravity"
+        if(disableIgnoreGravity and pm.getAttr(ignoreSolverGravity)):
+            pm.setAttr(ignoreSolverGravity, False)
+            changesMade = True
+            util.LogInfo("Disabled %s ignoreSolverGravity." % particleShapeName)
+
+        renderType = particleShapeName + ".particleRenderType"
+        if(changeRenderType and pm.getAttr(renderType) != 4):
+            pm.setAttr(renderType, 4)
+            changesMade = True
+            util.LogInfo("Changed %s render type to spheres." % particleShapeName)
+
+        nucleus = pm.ls(la.mel.getActiveNucleusNode(False, True))[0]
+        nucleusName = nucleus.name()
+        if(enableGroundPlane and not nucleus.attr("usePlane").get()):
+            nucleus.setAttr("usePlane", True)
+            changesMade = True
+            util.LogInfo("Enabled %s ground plane" % nucleusName)
+
+        if(enableGroundPlane and disableFriction and nucleus.attr("planeFriction").get() > 0):
+            nucleus.setAttr("planeFriction", 0.0)
+            changesMade = True
+            util.LogInfo("Set %s ground plane friction = 0" % nucleusName)
+
+        if(changeSpaceScale and abs(self.nucleusSpaceScale() - 0.01) > 0.001):
+            nucleus.setAttr('spaceScale', 0.01)
+            changesMade = True
+            util.LogInfo("Set %s spaceScale to 0.01" % nucleusName)
+
+        if(translateAbovePlane):
+            positions = self.particlePositionsList(particleShapeName)
+            if(positions):
+                yMin = float('inf')
+                for _, y, _ in zip(positions[0::3], positions[1::3], positions[2::3]):
+                    if(y < yMin) : yMin = y
+
+                particleRadius = pm.getAttr(particleShapeName + ".radius")
+                collideWidthScale = pm.getAttr(particleShapeName + ".collideWidthScale")
+                yMin -= (particleRadius * collideWidthScale) + 0.001
+
+                groundOriginY = nucleus.attr('planeOriginY').get()
+                if(yMin < groundOriginY):
+                    diff = groundOriginY - yMin
+                    particleShapeObject = self.objectFromObjectName(particleShapeName)
+                    particleTransform = particleShapeObject.parentAtIndex(0)
+                    particleTransform.translateBy((0, diff, 0), space='world')
+                    changesMade = True
+                    util.LogInfo("Translated %s by %.3f in y to clear %s ground plane."
+                                 % (particleShapeName, diff, nucleusName))
+
+        # re-setting time slider in this way refreshes solver display etc.
+        pm.currentTime(self.currentFrameNumber(), update=True)
+        util.LogInfo("%sQuick scene setup complete." % ("" if(changesMade) else "No changes to make. "))
+
+#####################
+    def currentFrameNumber(self):
+        return int(pm.currentTime(query=True))
+
+    def isStartingFrame(self):
+        return self.currentFrameNumber() <= int(pm.playbackOptions(minTime=True, q=True))
+
+    def playbackInProgress(self):
+        return pm.play(query=True, state=True)
+
+    def stopPlayback(self):
+        pm.play(state=False)
+
+########
+    def projectRootDirectory(self):
+        return pm.workspace.getPath()
+
+    def projectWorkingDirectory(self):
+        return pm.workspace.getcwd()
+
+    def sceneFilePath(self):
+        return sm.sceneName()
+
+# END OF CLASS - MayaSceneBackend
+###########################################
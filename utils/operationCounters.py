@@ -0,0 +1,297 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Per-frame counts of the work done by the inner loops - candidate pairs visited when building neighbour lists
+(and how they were dealt with), angleTo calls, Vector3s created and calls through the sceneInterface to the
+scene (i.e. Maya).  Counts that grow faster than the agent count (e.g. a dense region turning quadratic) show
+up here before they show up as slow frames.
+
+Counting is off by default, and costs next to nothing while off: the Vector3, angleTo & sceneInterface counters
+are wrappers that are only swapped in while an OperationCounters instance is enabled, and the neighbour list
+counts are kept in local variables by AgentState._recalculateListsAndAverages & only passed on if a frame
+is actually being counted.  NOTE - while counting *is* on, the wrappers do slow things down somewhat, so
+don't compare frame timings taken with counting on against those taken with it off.
+"""
+
+
+import collections
+import functools
+import types
+
+from pyswarm.pyswarmObject import PyswarmObject
+import pyswarm.vectors.vector3 as v3
+import pyswarm.utils.sceneInterface as scene
+
+
+
+#################################################
+#############    COUNTER NAMES    ###############
+#################################################
+
+CandidatePairsCounter = "Candidate Pairs"       # candidates visited in AgentState._recalculateListsAndAverages...
+ReciprocalChecksCounter = "Reciprocal Checks"   # ...skipped as the other agent had already checked this pair
+CrudeRejectionsCounter = "Crude Rejections"     # ...rejected by the crude (per-axis) distance check
+PreciseChecksCounter = "Precise Checks"         # ...given the precise (squared distance) check
+RestoredListsCounter = "Restored Lists"         # agents whose lists were carried over, i.e. no candidates visited
+AngleToCallsCounter = "angleTo Calls"           # Vector3.angleTo
+Vector3InstancesCounter = "Vector3 Instances"   # new Vector3s created
+SceneCallsCounter = "Scene Calls"               # calls through sceneInterface to the scene backend
+
+AllCounters = (CandidatePairsCounter, ReciprocalChecksCounter, CrudeRejectionsCounter, PreciseChecksCounter,
+               RestoredListsCounter, AngleToCallsCounter, Vector3InstancesCounter, SceneCallsCounter)
+
+_COUNTER_ABBREVIATIONS_ = { CandidatePairsCounter : "pairs", ReciprocalChecksCounter : "recip",
+                            CrudeRejectionsCounter : "crude", PreciseChecksCounter : "precise",
+                            RestoredListsCounter : "restored",
+                            AngleToCallsCounter : "angleTo", Vector3InstancesCounter : "v3",
+                            SceneCallsCounter : "scene" }
+
+_DEFAULT_MAX_FRAMES_ = 100
+
+#################################################
+
+
+
+#####################################
+ActiveCounts = None     # counter name -> count for the frame currently being counted, or None if not counting.
+
+########
+def CountNeighbourChecks(numCandidates, numReciprocalChecks, numCrudeRejections, numPreciseChecks):
+    """For AgentState._recalculateListsAndAverages (& ParallelCalculator, which does the same checks for many agents at 
+    once) - callers must check that ActiveCounts is not None first."""
+    counts = ActiveCounts
+    counts[CandidatePairsCounter] += numCandidates
+    counts[ReciprocalChecksCounter] += numReciprocalChecks
+    counts[CrudeRejectionsCounter] += numCrudeRejections
+    counts[PreciseChecksCounter] += numPreciseChecks
+
+########
+def CountRestoredLists(numRestored):
+    """For AgentsController (see AgentState.restoreListsAndAveragesIfUnchanged) - callers must check that 
+    ActiveCounts is not None first."""
+    ActiveCounts[RestoredListsCounter] += numRestored
+
+#####################################
+
+
+
+#####################################
+_OriginalVector3Init_ = v3.Vector3.__dict__["__init__"]     # (i.e. the plain functions, not unbound methods,
+_OriginalAngleTo_ = v3.Vector3.__dict__["angleTo"]           # so that restoring them leaves the class as it was)
+
+# i.e. every function that forwards to the scene backend
+_OriginalSceneFunctionsLookup_ = dict([(name, function) for name, function in vars(scene).iteritems()
+                                       if(isinstance(function, types.FunctionType) and
+                                          "__ActiveBackend__" in function.func_code.co_names and
+                                          name not in ("SetSceneBackend", "GetSceneBackend"))])
+
+_NumEnabledInstances_ = 0
+
+########
+def _CountingVector3Init(self, x=0.0, y=0.0, z=0.0):
+    counts = ActiveCounts
+    if(counts is not None):
+        counts[Vector3InstancesCounter] += 1
+    _OriginalVector3Init_(self, x, y, z)
+
+########
+def _CountingAngleTo(self, otherVector, ignoreVertical=True):
+    counts = ActiveCounts
+    if(counts is not None):
+        counts[AngleToCallsCounter] += 1
+    return _OriginalAngleTo_(self, otherVector, ignoreVertical)
+
+########
+def _CountingSceneFunction(function):
+    @functools.wraps(function)
+    def countingSceneFunction(*args, **kwargs):
+        counts = ActiveCounts
+        if(counts is not None):
+            counts[SceneCallsCounter] += 1
+        return function(*args, **kwargs)
+
+    return countingSceneFunction
+
+_CountingSceneFunctionsLookup_ = dict([(name, _CountingSceneFunction(function))
+                                       for name, function in _OriginalSceneFunctionsLookup_.iteritems()])
+
+########
+def _InstallCountingWrappers():
+    global _NumEnabledInstances_
+
+    _NumEnabledInstances_ += 1
+    if(_NumEnabledInstances_ == 1):
+        v3.Vector3.__init__ = _CountingVector3Init
+        v3.Vector3.angleTo = _CountingAngleTo
+        for name, function in _CountingSceneFunctionsLookup_.iteritems():
+            setattr(scene, name, function)
+
+########
+def _RemoveCountingWrappers():
+    global _NumEnabledInstances_
+
+    _NumEnabledInstances_ -= 1
+    if(_NumEnabledInstances_ == 0):
+        v3.Vector3.__init__ = _OriginalVector3Init_
+        v3.Vector3.angleTo = _OriginalAngleTo_
+        for name, function in _OriginalSceneFunctionsLookup_.iteritems():
+            setattr(scene, name, function)
+
+#####################################
+
+
+
+#####################################
+class OperationCounts(collections.namedtuple("OperationCounts", ["frameNumber", "counts"])):
+    """Counts for one frame - counts is a dict of counter name (see AllCounters) -> count."""
+
+    __slots__ = ()
+
+    def count(self, counterName):
+        return self.counts.get(counterName, 0)
+
+# END OF CLASS - OperationCounts
+#####################################
+
+
+
+#####################################
+class OperationCounters(PyswarmObject):
+    """
+    Counts operations (see AllCounters above) per frame, keeping the last maxFrames frames in a ring buffer.
+
+    The owner calls beginFrame only while enabled (& endFrame regardless) - only one frame can be counted at
+    a time, across all instances.  Recorded counts are not saved with the scene, and instances are always
+    disabled when loaded.
+    """
+
+    def __init__(self, maxFrames=_DEFAULT_MAX_FRAMES_):
+        self._enabled = False
+        self._frameCounts = collections.deque(maxlen=maxFrames)
+
+        self._currentFrameNumber = None
+        self._currentCounts = None   # None => not counting the current frame.
+
+#####################
+    def __str__(self):
+        return ("<OperationCounters enabled=%s, frames=%d/%d>" %
+                ("Y" if(self._enabled) else "N", len(self._frameCounts), self.maxFrames))
+
+########
+    def _getDebugStr(self):
+        return "\n".join([self.readoutString(operationCounts) for operationCounts in self._frameCounts])
+
+#####################
+    def __getstate__(self):
+        state = super(OperationCounters, self).__getstate__()
+        state["_enabled"] = False   # (counting wrappers won't be installed when loaded)
+        state["_frameCounts"] = collections.deque(maxlen=self.maxFrames)
+        state["_currentFrameNumber"] = None
+        state["_currentCounts"] = None
+
+        return state
+
+#####################
+    def _getEnabled(self):
+        return self._enabled
+    def _setEnabled(self, value):
+        value = bool(value)
+        if(value != self._enabled):
+            self._enabled = value
+            if(value):
+                _InstallCountingWrappers()
+            else:
+                self.discardFrame()
+                _RemoveCountingWrappers()
+    enabled = property(_getEnabled, _setEnabled)
+
+    def _getIsCounting(self):
+        return (self._currentCounts is not None)
+    isCounting = property(_getIsCounting)
+
+    def _getMaxFrames(self):
+        return self._frameCounts.maxlen
+    maxFrames = property(_getMaxFrames)
+
+    def _getFrameCounts(self):
+        """List of OperationCounts tuples, oldest first."""
+        return list(self._frameCounts)
+    frameCounts = property(_getFrameCounts)
+
+    def _getLatestFrameCounts(self):
+        """Most recently completed OperationCounts, or None."""
+        return self._frameCounts[-1] if(self._frameCounts) else None
+    latestFrameCounts = property(_getLatestFrameCounts)
+
+#####################
+    def beginFrame(self, frameNumber):
+        global ActiveCounts
+
+        self._currentFrameNumber = frameNumber
+        self._currentCounts = dict.fromkeys(AllCounters, 0)
+        ActiveCounts = self._currentCounts
+
+########
+    def endFrame(self):
+        """Adds the current frame's counts to the ring buffer.  Returns False if no frame was being counted."""
+        if(self._currentCounts is None):
+            return False
+
+        self._frameCounts.append(OperationCounts(self._currentFrameNumber, self._currentCounts))
+        self.discardFrame()
+
+        return True
+
+########
+    def discardFrame(self):
+        """Stops counting the current frame (if any) without recording it, e.g. if the frame update failed."""
+        global ActiveCounts
+
+        if(ActiveCounts is not None and ActiveCounts is self._currentCounts):
+            ActiveCounts = None
+        self._currentFrameNumber = None
+        self._currentCounts = None
+
+########
+    def clear(self):
+        self._frameCounts.clear()
+
+#####################
+    def averageCounts(self, numFrames=None):
+        """Returns OperationCounts (with frameNumber=None) of counts averaged over the last numFrames recorded
+        frames (or all of them if None), or None if there are none."""
+        frameCountsList = list(self._frameCounts)[-numFrames:] if(numFrames) else list(self._frameCounts)
+        if(not frameCountsList):
+            return None
+
+        numFrames = float(len(frameCountsList))
+        return OperationCounts(None, dict([(counterName, sum([operationCounts.count(counterName)
+                                                              for operationCounts in frameCountsList]) / numFrames)
+                                           for counterName in AllCounters]))
+
+########
+    def readoutString(self, operationCounts=None):
+        """Compact one-line summary of the given OperationCounts, or of the latest ones if None."""
+        if(operationCounts is None):
+            operationCounts = self.latestFrameCounts
+            if(operationCounts is None):
+                return "No frames counted"
+
+        countStringsList = [("%s %.0f" % (_COUNTER_ABBREVIATIONS_[counterName], operationCounts.count(counterName)))
+                            for counterName in AllCounters]
+        frameString = ("#%s " % operationCounts.frameNumber) if(operationCounts.frameNumber is not None) else ""
+
+        return "%s%s" % (frameString, ", ".join(countStringsList))
+
+# END OF CLASS - OperationCounters
+#####################################
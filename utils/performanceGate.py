@@ -0,0 +1,333 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Performance regression gate - runs a fixed set of headless benchmark cases (see utils.benchmarks), records
+their median & 95th percentile frame times and objects allocated per frame into a versioned baselines file,
+and fails if a later run is slower than the baseline by more than a given tolerance.
+
+Frame times are normalised against a machine-calibration loop (a fixed chunk of pure Python work, timed
+on the same machine at the same time) - so a baseline recorded on one machine stays usable on another.
+
+From the command line (with the folder containing the pyswarm package on the PYTHONPATH):
+    python -m pyswarm.utils.performanceGate record      # re-records resources/performanceBaselines.json
+    python -m pyswarm.utils.performanceGate check --tolerance 0.3
+
+'check' exits with a non-zero status if any case is too slow.
+"""
+
+
+import argparse
+import collections
+import datetime
+import json
+import math
+import platform
+import sys
+
+import pyswarm.utils.benchmarks as bm
+import pyswarm.utils.fileLocations as fl
+import pyswarm.utils.frameTimings as ft
+import pyswarm.utils.packageInfo as pi
+
+
+
+_BASELINE_FORMAT_VERSION_ = 1
+_DEFAULT_TOLERANCE_ = 0.2       # i.e. fail if more than 20% slower
+_CALIBRATION_REPEATS_ = 3       # (before *and* after each case)
+_CALIBRATION_NUM_POINTS_ = 300
+
+
+
+#####################################
+class GateCase(collections.namedtuple("GateCase", ["scenarioName", "parameters"])):
+    """A benchmark scenario with a fixed set of BenchmarkParameters."""
+
+    __slots__ = ()
+
+    def _getName(self):
+        return "%s-%d" % (self.scenarioName, self.parameters.agentCount)
+    name = property(_getName)
+
+# END OF CLASS - GateCase
+#####################################
+
+GateCases = tuple([GateCase(scenario.name, bm.BenchmarkParameters(agentCount=1000, numFrames=20, warmUpFrames=3))
+                   for scenario in bm.AllScenarios])
+
+#####################################
+
+
+
+#####################################
+class CaseMeasurement(collections.namedtuple("CaseMeasurement",
+                                             ["caseName", "medianFrameTime", "p95FrameTime",
+                                              "objectsAllocatedPerFrame", "calibrationTime"])):
+    """Frame times are in seconds; calibrationTime is the machine-calibration time they were measured against."""
+
+    __slots__ = ()
+
+    def _getNormalisedMedian(self):
+        return self.medianFrameTime / self.calibrationTime
+    normalisedMedian = property(_getNormalisedMedian)
+
+    def _getNormalisedP95(self):
+        return self.p95FrameTime / self.calibrationTime
+    normalisedP95 = property(_getNormalisedP95)
+
+# END OF CLASS - CaseMeasurement
+#####################################
+
+
+
+#####################################
+class CaseComparison(collections.namedtuple("CaseComparison", ["caseName", "baseline", "current", "tolerance"])):
+    """Current CaseMeasurement compared with the baseline one - ratios > 1 mean slower than the baseline."""
+
+    __slots__ = ()
+
+    def _getMedianRatio(self):
+        return self.current.normalisedMedian / self.baseline.normalisedMedian
+    medianRatio = property(_getMedianRatio)
+
+    def _getP95Ratio(self):
+        return self.current.normalisedP95 / self.baseline.normalisedP95
+    p95Ratio = property(_getP95Ratio)
+
+    def _getPassed(self):
+        maximumRatio = 1.0 + self.tolerance
+        return (self.medianRatio <= maximumRatio and self.p95Ratio <= maximumRatio)
+    passed = property(_getPassed)
+
+# END OF CLASS - CaseComparison
+#####################################
+
+
+
+#####################################
+class _CalibrationPoint(object):
+
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def distanceSquaredFrom(self, other):
+        dx = self.x - other.x
+        dy = self.y - other.y
+        dz = self.z - other.z
+        return dx * dx + dy * dy + dz * dz
+
+# END OF CLASS - _CalibrationPoint
+#####################################
+
+########
+def _CalibrationWorkload():
+    """Fixed mix of the sort of work the hot paths do - float arithmetic, attribute access, method calls, list
+    & dict building - using nothing from PySwarm itself, so that optimising PySwarm doesn't move the yardstick."""
+    pointsList = [_CalibrationPoint(math.sin(index), math.cos(index), 0.01 * index)
+                  for index in xrange(_CALIBRATION_NUM_POINTS_)]
+    nearbyPointsLookup = {}
+    total = 0.0
+    for index, point in enumerate(pointsList):
+        nearbyPointsList = []
+        for otherPoint in pointsList:
+            distanceSquared = point.distanceSquaredFrom(otherPoint)
+            if(distanceSquared < 1.0):
+                nearbyPointsList.append(otherPoint)
+                total += math.sqrt(distanceSquared)
+        nearbyPointsLookup[index] = nearbyPointsList
+
+    return total
+
+########
+def CalibrationTimes(repeats=_CALIBRATION_REPEATS_):
+    """List of times, in seconds, for this machine to run the calibration workload the given number of times."""
+    timesList = []
+    for _ in xrange(repeats):
+        startTime = ft.WallTime()
+        _CalibrationWorkload()
+        timesList.append(ft.WallTime() - startTime)
+
+    return timesList
+
+########
+def _Median(valuesList):
+    sortedValues = sorted(valuesList)
+    middle = len(sortedValues) // 2
+    return sortedValues[middle] if(len(sortedValues) % 2) else 0.5 * (sortedValues[middle - 1] + sortedValues[middle])
+
+#####################################
+
+
+
+#####################################
+def MeasureCases(cases=GateCases, inNewProcess=True):
+    """Runs the given GateCases, returning a list of corresponding CaseMeasurements.
+    Each case is calibrated separately, just before & after it's run, so drift in machine speed over the 
+    course of the run (e.g. other jobs on the same node) is accounted for.
+    Raises RuntimeError if any of the benchmark runs fail."""
+    runFunction = bm.RunBenchmarkInNewProcess if(inNewProcess) else bm.RunBenchmark
+
+    measurementsList = []
+    for case in cases:
+        calibrationTimesList = CalibrationTimes()
+        result = runFunction(bm.ScenarioWithName(case.scenarioName), case.parameters, countObjects=True)
+        if(not result.succeeded):
+            raise RuntimeError("Benchmark case %s failed - %s" % (case.name, result.errorString))
+        calibrationTimesList.extend(CalibrationTimes())
+        
+        measurementsList.append(CaseMeasurement(case.name, result.medianFrameTime, result.p95FrameTime,
+                                                result.objectsAllocatedPerFrame, _Median(calibrationTimesList)))
+
+    return measurementsList
+
+#####################################
+
+
+
+#####################################
+def RecordBaseline(filePath=None, cases=GateCases, inNewProcess=True):
+    """Measures the given cases & (over)writes the baselines file with the results."""
+    measurementsList = MeasureCases(cases, inNewProcess)
+
+    casesDict = {}
+    for case, measurement in zip(cases, measurementsList):
+        casesDict[case.name] = { "scenario" : case.scenarioName,
+                                 "parameters" : case.parameters._asdict(),
+                                 "medianFrameMs" : measurement.medianFrameTime * 1000.0,
+                                 "p95FrameMs" : measurement.p95FrameTime * 1000.0,
+                                 "calibrationMs" : measurement.calibrationTime * 1000.0,
+                                 "normalisedMedian" : measurement.normalisedMedian,
+                                 "normalisedP95" : measurement.normalisedP95,
+                                 "objectsAllocatedPerFrame" : measurement.objectsAllocatedPerFrame }
+
+    baselineDict = { "formatVersion" : _BASELINE_FORMAT_VERSION_,
+                     "packageVersion" : pi.VersionNumber(),
+                     "recorded" : datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                     "machine" : { "platform" : platform.platform(), "python" : platform.python_version() },
+                     "cases" : casesDict }
+
+    with open(filePath or fl.PerformanceBaselinesLocation(), "w") as jsonFile:
+        json.dump(baselineDict, jsonFile, indent=2, sort_keys=True)
+
+    return measurementsList
+
+########
+def LoadBaseline(filePath=None):
+    """Returns list of (GateCase, CaseMeasurement) tuples from the baselines file, ordered by case name."""
+    with open(filePath or fl.PerformanceBaselinesLocation(), "r") as jsonFile:
+        baselineDict = json.load(jsonFile)
+
+    formatVersion = baselineDict.get("formatVersion")
+    if(formatVersion != _BASELINE_FORMAT_VERSION_):
+        raise ValueError("Unsupported performance baselines format version: %s (expected %d) - please re-record."
+                         % (formatVersion, _BASELINE_FORMAT_VERSION_))
+
+    baselinesList = []
+    for caseName, caseDict in sorted(baselineDict["cases"].iteritems()):
+        case = GateCase(caseDict["scenario"], bm.BenchmarkParameters(**caseDict["parameters"]))
+        calibrationTime = caseDict["calibrationMs"] / 1000.0
+        # normalised values are authoritative - frame times are recovered from them so the ratios are exact
+        measurement = CaseMeasurement(caseName, caseDict["normalisedMedian"] * calibrationTime,
+                                      caseDict["normalisedP95"] * calibrationTime,
+                                      caseDict["objectsAllocatedPerFrame"], calibrationTime)
+        baselinesList.append((case, measurement))
+
+    return baselinesList
+
+########
+def CheckAgainstBaseline(filePath=None, tolerance=_DEFAULT_TOLERANCE_, inNewProcess=True):
+    """Re-measures the cases in the baselines file, returning a list of CaseComparisons (see CaseComparison.passed)."""
+    baselinesList = LoadBaseline(filePath)
+    casesList = [case for case, _ in baselinesList]
+    measurementsList = MeasureCases(casesList, inNewProcess)
+
+    return [CaseComparison(case.name, baseline, current, tolerance)
+            for (case, baseline), current in zip(baselinesList, measurementsList)]
+
+#####################################
+
+
+
+#####################################
+def ComparisonsTableString(comparisonsList):
+    headersList = ["case", "median ms", "(baseline)", "p95 ms", "(baseline)", "median x", "p95 x",
+                   "objs/frame", "(baseline)", ""]
+    rowsList = []
+    for comparison in comparisonsList:
+        baseline, current = comparison.baseline, comparison.current
+        # baseline times shown scaled to this machine, i.e. what they'd have been had they been recorded here
+        scaling = current.calibrationTime / baseline.calibrationTime
+        rowsList.append([comparison.caseName,
+                         "%.1f" % (current.medianFrameTime * 1000.0), "%.1f" % (baseline.medianFrameTime * scaling * 1000.0),
+                         "%.1f" % (current.p95FrameTime * 1000.0), "%.1f" % (baseline.p95FrameTime * scaling * 1000.0),
+                         "%.2f" % comparison.medianRatio, "%.2f" % comparison.p95Ratio,
+                         _ObjectCountString(current.objectsAllocatedPerFrame),
+                         _ObjectCountString(baseline.objectsAllocatedPerFrame),
+                         "ok" if(comparison.passed) else "TOO SLOW"])
+
+    columnWidths = [max([len(headersList[column])] + [len(row[column]) for row in rowsList])
+                    for column in xrange(len(headersList))]
+
+    return "\n".join(["  ".join([text.rjust(width) for text, width in zip(row, columnWidths)])
+                      for row in [headersList] + rowsList])
+
+########
+def _ObjectCountString(objectCount):
+    return ("%.1f" % objectCount) if(objectCount is not None) else "-"
+
+#####################################
+
+
+
+#####################################
+def _Main(argumentsList):
+    parser = argparse.ArgumentParser(description="PySwarm performance regression gate.")
+    parser.add_argument("command", choices=["record", "check"])
+    parser.add_argument("--baseline", help="baselines file (default: %s)" % fl.PerformanceBaselinesLocation())
+    parser.add_argument("--tolerance", type=float, default=_DEFAULT_TOLERANCE_,
+                        help="fraction by which a case may be slower than its baseline (default: %.2f)" % _DEFAULT_TOLERANCE_)
+    parser.add_argument("--in-process", action="store_true", help="run all cases in this process")
+    arguments = parser.parse_args(argumentsList)
+
+    inNewProcess = not arguments.in_process
+    if(arguments.command == "record"):
+        for measurement in RecordBaseline(arguments.baseline, inNewProcess=inNewProcess):
+            print "%s: median %.1fms, p95 %.1fms, %s objs/frame" % (measurement.caseName, measurement.medianFrameTime * 1000.0,
+                                                                   measurement.p95FrameTime * 1000.0,
+                                                                   _ObjectCountString(measurement.objectsAllocatedPerFrame))
+        print "Baselines written to %s" % (arguments.baseline or fl.PerformanceBaselinesLocation())
+        return 0
+    else:
+        comparisonsList = CheckAgainstBaseline(arguments.baseline, arguments.tolerance, inNewProcess)
+        print ComparisonsTableString(comparisonsList)
+        numFailed = len([comparison for comparison in comparisonsList if(not comparison.passed)])
+        if(numFailed):
+            print "\nFAILED - %d case(s) more than %d%% slower than baseline." % (numFailed, arguments.tolerance * 100)
+            return 1
+        else:
+            print "\nPassed."
+            return 0
+
+#####################################
+
+
+
+if(__name__ == "__main__"):
+    sys.exit(_Main(sys.argv[1:]))
+
+
+# END OF MODULE
+#############################################
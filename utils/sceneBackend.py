@@ -0,0 +1,206 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+# 
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Defines the SceneBackend interface - i.e. everything PySwarm needs from the host application
+(particle arrays, per-particle attributes, locators, curves, frame info and so on).
+
+The sceneInterface module forwards all of its calls to the currently active backend.  Normally
+this will be the Maya backend (mayaSceneBackend.py), but the headless in-memory backend
+(headlessSceneBackend.py) can be swapped in to run PySwarm outside of Maya.
+"""
+
+
+from abc import ABCMeta, abstractmethod
+
+
+
+###########################################
+class SceneBackend(object):
+    """
+    Abstract base class for scene backends.  Any class inheriting from SceneBackend must make
+    concrete implementations of *all* the methods defined.
+
+    Particle lists (positions, velocities) are flat lists of floats - [x0, y0, z0, x1, y1, z1...] -
+    ordered by particle *index* (i.e. the same order as particleIdsList), NOT by particle ID.
+    """
+
+    __metaclass__ = ABCMeta
+
+######## - Objects & selection
+    @abstractmethod
+    def objectFromObjectName(self, objectName, bypassTransformNodes=True, objectType=None):
+        """
+        Returns scene object for the given name (if necessary - if given a scene object, will return it directly).
+        Raises TypeError if the object is not of the given objectType.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def selectedParticleShapeNodes(self, particleShapeName=None, suppressPymelBugWarning=False):
+        raise NotImplementedError
+
+    @abstractmethod
+    def selectedParticles(self, particleShapeName):
+        raise NotImplementedError
+
+    @abstractmethod
+    def selectParticlesInList(self, particleIds, particleShapeName):
+        raise NotImplementedError
+
+    @abstractmethod
+    def selectedLocators(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def objectsInSceneOfType(self, objectType):
+        raise NotImplementedError
+
+    @abstractmethod
+    def locatorType(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def particleType(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def curveType(self):
+        raise NotImplementedError
+
+######## - Locators, points & vectors
+    @abstractmethod
+    def vector3FromLocator(self, locator):
+        """Returns vectors.Vector3 position of the locator, or None if the argument is not a locator."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def vector3sFromLocators(self, locatorsList):
+        """Bulk equivalent of [vector3FromLocator(locator) for locator in locatorsList] - i.e. reads all the locators
+        in one go."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def pointFromVector3(self, vector3):
+        """Returns backend-native point (as used by curve methods) from a vectors.Vector3."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def vector3FromPoint(self, point):
+        raise NotImplementedError
+
+    @abstractmethod
+    def vectorFromVector3(self, vector3):
+        raise NotImplementedError
+
+    @abstractmethod
+    def vector3FromVector(self, vector):
+        raise NotImplementedError
+
+######## - Particles
+    @abstractmethod
+    def particleIdsList(self, particleShapeName):
+        raise NotImplementedError
+
+    @abstractmethod
+    def particlePositionsList(self, particleShapeName):
+        raise NotImplementedError
+
+    @abstractmethod
+    def singleParticlePosition(self, particleShapeName, particleId):
+        raise NotImplementedError
+
+    @abstractmethod
+    def setSingleParticlePosition(self, particleShapeName, particleId, position):
+        raise NotImplementedError
+
+    @abstractmethod
+    def particleVelocitiesList(self, particleShapeName):
+        raise NotImplementedError
+
+    @abstractmethod
+    def singleParticleVelocity(self, particleShapeName, particleId):
+        raise NotImplementedError
+
+    @abstractmethod
+    def setSingleParticleVelocity(self, particleShapeName, particleId, velocityVector):
+        raise NotImplementedError
+
+    @abstractmethod
+    def setParticleVelocitiesList(self, particleShapeName, velocitiesList):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stickinessScalesList(self, particleShapeName):
+        raise NotImplementedError
+
+    @abstractmethod
+    def singleParticleStickinessScale(self, particleShapeName, particleId):
+        raise NotImplementedError
+
+    @abstractmethod
+    def setSingleParticleStickinessScale(self, particleShapeName, particleId, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def killParticle(self, particleShapeName, particleId):
+        """IMPORTANT - should not take effect until after the next frame update (as with Maya)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def setParticleColour(self, particleShapeName, particleId, colour):
+        raise NotImplementedError
+
+    @abstractmethod
+    def addStickinessPerParticleAttributeIfNecessary(self, particleShapeName):
+        raise NotImplementedError
+
+######## - Scene setup & info
+    @abstractmethod
+    def nucleusSpaceScale(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def quickSceneSetup(self, particleShapeName, enableSelfCollide, disableFriction, disableIgnoreGravity,
+                        changeRenderType, enableGroundPlane, changeSpaceScale, translateAbovePlane):
+        raise NotImplementedError
+
+    @abstractmethod
+    def currentFrameNumber(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def isStartingFrame(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def playbackInProgress(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stopPlayback(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def projectRootDirectory(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def projectWorkingDirectory(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def sceneFilePath(self):
+        raise NotImplementedError
+
+# END OF CLASS - SceneBackend
+###########################################
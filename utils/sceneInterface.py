@@ -4,154 +4,102 @@
 # created 2013-2014
 #
 # @author: Joe Muers  (joemuers@hotmail.com)
-# 
+#
 # All rights reserved.
 #
 # ------------------------------------------------------------
 
 
-import pymel.core as pm
-import pymel.core.nodetypes as pmn  # Eclipse doesn't like pm.nodetypes for some reason... 
-import pymel.core.language as la    # (perhaps an issue with the Pymel predefinitions?)
-import maya.cmds as cmds
+"""
+sceneInterface module - all interaction with objects in the scene (particles, locators, curves...) goes through here.
+
+The functions below forward to the currently active scene backend (see sceneBackend.py).  Inside Maya
+this is the Maya backend (mayaSceneBackend.py); if Maya/PyMel cannot be imported then the headless
+in-memory backend (headlessSceneBackend.py) is used instead.  Use SetSceneBackend to switch explicitly.
+"""
 
-import pyswarm.vectors.vector3 as v3
 
+from pyswarm.utils.sceneBackend import SceneBackend
 import pyswarm.utils.general as util
 
 
 
+######################################
+def _MakeDefaultBackend():
+    try:
+        import pyswarm.utils.mayaSceneBackend as msb
+        return msb.MayaSceneBackend()
+    except ImportError:
+        import pyswarm.utils.headlessSceneBackend as hsb
+        util.LogInfo("Maya not available - using headless scene backend.")
+        return hsb.HeadlessSceneBackend()
+
+__ActiveBackend__ = _MakeDefaultBackend()
+
+#####
+def SetSceneBackend(backend):
+    """
+    Sets the backend through which all scene interaction will go.  Should be done *before* any PySwarm
+    instances are created.
+
+    :param backend: SceneBackend instance.
+    """
+    global __ActiveBackend__
+
+    if(not isinstance(backend, SceneBackend)):
+        raise TypeError("Expected subclass of %s, got %s" % (SceneBackend, type(backend)))
+
+    __ActiveBackend__ = backend
+    util.LogDebug("Scene backend set to %s" % type(backend).__name__)
+
+#####
+def GetSceneBackend():
+    return __ActiveBackend__
+
+######################################
+
+
+
 ######################################
 def PymelObjectFromObjectName(objectName, bypassTransformNodes=True, pymelType=None):
     """Converts Maya object string to a Pymel object, if necessary.
     If the object is already a Pymel object, no action is taken.
     """
-    if(isinstance(objectName, pm.PyNode)):
-        result = _GetPymelObjectWithType(objectName, pymelType) if(bypassTransformNodes) else objectName 
-    else:
-        value = pm.PyNode(objectName)
-        result = _GetPymelObjectWithType(value, pymelType) if(bypassTransformNodes) else value 
-        
-    if(pymelType is None or isinstance(result, pymelType)):
-        return result
-    else:
-        raise TypeError("Cannot make Pymel object from %s - needed type %s, got %s" % 
-                        (objectName, pymelType, type(objectName)))
-    
+    return __ActiveBackend__.objectFromObjectName(objectName, bypassTransformNodes, pymelType)
+
 ######################################
 def GetSelectedParticleShapeNodes(particleShapeName=None, suppressPymelBugWarning=False):
-    selectionList = []
-    try:
-        selectionList = pm.ls(selection=True)
-    except Exception:
-        if(not suppressPymelBugWarning):
-            util.LogWarning("There's a bug in earlier versions of Maya's PyMel - it can break if you have individual "
-                            "particles selected (i.e. in component mode). Nothing I can do about that unfortunately. "
-                            "You may want to try again *without* individual particles selected.")
-        
-    returnList = []
-    for selectedObject in selectionList:
-        result = _GetPymelObjectWithType(selectedObject, ParticlePymelType())
-        if(result is not None and 
-           (particleShapeName is None or result.name() == particleShapeName)):
-            returnList.append(result)
-
-    return returnList
+    return __ActiveBackend__.selectedParticleShapeNodes(particleShapeName, suppressPymelBugWarning)
 
 ######################################
 def GetSelectedParticles(particleShapeName):
-    if(GetSelectedParticleShapeNodes(particleShapeName, suppressPymelBugWarning=True)):
-        return ParticleIdsListForParticleShape(particleShapeName)
-    else:
-        # using cmds instead of PyMel as a workaround here - there's a bug in earlier versions
-        # of PyMel where the 'ls' command breaks if you have particle components selected (nice!)
-        selectionList = cmds.ls(selection=True)
-        returnList = []
-        for selectedObject in selectionList:
-            if(cmds.objectType(selectedObject, isType="nParticle")):
-                particleComponentStrings = selectedObject.split(".pt[")
-                candidateName = particleComponentStrings[0]
-                if(candidateName == particleShapeName):
-                    index = int( particleComponentStrings[1].strip(']') )
-                    returnList.append(index)
-                    
-        return returnList
-    
+    return __ActiveBackend__.selectedParticles(particleShapeName)
+
 ######################################
 def SelectParticlesInList(particleIds, particleShapeName):
-    def _addToSelection(rangeStart, rangeEnd, particleShapeName):
-        indexSpecifier = (str(rangeStart) if(rangeStart == rangeEnd) else ("%d:%d" % (rangeStart, rangeEnd)))
-        pm.select(("%s.pt[%s]" % (particleShapeName, indexSpecifier)), add=True)
-    
-    pm.select(clear=True)
-    rangeStart = -1
-    rangeEnd = -1
-    for particleId in sorted(particleIds):
-        if(rangeStart == -1):
-            rangeStart = particleId
-            rangeEnd = particleId
-        elif(particleId == rangeEnd + 1):
-            rangeEnd = particleId
-        else:
-            _addToSelection(rangeStart, rangeEnd, particleShapeName)
-            rangeStart = particleId
-            rangeEnd = particleId
-    
-    if(rangeStart != -1):
-        _addToSelection(rangeStart, rangeEnd, particleShapeName)
+    __ActiveBackend__.selectParticlesInList(particleIds, particleShapeName)
 
 ######################################
 def GetSelectedLocators():
-    selectionList = []
-    try:
-        selectionList = pm.ls(selection=True)
-    except Exception:
-        util.LogWarning("There's a bug in earlier versions of Maya's PyMel - it can break if you have individual "
-                        "particles selected (i.e. in component mode). Nothing I can do about that unfortunately. "
-                        "You may want to try again *without* individual particles selected.")
-    returnList = []
-    for selectedObject in selectionList:
-        result = _GetPymelObjectWithType(selectedObject, LocatorPymelType())
-        if(result is not None):
-            returnList.append(result)
-    
-    return returnList
+    return __ActiveBackend__.selectedLocators()
 
 ######################################
 def GetObjectsInSceneOfType(pymelType):
-    return [pymelObject for pymelObject in pm.ls() if(isinstance(pymelObject, pymelType))]
-    
-######################################
-def _GetPymelObjectWithType(pymelObject, pymelType):
-    """Checks given object is of correct type.
-    Will inspect the corresponding shape node if a transform node is given.
-    """
-    if(pymelType is not None and isinstance(pymelObject, pymelType)):
-        return pymelObject
-    elif(isinstance(pymelObject, pmn.Transform)):
-        shapeNode = pymelObject.getShape()
-        if((pymelType is None and isinstance(pymelObject, pm.PyNode)) or 
-           isinstance(shapeNode, pymelType)):
-            return shapeNode
-    elif(pymelType is None and isinstance(pymelObject, pm.PyNode)):
-        return pymelObject
-
-    return None
+    return __ActiveBackend__.objectsInSceneOfType(pymelType)
 
 ######################################
 def GetNucleusSpaceScale():
-    nucleus = pm.ls(la.mel.getActiveNucleusNode(False, True))[0]
-    return nucleus.attr('spaceScale').get()
+    return __ActiveBackend__.nucleusSpaceScale()
 
 ######################################
 def LocatorPymelType():
-    return pmn.Locator
+    return __ActiveBackend__.locatorType()
 
 def ParticlePymelType():
-    return pmn.NParticle
+    return __ActiveBackend__.particleType()
 
 def CurvePymelType():
-    return pmn.NurbsCurve
+    return __ActiveBackend__.curveType()
 
 ######################################
 
@@ -159,44 +107,41 @@ def CurvePymelType():
 
 ######################################
 def Vector3FromLocator(locator):
-    if(isinstance(locator, pmn.Locator)):
-        coOrdsString = locator.getPosition()
-        coOrds = coOrdsString.split()
-        return v3.Vector3(float(coOrds[0]), float(coOrds[1]), float(coOrds[2]))     
-    elif(isinstance(locator, basestring)):
-        return Vector3FromLocator(PymelObjectFromObjectName(locator))
-    else:
-        return None
-
-#####    
+    return __ActiveBackend__.vector3FromLocator(locator)
+
+#####
+def Vector3sFromLocators(locatorsList):
+    return __ActiveBackend__.vector3sFromLocators(locatorsList)
+
+#####
 def Vector3OrderedPairFromLocators(locatorA, locatorB):
     lowerBoundsVector = Vector3FromLocator(locatorA)
     upperBoundsVector = Vector3FromLocator(locatorB)
-    
+
     if(lowerBoundsVector.x > upperBoundsVector.x):
         lowerBoundsVector.x, upperBoundsVector.x = upperBoundsVector.x, lowerBoundsVector.x
     if(lowerBoundsVector.y > upperBoundsVector.y):
         lowerBoundsVector.y, upperBoundsVector.y = upperBoundsVector.y, lowerBoundsVector.y
     if(lowerBoundsVector.z > upperBoundsVector.z):
         lowerBoundsVector.z, upperBoundsVector.z = upperBoundsVector.z, lowerBoundsVector.z
-    
+
     return (lowerBoundsVector, upperBoundsVector)
 
-######################################    
+######################################
 def PymelPointFromVector3(vector3):
-    return pm.datatypes.Point(vector3.x, vector3.y, vector3.z)
+    return __ActiveBackend__.pointFromVector3(vector3)
 
 #####
 def Vector3FromPymelPoint(point):
-    return v3.Vector3(point.x, point.y, point.z)
+    return __ActiveBackend__.vector3FromPoint(point)
 
 ######################################
 def Vector3FromPymelVector(pymelVector):
-    return v3.Vector3(pymelVector.x, pymelVector.y, pymelVector.z)
+    return __ActiveBackend__.vector3FromVector(pymelVector)
 
 #####
 def PymelVectorFromVector3(vector3):
-    return pm.datatypes.Vector(vector3.x, vector3.y, vector3.z)
+    return __ActiveBackend__.vectorFromVector3(vector3)
 
 ######################################
 
@@ -204,28 +149,28 @@ def PymelVectorFromVector3(vector3):
 
 ######################################
 def ParticleIdsListForParticleShape(particleShapeName):
-    return map(int, pm.getParticleAttr(particleShapeName + ".pt[:]", at='particleId', a=True))
+    return __ActiveBackend__.particleIdsList(particleShapeName)
 
 ######################################
 def ParticlePositionsListForParticleShape(particleShapeName):
-    return pm.getParticleAttr(particleShapeName + ".pt[:]", at='worldPosition', a=True)
+    return __ActiveBackend__.particlePositionsList(particleShapeName)
 
 #####
 def GetSingleParticlePosition(particleShapeName, particleId):
-    return pm.particle(particleShapeName, q=True, at='worldPosition', id=particleId)
+    return __ActiveBackend__.singleParticlePosition(particleShapeName, particleId)
 
 #####
 def SetParticlePosition(particleShapeName, particleId, position):
     """In general - DO NOT USE!!"""
-    pm.particle(particleShapeName, e=True, at='velocity', id=particleId, vv=(position.x, position.y, position.z))    
-    
+    __ActiveBackend__.setSingleParticlePosition(particleShapeName, particleId, position)
+
 ######################################
 def ParticleVelocitiesListForParticleShape(particleShapeName):
-    return pm.getParticleAttr(particleShapeName + ".pt[:]", at='velocity', a=True)
+    return __ActiveBackend__.particleVelocitiesList(particleShapeName)
 
 #####
 def GetSingleParticleVelocity(particleShapeName, particleId):
-    return pm.particle(particleShapeName, q=True, at='velocity', id=particleId)
+    return __ActiveBackend__.singleParticleVelocity(particleShapeName, particleId)
 
 #####
 def SetSingleParticleVelocity(particleShapeName, particleId, velocityVector):
@@ -233,123 +178,89 @@ def SetSingleParticleVelocity(particleShapeName, particleId, velocityVector):
     @param particleId: (self explanatory)
     @param velocityVector: vectors.Vector3 instance.
     """
-    #print("pid=%d, vel=%s" % (particleId, velocityVector))
-    
-    pm.particle(particleShapeName, e=True, at='velocity', id=particleId, 
-                vv=(velocityVector.x, velocityVector.y, velocityVector.z))
-    
+    __ActiveBackend__.setSingleParticleVelocity(particleShapeName, particleId, velocityVector)
+
+#####
+def SetParticleVelocitiesList(particleShapeName, velocitiesList):
+    """Sets velocities of ALL particles in a single Maya call (much quicker than SetSingleParticleVelocity
+    for each particle in turn).
+    @param particleShapeName: particleShapeNode name.
+    @param velocitiesList: flat list of floats [x0, y0, z0, x1, y1, z1...], ordered as per
+                           ParticleIdsListForParticleShape (i.e. particle index, NOT particle ID, order).
+    """
+    __ActiveBackend__.setParticleVelocitiesList(particleShapeName, velocitiesList)
+
 ######################################
 def StickinessScalesListForParticleShape(particleShapeName):
-    return pm.getParticleAttr(particleShapeName + ".pt[:]", at='stickinessScalePP', a=True)
+    return __ActiveBackend__.stickinessScalesList(particleShapeName)
 
 #####
 def GetSingleParticleStickinessScale(particleShapeName, particleId):
-    return pm.particle(particleShapeName, q=True, at='stickinessScalePP', id=particleId)
+    return __ActiveBackend__.singleParticleStickinessScale(particleShapeName, particleId)
 
 #####
 def SetSingleParticleStickinessScale(particleShapeName, particleId, value):
     """1 == particleID, 2 = float value"""
-    pm.particle(particleShapeName, e=True, at='stickinessScalePP', id=particleId, fv=value)
-    
+    __ActiveBackend__.setSingleParticleStickinessScale(particleShapeName, particleId, value)
+
 ######################################
 def KillParticle(particleShapeName, particleId):
     """IMPORTANT - WILL NOT TAKE EFEECT UNTIL AFTER NEXT FRAME UPDATE"""
-    pm.particle(particleShapeName, e=True, at='lifespanPP', id=particleId, fv=0.0)
-    
+    __ActiveBackend__.killParticle(particleShapeName, particleId)
+
 ######################################
 def SetParticleColour(particleShapeName, particleId, colour):
-    if(type(colour) == tuple):
-        pm.particle(particleShapeName, e=True, at="rgbPP", id=particleId, vv=(colour[0], colour[1], colour[2]))
-    else: # assuming colour is a float => greyscalse colour
-        pm.particle(particleShapeName, e=True, at="rgbPP", id=particleId, vv=(colour, colour, colour))
+    __ActiveBackend__.setParticleColour(particleShapeName, particleId, colour)
 
-######################################        
+######################################
 def AddStickinessPerParticleAttributeIfNecessary(particleShapeName):
-    if(not pm.attributeQuery('stickinessScalePP', node=particleShapeName, exists=True)):
-        pm.addAttr(particleShapeName, longName='stickinessScalePP', dataType='doubleArray')
-        util.LogDebug("Added PP attribute stickinessScalePP to %s" % particleShapeName)
-    if(not pm.attributeQuery('stickinessScalePP0', node=particleShapeName, exists=True)):
-        pm.addAttr(particleShapeName, longName='stickinessScalePP0', dataType='doubleArray')
-        util.LogDebug("Added PP attribute stickinessScalePP0 to %s" % particleShapeName)
-        
+    __ActiveBackend__.addStickinessPerParticleAttributeIfNecessary(particleShapeName)
+
 #######################################
 
 
 
 #######################################
-def QuickSceneSetup(particleShapeName, 
+def QuickSceneSetup(particleShapeName,
                     enableSelfCollide=True, disableFriction=True, disableIgnoreGravity=True,
                     changeRenderType=True, enableGroundPlane=True, changeSpaceScale=True,
                     translateAbovePlane=True):
-    
-    util.LogInfo("Performing quick scene setup...")
-    changesMade = False
-    
-    selfCollide = particleShapeName + ".selfCollide"
-    if(enableSelfCollide and not pm.getAttr(selfCollide)):
-        pm.setAttr(selfCollide, True)
-        changesMade = True
-        util.LogInfo("Enabled %s selfCollide." % particleShapeName)
-    
-    friction = particleShapeName + ".friction"
-    if(disableFriction and pm.getAttr(friction) > 0):
-        pm.setAttr(friction, 0.0)
-        changesMade = True
-        util.LogInfo("Set %s friction = 0." % particleShapeName)
-        
-    ignoreSolverGravity = particleShapeName + ".ignoreSolverGravity"
-    if(disableIgnoreGravity and pm.getAttr(ignoreSolverGravity)):
-        pm.setAttr(ignoreSolverGravity, False)
-        changesMade = True
-        util.LogInfo("Disabled %s ignoreSolverGravity." % particleShapeName)
-        
-    renderType = particleShapeName + ".particleRenderType"
-    if(changeRenderType and pm.getAttr(renderType) != 4):
-        pm.setAttr(renderType, 4)
-        changesMade = True
-        util.LogInfo("Changed %s render type to spheres." % particleShapeName)
-        
-    nucleus = pm.ls(la.mel.getActiveNucleusNode(False, True))[0]
-    nucleusName = nucleus.name()
-    if(enableGroundPlane and not nucleus.attr("usePlane").get()):
-        nucleus.setAttr("usePlane", True)
-        changesMade = True
-        util.LogInfo("Enabled %s ground plane" % nucleusName)
-    
-    if(enableGroundPlane and disableFriction and nucleus.attr("planeFriction").get() > 0):
-        nucleus.setAttr("planeFriction", 0.0)
-        changesMade = True
-        util.LogInfo("Set %s ground plane friction = 0" % nucleusName)
-    
-    if(changeSpaceScale and abs(GetNucleusSpaceScale() - 0.01) > 0.001):
-        nucleus.setAttr('spaceScale', 0.01)
-        changesMade = True
-        util.LogInfo("Set %s spaceScale to 0.01" % nucleusName)
-    
-    if(translateAbovePlane):
-        positions = ParticlePositionsListForParticleShape(particleShapeName)
-        if(positions):
-            yMin = float('inf')
-            for _, y, _ in zip(positions[0::3], positions[1::3], positions[2::3]):
-                if(y < yMin) : yMin = y
-            
-            particleRadius = pm.getAttr(particleShapeName + ".radius")
-            collideWidthScale = pm.getAttr(particleShapeName + ".collideWidthScale")
-            yMin -= (particleRadius * collideWidthScale) + 0.001
-            
-            groundOriginY = nucleus.attr('planeOriginY').get()
-            if(yMin < groundOriginY):
-                diff = groundOriginY - yMin
-                particleShapeObject = PymelObjectFromObjectName(particleShapeName)
-                particleTransform = particleShapeObject.parentAtIndex(0)
-                particleTransform.translateBy((0, diff, 0), space='world')
-                changesMade = True
-                util.LogInfo("Translated %s by %.3f in y to clear %s ground plane." 
-                             % (particleShapeName, diff, nucleusName))
-
-    # re-setting time slider in this way refreshes solver display etc.
-    pm.currentTime(util.GetCurrentFrameNumber(), update=True)
-    util.LogInfo("%sQuick scene setup complete." % ("" if(changesMade) else "No changes to make. "))
+    __ActiveBackend__.quickSceneSetup(particleShapeName,
+                                      enableSelfCollide, disableFriction, disableIgnoreGravity,
+                                      changeRenderType, enableGroundPlane, changeSpaceScale,
+                                      translateAbovePlane)
+
+#######################################
+
+
+
+#######################################
+def GetCurrentFrameNumber():
+    return __ActiveBackend__.currentFrameNumber()
+
+#####
+def IsStartingFrame():
+    return __ActiveBackend__.isStartingFrame()
+
+#####
+def ScenePlaybackInProgress():
+    return __ActiveBackend__.playbackInProgress()
+
+#####
+def StopPlayback():
+    __ActiveBackend__.stopPlayback()
+
+#######################################
+def GetProjectRootDirectory():
+    return __ActiveBackend__.projectRootDirectory()
+
+#####
+def GetProjectWorkingDirectory():
+    return __ActiveBackend__.projectWorkingDirectory()
+
+#####
+def GetSceneFilePath():
+    return __ActiveBackend__.sceneFilePath()
 
 
 # END OF MODULE
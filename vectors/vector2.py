@@ -17,10 +17,6 @@ from pyswarm.pyswarmObject import PyswarmObject
 
 
 
-__MAGNITUDE_UNDEFINED__ = -1.0
-
-
-
 #####
 def IsVector2(otherVector):
     return type(otherVector) == Vector2
@@ -35,9 +31,13 @@ class Vector2(PyswarmObject):
     Initial implementation of PySwarm system used surface UV coordinates rather than 3D position, hence 
     this class.  However still comes in handy...
     
+    As with Vector3, slotted and with magnitude caching off unless asked for (see enableMagnitudeCaching).
+    
     Note that angle inputs/outputs, currently, are in degrees, NOT radians.
     """
     
+    __slots__ = ("_u", "_v", "_magnitudeCache")
+    
     def __init__(self, u=0, v=0):
         """
         Note that you can either: 
@@ -52,8 +52,7 @@ class Vector2(PyswarmObject):
             self._u = float(u)
             self._v = float(v)
         
-        self._magnitude = __MAGNITUDE_UNDEFINED__
-        self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
+        self._magnitudeCache = None   # [magnitude, magnitudeSquared] if enabled.
 
 ####################### 
     def __str__(self):
@@ -61,10 +60,21 @@ class Vector2(PyswarmObject):
 
 #####################    
     def _getDebugStr(self):
-        magStr = ("%.4f" % self._magnitude) if(self._magnitude != __MAGNITUDE_UNDEFINED__) else "notCalc\'d"
-        magSqStr = ("%.4f" % self._magnitudeSquared) if(self._magnitudeSquared != __MAGNITUDE_UNDEFINED__) else "notCalc\'d"
-        
-        return ("<mag=%s, magSqu=%s>" % (magStr, magSqStr))
+        if(self._magnitudeCache is None):
+            return "<magnitude caching off>"
+        else:
+            magStr, magSqStr = [("%.4f" % value) if(value is not None) else "notCalc\'d" for value in self._magnitudeCache]
+            return ("<mag=%s, magSqu=%s>" % (magStr, magSqStr))
+
+#####################
+    def __getstate__(self):
+        return (self._u, self._v)
+    
+    def __setstate__(self, state):
+        if(isinstance(state, dict)):   # i.e. saved before Vector2 was slotted.
+            state = (state["_u"], state["_v"])
+        self._u, self._v = state
+        self._magnitudeCache = None
 
 ##################### 
     def __add__(self, other):
@@ -102,19 +112,17 @@ class Vector2(PyswarmObject):
     def _get_u(self):
         return self._u
     def _set_u(self, value):
-        if(value != self._u):
-            self._magnitude = __MAGNITUDE_UNDEFINED__ 
-            self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._u = value
+        self._u = value
+        if(self._magnitudeCache is not None):
+            self._magnitudeCache[0] = self._magnitudeCache[1] = None
     u = property(_get_u, _set_u)
     
     def _get_v(self):
         return self._v
     def _set_v(self, value):
-        if(value != self._v):
-            self._magnitude = __MAGNITUDE_UNDEFINED__ 
-            self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._v = value
+        self._v = value
+        if(self._magnitudeCache is not None):
+            self._magnitudeCache[0] = self._magnitudeCache[1] = None
     v = property(_get_v, _set_v)
     
 #######################
@@ -140,6 +148,14 @@ class Vector2(PyswarmObject):
         self.u = float(tokens[0].lstrip('u='))
         self.v = float(tokens[1].lstrip('v='))
     
+#######################
+    def enableMagnitudeCaching(self):
+        """
+        Opt-in - from now on, magnitude & magnitudeSquared results will be kept until the vector next changes.
+        """
+        if(self._magnitudeCache is None):
+            self._magnitudeCache = [None, None]
+    
 #######################     
     def isNull(self):
         """
@@ -161,15 +177,12 @@ class Vector2(PyswarmObject):
 ####################### 
     def resetToVector(self, otherVector):
         """
-        Copies U, V and magnitude values from other vector.
+        Copies U and V values from other vector.
         
-        :param otherVector: can be Vector2, or Vector3 (magnitude ignored if so).
+        :param otherVector: can be Vector2, or Vector3.
         """
         self.u = otherVector.u
         self.v = otherVector.v
-        if(isinstance(otherVector, Vector2)):
-            self._magnitudeSquared = otherVector._magnitudeSquared
-            self._magnitude = otherVector._magnitude 
 
 ####################### 
     def invert(self):
@@ -189,24 +202,32 @@ class Vector2(PyswarmObject):
 ####################### 
     def magnitude(self, dummy=False): # dummy- so magnitude can be called interchangeably for Vector2/3. Very hacky, I know...
         """
-        Returns scalar magnitude, recalculating if necessary.  
+        Returns scalar magnitude (cached if enabled - see enableMagnitudeCaching).  
         Where possible, prefer magnitudeSquared for performance reasons. 
         
         :param dummy: not used, present for interchangeability with Vector3.
         """
-        if(self._magnitude == __MAGNITUDE_UNDEFINED__):
-            self._magnitude = mth.sqrt(self.magnitudeSquared())
-        return self._magnitude
+        cache = self._magnitudeCache
+        if(cache is None):
+            return mth.sqrt(self.magnitudeSquared())
+        else:
+            if(cache[0] is None):
+                cache[0] = mth.sqrt(self.magnitudeSquared())
+            return cache[0]
     
 #######################
     def magnitudeSquared(self):
         """
-        Returns square of the scalar magnitude, recalculating if necessary.
+        Returns square of the scalar magnitude (cached if enabled - see enableMagnitudeCaching).
         If comparing distances, use mag squared as a more performant alternative to magnitude.
         """
-        if(self._magnitudeSquared == __MAGNITUDE_UNDEFINED__):
-            self._magnitudeSquared = (self._u **2) + (self._v **2)
-        return self._magnitudeSquared
+        cache = self._magnitudeCache
+        if(cache is None):
+            return (self._u **2) + (self._v **2)
+        else:
+            if(cache[1] is None):
+                cache[1] = (self._u **2) + (self._v **2)
+            return cache[1]
 
 ####################### 
     def dot(self, otherVector):
@@ -233,12 +254,14 @@ class Vector2(PyswarmObject):
         
         :param scaleFactor: float, will be the magnitude of the normalised vector.
         """
-        if(self._magnitude != scaleFactor and not self.isNull()):
+        cache = self._magnitudeCache
+        if((cache is None or cache[0] != scaleFactor) and not self.isNull()):
             multiple = scaleFactor / self.magnitude()
             self.u *= multiple
             self.v *= multiple
-            self._magnitude = scaleFactor
-            self._magnitudeSquared = scaleFactor **2
+            if(cache is not None):
+                cache[0] = scaleFactor
+                cache[1] = scaleFactor **2
 
 #######################
     def normalisedVector(self, scaleFactor=1.0):
@@ -330,6 +353,39 @@ class Vector2(PyswarmObject):
         self.u += otherVector.u
         self.v += otherVector.v
 
+#######################
+    def addScaled(self, otherVector, scaleFactor):
+        """
+        In-place equivalent of self.add(otherVector * scaleFactor), without creating the intermediate vector.
+        
+        :param otherVector:  Vector2 or Vector3.
+        :param scaleFactor: float.
+        """
+        self.u += otherVector.u * scaleFactor
+        self.v += otherVector.v * scaleFactor
+
+########
+    def setSum(self, vector1, vector2):
+        """
+        In-place equivalent of self.resetToVector(vector1 + vector2), without creating the intermediate vector.
+        
+        :param vector1: Vector2 or Vector3.
+        :param vector2: Vector2 or Vector3.
+        """
+        self.u = vector1.u + vector2.u
+        self.v = vector1.v + vector2.v
+
+########
+    def setDifference(self, vector1, vector2):
+        """
+        In-place equivalent of self.resetToVector(vector1 - vector2), without creating the intermediate vector.
+        
+        :param vector1: Vector2 or Vector3.
+        :param vector2: Vector2 or Vector3.
+        """
+        self.u = vector1.u - vector2.u
+        self.v = vector1.v - vector2.v
+
 #######################                 
     def divide(self, scalarVal):
         """
@@ -19,10 +19,6 @@ import pyswarm.vectors.vector2 as v2
 
 
 
-__MAGNITUDE_UNDEFINED__ = -1.0
-
-
-
 #####
 def IsVector2(otherVector):
     return type(otherVector) is v2.Vector2
@@ -44,88 +40,88 @@ class Vector3(PyswarmObject):
     As such, note that self.u is interchangeable with self.x, and self.v is interchangeable
     with self.z.
     
+    Vectors are created in huge numbers, so are kept as lean as possible - slotted (no instance __dict__),
+    and magnitudes are recalculated each time they're asked for unless caching has been switched on for that
+    particular vector (see enableMagnitudeCaching).  Hot paths should prefer the in-place operations
+    (addScaled, setSum, setDifference, reset etc.) on a re-used vector over the arithmetic operators,
+    which always create a new vector.
+
     Note also that currently all angles are in degrees, not radians.
     """
     
-    def __init__(self, x=0, y=0, z=0):
+    __slots__ = ("_x", "_y", "_z", "_magnitudeCache")
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
         """
         Note that you can either: 
         - pass in a vector object as an argument to create a (deep) copy
         - pass in numerical values for each axis
         - pass nothing for default values (0,0,0).
         """
-        if(IsVector3(x)):
-            self._x = x.x
-            self._y = x.y
-            self._z = x.z
-        elif(IsVector2(x)):
-            self._x = x.x
-            self._y = 0
-            self._z = x.z
+        xType = type(x)
+        if(xType is float):   # by far the most common case, so checked first.
+            self._x = x
+            self._y = float(y)
+            self._z = float(z)
+        elif(xType is Vector3):
+            self._x = x._x
+            self._y = x._y
+            self._z = x._z
+        elif(xType is v2.Vector2):
+            self._x = x.u
+            self._y = 0.0
+            self._z = x.v
         else:
             self._x = float(x)
             self._y = float(y)
             self._z = float(z)
    
-        self._magnitude = __MAGNITUDE_UNDEFINED__
-        self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-        self._2dMagnitude = __MAGNITUDE_UNDEFINED__
-        self._2dMagnitudeSquared = __MAGNITUDE_UNDEFINED__
-        
-    
+        self._magnitudeCache = None   # [magnitude, magnitudeSquared, 2dMagnitude, 2dMagnitudeSquared] if enabled.
 
 ####################### 
     def __str__(self):
-        return "<x=%.4f, y=%.4f, z=%.4f>" % (self.x, self.y, self.z)
+        return "<x=%.4f, y=%.4f, z=%.4f>" % (self._x, self._y, self._z)
 
 #####################    
     def _getDebugStr(self):
-        magStr = ("%.4f" % self._magnitude) if(self._magnitude != __MAGNITUDE_UNDEFINED__) else "notCalc\'d"
-        magSqStr = ("%.4f" % self._magnitudeSquared) if(self._magnitudeSquared != __MAGNITUDE_UNDEFINED__) else "notCalc\'d"
-        twoDMagStr = ("%.4f" % self._2dMagnitude) if(self._2dMagnitude != __MAGNITUDE_UNDEFINED__) else "notCalc\'d"
-        twoDMagSqStr = ("%.4f" % self._2dMagnitudeSquared) if(self._2dMagnitudeSquared != __MAGNITUDE_UNDEFINED__) else "notCalc\'d"
-        
-        return ("<mag=%s, magSqu=%s, 2dMag=%s, 2dMagSqu=%s>" % (magStr, magSqStr, twoDMagStr, twoDMagSqStr))
+        if(self._magnitudeCache is None):
+            return "<magnitude caching off>"
+        else:
+            magStr, magSqStr, twoDMagStr, twoDMagSqStr = [("%.4f" % value) if(value is not None) else "notCalc\'d"
+                                                          for value in self._magnitudeCache]
+            return ("<mag=%s, magSqu=%s, 2dMag=%s, 2dMagSqu=%s>" % (magStr, magSqStr, twoDMagStr, twoDMagSqStr))
+        
+#####################
+    def __getstate__(self):
+        return (self._x, self._y, self._z)
+
+    def __setstate__(self, state):
+        if(isinstance(state, dict)):   # i.e. saved before Vector3 was slotted.
+            state = (state["_x"], state["_y"], state["_z"])
+        self._x, self._y, self._z = state
+        self._magnitudeCache = None
     
 ##################### 
     def __add__(self, other):
         if(IsVector2(other)):
-            return Vector3(self.x + other.u, self.y, self.z + other.v)
+            return Vector3(self._x + other.u, self._y, self._z + other.v)
         else:
-            return Vector3(self.x + other.x, self.y + other.y, self.z + other.z)
+            return Vector3(self._x + other.x, self._y + other.y, self._z + other.z)
 
     def __sub__(self, other):
         if(IsVector2(other)):
-            return Vector3(self.x - other.u, self.y, self.z - other.v)
+            return Vector3(self._x - other.u, self._y, self._z - other.v)
         else:
-            return Vector3(self.x - other.x, self.y - other.y, self.z - other.z)
+            return Vector3(self._x - other.x, self._y - other.y, self._z - other.z)
         
     def __mul__(self, value):
-        multipliedVector = Vector3(self.x * value, self.y * value, self.z * value)
-        
-        if(self._magnitude != __MAGNITUDE_UNDEFINED__):
-            multipliedVector._magnitude = self._magnitude * value
-            multipliedVector._magnitudeSquared = self._magnitude **2
-        if(self._2dMagnitude != __MAGNITUDE_UNDEFINED__):
-            multipliedVector._2dMagnitude = self._2dMagnitude * value
-            multipliedVector._2dMagnitudeSquared = self._2dMagnitude **2
-
-        return multipliedVector
+        return Vector3(self._x * value, self._y * value, self._z * value)
     
     def __rmul__(self, value):
         return self.__mul__(value)
     
     def __div__(self, value):
-        dividedVector = Vector3(self.x / value, self.y / value, self.z / value)
-        
-        if(self._magnitude != __MAGNITUDE_UNDEFINED__):
-            dividedVector._magnitude = self._magnitude / value
-            dividedVector._magnitudeSquared = self._magnitude **2
-        if(self._2dMagnitude != __MAGNITUDE_UNDEFINED__):
-            dividedVector._2dMagnitude = self._2dMagnitude / value
-            dividedVector._2dMagnitudeSquared = self._2dMagnitude **2
-            
-        return dividedVector
+        return Vector3(self._x / value, self._y / value, self._z / value)
     
     def __rdiv__(self, value):
         return self.__div__(1/value)
@@ -134,14 +130,8 @@ class Vector3(PyswarmObject):
         self._x *= value
         self._y *= value
         self._z *= value
-        if(self._magnitudeSquared != __MAGNITUDE_UNDEFINED__):
-            self._magnitudeSquared *= value
-            if(self._magnitude != __MAGNITUDE_UNDEFINED__):
-                self._magnitude *= value
-        if(self._2dMagnitudeSquared != __MAGNITUDE_UNDEFINED__):
-            self._2dMagnitudeSquared *= __MAGNITUDE_UNDEFINED__
-            if(self._2dMagnitude != __MAGNITUDE_UNDEFINED__):
-                self._magnitude *= value
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
             
         return self
     
@@ -150,7 +140,7 @@ class Vector3(PyswarmObject):
         return self
 
     def __eq__(self, other):
-        return IsVector3(other) and self.x == other.x and self.y == other.y and self.z == other.z
+        return IsVector3(other) and self._x == other._x and self._y == other._y and self._z == other._z
     
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -168,38 +158,34 @@ class Vector3(PyswarmObject):
     def _get_x(self):
         return self._x
     def _set_x(self, value):
-        if(value != self._x):
-            self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._2dMagnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._x = value
+        self._x = value
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
     x = property(_get_x, _set_x)
     u = property(_get_x, _set_x) # for compatibility with Vector2
     
     def _get_y(self):
         return self._y
     def _set_y(self, value):
-        if(value != self._y):
-            self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._y = value
+        self._y = value
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
     y = property(_get_y, _set_y)
     
     def _get_z(self):
         return self._z
     def _set_z(self, value):
-        if(value != self._z):
-            self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._2dMagnitudeSquared = __MAGNITUDE_UNDEFINED__
-            self._z = value
+        self._z = value
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
     z = property(_get_z, _set_z)
     v = property(_get_z, _set_z) # for compatibility with Vector2
 
 #######################
     def _getValueAsTuple(self):
-        return (self.x, self.y, self.z)
+        return (self._x, self._y, self._z)
     def _setValueAsTuple(self, value):
-        self.x = value[0]
-        self.y = value[1]
-        self.z = value[2]
+        self.reset(value[0], value[1], value[2])
     valueAsTuple = property(_getValueAsTuple, _setValueAsTuple)
 
 #######################    
@@ -211,16 +197,28 @@ class Vector3(PyswarmObject):
         """
         tokens = valueString.strip(" <>").split(', ')
         
-        self.x = float(tokens[0].lstrip('x='))
-        self.y = float(tokens[1].lstrip('y='))
-        self.z = float(tokens[2].lstrip('z='))
+        self.reset(float(tokens[0].lstrip('x=')), float(tokens[1].lstrip('y=')), float(tokens[2].lstrip('z=')))
+
+#######################
+    def enableMagnitudeCaching(self):
+        """
+        Opt-in - from now on, magnitude & magnitudeSquared results will be kept until the vector next changes.
+        Only worthwhile for long-lived vectors whose magnitude is asked for far more often than they change.
+        """
+        if(self._magnitudeCache is None):
+            self._magnitudeCache = [None, None, None, None]
+
+########
+    def _clearMagnitudeCache(self):
+        cache = self._magnitudeCache
+        cache[0] = cache[1] = cache[2] = cache[3] = None
         
 #######################     
     def isNull(self, ignoreVertical=False):
         """
         Returns True if x, y and z are all == zero, False otherwise.
         """
-        return (self.x == 0 and self.z == 0 and (ignoreVertical or self.y == 0))
+        return (self._x == 0 and self._z == 0 and (ignoreVertical or self._y == 0))
     
 #######################
     def add(self, otherVector, ignoreVertical=False):
@@ -229,11 +227,12 @@ class Vector3(PyswarmObject):
         :param otherVector: Vector2 or Vector3.
         :param ignoreVertical: ignores y if True.
         """
-        
-        self.x += otherVector.u
-        self.z += otherVector.v
+        self._x += otherVector.u
+        self._z += otherVector.v
         if(not ignoreVertical): # and not IsVector2(otherVector):
-            self.y += otherVector.y
+            self._y += otherVector.y
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
 
 #######################
     def subtract(self, otherVector, ignoreVertical=False):
@@ -242,10 +241,51 @@ class Vector3(PyswarmObject):
         :param otherVector: Vector2 or Vector3.
         :param ignoreVertical: ignores y if True.
         """
-        self.x -= otherVector.u
-        self.z -= otherVector.v
+        self._x -= otherVector.u
+        self._z -= otherVector.v
         if(not ignoreVertical): # and not IsVector2(otherVector):
-            self.y -= otherVector.y
+            self._y -= otherVector.y
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
+
+#######################
+    def addScaled(self, otherVector, scaleFactor):
+        """
+        In-place equivalent of self.add(otherVector * scaleFactor), without creating the intermediate vector.
+        :param otherVector: Vector3.
+        :param scaleFactor: float.
+        """
+        self._x += otherVector._x * scaleFactor
+        self._y += otherVector._y * scaleFactor
+        self._z += otherVector._z * scaleFactor
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
+
+########
+    def setSum(self, vector1, vector2):
+        """
+        In-place equivalent of self.resetToVector(vector1 + vector2), without creating the intermediate vector.
+        :param vector1: Vector3.
+        :param vector2: Vector3.
+        """
+        self._x = vector1._x + vector2._x
+        self._y = vector1._y + vector2._y
+        self._z = vector1._z + vector2._z
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
+
+########
+    def setDifference(self, vector1, vector2):
+        """
+        In-place equivalent of self.resetToVector(vector1 - vector2), without creating the intermediate vector.
+        :param vector1: Vector3.
+        :param vector2: Vector3.
+        """
+        self._x = vector1._x - vector2._x
+        self._y = vector1._y - vector2._y
+        self._z = vector1._z - vector2._z
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
 
 #######################                 
     def divide(self, scalarVal, ignoreVertical=False):
@@ -260,24 +300,15 @@ class Vector3(PyswarmObject):
         self._z *= scalarMult
         if(not ignoreVertical or self._y == 0): 
             self._y *= scalarMult
-            if(self._magnitudeSquared != __MAGNITUDE_UNDEFINED__):
-                self._magnitudeSquared *= scalarMult
-                if(self._magnitude != __MAGNITUDE_UNDEFINED__):
-                    self._magnitude *= scalarMult
-        else:
-            self._magnitudeSquared = __MAGNITUDE_UNDEFINED__
-        
-        if(self._2dMagnitudeSquared != __MAGNITUDE_UNDEFINED__):
-            self._2dMagnitudeSquared *= scalarMult
-            if(self._2dMagnitude != __MAGNITUDE_UNDEFINED__):
-                self._2dMagnitude *= scalarMult
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
 
 #######################
     def horizontalVector(self):
         """
         Returns Vector2 equivalent of self.
         """
-        return v2.Vector2(self.x, self.z)
+        return v2.Vector2(self._x, self._z)
     
 #######################
     def degreeHeading(self):
@@ -295,14 +326,14 @@ class Vector3(PyswarmObject):
             - -90 = vertical down
             -   0 = horizontal.
         """
-        horizontalMag = self.horizontalVector().magnitude()
+        horizontalMag = self.magnitude(True)
         
         if(horizontalMag > 0):
-            return mth.degrees(mth.atan(self.y / horizontalMag))
-        elif(self.y == 0):
+            return mth.degrees(mth.atan(self._y / horizontalMag))
+        elif(self._y == 0):
             return 0
         else:
-            return 90 if self.y > 0 else -90
+            return 90 if self._y > 0 else -90
 
 #######################         
     def reset(self, x=0, y=0, z=0):
@@ -313,40 +344,35 @@ class Vector3(PyswarmObject):
         :param y: float, y val.
         :param z: float, z val.
         """
-        self.x = float(x)
-        self.y = float(y)
-        self.z = float(z)
+        self._x = float(x)
+        self._y = float(y)
+        self._z = float(z)
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
 
 ####################### 
     def resetToVector(self, otherVector, ignoreVertical=False):
         """
-        Resets self to other vector's values, including magnitude if calculated.
+        Resets self to other vector's values.
         
         :param otherVector: Vector2 or Vector3.
-        :param ignoreVertical: ignores y if True.
+        :param ignoreVertical: ignores y (i.e. sets it to zero) if True.
         """
         self._x = otherVector.u
         self._z = otherVector.v
-        if(not ignoreVertical):
-            if(IsVector2(otherVector)):
-                self.y = 0
-                self._2dMagnitude = otherVector._magnitude
-                self._2dMagnitudeSquared = otherVector._magnitudeSquared
-            else:
-                self._y = otherVector.y
-                self._magnitude = otherVector._magnitude
-                self._magnitudeSquared = otherVector._magnitudeSquared
-                self._2dMagnitude = otherVector._2dMagnitude
-                self._2dMagnitudeSquared = otherVector._2dMagnitudeSquared
+        if(ignoreVertical or IsVector2(otherVector)):
+            self._y = 0.0
         else:
-            self.y = 0
+            self._y = otherVector._y
+        if(self._magnitudeCache is not None):
+            self._clearMagnitudeCache()
 
 ####################### 
     def invert(self):
         """
         Inverts self, magnitude remains unchanged.
         """
-        self._x = -(self._x) # magnitude won't change, so don't use the property setter
+        self._x = -(self._x) # magnitude won't change, so no need to touch the cache
         self._y = -(self._y) #
         self._z = -(self._z) #
         
@@ -355,47 +381,47 @@ class Vector3(PyswarmObject):
         """
         Returns copy of self with inverted values. 
         """
-        invertedVector = Vector3(-(self.x), -(self.y), -(self.z))
-        invertedVector._magnitude = self._magnitude
-        invertedVector._magnitudeSquared = self._magnitudeSquared
-        invertedVector._2dMagnitude = self._2dMagnitude
-        invertedVector._2dMagnitudeSquared = self._2dMagnitudeSquared
-        
-        return invertedVector
+        return Vector3(-(self._x), -(self._y), -(self._z))
 
 ####################### 
     def magnitude(self, ignoreVertical=False):
         """
-        Returns scalar magnitude of self, recalculating if necessary.
+        Returns scalar magnitude of self (cached if enabled - see enableMagnitudeCaching).
         Prefer magnitudeSquared where possible for performance reasons. 
         
         :param ignoreVertical: ignores y if True.
         """
-        if(not ignoreVertical):
-            if(self._magnitude == __MAGNITUDE_UNDEFINED__ or self._magnitudeSquared == __MAGNITUDE_UNDEFINED__):
-                self._magnitude = mth.sqrt(self.magnitudeSquared(ignoreVertical))
-            return self._magnitude
+        cache = self._magnitudeCache
+        if(cache is None):
+            return mth.sqrt(self.magnitudeSquared(ignoreVertical))
         else:
-            if(self._2dMagnitude == __MAGNITUDE_UNDEFINED__ or self._2dMagnitudeSquared == __MAGNITUDE_UNDEFINED__):
-                self._2dMagnitude = mth.sqrt(self.magnitudeSquared(ignoreVertical))
-            return self._2dMagnitude  
+            cacheIndex = 2 if(ignoreVertical) else 0
+            if(cache[cacheIndex] is None):
+                cache[cacheIndex] = mth.sqrt(self.magnitudeSquared(ignoreVertical))
+            return cache[cacheIndex]
         
 #######################   
     def magnitudeSquared(self, ignoreVertical=False):
         """
-        Returns square of scalar magnitude of self, recalculating if necessary.
+        Returns square of scalar magnitude of self (cached if enabled - see enableMagnitudeCaching).
         Prefer to magnitude if possible, for performance reasons.
         
         :param ignoreVertical: ignores y if True.
         """
-        if(not ignoreVertical):
-            if(self._magnitudeSquared == __MAGNITUDE_UNDEFINED__):
-                self._magnitudeSquared = (self.x **2) + (self.y **2) + (self.z **2)
-            return self._magnitudeSquared
+        cache = self._magnitudeCache
+        if(cache is None):
+            if(ignoreVertical):
+                return (self._x **2) + (self._z **2)
+            else:
+                return (self._x **2) + (self._y **2) + (self._z **2)
         else:
-            if(self._2dMagnitudeSquared == __MAGNITUDE_UNDEFINED__):
-                self._2dMagnitudeSquared = (self.x **2) + (self.z **2)
-            return self._2dMagnitudeSquared
+            cacheIndex = 3 if(ignoreVertical) else 1
+            if(cache[cacheIndex] is None):
+                if(ignoreVertical):
+                    cache[cacheIndex] = (self._x **2) + (self._z **2)
+                else:
+                    cache[cacheIndex] = (self._x **2) + (self._y **2) + (self._z **2)
+            return cache[cacheIndex]
 
 ####################### 
     def dot(self, otherVector, ignoreVertical=False):
@@ -405,9 +431,9 @@ class Vector3(PyswarmObject):
         :param ignoreVertical: ignores y if True.
         """
         if(ignoreVertical or IsVector2(otherVector)):
-            return (self.x * otherVector.u) + (self.z * otherVector.v)
+            return (self._x * otherVector.u) + (self._z * otherVector.v)
         else:
-            return (self.x * otherVector.x) + (self.y * otherVector.y) + (self.z * otherVector.z)
+            return (self._x * otherVector._x) + (self._y * otherVector._y) + (self._z * otherVector._z)
 
 #######################        
     def cross(self, otherVector, ignoreVertical=False):
@@ -417,11 +443,11 @@ class Vector3(PyswarmObject):
         :param ignoreVertical: ignores y if True.
         """
         if(ignoreVertical or IsVector2(otherVector)):
-            return (self.u * otherVector.v) - (self.v * otherVector.u)
+            return (self._x * otherVector.v) - (self._z * otherVector.u)
         else:
-            return (((self.y * otherVector.z) - (otherVector.y * self.z)) - 
-                    ((self.x * otherVector.z) - (otherVector.x * self.z)) -
-                    ((self.x * otherVector.y) - (otherVector.x * self.y)))
+            return (((self._y * otherVector.z) - (otherVector.y * self._z)) -
+                    ((self._x * otherVector.z) - (otherVector.x * self._z)) -
+                    ((self._x * otherVector.y) - (otherVector.x * self._y)))
 
 #######################
     def normalise(self, scaleFactor=1.0):
@@ -430,14 +456,17 @@ class Vector3(PyswarmObject):
         
         :param scaleFactor:   float, will be the magnitude of the normalised vector.
         """
-        if(self._magnitude != scaleFactor and not self.isNull()):
+        cache = self._magnitudeCache
+        if((cache is None or cache[0] != scaleFactor) and not self.isNull()):
             multiple = scaleFactor / self.magnitude()
-            self.x *= multiple
-            self.y *= multiple
-            self.z *= multiple
+            self._x *= multiple
+            self._y *= multiple
+            self._z *= multiple
             
-            self._magnitude = scaleFactor
-            self._magnitudeSquared = scaleFactor **2
+            if(cache is not None):
+                self._clearMagnitudeCache()
+                cache[0] = scaleFactor
+                cache[1] = scaleFactor **2
  
 #######################            
     def normalisedVector(self, scaleFactor=1.0):
@@ -446,9 +475,7 @@ class Vector3(PyswarmObject):
         
         :param scaleFactor:  float, will be the magnitude of the normalised vector.
         """
-        normalisedVector = Vector3(self.x, self.y, self.z)
-        normalisedVector._magnitude = self._magnitude
-        normalisedVector._magnitudeSquared = self._magnitudeSquared
+        normalisedVector = Vector3(self)
         normalisedVector.normalise(scaleFactor)
         
         return normalisedVector
@@ -472,7 +499,7 @@ class Vector3(PyswarmObject):
 
             angle = mth.degrees(mth.acos(temp))
             if(0 < angle and angle < 180):
-                cross = (self.u * otherVector.v) - (self.v * otherVector.u)
+                cross = (self._x * otherVector.v) - (self._z * otherVector.u)
                 if(cross > 0):  # anti-clockwise
                     return -angle
                 else: # clockwise
@@ -530,14 +557,14 @@ class Vector3(PyswarmObject):
         :param ignoreVertical: ignores y if True.
         """
         if(ignoreVertical or IsVector2(otherVector)):
-            tempU = (self.x - otherVector.u) ** 2
-            tempV = (self.z - otherVector.v) ** 2
+            tempU = (self._x - otherVector.u) ** 2
+            tempV = (self._z - otherVector.v) ** 2
             
             return (tempU + tempV)
         else:
-            tempX = (self.x - otherVector.x) ** 2
-            tempY = (self.y - otherVector.y) ** 2
-            tempZ = (self.z - otherVector.z) ** 2
+            tempX = (self._x - otherVector._x) ** 2
+            tempY = (self._y - otherVector._y) ** 2
+            tempZ = (self._z - otherVector._z) ** 2
 
             return(tempX + tempY + tempZ)
  
@@ -549,9 +576,9 @@ class Vector3(PyswarmObject):
         :param otherVector: Vector2 or Vector3.
         """
         if(IsVector2(otherVector)):
-            return self.y > 0
+            return self._y > 0
         else:
-            return self.y > otherVector.y
+            return self._y > otherVector._y
 
 #######################  
     def rotateInHorizontal(self, angle):
@@ -563,11 +590,11 @@ class Vector3(PyswarmObject):
         theta = mth.radians(-angle) #formula I'm using gives an inverted angle for some reason...??
         cosTheta = mth.cos(theta)
         sinTheta = mth.sin(theta)
-        xTemp = self.x
+        xTemp = self._x
         
-        # magnitude should be unaffected => don't set values with property accessors
-        self._x = (self.x * cosTheta) - (self.z * sinTheta)
-        self._z = (xTemp * sinTheta) + (self.z * cosTheta)
+        # magnitude should be unaffected => no need to touch the cache
+        self._x = (self._x * cosTheta) - (self._z * sinTheta)
+        self._z = (xTemp * sinTheta) + (self._z * cosTheta)
 
 ####################### 
     def moveTowards(self, toVector, byAmount, ignoreVertical=True):
@@ -585,10 +612,7 @@ class Vector3(PyswarmObject):
             self.resetToVector(toVector, ignoreVertical)
         else:
             diffVec.normalise(byAmount)
-            self.x += diffVec.u
-            if(not ignoreVertical):
-                self.y += diffVec.y
-            self.z += diffVec.v
+            self.add(diffVec, ignoreVertical)
 
 #######################                 
     def jitter(self, maxAmount, ignoreVertical=True):
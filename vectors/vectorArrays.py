@@ -0,0 +1,118 @@
+#
+# PySwarm, a swarming simulation tool for Autodesk Maya
+#
+# created 2013-2014
+#
+# @author: Joe Muers  (joemuers@hotmail.com)
+#
+# All rights reserved.
+#
+# ------------------------------------------------------------
+
+
+"""
+Array equivalents of the Vector3 operations used by the behaviours, for the batch (NumPy) code paths.
+
+All "vectors" arguments are (n x 3) NumPy float arrays, one row per vector; angles are in DEGREES and
+follow the same conventions as Vector3 (i.e. negative for anti-clockwise).  Requires NumPy - check
+NumpyAvailable before using anything else in here.
+"""
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # NumPy is optional - none of the batch code paths will be used without it.
+
+
+
+#####################################
+def NumpyAvailable():
+    return (np is not None)
+
+#####################################
+def Magnitudes(vectors, ignoreVertical=False):
+    """Array equivalent of Vector3.magnitude."""
+    return np.sqrt(MagnitudesSquared(vectors, ignoreVertical))
+
+########
+def MagnitudesSquared(vectors, ignoreVertical=False):
+    """Array equivalent of Vector3.magnitudeSquared."""
+    if(ignoreVertical):
+        return (vectors[:, 0] **2) + (vectors[:, 2] **2)
+    else:
+        return np.einsum('ij,ij->i', vectors, vectors)
+
+########
+def IsNull(vectors, ignoreVertical=False):
+    """Array equivalent of Vector3.isNull."""
+    isNull = (vectors[:, 0] == 0) & (vectors[:, 2] == 0)
+    if(not ignoreVertical):
+        isNull &= (vectors[:, 1] == 0)
+
+    return isNull
+
+#####################################
+def Normalised(vectors, scaleFactors=1.0):
+    """Array equivalent of Vector3.normalise - null vectors are left as they are.
+
+    :param scaleFactors: scalar, or array of length n giving the magnitude of each resulting vector.
+    """
+    magnitudes = Magnitudes(vectors)
+    nonNull = (magnitudes > 0)
+    multiples = np.zeros_like(magnitudes)
+    multiples[nonNull] = (np.broadcast_to(scaleFactors, magnitudes.shape)[nonNull] / magnitudes[nonNull])
+
+    return np.where(nonNull[:, None], vectors * multiples[:, None], vectors)
+
+########
+def ClampedMagnitudes(vectors, maxMagnitudes):
+    """Returns copy of vectors, scaled down where necessary so that no magnitude exceeds the given maximums.
+
+    :param maxMagnitudes: scalar, or array of length n.
+    """
+    magnitudes = Magnitudes(vectors)
+    maxMagnitudes = np.broadcast_to(maxMagnitudes, magnitudes.shape)
+    needsClamping = (magnitudes > maxMagnitudes)
+    multiples = np.ones_like(magnitudes)
+    multiples[needsClamping] = maxMagnitudes[needsClamping] / magnitudes[needsClamping]
+
+    return vectors * multiples[:, None]
+
+#####################################
+def AnglesTo(fromVectors, toVectors):
+    """Array equivalent of Vector3.angleTo (with ignoreVertical=True, i.e. horizontal angles only).
+    Angle is 0 where either vector is null in the horizontal plane."""
+    fromX, fromZ = fromVectors[:, 0], fromVectors[:, 2]
+    toX, toZ = toVectors[:, 0], toVectors[:, 2]
+
+    magnitudesProduct = np.sqrt((fromX **2) + (fromZ **2)) * np.sqrt((toX **2) + (toZ **2))
+    isNull = (magnitudesProduct == 0)
+    cosines = ((fromX * toX) + (fromZ * toZ)) / np.where(isNull, 1.0, magnitudesProduct)
+    angles = np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)))
+
+    isAntiClockwise = ((0 < angles) & (angles < 180) & (((fromX * toZ) - (fromZ * toX)) > 0))
+    angles = np.where(isAntiClockwise, -angles, angles)
+    angles[isNull] = 0.0
+
+    return angles
+
+########
+def RotatedInHorizontal(vectors, angles):
+    """Array equivalent of Vector3.rotateInHorizontal - returns rotated copies of vectors.
+
+    :param angles: scalar, or array of length n, in DEGREES (negative for anti-clockwise).
+    """
+    thetas = np.radians(-np.asarray(angles, dtype=np.float64))
+    cosThetas = np.cos(thetas)
+    sinThetas = np.sin(thetas)
+
+    rotatedVectors = np.array(vectors, dtype=np.float64)
+    rotatedVectors[:, 0] = (vectors[:, 0] * cosThetas) - (vectors[:, 2] * sinThetas)
+    rotatedVectors[:, 2] = (vectors[:, 0] * sinThetas) + (vectors[:, 2] * cosThetas)
+
+    return rotatedVectors
+
+
+# END OF MODULE
+#####################################